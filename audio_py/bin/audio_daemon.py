@@ -14,14 +14,51 @@ Goals:
 - Clean socket lifecycle (unlink stale, chmod, graceful shutdown)
 - Safe, minimal command surface
 - Works on constrained hardware
+
+Modes (VOXIE_AUDIO_DAEMON_MODE):
+- async  (default): asyncio event loop, many clients at once, connections
+                    kept open; PLAY_* spawn/verify runs on a worker thread so
+                    STOP/STATUS/PING are always answered inline. PLAY_* reply
+                    {"ok":true,"job":"j1"} right away (add "wait":true to reply
+                    only once the player is verified alive); progress via
+                    {"cmd":"JOB_STATUS","job":"j1"} and
+                    {"cmd":"WAIT","job":"j1","until":"done|started","timeout_ms":N}
+                    Priority queue (alarm > tts > filler > radio):
+                    {"cmd":"ENQUEUE","items":[{"path":"a.wav","prio":"filler"},
+                                              {"url":"http://...","prio":"radio"}]}
+                    {"cmd":"CLEAR","prio":"filler","current":false}
+                    Stream racing: {"cmd":"PLAY_STREAM_ANY","urls":[best,...]}
+                    connects to all at once, plays the first that delivers
+                    valid MPEG frames; the old stream keeps playing until then
+                    Streaming ingest (see src/audio/ingest.py):
+                    {"cmd":"PLAY_BYTES","format":"mp3|pcm","tee":"/abs.mp3"}
+                    then <u32 BE len><bytes>... <u32 0>; queued like ENQUEUE
+                    (class tts by default), plays while bytes arrive;
+                    closing without the zero frame fails the job
+                    Events: {"cmd":"SUBSCRIBE","jobs":["j1"],"events":["finished"]}
+                    turns the connection into a push channel: one JSON line
+                    per started/finished/failed/preempted/stopped event,
+                    until the client closes it (filters optional)
+                    Mixer engine: radio keeps playing (ducked) under voice;
+                    {"cmd":"STOP","fg":true} stops the voice channel only
+                    Atomic batch: {"cmd":"BATCH","cmds":[{"cmd":"STOP"},
+                    {"cmd":"ENQUEUE",...}]} -> {"ok":..,"results":[..]}
+                    Binary mode: {"cmd":"BINARY"} switches the connection
+                    to length-prefixed frames (see src/audio/protocol.py)
+                    Metrics: {"cmd":"STATS"} (JSON) or
+                    {"cmd":"STATS","format":"prom"}; also written to
+                    $VOXIE_METRICS_DIR/audio_daemon.prom (see src/metrics.py)
+- legacy:           original one-connection-at-a-time accept loop
 """
 
 import os
 import sys
 import socket
 import signal
+import time
+import asyncio
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
 
 # ------------------------------------------------------------
 # Ensure local src/ is on PYTHONPATH (repo-relative)
@@ -36,7 +73,14 @@ if str(SRC_DIR) not in sys.path:
 # ------------------------------------------------------------
 try:
     from audio import play_wav, play_mp3, play_stream, stop, is_playing
-    from audio.protocol import parse_line, reply
+    from audio.engine import AudioEngine
+    from audio.ingest import FRAME, MAX_FRAME, ByteFeed, parse_format
+    from audio.playqueue import PRIO, prio_of
+    from audio.protocol import (
+        HEADER, MAX_PAYLOAD, OP_BYTES, OP_JSON, OP_NAMES, OP_PING, OP_REPLY, OP_STATUS, OP_STOP,
+        frame, frame_json, pack_status, parse_batch, parse_line, reply,
+    )
+    import metrics
 except Exception as e:
     print(f"[AUDIO_DAEMON][FATAL] Import error: {e}", flush=True)
     print("Expected: src/audio.py and src/audio/protocol.py (or package).", flush=True)
@@ -50,6 +94,41 @@ SOCK_PATH = str(SOCK_PATH)
 
 DEBUG = int(os.environ.get("DEBUG", "0"))
 
+MODE = (os.environ.get("VOXIE_AUDIO_DAEMON_MODE", "async") or "async").strip().lower()
+
+# PLAY command -> (player kind, target field)
+PLAY_KINDS = {
+    "PLAY_WAV": ("wav", "path"),
+    "PLAY_MP3": ("mp3", "path"),
+    "PLAY_STREAM": ("stream", "url"),
+}
+
+# Max items per ENQUEUE
+ENQUEUE_MAX = 32
+
+# Max URLs raced by PLAY_STREAM_ANY
+RACE_MAX = 8
+
+# Upper bound for WAIT (a client can always WAIT again).
+WAIT_MAX_MS = 120000
+
+# Command label values; anything else is counted as "OTHER"
+KNOWN_CMDS = frozenset((
+    "PING", "HELLO", "STOP", "STATUS", "STATS", "PLAY_WAV", "PLAY_MP3", "PLAY_STREAM",
+    "PLAY_STREAM_ANY", "PLAY_BYTES", "ENQUEUE", "CLEAR", "JOB_STATUS", "WAIT", "SUBSCRIBE",
+    "BATCH", "BINARY",
+))
+
+CMD_SECONDS = metrics.histogram("voxie_audio_command_seconds", "Socket command handling time", ("cmd",))
+CMD_ERRORS = metrics.counter("voxie_audio_command_errors_total", "Commands answered with ok=false", ("cmd",))
+CLIENTS = metrics.gauge("voxie_audio_clients", "Open client connections")
+
+# Connection handlers, cancelled on shutdown (wait_closed() waits for every
+# open connection on Python 3.12.1+: a kept-alive or SUBSCRIBE client would
+# hold the daemon up forever).
+SESSIONS: Set["asyncio.Task[None]"] = set()
+SHUTDOWN_SEC = 2.0
+
 
 def log(msg: str) -> None:
     print(msg, flush=True)
@@ -64,7 +143,14 @@ def _safe_str(x: Any) -> str:
     return "" if x is None else str(x)
 
 
-def handle(cmd: Dict[str, Any]) -> Dict[str, Any]:
+def _observe(c_up: str, t0: float, res: Optional[Dict[str, Any]]) -> None:
+    label = c_up if c_up in KNOWN_CMDS else "OTHER"
+    CMD_SECONDS.observe(time.monotonic() - t0, cmd=label)
+    if res is None or not res.get("ok"):
+        CMD_ERRORS.inc(cmd=label)
+
+
+def handle(cmd: Dict[str, Any], gen: Optional[int] = None) -> Dict[str, Any]:
     """
     Execute an audio command.
     Expected cmd format (examples):
@@ -73,6 +159,9 @@ def handle(cmd: Dict[str, Any]) -> Dict[str, Any]:
       {"cmd":"PLAY_WAV","path":"/path/file.wav"}
       {"cmd":"PLAY_MP3","path":"/path/file.mp3"}
       {"cmd":"PLAY_STREAM","url":"http://..."}  (or "src")
+
+    `gen` is the player generation captured when the request was received,
+    so a STOP that arrives while a PLAY is still pending cancels it.
     """
     c = _safe_str(cmd.get("cmd")).strip()
     c_up = c.upper()
@@ -90,25 +179,30 @@ def handle(cmd: Dict[str, Any]) -> Dict[str, Any]:
     if c_up == "STATUS":
         return {"ok": True, "playing": bool(is_playing())}
 
+    if c_up == "STATS":
+        if _safe_str(cmd.get("format")).lower() == "prom":
+            return {"ok": True, "text": metrics.render()}
+        return {"ok": True, "metrics": metrics.snapshot()}
+
     if c_up == "PLAY_WAV":
         path = _safe_str(cmd.get("path"))
         if not path:
             return {"ok": False, "err": "BAD_REQUEST", "msg": "Missing path"}
-        play_wav(path)
+        play_wav(path, gen=gen)
         return {"ok": True}
 
     if c_up == "PLAY_MP3":
         path = _safe_str(cmd.get("path"))
         if not path:
             return {"ok": False, "err": "BAD_REQUEST", "msg": "Missing path"}
-        play_mp3(path)
+        play_mp3(path, gen=gen)
         return {"ok": True}
 
     if c_up == "PLAY_STREAM":
         url = _safe_str(cmd.get("url") or cmd.get("src"))
         if not url:
             return {"ok": False, "err": "BAD_REQUEST", "msg": "Missing url/src"}
-        play_stream(url)
+        play_stream(url, gen=gen)
         return {"ok": True}
 
     return {"ok": False, "err": "UNKNOWN_CMD", "cmd": c}
@@ -123,9 +217,7 @@ def _cleanup_socket(path: str) -> None:
         pass
 
 
-def main() -> None:
-    sock_file = Path(SOCK_PATH)
-
+def serve_legacy() -> None:
     _cleanup_socket(SOCK_PATH)
 
     srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
@@ -145,6 +237,7 @@ def main() -> None:
 
     srv.listen(16)
     log(f"[AUDIO_DAEMON] listening on {SOCK_PATH}")
+    metrics.export("audio_daemon")
 
     running = True
 
@@ -188,12 +281,17 @@ def main() -> None:
 
                     dlog(f"[AUDIO_DAEMON] << {line_str}")
 
+                    t0 = time.monotonic()
+                    c_up = ""
+                    res = None
                     try:
                         cmd = parse_line(line_str)
+                        c_up = _safe_str(cmd.get("cmd")).strip().upper()
                         res = handle(cmd)
                         payload = reply(res)
                     except Exception as e:
                         payload = reply({"ok": False, "err": "EXC", "msg": str(e)})
+                    _observe(c_up, t0, res)
 
                     try:
                         conn.sendall(payload)
@@ -218,5 +316,420 @@ def main() -> None:
     _cleanup_socket(SOCK_PATH)
 
 
+# ------------------------------------------------------------
+# asyncio mode
+# ------------------------------------------------------------
+ENGINE: Optional[AudioEngine] = None
+
+
+def _truthy(v: Any) -> bool:
+    return str(v).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _job_reply(job, **extra: Any) -> Dict[str, Any]:
+    res: Dict[str, Any] = {"ok": True, "job": job.id, "state": job.state}
+    d = job.to_dict()
+    for k in ("err", "exit", "start_ms", "dur_ms"):
+        if k in d:
+            res[k] = d[k]
+    res.update(extra)
+    return res
+
+
+def _parse_item(item: Dict[str, Any]) -> Tuple[Optional[Tuple[str, str, Optional[int]]], str]:
+    """ENQUEUE item -> ((kind, target, prio), "") or (None, error message)."""
+    kind = _safe_str(item.get("kind")).strip().lower()
+    target = _safe_str(item.get("path") or item.get("url") or item.get("src")).strip()
+    if not target:
+        return None, "Missing path/url"
+    if not kind:
+        low = target.lower()
+        if low.startswith("http://") or low.startswith("https://"):
+            kind = "stream"
+        elif low.endswith(".wav"):
+            kind = "wav"
+        else:
+            kind = "mp3"
+    if kind not in ("wav", "mp3", "stream"):
+        return None, "Bad kind: " + kind
+    prio = prio_of(item.get("prio"), kind)
+    if prio is None:
+        return None, "Bad prio: " + _safe_str(item.get("prio"))
+    return (kind, target, prio), ""
+
+
+async def handle_async(cmd: Dict[str, Any]) -> Dict[str, Any]:
+    eng = ENGINE
+    assert eng is not None
+    c_up = _safe_str(cmd.get("cmd")).strip().upper()
+
+    if c_up == "STOP":
+        eng.stop(fg_only=_truthy(cmd.get("fg")))
+        return {"ok": True}
+
+    if c_up == "STATUS":
+        return eng.status()
+
+    if c_up in PLAY_KINDS:
+        kind, field = PLAY_KINDS[c_up]
+        target = _safe_str(cmd.get(field) or (cmd.get("src") if kind == "stream" else ""))
+        if not target:
+            msg = "Missing url/src" if kind == "stream" else "Missing path"
+            return {"ok": False, "err": "BAD_REQUEST", "msg": msg}
+        prio = prio_of(cmd.get("prio"), kind)
+        if prio is None:
+            return {"ok": False, "err": "BAD_REQUEST", "msg": "Bad prio"}
+
+        job = eng.play(kind, target, prio)
+        if not _truthy(cmd.get("wait")):
+            return {"ok": True, "job": job.id}
+
+        await eng.wait(job, until="started", timeout=5.0)
+        res = _job_reply(job)
+        res["ok"] = job.state in ("playing", "done")
+        return res
+
+    if c_up == "PLAY_STREAM_ANY":
+        raw = cmd.get("urls")
+        urls = [_safe_str(u).strip() for u in raw] if isinstance(raw, list) else []
+        urls = [u for u in urls if u.startswith("http://") or u.startswith("https://")][:RACE_MAX]
+        if not urls:
+            return {"ok": False, "err": "BAD_REQUEST", "msg": "urls: 1..%d http(s) urls" % RACE_MAX}
+        prio = prio_of(cmd.get("prio"), "stream")
+        if prio is None:
+            return {"ok": False, "err": "BAD_REQUEST", "msg": "Bad prio"}
+
+        job = eng.play_any(urls, prio)
+        if not _truthy(cmd.get("wait")):
+            return {"ok": True, "job": job.id}
+
+        await eng.wait(job, until="started", timeout=10.0)
+        res = _job_reply(job)
+        res["ok"] = job.state in ("playing", "done")
+        res["url"] = job.target
+        return res
+
+    if c_up == "ENQUEUE":
+        raw = cmd.get("items")
+        if raw is None:
+            raw = [cmd]
+        if not isinstance(raw, list) or not raw or len(raw) > ENQUEUE_MAX:
+            return {"ok": False, "err": "BAD_REQUEST", "msg": "items: 1..%d" % ENQUEUE_MAX}
+        items: List[Tuple[str, str, Optional[int]]] = []
+        for i, it in enumerate(raw):
+            parsed, msg = _parse_item(it if isinstance(it, dict) else {})
+            if parsed is None:
+                return {"ok": False, "err": "BAD_REQUEST", "msg": "item %d: %s" % (i, msg)}
+            items.append(parsed)
+        return {"ok": True, "jobs": [j.id for j in eng.enqueue(items)]}
+
+    if c_up == "CLEAR":
+        prio = None
+        if cmd.get("prio") not in (None, ""):
+            prio = prio_of(cmd.get("prio"))
+            if prio is None:
+                return {"ok": False, "err": "BAD_REQUEST", "msg": "Bad prio"}
+        n = eng.clear(prio, current=_truthy(cmd.get("current")))
+        return {"ok": True, "cleared": n}
+
+    if c_up == "BATCH":
+        subs, msg = parse_batch(cmd)
+        if subs is None:
+            return {"ok": False, "err": "BAD_REQUEST", "msg": msg}
+        # none of the batchable branches awaits anything that suspends, so
+        # the whole batch runs in one event-loop step (atomic for other clients)
+        results: List[Dict[str, Any]] = []
+        for sub in subs:
+            try:
+                results.append(await handle_async(sub))
+            except Exception as e:
+                results.append({"ok": False, "err": "EXC", "msg": str(e)})
+        return {"ok": all(r.get("ok") for r in results), "results": results}
+
+    if c_up in ("JOB_STATUS", "WAIT"):
+        job = eng.jobs.get(_safe_str(cmd.get("job")))
+        if job is None:
+            return {"ok": False, "err": "UNKNOWN_JOB", "job": _safe_str(cmd.get("job"))}
+        if c_up == "JOB_STATUS":
+            return _job_reply(job)
+
+        try:
+            timeout_ms = min(int(cmd.get("timeout_ms", 30000)), WAIT_MAX_MS)
+        except (TypeError, ValueError):
+            timeout_ms = 30000
+        until = _safe_str(cmd.get("until") or "done").lower()
+        ok = await eng.wait(job, until=until, timeout=timeout_ms / 1000.0)
+        return _job_reply(job, timeout=not ok)
+
+    return handle(cmd)
+
+
+def _str_set(v: Any) -> Optional[set]:
+    if isinstance(v, str):
+        v = [v]
+    if not isinstance(v, list) or not v:
+        return None
+    return {_safe_str(x).strip() for x in v}
+
+
+async def _subscribe(cmd: Dict[str, Any], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Push job events on this connection until the client goes away."""
+    assert ENGINE is not None
+    jobs = _str_set(cmd.get("jobs") or cmd.get("job"))
+    events = _str_set(cmd.get("events"))
+
+    q = ENGINE.jobs.subscribe()
+    eof = asyncio.ensure_future(reader.read())  # anything else the client sends is ignored
+    try:
+        writer.write(reply({"ok": True, "subscribed": True}))
+        await writer.drain()
+        while True:
+            get = asyncio.ensure_future(q.get())
+            done, _ = await asyncio.wait({get, eof}, return_when=asyncio.FIRST_COMPLETED)
+            if get not in done:
+                get.cancel()
+                break
+            ev = get.result()
+            if jobs is not None and ev.get("id") not in jobs:
+                continue
+            if events is not None and ev.get("event") not in events:
+                continue
+            writer.write(reply(ev))
+            await writer.drain()
+    finally:
+        ENGINE.jobs.unsubscribe(q)
+        eof.cancel()
+
+
+def _tee_path(v: Any) -> Optional[str]:
+    """Absolute cache file path in an existing directory, else None."""
+    p = _safe_str(v).strip()
+    if not p or not os.path.isabs(p) or not os.path.isdir(os.path.dirname(p)):
+        return None
+    return p
+
+
+async def _play_bytes(
+    cmd: Dict[str, Any],
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    enc: Callable[[Dict[str, Any]], bytes] = reply,
+) -> bool:
+    """PLAY_BYTES: header already read; consume frames until the zero-length one."""
+    assert ENGINE is not None
+    try:
+        spec = parse_format(_safe_str(cmd.get("format")), int(cmd.get("rate") or 0), int(cmd.get("channels") or 0))
+    except (TypeError, ValueError):
+        spec = None
+    prio = prio_of(cmd.get("prio"), "bytes")
+    if spec is None or prio is None:
+        # the client must not send frames after an error reply
+        writer.write(enc({"ok": False, "err": "BAD_REQUEST", "msg": "Bad format/prio"}))
+        await writer.drain()
+        return True
+
+    tee = _tee_path(cmd.get("tee")) if cmd.get("tee") else None
+    feed = ByteFeed(spec, tee)
+    job = ENGINE.play_bytes(feed, prio)
+    writer.write(enc({"ok": True, "job": job.id}))
+    await writer.drain()
+
+    ok = False
+    try:
+        while True:
+            (n,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+            if n == 0:
+                ok = True
+                break
+            if n > MAX_FRAME:
+                break
+            feed.feed(await reader.readexactly(n))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        if not ok:
+            # framing error or client gone (a TTS download that broke off): fail the
+            # job before the decoder sees EOF, so a truncated clip is neither played
+            # to the end nor saved to the cache
+            ENGINE.fail_bytes(job, "STREAM_ABORTED")
+        feed.finish(ok)
+
+    if not ok:
+        return False
+    writer.write(enc({"ok": True, "job": job.id, "bytes": feed.received}))
+    await writer.drain()
+    return True
+
+
+def _bin_reply(obj: Dict[str, Any]) -> bytes:
+    return frame_json(OP_JSON | OP_REPLY, obj)
+
+
+async def _serve_binary(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Binary frames (after BINARY) until the client closes or breaks framing."""
+    eng = ENGINE
+    assert eng is not None
+    while True:
+        try:
+            op, n = HEADER.unpack(await reader.readexactly(HEADER.size))
+            if n > MAX_PAYLOAD:
+                break
+            payload = await reader.readexactly(n) if n else b""
+        except asyncio.IncompleteReadError:
+            break
+        t0 = time.monotonic()
+        res: Optional[Dict[str, Any]] = {"ok": True}
+        label = OP_NAMES.get(op, "OTHER")
+
+        if op == OP_PING:
+            out = frame(OP_PING | OP_REPLY)
+        elif op == OP_STATUS:
+            st = eng.status()
+            out = frame(OP_STATUS | OP_REPLY, pack_status(st, PRIO.get(st.get("prio", ""))))
+        elif op == OP_STOP:
+            eng.stop(fg_only=payload[:1] == b"\x01")
+            out = frame(OP_STOP | OP_REPLY)
+        elif op in (OP_JSON, OP_BYTES):
+            cmd = parse_line(payload.decode("utf-8", errors="ignore"))
+            if op == OP_BYTES:
+                ok = await _play_bytes(cmd, reader, writer, _bin_reply)
+                _observe(label, t0, {"ok": ok})
+                if not ok:
+                    break
+                continue
+            label = _safe_str(cmd.get("cmd")).strip().upper()
+            try:
+                res = await handle_async(cmd)
+            except Exception as e:
+                res = {"ok": False, "err": "EXC", "msg": str(e)}
+            out = _bin_reply(res)
+        else:
+            res = {"ok": False, "err": "BAD_OP", "op": op}
+            out = _bin_reply(res)
+
+        writer.write(out)
+        await writer.drain()
+        _observe(label, t0, res)
+
+
+async def _serve_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    task = asyncio.current_task()
+    if task is not None:
+        SESSIONS.add(task)
+    CLIENTS.inc()
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (asyncio.LimitOverrunError, ValueError):
+                writer.write(reply({"ok": False, "err": "BAD_REQUEST", "msg": "Line too long"}))
+                break
+            if not line:
+                break
+
+            line_str = line.decode("utf-8", errors="ignore").strip()
+            if not line_str:
+                continue
+
+            dlog(f"[AUDIO_DAEMON] << {line_str}")
+
+            t0 = time.monotonic()
+            cmd = parse_line(line_str)
+            c_up = _safe_str(cmd.get("cmd")).strip().upper()
+            if c_up == "SUBSCRIBE":
+                await _subscribe(cmd, reader, writer)
+                break
+            if c_up == "BINARY":
+                writer.write(reply({"ok": True, "binary": True}))
+                await writer.drain()
+                await _serve_binary(reader, writer)
+                break
+            if c_up == "PLAY_BYTES":
+                # timed until the whole stream is in: the job itself is in voxie_audio_job_start_seconds
+                ok = await _play_bytes(cmd, reader, writer)
+                _observe(c_up, t0, {"ok": ok})
+                if not ok:
+                    break
+                continue
+
+            res = None
+            try:
+                res = await handle_async(cmd)
+                payload = reply(res)
+            except Exception as e:
+                payload = reply({"ok": False, "err": "EXC", "msg": str(e)})
+            _observe(c_up, t0, res)
+
+            writer.write(payload)
+            await writer.drain()
+    except (ConnectionError, BrokenPipeError):
+        pass
+    except asyncio.CancelledError:
+        # shutdown with kept-alive clients still connected
+        pass
+    finally:
+        CLIENTS.dec()
+        SESSIONS.discard(task)  # type: ignore[arg-type]
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+
+async def _serve_async() -> None:
+    global ENGINE
+    _cleanup_socket(SOCK_PATH)
+    ENGINE = AudioEngine()
+    ENGINE.start()
+
+    try:
+        srv = await asyncio.start_unix_server(_serve_client, path=SOCK_PATH)
+    except Exception as e:
+        log(f"[AUDIO_DAEMON][FATAL] bind failed: {SOCK_PATH} ({e})")
+        sys.exit(2)
+
+    try:
+        os.chmod(SOCK_PATH, 0o666)
+    except Exception:
+        pass
+
+    watch = ENGINE.children.method if ENGINE.children is not None else "-"
+    log(f"[AUDIO_DAEMON] listening on {SOCK_PATH} (async, engine={ENGINE.mode}, exit={watch})")
+    prom = metrics.export("audio_daemon")
+    if prom:
+        log(f"[AUDIO_DAEMON] metrics -> {prom}")
+
+    done = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, done.set)
+
+    await done.wait()
+
+    srv.close()
+    for task in list(SESSIONS):
+        task.cancel()
+    if SESSIONS:
+        await asyncio.wait(list(SESSIONS), timeout=SHUTDOWN_SEC)
+    try:
+        await asyncio.wait_for(srv.wait_closed(), SHUTDOWN_SEC)
+    except asyncio.TimeoutError:
+        log(f"[AUDIO_DAEMON] {len(SESSIONS)} connection(s) still open at shutdown")
+    ENGINE.close()
+    _cleanup_socket(SOCK_PATH)
+    log("[AUDIO_DAEMON] shutdown")
+
+
+def serve_async() -> None:
+    asyncio.run(_serve_async())
+
+
+def main() -> None:
+    if MODE == "legacy":
+        serve_legacy()
+    else:
+        serve_async()
+
+
 if __name__ == "__main__":
     main()
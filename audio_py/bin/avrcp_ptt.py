@@ -9,7 +9,9 @@ Backends:
 - DBus (default): listens to BlueZ MediaControl1 KeyPressed via `dbus-monitor`
 - btmon (optional): parses raw btmon output (older but sometimes very reliable)
 
-Writes a trigger token into VOXIE_PTT_FIFO (default: /tmp/bitvox_ptt.fifo)
+Sends each press on the trigger bus (VOXIE_TRIGGER_SOCK, src/trigger_bus.py),
+or writes a trigger token into VOXIE_PTT_FIFO (default: /tmp/bitvox_ptt.fifo)
+when no listener is bound there
 
 Environment:
 - VOXIE_PTT_FIFO=/tmp/bitvox_ptt.fifo
@@ -17,6 +19,7 @@ Environment:
 - VOXIE_PTT_DEBOUNCE_SEC=0.35
 - VOXIE_AVRCP_BACKEND=dbus|btmon   (default: dbus)
 - VOXIE_AVRCP_KEYS=playpause,play,pause  (dbus backend)
+- VOXIE_TRIGGER_SOCK=/tmp/bitvox_trigger.sock
 """
 
 import os
@@ -29,6 +32,12 @@ import subprocess
 from pathlib import Path
 from typing import List
 
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from trigger_bus import send_trigger  # noqa: E402
+
 
 FIFO = os.environ.get("VOXIE_PTT_FIFO", "/tmp/bitvox_ptt.fifo")
 TRIGGER = os.environ.get("VOXIE_PTT_TOKEN", "PTT")
@@ -79,6 +88,11 @@ def fifo_trigger(path: str, token: str) -> bool:
         return False
 
 
+def trigger(key: str) -> bool:
+    """Trigger bus first, the FIFO if no listener is bound there."""
+    return send_trigger("avrcp", {"key": key} if key else None) or fifo_trigger(FIFO, TRIGGER)
+
+
 def parse_keys(keys_csv: str) -> List[str]:
     out: List[str] = []
     for k in (keys_csv or "").split(","):
@@ -125,16 +139,17 @@ def run_dbus(keys: List[str], debounce: float) -> int:
                 if key not in keys:
                     continue
 
-                now = time.time()
+                # dbus-monitor lines carry no time: the moment we read it is the earliest we have
+                now = time.monotonic()
                 if now - last_ts < debounce:
                     continue
                 last_ts = now
 
-                ok = fifo_trigger(FIFO, TRIGGER)
+                ok = trigger(key)
                 if ok:
                     log(f"[AVRCP_PTT] PTT (key={key})")
                 else:
-                    log(f"[AVRCP_PTT] detected key={key} but FIFO has no reader")
+                    log(f"[AVRCP_PTT] detected key={key} but no listener (trigger bus / FIFO)")
 
         except KeyboardInterrupt:
             log("\n[AVRCP_PTT] exit")
@@ -169,16 +184,16 @@ def run_btmon(debounce: float) -> int:
             if not BTMON_PRESS_RE.search(line):
                 continue
 
-            now = time.time()
+            now = time.monotonic()
             if now - last_ts < debounce:
                 continue
             last_ts = now
 
-            ok = fifo_trigger(FIFO, TRIGGER)
+            ok = trigger("")
             if ok:
                 log("[AVRCP_PTT] PTT")
             else:
-                log("[AVRCP_PTT] detected press but FIFO has no reader")
+                log("[AVRCP_PTT] detected press but no listener (trigger bus / FIFO)")
 
     except KeyboardInterrupt:
         log("\n[AVRCP_PTT] exit")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_agent.py
+Per-turn agent start-up: `php agent.php` per turn vs the resident worker
+
+What a turn costs before any skill runs (PHP start, .env, ~20 requires,
+routing), measured with ROUTE requests so nothing is played, spoken or
+fetched:
+- spawn:   `php agent.php --route "<text>"`, one process per turn (what
+           voxie_listen did until now)
+- worker:  {"cmd":"ROUTE"} to agent_worker.php over its unix socket
+           (src/agent_client.py; the first call starts the worker and is
+           reported separately as the one-off boot)
+
+Run it on the Pi (the numbers that matter are there); the texts match
+the offline router only, so VOXIE_FEATURE_SEMANTIC makes no network call.
+
+Usage:
+  python3 audio_py/bin/bench_agent.py
+  python3 audio_py/bin/bench_agent.py -n 50 --sock /tmp/bench_agent.sock
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from agent_client import AgentClient  # noqa: E402
+
+ROOT = os.environ.get("VOXIE_ROOT") or str(BASE_DIR.parent)
+AGENT_PHP = os.environ.get("VOXIE_AGENT_PHP", f"{ROOT}/php/bin/agent.php")
+WORKER_PHP = os.environ.get("VOXIE_AGENT_WORKER_PHP", f"{ROOT}/php/bin/agent_worker.php")
+
+TEXTS = [
+    "che ore sono", "che tempo fa domani", "metti la radio jazz", "notizie di sport",
+    "sveglia alle 7:30", "timer 10 minuti", "stop", "modalità studio",
+]
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def pct(xs: List[float], q: float) -> float:
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(q * len(s)))] if s else 0.0
+
+
+def report(name: str, ms: List[float]) -> None:
+    log(f"[AGENT] {name:<7} n={len(ms):<4} p50={pct(ms, 0.5):7.1f}ms p95={pct(ms, 0.95):7.1f}ms "
+        f"max={max(ms):7.1f}ms")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Agent start-up per turn: php per turn vs resident worker")
+    ap.add_argument("-n", type=int, default=20, help="turns per mode")
+    ap.add_argument("--sock", default="/tmp/bench_agent.sock", help="socket for the benchmark's own worker")
+    args = ap.parse_args()
+
+    if not shutil.which("php"):
+        log("[AGENT] php not found")
+        return 1
+    texts = [TEXTS[i % len(TEXTS)] for i in range(args.n)]
+    log(f"[AGENT] agent={AGENT_PHP} n={args.n}")
+
+    spawn: List[float] = []
+    for t in texts:
+        t0 = time.perf_counter()
+        p = subprocess.run(["php", AGENT_PHP, "--route", t], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        spawn.append((time.perf_counter() - t0) * 1000.0)
+        if p.returncode != 0:
+            log(f"[AGENT] agent.php failed rc={p.returncode}")
+            return 1
+    report("spawn", spawn)
+
+    client = AgentClient(args.sock, WORKER_PHP, timeout=10.0)
+    try:
+        t0 = time.perf_counter()
+        r = client.ping()
+        boot = (time.perf_counter() - t0) * 1000.0
+        if not r.get("ok"):
+            log(f"[AGENT] worker: {r}")
+            return 1
+        worker: List[float] = []
+        for t in texts:
+            t0 = time.perf_counter()
+            r = client.route(t)
+            worker.append((time.perf_counter() - t0) * 1000.0)
+            if not r.get("ok"):
+                log(f"[AGENT] worker route failed: {r}")
+                return 1
+        report("worker", worker)
+        log(f"[AGENT] worker boot (once) {boot:.1f}ms, mem {client.ping().get('mem_kb', '?')} KiB")
+        log(f"[AGENT] saved per turn p50={pct(spawn, 0.5) - pct(worker, 0.5):.1f}ms")
+    finally:
+        client._kill()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_features.py
+CPU cost of the VAD frame features (features.py) per hour of audio
+
+wake_poll computes one RMS per 20 ms chunk, forever. For each backend we
+run N seconds of synthetic 16 kHz mono S16_LE audio (speech-like tone
+bursts over noise) through the feature engine and report:
+
+- cpu%:     share of one core at real time
+- cpu s/h:  CPU seconds spent per hour of audio
+
+"legacy" is the old wake_poll rms_amp() (struct.unpack with a format
+string built per call + a Python loop over every sample), for reference.
+"xN" rows pass N frames per call (e.g. a capture thread reading 100 ms
+at a time) and also compute peak and ZCR.
+
+Usage:
+  python3 audio_py/bin/bench_features.py
+  python3 audio_py/bin/bench_features.py --seconds 120 --frame-ms 20 --batch 5
+"""
+
+from __future__ import annotations
+
+import sys
+import math
+import time
+import array
+import random
+import struct
+import argparse
+from pathlib import Path
+from typing import Callable, List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from mic.features import FrameFeatures, backends  # noqa: E402
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def legacy_rms(pcm16: bytes) -> float:
+    n = len(pcm16) // 2
+    if n <= 0:
+        return 0.0
+    samples = struct.unpack("<" + ("h" * n), pcm16)
+    acc = 0.0
+    for x in samples:
+        acc += float(x) * float(x)
+    return math.sqrt(acc / n)
+
+
+def synth(rate: int, seconds: float) -> bytes:
+    """Noise floor with 300 ms tone bursts every second."""
+    rnd = random.Random(7)
+    a = array.array("h")
+    for i in range(int(rate * seconds)):
+        v = rnd.randint(-300, 300)
+        if (i % rate) < rate * 0.3:
+            v += int(9000 * math.sin(2 * math.pi * 220 * i / rate))
+        a.append(max(-32768, min(32767, v)))
+    return a.tobytes()
+
+
+def run(pcm: bytes, chunk: int, fn: Callable[[bytes], object]) -> float:
+    """CPU seconds to feed `pcm` to `fn` in `chunk`-byte reads."""
+    mv = memoryview(pcm)
+    t0 = time.process_time()
+    for off in range(0, len(pcm) - chunk + 1, chunk):
+        fn(mv[off:off + chunk].tobytes())
+    return time.process_time() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="VAD feature CPU per hour of 16 kHz audio")
+    ap.add_argument("--seconds", type=float, default=60.0)
+    ap.add_argument("--rate", type=int, default=16000)
+    ap.add_argument("--frame-ms", type=int, default=20)
+    ap.add_argument("--batch", type=int, default=5, help="frames per call for the xN rows")
+    ap.add_argument("--backend", default="", help="one of: " + ", ".join(backends()))
+    args = ap.parse_args()
+
+    pcm = synth(args.rate, args.seconds)
+    names: List[str] = [args.backend] if args.backend else backends()
+    log(f"[FEAT] {args.rate}Hz mono frame={args.frame_ms}ms audio={args.seconds:.0f}s backends={','.join(names)}")
+
+    def report(label: str, cpu: float, secs: float) -> None:
+        frac = cpu / secs
+        log(f"[FEAT] {label:16s} cpu={frac * 100:7.3f}%  cpu/h={frac * 3600:8.1f} s")
+
+    frame_bytes = FrameFeatures(args.rate, args.frame_ms).frame_bytes
+    # the legacy loop is slow: a shorter slice keeps the run reasonable
+    legacy_secs = min(args.seconds, 10.0)
+    report("legacy", run(pcm[:int(args.rate * legacy_secs) * 2], frame_bytes, legacy_rms), legacy_secs)
+
+    for name in names:
+        if name not in backends():
+            log(f"[FEAT] {name}: not available")
+            continue
+        ff = FrameFeatures(args.rate, args.frame_ms, backend=name)
+        report(f"{name} rms", run(pcm, ff.frame_bytes, ff.rms), args.seconds)
+        report(f"{name} x1", run(pcm, ff.frame_bytes, ff.frames), args.seconds)
+        report(f"{name} x{args.batch}", run(pcm, ff.frame_bytes * args.batch, ff.frames), args.seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_gateway.py
+Cloud calls per turn: fresh connection per request vs the HTTP gateway
+
+A local stand-in HTTP/1.1 server plays the APIs and records every
+connection it accepts (each one costs --connect-ms, standing in for
+DNS + TCP + TLS to the real endpoint):
+- POST /v1/embeddings       small JSON reply
+- POST /v1/audio/speech     --tts-kb of "mp3", written in 4 KB pieces
+- POST /v1/slow             every other request stalls --stall-ms (hedging)
+- POST /v1/chat             answers after 50 ms (keeps clients overlapping)
+- keep-alive connections idle for more than --idle-ms are closed by the
+  server, like a real API would
+
+Scenarios, each checked against what the stand-in saw:
+- direct:   new connection per request (what one cURL handle per PHP
+            process does): N requests -> N connections
+- gateway:  the same requests through GatewayServer (src/gateway.py):
+            N requests -> 1 connection
+- stale:    pauses longer than the server's idle timeout: the gateway
+            drops the closed connection and every request still succeeds
+- hedge:    kind=embed against /v1/slow: a stalled request is duplicated
+            after VOXIE_GW_EMBED_HEDGE_MS instead of waiting it out
+- limit:    8 clients at once, VOXIE_GW_MAX_CONN=2: never more than 2
+            connections in flight upstream
+- stream:   a TTS body arrives through on_chunk before the request ends
+
+The real TLS savings depend on the Pi's link: run bin/http_gateway.py
+there and compare the voxie_gw_* metrics and [TIMING] lines with VOXIE_GW=0.
+
+Usage:
+  python3 audio_py/bin/bench_gateway.py
+  python3 audio_py/bin/bench_gateway.py -n 30 --connect-ms 150 --stall-ms 1500
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import http.client
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from gateway import Gateway, GatewayClient, GatewayServer  # noqa: E402
+
+CONNECT_MS = 150
+STALL_MS = 1500
+IDLE_MS = 400
+TTS_KB = 64
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.open = 0
+        self.reset()
+
+    def reset(self) -> None:
+        # `open` carries over: connections from the last scenario may still be pooled
+        with self.lock:
+            self.conns = 0
+            self.peak = self.open
+            self.requests = 0
+            self.slow = 0
+
+    def opened(self) -> None:
+        with self.lock:
+            self.conns += 1
+            self.open += 1
+            self.peak = max(self.peak, self.open)
+
+    def closed(self) -> None:
+        with self.lock:
+            self.open -= 1
+
+
+STATS = Stats()
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # headers and body are separate writes
+
+    def log_message(self, *_a) -> None:
+        pass
+
+    def setup(self) -> None:
+        STATS.opened()
+        time.sleep(CONNECT_MS / 1000.0)   # the handshake this connection stands for
+        self.timeout = IDLE_MS / 1000.0   # idle keep-alive connections get closed
+        super().setup()
+
+    def finish(self) -> None:
+        STATS.closed()
+        super().finish()
+
+    def _reply(self, body: bytes, ctype: str = "application/json", pieces: int = 0) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not pieces:
+            self.wfile.write(body)
+            return
+        for i in range(0, len(body), pieces):
+            self.wfile.write(body[i:i + pieces])
+            self.wfile.flush()
+            time.sleep(0.005)
+
+    def do_POST(self) -> None:
+        n = int(self.headers.get("Content-Length") or 0)
+        if n:
+            self.rfile.read(n)
+        with STATS.lock:
+            STATS.requests += 1
+            stall = self.path == "/v1/slow" and STATS.slow % 2 == 0
+            if self.path == "/v1/slow":
+                STATS.slow += 1
+        if self.path == "/v1/embeddings":
+            self._reply(b'{"data":[{"embedding":[0.1,0.2,0.3]}]}')
+        elif self.path == "/v1/audio/speech":
+            self._reply(b"\xff\xfb" * (TTS_KB * 512), "audio/mpeg", pieces=4096)
+        elif self.path == "/v1/chat":
+            time.sleep(0.05)
+            self._reply(b'{"ok":true}')
+        elif self.path == "/v1/slow":
+            if stall:
+                time.sleep(STALL_MS / 1000.0)
+            self._reply(b'{"ok":true}')
+        else:
+            self.send_error(404)
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        pass   # clients closing hedged / abandoned requests
+
+
+def free_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def pct(xs: List[float], q: float) -> float:
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(q * len(s)))] if s else 0.0
+
+
+def report(name: str, ms: List[float], ok: bool, extra: str = "") -> bool:
+    log(f"[GW] {name:<8} {'PASS' if ok else 'FAIL'} n={len(ms):<3} p50={pct(ms, 0.5):7.1f}ms "
+        f"p95={pct(ms, 0.95):7.1f}ms conns={STATS.conns:<3} {extra}")
+    return ok
+
+
+def direct(port: int, path: str, n: int) -> List[float]:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        c = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        c.request("POST", path, body=b'{"input":"che tempo fa"}', headers={"Content-Type": "application/json"})
+        c.getresponse().read()
+        c.close()
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def through(cli: GatewayClient, url: str, n: int, kind: str = "embed", pause: float = 0.0) -> List[float]:
+    out = []
+    for _ in range(n):
+        if pause:
+            time.sleep(pause)
+        t0 = time.perf_counter()
+        r = cli.request("POST", url, {"Content-Type": "application/json"}, b'{"input":"che tempo fa"}', kind=kind)
+        if r.status != 200:
+            raise RuntimeError(f"status {r.status}")
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def main() -> int:
+    global CONNECT_MS, STALL_MS, IDLE_MS, TTS_KB
+    ap = argparse.ArgumentParser(description="HTTP gateway vs connection per request, against a local stand-in")
+    ap.add_argument("-n", type=int, default=20, help="requests per scenario")
+    ap.add_argument("--connect-ms", type=int, default=CONNECT_MS, help="cost of a new connection (DNS+TCP+TLS)")
+    ap.add_argument("--stall-ms", type=int, default=STALL_MS, help="stall of every other /v1/slow request")
+    ap.add_argument("--idle-ms", type=int, default=IDLE_MS, help="server-side keep-alive idle timeout")
+    ap.add_argument("--hedge-ms", type=int, default=200, help="VOXIE_GW_EMBED_HEDGE_MS for the hedge scenario")
+    ap.add_argument("--tts-kb", type=int, default=TTS_KB, help="size of the stand-in TTS reply")
+    args = ap.parse_args()
+    CONNECT_MS, STALL_MS, IDLE_MS, TTS_KB = args.connect_ms, args.stall_ms, args.idle_ms, args.tts_kb
+
+    port = free_port()
+    srv = Server(("127.0.0.1", port), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{port}"
+    log(f"[GW] stand-in {base} connect={CONNECT_MS}ms idle={IDLE_MS}ms stall={STALL_MS}ms")
+
+    os.environ["VOXIE_GW_EMBED_HEDGE_MS"] = "0"
+    sock = os.path.join(tempfile.mkdtemp(prefix="bench_gw_"), "gw.sock")
+    gw = Gateway(max_conn=2, idle_sec=30.0)
+    gsrv = GatewayServer(gw, sock)
+    gsrv.bind()
+    gsrv.start()
+    cli = GatewayClient(sock, timeout=30.0)
+    ok = True
+
+    STATS.reset()
+    ms = direct(port, "/v1/embeddings", args.n)
+    ok &= report("direct", ms, STATS.conns == args.n)
+
+    STATS.reset()
+    ms = through(cli, base + "/v1/embeddings", args.n)
+    ok &= report("gateway", ms, STATS.conns == 1, f"stats={gw.stats()}")
+
+    STATS.reset()
+    n = max(3, args.n // 5)
+    ms = through(cli, base + "/v1/embeddings", n, pause=IDLE_MS / 1000.0 + 0.2)
+    ok &= report("stale", ms, STATS.conns == n, "(server closed every idle connection; all requests succeeded)")
+
+    os.environ["VOXIE_GW_EMBED_HEDGE_MS"] = str(args.hedge_ms)
+    STATS.reset()
+    ms = through(cli, base + "/v1/slow", args.n)
+    ok &= report("hedge", ms, pct(ms, 0.95) < STALL_MS, f"requests={STATS.requests}")
+    os.environ["VOXIE_GW_EMBED_HEDGE_MS"] = "0"
+
+    time.sleep(STALL_MS / 1000.0 + 0.2)   # stalled losers of the hedge run are still open server-side
+    STATS.reset()
+    lat: List[float] = []
+    lock = threading.Lock()
+
+    def worker() -> None:
+        c = GatewayClient(sock, timeout=30.0)
+        r = through(c, base + "/v1/chat", max(1, args.n // 4), kind="llm")
+        c.close()
+        with lock:
+            lat.extend(r)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ok &= report("limit", lat, STATS.peak <= 2, f"peak_open={STATS.peak}")
+
+    STATS.reset()
+    first: List[float] = []
+    got = [0]
+    t0 = time.perf_counter()
+
+    def on_chunk(data: bytes) -> None:
+        if not first:
+            first.append((time.perf_counter() - t0) * 1000.0)
+        got[0] += len(data)
+
+    cli.request("POST", base + "/v1/audio/speech", {"Content-Type": "application/json"}, b"{}", kind="tts",
+                on_chunk=on_chunk)
+    total = (time.perf_counter() - t0) * 1000.0
+    ok &= report("stream", [total], got[0] == TTS_KB * 1024 and first[0] < total,
+                 f"first_chunk={first[0]:.1f}ms bytes={got[0]}")
+
+    cli.close()
+    gsrv.close()
+    gw.close()
+    srv.shutdown()
+    log(f"[GW] {'ALL PASS' if ok else 'SOME FAILED'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
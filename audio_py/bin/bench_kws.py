@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_kws.py
+Offline wake-word spotter (kws.py): latency, false rejects, false accepts
+
+wake_poll used to send every VAD segment to `php asr.php` (cloud ASR,
+TLS + round trip, >1 s) and look for the wake word in the transcript.
+The spotter decides in-process. We replay labelled segments and report:
+
+- FR:       keyword segments rejected (owner = the enrolled speaker,
+            others = different voices)
+- FA:       non-keyword segments accepted (confusable words: boxy,
+            foxy, taxi, dixie, ...; other words; "voxie" never)
+- latency:  spotter CPU time per segment (MFCC + DTW, p50 / p95), the
+            whole decision after the VAD closes the segment
+
+The default corpus is synthetic: a formant synthesiser (glottal pulse
+train through three resonators, noise bursts for s/k/t) speaks the
+words with per-speaker pitch, vocal tract length and speed, over noise
+at ~20 dB SNR. Half the keyword takes are followed by a command ("voxie
+radio"). Enrollment uses 4 owner takes, exactly like kws_enroll.py.
+
+With --enroll/--pos/--neg, real 16 kHz mono WAVs are used instead.
+
+Usage:
+  python3 audio_py/bin/bench_kws.py
+  python3 audio_py/bin/bench_kws.py --takes 60 --backend python
+  python3 audio_py/bin/bench_kws.py --enroll me1.wav me2.wav me3.wav --pos pos/*.wav --neg neg/*.wav
+"""
+
+from __future__ import annotations
+
+import sys
+import math
+import time
+import wave
+import array
+import random
+import argparse
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from mic.kws import Mfcc, Spotter, backends, calibrate, templates  # noqa: E402
+
+RATE = 16000
+TWO_PI = 2.0 * math.pi
+
+KEYWORD = "voxie"
+CONFUSABLE = ["boxy", "foxy", "taxi", "dixie", "roxy", "moxie", "vaxi", "voce"]
+OTHER = ["okay", "music", "radio", "stop", "volume", "dimmi", "luce", "sera", "tempo", "ciao"]
+WORDS = {
+    "voxie": "voksi", "boxy": "boksi", "foxy": "foksi", "taxi": "taksi", "dixie": "diksi",
+    "roxy": "roksi", "moxie": "moksi", "vaxi": "vaksi", "voce": "vote",
+    "okay": "okei", "music": "musik", "radio": "radio", "stop": "stop", "volume": "volume",
+    "dimmi": "dimmi", "luce": "lute", "sera": "sera", "tempo": "tempo", "ciao": "tao",
+}
+
+
+class Phone(NamedTuple):
+    ms: int
+    f: Tuple[float, float, float]   # formant targets (Hz)
+    voice: float                    # glottal source level
+    noise: float                    # noise level
+    nf: float                       # noise band centre (Hz)
+    burst: bool = False             # stop: closure, then a 25 ms burst
+
+
+_V = (300.0, 1200.0, 2400.0)
+PHONES: Dict[str, Phone] = {
+    "a": Phone(120, (750.0, 1250.0, 2600.0), 1.0, 0.0, 0.0),
+    "e": Phone(110, (500.0, 1800.0, 2500.0), 1.0, 0.0, 0.0),
+    "i": Phone(110, (300.0, 2300.0, 3000.0), 1.0, 0.0, 0.0),
+    "o": Phone(120, (500.0, 900.0, 2500.0), 1.0, 0.0, 0.0),
+    "u": Phone(110, (320.0, 800.0, 2400.0), 1.0, 0.0, 0.0),
+    "v": Phone(70, _V, 0.25, 0.2, 4000.0),
+    "f": Phone(90, _V, 0.0, 0.3, 5000.0),
+    "s": Phone(110, _V, 0.0, 0.5, 6000.0),
+    "k": Phone(80, (300.0, 1800.0, 2500.0), 0.0, 0.6, 2500.0, True),
+    "t": Phone(80, (300.0, 1700.0, 2600.0), 0.0, 0.6, 4000.0, True),
+    "p": Phone(80, (300.0, 900.0, 2300.0), 0.0, 0.6, 1200.0, True),
+    "b": Phone(70, (300.0, 900.0, 2300.0), 0.1, 0.3, 1200.0, True),
+    "d": Phone(70, (300.0, 1700.0, 2600.0), 0.1, 0.3, 3500.0, True),
+    "m": Phone(80, (250.0, 1100.0, 2300.0), 0.4, 0.0, 0.0),
+    "n": Phone(70, (250.0, 1500.0, 2500.0), 0.4, 0.0, 0.0),
+    "r": Phone(50, (450.0, 1300.0, 1800.0), 0.6, 0.0, 0.0),
+    "l": Phone(60, (400.0, 1100.0, 2600.0), 0.6, 0.0, 0.0),
+}
+
+
+class Voice(NamedTuple):
+    f0: float      # pitch (Hz)
+    tract: float   # formant scale (vocal tract length)
+    speed: float   # duration scale
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def _coef(f: float, bw: float) -> Tuple[float, float, float]:
+    r = math.exp(-math.pi * bw / RATE)
+    return 1.0 - r, 2.0 * r * math.cos(TWO_PI * f / RATE), -r * r
+
+
+def say(rnd: random.Random, word: str, v: Voice) -> List[float]:
+    """One take of `word` by voice `v` (with small take-to-take jitter)."""
+    f0 = v.f0 * rnd.uniform(0.95, 1.05)
+    tract = v.tract * rnd.uniform(0.97, 1.03)
+    out: List[float] = []
+    y = [[0.0, 0.0] for _ in range(4)]
+    prev = PHONES[WORDS[word][0]].f
+    phase = 0.0
+    va = na = 0.0
+    for ch in WORDS[word]:
+        ph = PHONES[ch]
+        n = int(RATE * ph.ms / 1000.0 * v.speed * rnd.uniform(0.9, 1.1))
+        coefs = []
+        for i in range(n):
+            if i % 80 == 0:
+                k = min(1.0, i / (0.03 * RATE))  # 30 ms formant transition
+                coefs = [_coef(tract * (a + (b - a) * k), 60.0 + 40.0 * j) for j, (a, b) in enumerate(zip(prev, ph.f))]
+                if ph.noise:
+                    coefs.append(_coef(ph.nf * tract, 1500.0))
+            if ph.burst:
+                tv, tn = (ph.voice, ph.noise) if i > n - int(0.025 * RATE) else (ph.voice, 0.0)
+            else:
+                tv, tn = ph.voice, ph.noise
+            va += 0.01 * (tv - va)
+            na += 0.01 * (tn - na)
+            phase += f0 * (1.0 - 0.1 * i / max(1, n)) / RATE
+            src = va * (2.0 * (phase % 1.0) - 1.0)
+            s = 0.0
+            for j in range(3):
+                g, a1, a2 = coefs[j]
+                o = g * src + a1 * y[j][0] + a2 * y[j][1]
+                y[j][1], y[j][0] = y[j][0], o
+                s += o
+            if na > 1e-3:
+                g, a1, a2 = coefs[3] if len(coefs) > 3 else _coef(ph.nf, 1500.0)
+                o = g * na * rnd.gauss(0.0, 3.0) + a1 * y[3][0] + a2 * y[3][1]
+                y[3][1], y[3][0] = y[3][0], o
+                s += o
+            out.append(s)
+        prev = ph.f
+    return out
+
+
+def segment(rnd: random.Random, words: List[str], v: Voice, level: float = 4000.0, snr_db: float = 20.0) -> bytes:
+    """VAD-like segment: 200 ms lead-in, the words 150 ms apart, noise underneath."""
+    x: List[float] = [0.0] * int(0.2 * RATE)
+    for w in words:
+        u = say(rnd, w, v)
+        rms = math.sqrt(sum(s * s for s in u) / len(u)) or 1.0
+        x.extend(s * level / rms for s in u)
+        x.extend([0.0] * int(0.15 * RATE))
+    noise = level * 10.0 ** (-snr_db / 20.0)
+    a = array.array("h", (max(-32768, min(32767, int(s + rnd.gauss(0.0, noise)))) for s in x))
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a.tobytes()
+
+
+def voices(rnd: random.Random, n: int) -> List[Voice]:
+    out = [Voice(120.0, 1.0, 1.0)]  # the owner
+    while len(out) < n:
+        out.append(Voice(rnd.uniform(90.0, 240.0), rnd.uniform(0.88, 1.15), rnd.uniform(0.8, 1.25)))
+    return out
+
+
+def read_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1 or wf.getframerate() != RATE:
+            raise SystemExit(f"{path}: need {RATE} Hz mono S16 WAV")
+        return wf.readframes(wf.getnframes())
+
+
+def pct(xs: List[float], q: float) -> float:
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(q * len(s)))] if s else 0.0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Offline wake-word spotter: latency, FR and FA")
+    ap.add_argument("--takes", type=int, default=40, help="synthetic segments per class")
+    ap.add_argument("--voices", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=5)
+    ap.add_argument("--margin", type=float, default=1.0)
+    ap.add_argument("--backend", default="", help="one of: " + ", ".join(backends()))
+    ap.add_argument("--enroll", nargs="*", default=[], help="keyword takes (WAV) to enroll")
+    ap.add_argument("--pos", nargs="*", default=[], help="keyword segments (WAV)")
+    ap.add_argument("--neg", nargs="*", default=[], help="non-keyword segments (WAV)")
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    mfcc = Mfcc(RATE, backend=args.backend)
+
+    sets: List[Tuple[str, bool, List[bytes]]] = []
+    if args.enroll:
+        enroll = [read_wav(p) for p in args.enroll]
+        sets.append(("pos", True, [read_wav(p) for p in args.pos]))
+        sets.append(("neg", False, [read_wav(p) for p in args.neg]))
+    else:
+        vs = voices(rnd, args.voices)
+        owner, others = vs[0], vs[1:]
+        t0 = time.perf_counter()
+        enroll = [segment(rnd, [KEYWORD], owner) for _ in range(4)]
+
+        def kw(v: Voice) -> bytes:
+            tail = [rnd.choice(OTHER)] if rnd.random() < 0.5 else []
+            return segment(rnd, [KEYWORD] + tail, v)
+
+        sets.append(("owner", True, [kw(owner) for _ in range(args.takes)]))
+        sets.append(("others", True, [kw(rnd.choice(others)) for _ in range(args.takes)]))
+        sets.append(("confusable", False, [segment(rnd, [rnd.choice(CONFUSABLE)], rnd.choice(vs))
+                                           for _ in range(args.takes)]))
+        sets.append(("other words", False, [segment(rnd, rnd.sample(OTHER, rnd.randint(1, 2)), rnd.choice(vs))
+                                            for _ in range(args.takes)]))
+        log(f"[KWS] synthetic corpus: {args.voices} voices, {args.takes} segments/class "
+            f"({time.perf_counter() - t0:.1f}s to synthesise)")
+
+    tpls = templates(enroll, mfcc)
+    thr = calibrate(tpls, args.margin)
+    model = {"word": KEYWORD, "rate": RATE, "hop_ms": mfcc.hop_ms, "templates": tpls, "threshold": thr}
+    sp = Spotter(model, backend=mfcc.backend)
+    log(f"[KWS] backend={mfcc.backend} templates={len(tpls)} ({', '.join(str(len(t)) for t in tpls)} frames) "
+        f"threshold={thr:.2f}")
+
+    lat: List[float] = []
+    audio = 0.0
+    scored: List[Tuple[str, bool, List[float]]] = []
+    for name, positive, segs in sets:
+        scores = []
+        for pcm in segs:
+            t0 = time.process_time()
+            scores.append(sp.score(pcm))
+            lat.append(time.process_time() - t0)
+            audio += len(pcm) / 2.0 / RATE
+        scored.append((name, positive, scores))
+
+    for k in (0.9, 1.0, 1.1):
+        t = thr * k
+        cells = []
+        for name, positive, scores in scored:
+            if not scores:
+                continue
+            bad = sum(1 for x in scores if (x > t) == positive)
+            cells.append(f"{'FR' if positive else 'FA'} {name}={bad * 100.0 / len(scores):4.1f}%")
+        log(f"[KWS] threshold x{k:.1f} ({t:5.2f}): " + "  ".join(cells))
+    n = max(1, len(lat))
+    log(f"[KWS] latency/segment p50={pct(lat, 0.5) * 1000:.1f}ms p95={pct(lat, 0.95) * 1000:.1f}ms "
+        f"(avg segment {audio / n:.2f}s, cpu {sum(lat) / max(audio, 1e-9) * 100:.1f}% of real time)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_listener_mem.py
+Memory of the listener side: one interpreter per source vs MicListener
+
+Layouts, started as start.sh starts them (the audio daemon, gateway
+and capture daemon are the same in both and not measured):
+- multi:   evdev_ptt.py + voxie_listen.py + wake_poll.py, three Python
+           interpreters talking over the FIFO / handoff socket
+- single:  voxie_listen.py with VOXIE_LISTEN_SOURCES=fifo,evdev,wake:
+           the PTT key and the wake listener run inside the listener
+           (src/mic/listener.py MicListener, start.sh VOXIE_SINGLE_PROCESS=1)
+
+Each process is sampled from /proc once it has settled: RSS (VmRSS) and
+PSS (smaps_rollup; shared pages such as libpython split between the
+processes mapping them, so the PSS sum is what the layout really costs).
+arecord children are not counted. The PTT key is a FIFO standing in for
+/dev/input/eventX; without alsa-utils a stand-in arecord writes silence
+at 16 kHz, so wake_poll runs its VAD as it would on the Pi.
+
+Usage:
+  python3 audio_py/bin/bench_listener_mem.py
+  python3 audio_py/bin/bench_listener_mem.py --settle 5
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BIN_DIR = Path(__file__).resolve().parent
+
+# 16 kHz mono S16 silence in 20 ms writes, for hosts without a microphone
+FAKE_ARECORD = """#!/bin/sh
+exec python3 -c '
+import sys, time
+frame = bytes(640)
+t = time.monotonic()
+while True:
+    sys.stdout.buffer.write(frame)
+    sys.stdout.buffer.flush()
+    t += 0.02
+    time.sleep(max(0.0, t - time.monotonic()))
+'
+"""
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def proc_kb(pid: int) -> Tuple[int, int]:
+    """(RSS kB, PSS kB) of one process; PSS falls back to RSS without smaps_rollup."""
+    rss = pss = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1])
+    except OSError:
+        return 0, 0
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    pss = int(line.split()[1])
+    except OSError:
+        pss = rss
+    return rss, pss
+
+
+def start(name: str, args: List[str], env: Dict[str, str], logdir: Path) -> subprocess.Popen:
+    out = open(logdir / f"{name}.log", "w")
+    return subprocess.Popen([sys.executable] + args, env=env, stdout=out, stderr=subprocess.STDOUT,
+                            start_new_session=True)
+
+
+def stop(procs: List[subprocess.Popen]) -> None:
+    for p in procs:
+        try:
+            os.killpg(p.pid, signal.SIGTERM)
+        except OSError:
+            pass
+    for p in procs:
+        try:
+            p.wait(3)
+        except subprocess.TimeoutExpired:
+            os.killpg(p.pid, signal.SIGKILL)
+
+
+def run(layout: str, env: Dict[str, str], tmp: Path, settle: float) -> Tuple[int, int, List[str]]:
+    logdir = tmp / layout
+    logdir.mkdir()
+    ev = str(tmp / "event0")
+    procs: Dict[str, subprocess.Popen] = {}
+    if layout == "multi":
+        procs["voxie_listen"] = start("voxie_listen", [str(BIN_DIR / "voxie_listen.py")], env, logdir)
+        time.sleep(0.3)
+        procs["evdev_ptt"] = start("evdev_ptt", [str(BIN_DIR / "evdev_ptt.py"), "--dev", ev], env, logdir)
+        procs["wake_poll"] = start("wake_poll", [str(BIN_DIR / "wake_poll.py")], env, logdir)
+    else:
+        single = dict(env, VOXIE_LISTEN_SOURCES="fifo,evdev,wake", VOXIE_PTT_EVDEV=ev)
+        procs["voxie_listen"] = start("voxie_listen", [str(BIN_DIR / "voxie_listen.py")], single, logdir)
+
+    # settled: the largest of a few samples once start-up is over
+    time.sleep(settle)
+    peak: Dict[str, Tuple[int, int]] = {}
+    for _ in range(5):
+        for name, p in procs.items():
+            rss, pss = proc_kb(p.pid)
+            old = peak.get(name, (0, 0))
+            peak[name] = (max(old[0], rss), max(old[1], pss))
+        time.sleep(0.2)
+    dead = [n for n, p in procs.items() if p.poll() is not None]
+    stop(list(procs.values()))
+
+    rows = []
+    for name, (rss, pss) in peak.items():
+        rows.append(f"    {name:<13} rss={rss / 1024:6.1f}MB pss={pss / 1024:6.1f}MB")
+    for name in dead:
+        tail = (logdir / f"{name}.log").read_text(errors="replace").strip().splitlines()[-3:]
+        rows.append(f"    {name} EXITED: {' | '.join(tail)}")
+    rss = sum(v[0] for v in peak.values())
+    pss = sum(v[1] for v in peak.values())
+    return rss, pss, rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Listener-side RSS/PSS: process per source vs MicListener")
+    ap.add_argument("--settle", type=float, default=3.0, help="seconds before sampling")
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_listener_"))
+    ev = tmp / "event0"
+    os.mkfifo(ev)
+    # a writer of our own: the readers' open() does not block, nothing is ever sent
+    ev_fd = os.open(ev, os.O_RDWR | os.O_NONBLOCK)
+
+    env = dict(os.environ)
+    env.update({
+        "VOXIE_PTT_FIFO": str(tmp / "ptt.fifo"),
+        "VOXIE_HANDOFF_SOCK": str(tmp / "handoff.sock"),
+        "VOXIE_AUDIO_SOCK": str(tmp / "audio.sock"),   # no daemon: best-effort calls fail fast
+        "VOXIE_CAPTURE_SHM": str(tmp / "no_capture_daemon"),
+        "VOXIE_METRICS_DIR": str(tmp / "metrics"),
+        "VOXIE_WAKE_ENGINE": "asr",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    if shutil.which("arecord") is None:
+        fake = tmp / "fakebin"
+        fake.mkdir()
+        (fake / "arecord").write_text(FAKE_ARECORD)
+        (fake / "arecord").chmod(0o755)
+        env["PATH"] = f"{fake}:{env.get('PATH', '')}"
+        log("[MEM] no arecord here: stand-in mic (silence)")
+
+    results = {}
+    for layout in ("multi", "single"):
+        rss, pss, rows = run(layout, env, tmp, args.settle)
+        results[layout] = (rss, pss)
+        log(f"[MEM] {layout:<6} rss={rss / 1024:6.1f}MB pss={pss / 1024:6.1f}MB")
+        for r in rows:
+            log(r)
+
+    os.close(ev_fd)
+    (m_rss, m_pss), (s_rss, s_pss) = results["multi"], results["single"]
+    log(f"[MEM] saved rss={(m_rss - s_rss) / 1024:.1f}MB pss={(m_pss - s_pss) / 1024:.1f}MB "
+        f"({100.0 * (m_pss - s_pss) / max(1, m_pss):.0f}% of the listener side)")
+    log(f"[MEM] logs: {tmp}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
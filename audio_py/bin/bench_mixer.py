@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_mixer.py
+CPU cost of the mixer (mixer.py) per second of mixed audio
+
+For each available backend (numpy / audioop / python) we mix N seconds of
+synthetic stereo PCM in 20 ms periods, the way the mixer writer thread
+does, and report process CPU time per second of audio. "load" is the share
+of one core the mixer would take at real time (the Pi budget).
+
+Scenarios:
+- duck:    voice over radio, gain ramping down/up every second (worst case)
+- ducked:  voice over radio at steady ducked gain
+- bg-only: radio alone at unity gain (pass-through, no arithmetic)
+
+Usage:
+  python3 audio_py/bin/bench_mixer.py --seconds 30
+  python3 audio_py/bin/bench_mixer.py --backend audioop --rate 22050 --channels 1
+"""
+
+from __future__ import annotations
+
+import sys
+import math
+import time
+import array
+import argparse
+from pathlib import Path
+from typing import List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from audio.mixer import Ducker, backends  # noqa: E402
+from audio.sink import SinkFormat  # noqa: E402
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def tone(fmt: SinkFormat, hz: float, ms: int, amp: int = 12000) -> bytes:
+    frames = int(fmt.rate * ms / 1000)
+    a = array.array("h")
+    for i in range(frames):
+        v = int(amp * math.sin(2 * math.pi * hz * i / fmt.rate))
+        a.extend([v] * fmt.channels)
+    return a.tobytes()
+
+
+def run(fmt: SinkFormat, backend: str, scenario: str, seconds: float) -> float:
+    """CPU seconds spent mixing `seconds` of audio."""
+    period_ms = 20
+    bg = tone(fmt, 220.0, period_ms)
+    fg = tone(fmt, 660.0, period_ms)
+    periods = int(seconds * 1000 / period_ms)
+    per_sec = 1000 // period_ms
+
+    d = Ducker(fmt, duck=0.25, ramp_ms=200, backend=backend)
+    if scenario == "ducked":
+        d.gain = d.duck
+
+    t0 = time.process_time()
+    for i in range(periods):
+        f: Optional[bytes] = fg
+        if scenario == "bg-only" or (scenario == "duck" and (i // per_sec) % 2):
+            f = None
+        d.mix(f, bg)
+    return time.process_time() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Mixer CPU per second of audio")
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--backend", default="", help="one of: " + ", ".join(backends()))
+    ap.add_argument("--rate", type=int, default=SinkFormat.from_env().rate)
+    ap.add_argument("--channels", type=int, default=SinkFormat.from_env().channels)
+    args = ap.parse_args()
+
+    fmt = SinkFormat(args.rate, args.channels)
+    names: List[str] = [args.backend] if args.backend else backends()
+    log(f"[MIXER] fmt={fmt.rate}Hz/{fmt.channels}ch audio={args.seconds:.0f}s backends={','.join(names)}")
+
+    for name in names:
+        if name not in backends():
+            log(f"[MIXER] {name}: not available")
+            continue
+        # the pure-python kernel is orders of magnitude slower: keep its run short
+        secs = min(args.seconds, 2.0) if name == "python" else args.seconds
+        for scenario in ("duck", "ducked", "bg-only"):
+            cpu = run(fmt, name, scenario, secs)
+            per = cpu / secs
+            log(f"[MIXER] {name:7s} {scenario:8s} cpu={per * 1000:8.2f} ms/s  load={per * 100:6.2f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_protocol.py
+Socket protocol cost: JSON lines vs BATCH vs binary frames (protocol.py)
+
+In-process (no daemon needed), per message, what the daemon does on its
+side (decode request + encode reply) and what a client does on its side:
+- status:  STATUS poll as a JSON line vs OP_STATUS frame + STATUS struct
+- batch:   STOP + PLAY + ENQUEUE as three lines/replies vs one BATCH
+- pcm:     a 4 KiB PCM chunk as a JSON/base64 message vs a u32 frame
+
+With --sock the same traffic is also timed against a running daemon
+(round trips per second; the batch scenario plays nothing: it targets a
+missing file, the replies still come back).
+
+Usage:
+  python3 audio_py/bin/bench_protocol.py
+  python3 audio_py/bin/bench_protocol.py -n 200000
+  python3 audio_py/bin/bench_protocol.py --sock /tmp/bitvox_audio.sock
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import base64
+import argparse
+from pathlib import Path
+from typing import Callable
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from audio.ingest import FRAME  # noqa: E402
+from audio.protocol import (  # noqa: E402
+    HEADER, OP_REPLY, OP_STATUS, frame, pack_status, parse_batch, parse_line, reply, unpack_status,
+)
+from audio_client import AudioClient, BinaryAudioClient  # noqa: E402
+
+STATUS = {"ok": True, "playing": True, "job": "j42", "prio": "tts", "bg": "j40", "queued": 2}
+SEQ = [
+    {"cmd": "STOP"},
+    {"cmd": "PLAY_WAV", "path": "/nonexistent/ack.wav", "prio": "tts"},
+    {"cmd": "ENQUEUE", "items": [{"path": "/nonexistent/intro.mp3", "prio": "tts"}]},
+]
+SEQ_REPLIES = [{"ok": True}, {"ok": True, "job": "j7"}, {"ok": True, "jobs": ["j8"]}]
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def rate(fn: Callable[[], None], n: int) -> float:
+    """Calls per second (best of 3)."""
+    best = 0.0
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        dt = time.perf_counter() - t0
+        best = max(best, n / dt if dt > 0 else 0.0)
+    return best
+
+
+def in_process(n: int) -> None:
+    line = json.dumps({"cmd": "STATUS"}) + "\n"
+    req = frame(OP_STATUS)
+    pcm = bytes(range(256)) * 16
+
+    def json_status_server() -> None:
+        parse_line(line)
+        reply(STATUS)
+
+    def json_status_client() -> None:
+        json.loads(reply(STATUS))
+
+    def bin_status_server() -> None:
+        HEADER.unpack_from(req)
+        frame(OP_STATUS | OP_REPLY, pack_status(STATUS, 2))
+
+    rep = frame(OP_STATUS | OP_REPLY, pack_status(STATUS, 2))
+
+    def bin_status_client() -> None:
+        _op, ln = HEADER.unpack_from(rep)
+        unpack_status(rep[HEADER.size:HEADER.size + ln])
+
+    lines = [json.dumps(c) + "\n" for c in SEQ]
+    batch_line = json.dumps({"cmd": "BATCH", "cmds": SEQ}) + "\n"
+
+    def three_lines() -> None:
+        for ln, r in zip(lines, SEQ_REPLIES):
+            parse_line(ln)
+            reply(r)
+
+    def one_batch() -> None:
+        parse_batch(parse_line(batch_line))
+        reply({"ok": True, "results": SEQ_REPLIES})
+
+    def pcm_json() -> None:
+        msg = json.dumps({"cmd": "PCM", "data": base64.b64encode(pcm).decode("ascii")})
+        base64.b64decode(json.loads(msg)["data"])
+
+    def pcm_frame() -> None:
+        msg = FRAME.pack(len(pcm)) + pcm
+        (ln,) = FRAME.unpack_from(msg)
+        memoryview(msg)[FRAME.size:FRAME.size + ln]
+
+    cases = [
+        ("status  json   server", json_status_server, n),
+        ("status  binary server", bin_status_server, n),
+        ("status  json   client", json_status_client, n),
+        ("status  binary client", bin_status_client, n),
+        ("seq3    3 lines      ", three_lines, n // 3),
+        ("seq3    1 BATCH      ", one_batch, n // 3),
+        ("pcm4k   json+base64  ", pcm_json, n // 10),
+        ("pcm4k   u32 frame    ", pcm_frame, n // 10),
+    ]
+    for name, fn, count in cases:
+        r = rate(fn, max(1, count))
+        log(f"[PROTO] {name} {r:12.0f} msg/s  {1e6 / r:8.2f} us/msg")
+
+
+def via_daemon(sock: str, n: int) -> None:
+    n = max(1, n // 20)
+    c = AudioClient(sock, timeout=5.0)
+    b = BinaryAudioClient(sock, timeout=5.0)
+    try:
+        c.ping()
+        b.ping()
+    except OSError as e:
+        log(f"[PROTO] daemon not reachable: {sock} ({e})")
+        return
+
+    def oneshot() -> None:
+        AudioClient(sock, timeout=5.0).status()
+
+    cases = [
+        ("STATUS  one connection/cmd", oneshot),
+        ("STATUS  json kept-alive   ", c.status),
+        ("STATUS  binary            ", b.status),
+        ("seq3    3 requests        ", lambda: [c.request(x) for x in SEQ]),
+        ("seq3    pipelined         ", lambda: c.pipeline(SEQ)),
+        ("seq3    BATCH             ", lambda: c.batch(SEQ)),
+    ]
+    for name, fn in cases:
+        r = rate(fn, n)
+        log(f"[PROTO] daemon {name} {r:9.0f} /s  {1e6 / r:8.1f} us")
+    c.stop()
+    c.close()
+    b.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Socket protocol throughput: JSON vs BATCH vs binary")
+    ap.add_argument("-n", type=int, default=100000, help="messages per in-process case")
+    ap.add_argument("--sock", default="", help="also time round trips against this daemon socket")
+    args = ap.parse_args()
+
+    log(f"[PROTO] python={sys.version.split()[0]} n={args.n}")
+    in_process(args.n)
+    if args.sock:
+        via_daemon(args.sock, args.n)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_stream_race.py
+Dead-station failover: sequential tries vs parallel race (race.py)
+
+A local stand-in HTTP server plays the stations:
+- /dead      accepts, never answers (hung station)
+- /refused   closed port (connection refused)
+- /html      200 text/html error page
+- /slow      answers after --slow-ms, then valid MP3 frames
+- /good      valid MP3 frames right away (paced at real time)
+- /moved     302 -> /good
+
+For each scenario the same ranked URL list is resolved two ways:
+- sequential: one URL at a time, each with the full per-URL timeout
+  (what radio.php did with three PLAY_STREAM attempts)
+- race:       race() from src/audio/race.py
+
+With --sock the race is also run end-to-end through a running daemon
+(PLAY_STREAM_ANY + WAIT started), which needs a working mpg123.
+
+Usage:
+  python3 audio_py/bin/bench_stream_race.py
+  python3 audio_py/bin/bench_stream_race.py --timeout-ms 3000 --slow-ms 800
+  python3 audio_py/bin/bench_stream_race.py --sock /tmp/bitvox_audio.sock
+"""
+
+from __future__ import annotations
+
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from audio.race import _open, mpeg_frames, race  # noqa: E402
+
+# MPEG1 Layer III, 128 kbps, 44.1 kHz: 417-byte frames, ~26 ms each
+FRAME = b"\xff\xfb\x90\x64" + b"\0" * 413
+FRAME_S = 1152 / 44100.0
+
+SLOW_MS = 1500
+STOP = threading.Event()
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, *_a) -> None:
+        pass
+
+    def _frames(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.end_headers()
+        try:
+            while not STOP.is_set():
+                self.wfile.write(FRAME * 4)
+                time.sleep(FRAME_S * 4)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self) -> None:
+        if self.path == "/dead":
+            STOP.wait(30.0)
+        elif self.path == "/html":
+            body = b"<html><body>503 stream offline</body></html>" * 40
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/slow":
+            STOP.wait(SLOW_MS / 1000.0)
+            self._frames()
+        elif self.path == "/good":
+            self._frames()
+        elif self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/good")
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def free_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def sequential(urls: List[str], timeout: float) -> Tuple[Optional[str], float]:
+    """One URL at a time, full timeout each (the old radio.php behaviour)."""
+    t0 = time.monotonic()
+    for url in urls:
+        deadline = time.monotonic() + timeout
+        try:
+            sock, buf = _open(url, deadline)
+        except Exception:
+            continue
+        try:
+            while True:
+                v = mpeg_frames(buf)
+                if v:
+                    return url, time.monotonic() - t0
+                if v is False:
+                    break
+                sock.settimeout(max(0.05, deadline - time.monotonic()))
+                data = sock.recv(4096)
+                if not data:
+                    break
+                buf += data
+        except Exception:
+            pass
+        finally:
+            sock.close()
+    return None, time.monotonic() - t0
+
+
+def via_daemon(sock_path: str, urls: List[str]) -> Tuple[Optional[str], float]:
+    t0 = time.monotonic()
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.connect(sock_path)
+    s.sendall((json.dumps({"cmd": "PLAY_STREAM_ANY", "urls": urls, "wait": True}) + "\n").encode())
+    r = json.loads(s.makefile().readline() or "{}")
+    s.close()
+    return (r.get("url") if r.get("ok") else None), time.monotonic() - t0
+
+
+def main() -> int:
+    global SLOW_MS
+    ap = argparse.ArgumentParser(description="Stream failover: sequential vs race")
+    ap.add_argument("--timeout-ms", type=int, default=4000)
+    ap.add_argument("--slow-ms", type=int, default=1500)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--sock", default="", help="also run PLAY_STREAM_ANY on this daemon socket")
+    args = ap.parse_args()
+    SLOW_MS = args.slow_ms
+
+    srv = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = "http://127.0.0.1:%d" % srv.server_address[1]
+    refused = "http://127.0.0.1:%d/refused" % free_port()
+
+    def u(name: str) -> str:
+        return refused if name == "refused" else base + "/" + name
+
+    scenarios = [
+        ("good", ["good"]),
+        ("dead,html,good", ["dead", "html", "good"]),
+        ("refused,dead,moved", ["refused", "dead", "moved"]),
+        ("slow,good", ["slow", "good"]),
+        ("dead,slow", ["dead", "slow"]),
+        ("dead,html,refused", ["dead", "html", "refused"]),
+    ]
+    timeout = args.timeout_ms / 1000.0
+    log(f"[RACE] server={base} timeout={args.timeout_ms}ms slow={args.slow_ms}ms runs={args.runs}")
+
+    for name, names in scenarios:
+        urls = [u(n) for n in names]
+        seq_t, race_t, d_t = [], [], []
+        seq_w = race_w = d_w = None
+        for _ in range(args.runs):
+            seq_w, t = sequential(urls, timeout)
+            seq_t.append(t)
+            t0 = time.monotonic()
+            w = race(urls, timeout=timeout)
+            race_t.append(time.monotonic() - t0)
+            race_w = w.url if w else None
+            if w:
+                w.close()
+            if args.sock:
+                d_w, t = via_daemon(args.sock, urls)
+                d_t.append(t)
+
+        def short(x: Optional[str]) -> str:
+            return x.rsplit("/", 1)[-1] if x else "-"
+
+        line = (f"[RACE] {name:20s} seq={min(seq_t) * 1000:7.0f}ms ({short(seq_w):6s}) "
+                f"race={min(race_t) * 1000:7.0f}ms ({short(race_w):6s})")
+        if d_t:
+            line += f" daemon={min(d_t) * 1000:7.0f}ms ({short(d_w)})"
+        log(line)
+
+    STOP.set()
+    srv.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
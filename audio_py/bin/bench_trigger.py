@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_trigger.py
+PTT trigger path: the old FIFO poll loop vs the trigger bus
+
+- fifo-poll: voxie_listen's old reader, `readline()` on the FIFO and a
+             50 ms sleep whenever it returns '' (every time the last
+             writer has closed, i.e. after every press): latency from
+             the producer's write to the reader, and idle wakeups/s
+- bus:       send_trigger() -> TriggerBus on an asyncio loop
+             (src/trigger_bus.py, what MicListener runs): same numbers
+- debounce:  two presses --gap-ms apart (more than the debounce) reach a
+             listener whose loop was busy, so they are read together;
+             debouncing on arrival time drops the second, TurnEngine
+             on the event timestamps takes it (as a barge-in on the first)
+- stale:     an event older than VOXIE_TRIGGER_MAX_AGE_MS is dropped
+
+Usage:
+  python3 audio_py/bin/bench_trigger.py
+  python3 audio_py/bin/bench_trigger.py -n 50
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from mic.turn import TurnEngine  # noqa: E402
+from trigger_bus import TriggerBus, send_trigger  # noqa: E402
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def pct(xs: List[float], q: float) -> float:
+    s = sorted(xs)
+    return s[min(len(s) - 1, int(q * len(s)))] if s else 0.0
+
+
+def fifo_write(path: str) -> bool:
+    # what the producers' fifo_trigger() does
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        return False
+    try:
+        os.write(fd, b"PTT\n")
+    finally:
+        os.close(fd)
+    return True
+
+
+def fifo_poll(path: str, n: int, idle: float) -> None:
+    got = threading.Semaphore(0)
+    spins = [0]
+
+    def reader() -> None:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            while True:
+                line = f.readline()
+                if not line:
+                    spins[0] += 1
+                    time.sleep(0.05)
+                    continue
+                got.release()
+
+    threading.Thread(target=reader, daemon=True).start()
+    fd = os.open(path, os.O_WRONLY)   # let the reader's open() return
+    os.close(fd)
+    time.sleep(0.2)
+    lat = []
+    for _ in range(n):
+        time.sleep(0.03)
+        t0 = time.perf_counter()
+        fifo_write(path)
+        got.acquire()
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    s0 = spins[0]
+    time.sleep(idle)
+    log(f"[TRIG] fifo-poll n={n} p50={pct(lat, 0.5):6.2f}ms p95={pct(lat, 0.95):6.2f}ms "
+        f"idle_wakeups={(spins[0] - s0) / idle:.0f}/s")
+
+
+async def bus(path: str, n: int, idle: float) -> None:
+    loop = asyncio.get_running_loop()
+    got: "asyncio.Queue[float]" = asyncio.Queue()
+    calls = [0]
+
+    def on_event(ev) -> None:
+        calls[0] += 1
+        got.put_nowait(time.perf_counter())
+
+    tb = TriggerBus(path, on_event, log)
+    tb.start(loop)
+    lat = []
+    for _ in range(n):
+        await asyncio.sleep(0.03)
+        t0 = time.perf_counter()
+        await loop.run_in_executor(None, send_trigger, "bench", None, None, path)
+        t1 = await got.get()
+        lat.append((t1 - t0) * 1000.0)
+    c0 = calls[0]
+    await asyncio.sleep(idle)
+    tb.close(loop)
+    log(f"[TRIG] bus       n={n} p50={pct(lat, 0.5):6.2f}ms p95={pct(lat, 0.95):6.2f}ms "
+        f"idle_wakeups={(calls[0] - c0) / idle:.0f}/s  (incl. executor hop)")
+
+
+async def debounce(path: str, gap_ms: int, debounce_sec: float) -> bool:
+    loop = asyncio.get_running_loop()
+    turns: List[int] = []
+
+    async def handler(turn, item) -> None:
+        turns.append(turn.seq)
+
+    eng = TurnEngine(handler, debounce_sec)
+    tb = TriggerBus(path, lambda ev: eng.trigger(None, ev.ts), log)
+    serving = asyncio.ensure_future(eng.serve(lambda: tb.start(loop)))
+    await asyncio.sleep(0.05)
+    t = time.monotonic()
+    # both presses were queued while the loop was busy (a blocking call on it)
+    send_trigger("bench", None, t - gap_ms / 1000.0, path)
+    send_trigger("bench", None, t, path)
+    time.sleep(0.3)
+    await asyncio.sleep(0.1)
+    serving.cancel()
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    tb.close(loop)
+    # the second press is a barge-in on the first: turn #2 exists only if it was not debounced
+    ok = bool(turns) and turns[-1] == 2
+    log(f"[TRIG] debounce  {'PASS' if ok else 'FAIL'} presses {gap_ms}ms apart, read together: "
+        f"last turn #{turns[-1] if turns else 0} on event time (arrival time: #1, second press dropped)")
+    return ok
+
+
+async def stale(path: str) -> bool:
+    loop = asyncio.get_running_loop()
+    seen: List[str] = []
+    tb = TriggerBus(path, lambda ev: seen.append(ev.source), lambda m: None, max_age_ms=1500)
+    tb.start(loop)
+    send_trigger("old", None, time.monotonic() - 5.0, path)
+    send_trigger("new", None, None, path)
+    await asyncio.sleep(0.1)
+    tb.close(loop)
+    ok = seen == ["new"]
+    log(f"[TRIG] stale     {'PASS' if ok else 'FAIL'} delivered={seen} (5 s old event dropped)")
+    return ok
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="FIFO poll loop vs trigger bus")
+    ap.add_argument("-n", type=int, default=30, help="presses per transport")
+    ap.add_argument("--idle", type=float, default=2.0, help="seconds of idle to count wakeups")
+    ap.add_argument("--gap-ms", type=int, default=400, help="gap between the two presses (debounce scenario)")
+    ap.add_argument("--debounce", type=float, default=0.35, help="debounce seconds")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_trigger_")
+    fifo = os.path.join(tmp, "ptt.fifo")
+    os.mkfifo(fifo)
+    sock = os.path.join(tmp, "trigger.sock")
+
+    fifo_poll(fifo, args.n, args.idle)
+    ok = True
+
+    async def run() -> bool:
+        await bus(sock, args.n, args.idle)
+        r = await debounce(sock, args.gap_ms, args.debounce)
+        return await stale(sock) and r
+
+    ok &= asyncio.run(run())
+    log(f"[TRIG] {'ALL PASS' if ok else 'SOME FAILED'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
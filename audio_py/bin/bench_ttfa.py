@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_ttfa.py
+Time-to-first-audio: fork-per-play (player.py) vs warm PCM sink (sink.py)
+
+How it is measured (same probe for both paths):
+- the player reads PCM through a pipe shrunk to one page (F_SETPIPE_SZ)
+- we write one page plus one chunk; that write can only complete once the
+  player has actually consumed PCM, i.e. after it opened and configured the
+  ALSA device
+- spawn path: `aplay -D dev <fifo>` is spawned per run (what PLAY_WAV does)
+- sink path:  one `aplay -t raw` stays open; each run only submits a clip
+
+Usage:
+  python3 audio_py/bin/bench_ttfa.py --runs 20
+  python3 audio_py/bin/bench_ttfa.py --device null     # no sound card
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import fcntl
+import shutil
+import struct
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from audio import player  # noqa: E402
+from audio.sink import Clip, PcmSink, SinkFormat, F_SETPIPE_SZ  # noqa: E402
+
+PAGE = 4096
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def wav_header(fmt: SinkFormat, data_bytes: int) -> bytes:
+    byte_rate = fmt.rate * fmt.frame_bytes
+    return b"RIFF" + struct.pack("<I", 36 + data_bytes) + b"WAVE" + \
+        b"fmt " + struct.pack("<IHHIIHH", 16, 1, fmt.channels, fmt.rate, byte_rate, fmt.frame_bytes, 16) + \
+        b"data" + struct.pack("<I", data_bytes)
+
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))]
+
+
+def bench_spawn(dev: str, fmt: SinkFormat, chunk: bytes) -> float:
+    """One fork-per-play run: spawn aplay on a FIFO and time first consumption."""
+    tmp = tempfile.mkdtemp(prefix="ttfa_")
+    fifo = os.path.join(tmp, "probe.wav")
+    os.mkfifo(fifo)
+    try:
+        t0 = time.perf_counter()
+        proc = player._popen(["aplay", "-q", "-D", dev, fifo])
+        fd = os.open(fifo, os.O_WRONLY)  # blocks until aplay opens the file
+        try:
+            try:
+                fcntl.fcntl(fd, F_SETPIPE_SZ, PAGE)
+            except OSError:
+                pass
+            payload = wav_header(fmt, 10 * 1024 * 1024) + b"\0" * PAGE + chunk
+            mv = memoryview(payload)
+            while mv:
+                mv = mv[os.write(fd, mv):]
+            dt = time.perf_counter() - t0
+        finally:
+            os.close(fd)
+        player._terminate(proc, wait=True)
+        return dt
+    finally:
+        try:
+            os.unlink(fifo)
+            os.rmdir(tmp)
+        except OSError:
+            pass
+
+
+def bench_sink(sink: PcmSink, chunk: bytes) -> float:
+    """One warm-sink run: submit a clip and time first consumption."""
+    need = PAGE + len(chunk)
+    done = threading.Event()
+    t_hit = [0.0]
+
+    def chunks():
+        sent = 0
+        while True:
+            if sent >= need and not t_hit[0]:
+                # previous chunk write returned: the player consumed PCM
+                t_hit[0] = time.perf_counter()
+                return
+            sent += len(chunk)
+            yield chunk
+
+    t0 = time.perf_counter()
+    sink.submit(Clip(chunks(), on_end=lambda _r: done.set()))
+    done.wait(10.0)
+    sink.drop()
+    return (t_hit[0] or time.perf_counter()) - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Time-to-first-audio: spawn vs warm sink")
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--device", default=player._alsa_device())
+    ap.add_argument("--rate", type=int, default=SinkFormat.from_env().rate)
+    ap.add_argument("--channels", type=int, default=SinkFormat.from_env().channels)
+    args = ap.parse_args()
+
+    if shutil.which("aplay") is None:
+        log("[TTFA] aplay not found: install alsa-utils (both paths play through it)")
+        return 1
+
+    fmt = SinkFormat(args.rate, args.channels)
+    chunk = b"\0" * fmt.bytes_for_ms(20)
+
+    log(f"[TTFA] device={args.device} fmt={fmt.rate}Hz/{fmt.channels}ch runs={args.runs}")
+
+    spawn_ms = [bench_spawn(args.device, fmt, chunk) * 1000 for _ in range(args.runs)]
+
+    sink = PcmSink(fmt=fmt, device=args.device, pipe_bytes=PAGE)
+    sink.start()
+    time.sleep(0.5)  # let the sink finish its one-time open
+    # Let the previous run drain from the device buffer.
+    sink_ms = []
+    for _ in range(args.runs):
+        sink_ms.append(bench_sink(sink, chunk) * 1000)
+        time.sleep(sink.buffer_ms / 1000.0 + 0.05)
+    sink.close()
+
+    for name, xs in (("spawn", spawn_ms), ("sink", sink_ms)):
+        log(f"[TTFA] {name:5s} median={_pct(xs, 0.5):7.1f}ms p90={_pct(xs, 0.9):7.1f}ms "
+            f"min={min(xs):7.1f}ms max={max(xs):7.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
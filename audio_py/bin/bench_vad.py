@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_vad.py
+Wake segments (= ASR calls) per hour: fixed threshold vs adaptive VAD (vad.py)
+
+Every accepted VAD segment costs wake_poll one ASR call. We replay audio
+through both gates, frame by frame, exactly as wake_poll sees it, and
+report per scenario:
+
+- seg/h:    accepted segments per hour of audio (ASR calls)
+- rejected: segments the gate dropped itself (short / hum / steady)
+- recall:   labelled user utterances covered by an accepted segment
+            (synthetic corpus only)
+
+The default corpus is synthetic, 16 kHz mono: a user saying a short
+phrase every ~12 s over a quiet room, a fan, mains hum, a TV talker and
+music. With --wav, your own recordings (16 kHz mono S16 WAV, e.g. a few
+hours of the room with the radio on) are replayed instead; recall is not
+reported for those.
+
+Usage:
+  python3 audio_py/bin/bench_vad.py
+  python3 audio_py/bin/bench_vad.py --minutes 5 --thresh 800
+  python3 audio_py/bin/bench_vad.py --wav kitchen_evening.wav radio.wav
+"""
+
+from __future__ import annotations
+
+import sys
+import math
+import wave
+import array
+import random
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from mic.features import FrameFeatures  # noqa: E402
+from mic.vad import AdaptiveVad, FixedVad, Segment  # noqa: E402
+
+RATE = 16000
+TWO_PI = 2.0 * math.pi
+# one period of a voiced source (harmonics falling off at 1/k)
+_TABLE = [sum(math.sin(TWO_PI * k * i / 512) / k for k in range(1, 9)) for i in range(512)]
+
+Span = Tuple[int, int]  # [start, end) in samples
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def _scale(x: List[float], rms: float) -> List[float]:
+    cur = math.sqrt(sum(v * v for v in x) / max(1, len(x))) or 1.0
+    k = rms / cur
+    return [v * k for v in x]
+
+
+def utterance(rnd: random.Random, secs: float, rms: float) -> List[float]:
+    """Voiced syllables at 4-5 Hz with a fricative onset, gliding pitch."""
+    n = int(RATE * secs)
+    f0 = rnd.uniform(100.0, 220.0)
+    syl = rnd.uniform(3.5, 5.5)
+    out: List[float] = []
+    phase = 0.0
+    for i in range(n):
+        t = i / RATE
+        phase += 512.0 * f0 * (1.0 + 0.08 * math.sin(TWO_PI * 0.7 * t)) / RATE
+        s = (t * syl) % 1.0
+        env = math.sin(math.pi * s) ** 2
+        if s < 0.18:
+            out.append(env * rnd.gauss(0.0, 0.6))
+        else:
+            out.append(env * _TABLE[int(phase) & 511])
+    return _scale(out, rms)
+
+
+def white(rnd: random.Random, n: int, rms: float) -> List[float]:
+    return [rnd.gauss(0.0, rms) for _ in range(n)]
+
+
+def fan(rnd: random.Random, n: int, rms: float) -> List[float]:
+    # low-passed noise with a slow wobble
+    out: List[float] = []
+    y = 0.0
+    for i in range(n):
+        y += 0.3 * (rnd.gauss(0.0, 1.0) - y)
+        out.append(y * (1.0 + 0.05 * math.sin(TWO_PI * 0.3 * i / RATE)))
+    return _scale(out, rms)
+
+
+def hum(rnd: random.Random, n: int, rms: float) -> List[float]:
+    out = [
+        math.sin(TWO_PI * 100 * i / RATE) + 0.3 * math.sin(TWO_PI * 200 * i / RATE) + rnd.gauss(0.0, 0.02)
+        for i in range(n)
+    ]
+    return _scale(out, rms)
+
+
+def tv(rnd: random.Random, n: int, rms: float) -> List[float]:
+    # a talker in the next room: phrases of 1-4 s, pauses of 0.2-1 s
+    out: List[float] = []
+    while len(out) < n:
+        out.extend(utterance(rnd, rnd.uniform(1.0, 4.0), rms))
+        out.extend(white(rnd, int(RATE * rnd.uniform(0.2, 1.0)), rms * 0.05))
+    return out[:n]
+
+
+def music(rnd: random.Random, n: int, rms: float) -> List[float]:
+    # three-note chords changing every 0.5 s, on a 2 Hz beat
+    out: List[float] = []
+    notes = [220.0, 277.2, 329.6]
+    for i in range(n):
+        if i % (RATE // 2) == 0:
+            root = rnd.choice([196.0, 220.0, 246.9, 261.6, 293.7])
+            notes = [root, root * 1.26, root * 1.5]
+        t = i / RATE
+        beat = 0.6 + 0.4 * math.exp(-((t * 2.0) % 1.0) * 6.0)
+        out.append(beat * sum(math.sin(TWO_PI * f * t) for f in notes))
+    return _scale(out, rms)
+
+
+SCENARIOS: List[Tuple[str, Callable[[random.Random, int, float], List[float]], float]] = [
+    ("quiet", white, 60.0),
+    ("fan", fan, 1100.0),
+    ("hum", hum, 1000.0),
+    ("tv", tv, 900.0),
+    ("music", music, 1000.0),
+]
+
+
+def corpus(name: str, bg: Callable[[random.Random, int, float], List[float]], bg_rms: float,
+           minutes: float, user_rms: float, seed: int) -> Tuple[bytes, List[Span]]:
+    rnd = random.Random(seed)
+    n = int(RATE * 60 * minutes)
+    x = bg(rnd, n, bg_rms)
+    spans: List[Span] = []
+    pos = int(RATE * rnd.uniform(3.0, 8.0))
+    while True:
+        u = utterance(rnd, rnd.uniform(0.5, 1.2), user_rms)
+        if pos + len(u) >= n:
+            break
+        for i, v in enumerate(u):
+            x[pos + i] += v
+        spans.append((pos, pos + len(u)))
+        pos += len(u) + int(RATE * rnd.uniform(8.0, 16.0))
+    a = array.array("h", (max(-32768, min(32767, int(v))) for v in x))
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a.tobytes(), spans
+
+
+def read_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1 or wf.getframerate() != RATE:
+            raise SystemExit(f"{path}: need {RATE} Hz mono S16 WAV")
+        return wf.readframes(wf.getnframes())
+
+
+def replay(pcm: bytes, vad: object, ff: FrameFeatures) -> List[Segment]:
+    f = ff.frames(pcm)
+    out: List[Segment] = []
+    for rms, zcr in zip(f.rms, f.zcr):
+        ev = vad.update(rms, zcr)  # type: ignore[attr-defined]
+        if isinstance(ev, Segment):
+            out.append(ev)
+    return out
+
+
+def recall(segs: List[Segment], spans: List[Span], spf: int) -> float:
+    if not spans:
+        return 1.0
+    hit = 0
+    for a, b in spans:
+        for s in segs:
+            lo, hi = s.start * spf, (s.start + s.frames - s.tail) * spf
+            if s.ok and min(b, hi) - max(a, lo) >= 0.5 * (b - a):
+                hit += 1
+                break
+    return hit / len(spans)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="ASR calls per hour: fixed threshold vs adaptive VAD")
+    ap.add_argument("--minutes", type=float, default=3.0, help="synthetic audio per scenario")
+    ap.add_argument("--user-rms", type=float, default=3500.0, help="level of the labelled utterances")
+    ap.add_argument("--frame-ms", type=int, default=20)
+    ap.add_argument("--thresh", type=float, default=800.0, help="fixed gate threshold (VOXIE_WAKE_THRESH)")
+    ap.add_argument("--tail-ms", type=int, default=250, help="fixed gate tail (VOXIE_WAKE_SILENCE_TAIL_MS)")
+    ap.add_argument("--min-ms", type=int, default=250)
+    ap.add_argument("--max-ms", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=11)
+    ap.add_argument("--wav", nargs="*", default=[], help="replay these recordings instead")
+    args = ap.parse_args()
+
+    ff = FrameFeatures(RATE, args.frame_ms)
+    runs: List[Tuple[str, bytes, List[Span]]] = []
+    if args.wav:
+        runs = [(Path(p).name, read_wav(p), []) for p in args.wav]
+    else:
+        for i, (name, bg, bg_rms) in enumerate(SCENARIOS):
+            pcm, spans = corpus(name, bg, bg_rms, args.minutes, args.user_rms, args.seed + i)
+            runs.append((name, pcm, spans))
+
+    probe = AdaptiveVad(args.frame_ms, args.min_ms, args.max_ms)
+    log(f"[VAD] frame={args.frame_ms}ms fixed: thresh={args.thresh:.0f} tail={args.tail_ms}ms | "
+        f"adaptive: start={probe.start_db:.0f}dB stop={probe.stop_db:.0f}dB "
+        f"hang={probe.hang_frames * args.frame_ms}ms gap={probe.gap_frames * args.frame_ms}ms")
+
+    tot: Dict[str, float] = {"secs": 0.0, "fixed": 0.0, "adaptive": 0.0}
+    for name, pcm, spans in runs:
+        secs = len(pcm) / 2.0 / RATE
+        row = []
+        for vad in (
+            FixedVad(args.frame_ms, args.thresh, args.tail_ms, args.min_ms, args.max_ms),
+            AdaptiveVad(args.frame_ms, args.min_ms, args.max_ms),
+        ):
+            segs = replay(pcm, vad, ff)
+            ok = sum(1 for s in segs if s.ok)
+            tot[vad.name] += ok
+            rej: Dict[str, int] = {}
+            for s in segs:
+                if not s.ok:
+                    rej[s.reason] = rej.get(s.reason, 0) + 1
+            rec = f" recall={recall(segs, spans, ff.samples) * 100:3.0f}%" if spans else ""
+            cell = f"{vad.name}={ok * 3600.0 / secs:7.0f} seg/h{rec}"
+            if rej:
+                cell += " (rejected " + ",".join(f"{k}:{v}" for k, v in sorted(rej.items())) + ")"
+            row.append(cell)
+        tot["secs"] += secs
+        log(f"[VAD] {name:12s} {secs / 60:5.1f}min  " + "  ".join(row))
+
+    fixed_h = tot["fixed"] * 3600.0 / tot["secs"]
+    adapt_h = tot["adaptive"] * 3600.0 / tot["secs"]
+    cut = (1.0 - adapt_h / fixed_h) * 100 if fixed_h else 0.0
+    log(f"[VAD] total  fixed={fixed_h:.0f} seg/h  adaptive={adapt_h:.0f} seg/h  ASR calls -{cut:.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
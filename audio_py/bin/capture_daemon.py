@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+capture_daemon.py
+Always-on capture: the one process that owns the microphone
+
+One streaming arecord into a shared-memory ring (src/mic/shmring.py,
+VOXIE_CAPTURE_SHM). wake_poll and the PTT recorder (voxie_listen,
+mic/listener.py) attach and read it at their own offsets instead of
+opening the device themselves:
+- no second arecord fighting the first for a USB mic
+- PTT recording starts at once, with VOXIE_REC_PREROLL_MS of audio from
+  before the button press
+- without the daemon (or with VOXIE_CAPTURE_SHM="") every consumer falls
+  back to its own arecord, as before
+
+The ring holds VOXIE_CAPTURE_SEC seconds (default 30: ~1 MB at 16 kHz
+mono). arecord restarts with backoff; the ring (and the readers' offsets)
+survives it. On exit the ring file is removed so readers stop waiting.
+
+Metrics: $VOXIE_METRICS_DIR/capture_daemon.prom (src/metrics.py)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+import shutil
+import signal
+import threading
+import subprocess
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import metrics  # noqa: E402
+from mic.shmring import SharedRing, capture_shm  # noqa: E402
+
+SHM = capture_shm()
+MIC_DEV = os.environ.get("VOXIE_MIC_DEV", "default")
+SR = int(os.environ.get("VOXIE_CAPTURE_SR", "16000"))
+CH = int(os.environ.get("VOXIE_CAPTURE_CH", "1"))
+RING_SEC = float(os.environ.get("VOXIE_CAPTURE_SEC", "30"))
+CHUNK_MS = 20
+
+RESTART_BACKOFF_BASE = float(os.environ.get("VOXIE_WAKE_BACKOFF_BASE", "0.6"))
+RESTART_BACKOFF_MAX = float(os.environ.get("VOXIE_WAKE_BACKOFF_MAX", "6.0"))
+
+DEBUG = int(os.environ.get("DEBUG", "0"))
+
+CAPTURED = metrics.counter("voxie_capture_bytes_total", "PCM bytes published to the shared ring")
+XRUN_FRAMES = metrics.counter("voxie_capture_xrun_frames_total", "20 ms frames lost to ALSA overruns")
+RESTARTS = metrics.counter("voxie_capture_arecord_restarts_total", "arecord (re)spawns after a failure")
+
+XRUN_RE = re.compile(r"overrun!!!(?: \(at least ([0-9.]+) ms long\))?")
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def dlog(msg: str) -> None:
+    if DEBUG:
+        print(msg, flush=True)
+
+
+def arecord_cmd() -> List[str]:
+    return ["arecord", "-D", MIC_DEV, "-f", "S16_LE", "-r", str(SR), "-c", str(CH), "-t", "raw", "-q"]
+
+
+def xruns(proc: subprocess.Popen) -> None:
+    assert proc.stderr is not None
+    for raw in proc.stderr:
+        line = raw.decode("utf-8", "replace").strip()
+        m = XRUN_RE.search(line)
+        if m:
+            ms = float(m.group(1) or CHUNK_MS)
+            XRUN_FRAMES.inc(max(1, int(round(ms / CHUNK_MS))))
+            dlog(f"[CAPTURE] arecord {line}")
+
+
+def kill(proc: subprocess.Popen) -> None:
+    try:
+        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+    except Exception:
+        pass
+
+
+def main() -> int:
+    if not SHM:
+        log("[CAPTURE] VOXIE_CAPTURE_SHM is empty: nothing to do")
+        return 0
+    if not shutil.which("arecord"):
+        log("[CAPTURE][ERR] arecord not found. Install alsa-utils.")
+        return 1
+
+    ring = SharedRing.create(SHM, RING_SEC, SR, CH)
+    chunk = SR * CH * 2 * CHUNK_MS // 1000
+    log(f"[CAPTURE] mic={MIC_DEV} sr={SR} ch={CH} ring={RING_SEC:g}s ({ring.capacity // 1024} KiB) shm={SHM}")
+    metrics.export("capture_daemon")
+
+    # SIGTERM (stop.sh) -> the finally below
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    backoff = RESTART_BACKOFF_BASE
+    proc = None
+    try:
+        while True:
+            dlog(f"[CAPTURE] spawn: {' '.join(arecord_cmd())}")
+            try:
+                proc = subprocess.Popen(arecord_cmd(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        bufsize=0, preexec_fn=os.setsid)
+            except OSError as e:
+                log(f"[CAPTURE][ERR] cannot start arecord: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 1.6, RESTART_BACKOFF_MAX)
+                continue
+            threading.Thread(target=xruns, args=(proc,), name="capture-xrun", daemon=True).start()
+            t0 = time.monotonic()
+
+            assert proc.stdout is not None
+            while True:
+                got = ring.fill(proc.stdout, chunk)
+                if not got:
+                    break
+                CAPTURED.inc(got)
+
+            kill(proc)
+            proc.wait()
+            RESTARTS.inc()
+            if time.monotonic() - t0 > 10.0:
+                backoff = RESTART_BACKOFF_BASE  # it ran for a while: not a tight failure loop
+            log(f"[CAPTURE] arecord ended (rc={proc.returncode}), restart in {backoff:.1f}s")
+            ring.beat()  # a restart is not a dead daemon
+            time.sleep(backoff)
+            backoff = min(backoff * 1.4, RESTART_BACKOFF_MAX)
+    except KeyboardInterrupt:
+        log("\n[CAPTURE] exit")
+    finally:
+        if proc is not None:
+            kill(proc)
+        try:
+            os.unlink(SHM)
+        except OSError:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
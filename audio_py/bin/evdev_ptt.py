@@ -5,7 +5,10 @@
 evdev_ptt.py
 Push-To-Talk via Linux input event device (/dev/input/eventX).
 
-Reads EV_KEY events from the chosen device and writes VOXIE_PTT_TOKEN into VOXIE_PTT_FIFO.
+Reads EV_KEY events from the chosen device and sends each press on the
+trigger bus (VOXIE_TRIGGER_SOCK, src/trigger_bus.py) with its kernel
+timestamp; writes VOXIE_PTT_TOKEN into VOXIE_PTT_FIFO when no listener
+is bound there.
 
 Environment:
 - VOXIE_PTT_EVDEV=/dev/input/event2
@@ -13,10 +16,13 @@ Environment:
 - VOXIE_PTT_TOKEN=PTT
 - VOXIE_PTT_DEBOUNCE_SEC=0.35
 - VOXIE_PTT_KEYCODES=200,201,164   (default includes PLAYCD+PAUSECD+PLAYPAUSE)
+- VOXIE_TRIGGER_SOCK=/tmp/bitvox_trigger.sock
 
 Notes:
 - No external deps; parses evdev events in binary format (struct input_event).
 - Works on older Raspberry Pi (ARMv6) with Python 3.x.
+- Debounce on the events' own timestamps, not on when they were read.
+- Metrics: $VOXIE_METRICS_DIR/evdev_ptt.prom (src/metrics.py)
 """
 
 import os
@@ -27,6 +33,13 @@ import argparse
 from pathlib import Path
 from typing import List, Optional
 
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import metrics  # noqa: E402
+from trigger_bus import realtime_to_mono, send_trigger  # noqa: E402
+
 
 DEFAULT_FIFO = os.environ.get("VOXIE_PTT_FIFO", "/tmp/bitvox_ptt.fifo")
 DEFAULT_TOKEN = os.environ.get("VOXIE_PTT_TOKEN", "PTT")
@@ -44,6 +57,8 @@ SIZE_64 = struct.calcsize(FMT_64)  # 24
 
 EV_KEY = 0x01
 
+PRESSES = metrics.counter("voxie_ptt_presses_total", "PTT key presses", ("code", "result"))
+
 
 def log(msg: str) -> None:
     print(msg, flush=True)
@@ -71,6 +86,11 @@ def fifo_trigger(path: str, token: str) -> bool:
         return False
 
 
+def trigger(path: str, token: str, code: int, ts: float) -> bool:
+    """Trigger bus first (the press time goes with it), the FIFO if no listener is bound."""
+    return send_trigger("evdev", {"code": code}, realtime_to_mono(ts)) or fifo_trigger(path, token)
+
+
 def parse_int_list(csv: str) -> List[int]:
     out: List[int] = []
     for part in (csv or "").split(","):
@@ -152,8 +172,9 @@ def main() -> int:
     log(f"[EVDEV_PTT] keycodes={keycodes} (Tip: EBS-313 is usually 200/201)")
     log("[EVDEV_PTT] waiting for key events…")
     log(f"[EVDEV_PTT] device name: {read_device_name(dev)}")
+    metrics.export("evdev_ptt")
 
-    last_ts = 0.0
+    last_ts = 0.0  # kernel time of the last accepted press
 
     try:
         with open(dev, "rb", buffering=0) as f:
@@ -179,16 +200,18 @@ def main() -> int:
                 if code not in keycodes:
                     continue
 
-                now = time.time()
-                if now - last_ts < args.debounce:
+                ts = sec + usec / 1e6
+                if 0 <= ts - last_ts < args.debounce:
+                    PRESSES.inc(code=code, result="debounced")
                     continue
-                last_ts = now
+                last_ts = ts
 
-                ok = fifo_trigger(args.fifo, args.token)
+                ok = trigger(args.fifo, args.token, code, ts)
+                PRESSES.inc(code=code, result="sent" if ok else "no_reader")
                 if ok:
                     log(f"[EVDEV_PTT] PTT (code={code})")
                 else:
-                    log(f"[EVDEV_PTT] code={code} but FIFO has no reader")
+                    log(f"[EVDEV_PTT] code={code} but no listener (trigger bus / FIFO)")
 
     except PermissionError:
         log(f"[EVDEV_PTT][FATAL] Permission denied opening {dev}.")
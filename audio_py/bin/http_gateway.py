@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+http_gateway.py
+Local HTTP gateway for the cloud APIs (ASR, TTS, LLM, embeddings)
+
+Holds keep-alive HTTPS connections to each upstream and serves requests
+from PHP (php/core/gateway.php) and Python (src/gateway.py GatewayClient)
+on VOXIE_GW_SOCK (default /tmp/bitvox_gw.sock). A turn's ASR, embedding,
+LLM and TTS calls then reuse connections instead of paying DNS + TCP +
+TLS each; callers go straight to the API when the gateway is not running.
+
+VOXIE_GW_WARM: comma-separated origins connected at start-up (default:
+the OpenAI and Gemini endpoints), so even the first turn finds a warm
+connection. Pool size, idle time and per-kind timeout / retry / hedge
+policy: see src/gateway.py.
+
+Metrics: $VOXIE_METRICS_DIR/http_gateway.prom (src/metrics.py)
+
+Usage: python3 audio_py/bin/http_gateway.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import signal
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import metrics  # noqa: E402
+from gateway import DEFAULT_SOCK, Gateway, GatewayError, GatewayServer  # noqa: E402
+
+WARM = os.environ.get(
+    "VOXIE_GW_WARM", "https://api.openai.com,https://generativelanguage.googleapis.com")
+
+DEBUG = int(os.environ.get("DEBUG", "0"))
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def dlog(msg: str) -> None:
+    if DEBUG:
+        print(msg, flush=True)
+
+
+def warm(gw: Gateway) -> None:
+    for origin in (o.strip() for o in WARM.split(",")):
+        if not origin:
+            continue
+        try:
+            gw.upstream(origin).warm()
+            dlog(f"[GW] warm {origin}")
+        except (GatewayError, OSError) as e:
+            log(f"[GW][WARN] warm {origin}: {e}")
+
+
+def main() -> int:
+    gw = Gateway()
+    srv = GatewayServer(gw, DEFAULT_SOCK, log=dlog)
+    try:
+        srv.bind()
+    except OSError as e:
+        log(f"[GW][FATAL] bind failed: {DEFAULT_SOCK} ({e})")
+        return 2
+    srv.start()
+    log(f"[GW] listening on {DEFAULT_SOCK} (max_conn={gw.max_conn} idle={gw.idle_sec:.0f}s)")
+    prom = metrics.export("http_gateway")
+    if prom:
+        log(f"[GW] metrics -> {prom}")
+    threading.Thread(target=warm, args=(gw,), name="gw-warm", daemon=True).start()
+
+    done = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: done.set())
+    while not done.wait(1.0):
+        pass
+
+    srv.close()
+    gw.close()
+    log("[GW] shutdown")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
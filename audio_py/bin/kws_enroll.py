@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+kws_enroll.py
+Enroll the wake word for the offline spotter (src/mic/kws.py)
+
+Records N takes of the wake word from the mic (arecord + the wake VAD),
+or reads them from WAV files, and writes the MFCC templates and a
+calibrated threshold to the model file wake_poll loads
+(VOXIE_KWS_MODEL, default <root>/data/kws/<word>.json).
+
+Say the word the way you say it to the speaker, from where you usually
+stand; 4-5 takes are plenty. Re-running replaces the model; --append
+adds another voice (templates are speaker-dependent: enroll everyone
+who should wake the speaker).
+
+Usage:
+  python3 audio_py/bin/kws_enroll.py
+  python3 audio_py/bin/kws_enroll.py --takes 5 --word voxie
+  python3 audio_py/bin/kws_enroll.py --wav take1.wav take2.wav take3.wav
+  python3 audio_py/bin/kws_enroll.py --append      # second speaker
+  python3 audio_py/bin/kws_enroll.py --test       # score live segments against the model
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import wave
+import shutil
+import signal
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Iterator, List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from mic.features import FrameFeatures  # noqa: E402
+from mic.kws import Mfcc, Spotter, calibrate, load_model, model_path, save_model, templates  # noqa: E402
+from mic.ringbuf import PcmRing  # noqa: E402
+from mic.vad import Segment, make_vad  # noqa: E402
+
+RATE = 16000
+CHUNK_MS = 20
+MIC_DEV = os.environ.get("VOXIE_MIC_DEV", "default")
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def read_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1 or wf.getframerate() != RATE:
+            raise SystemExit(f"{path}: need {RATE} Hz mono S16 WAV")
+        return wf.readframes(wf.getnframes())
+
+
+def mic_segments(ff: FrameFeatures) -> Iterator[bytes]:
+    """Accepted VAD segments from the mic, as bytes, until the caller stops."""
+    if not shutil.which("arecord"):
+        raise SystemExit("arecord not found (install alsa-utils) - or use --wav")
+    cmd = ["arecord", "-D", MIC_DEV, "-f", "S16_LE", "-r", str(RATE), "-c", "1", "-t", "raw", "-q"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0,
+                            preexec_fn=os.setsid)
+    vad = make_vad(CHUNK_MS, 250, 2000)
+    cb = ff.frame_bytes
+    ring = PcmRing(RATE * 2 * 3, align=cb)
+    done = 0
+    try:
+        assert proc.stdout is not None
+        while ring.fill(proc.stdout, cb):
+            while ring.end - done >= cb:
+                f = ff.frames(ring.view(done, done + cb))
+                done += cb
+                ev = vad.update(f.rms[0], f.zcr[0])
+                if isinstance(ev, Segment) and ev.ok:
+                    lo = max(ring.start, (ev.start - 5) * cb)
+                    yield bytes(ring.view(lo, (ev.start + ev.frames - ev.tail) * cb))
+    finally:
+        try:
+            os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+        except Exception:
+            pass
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Enroll the wake word for the offline spotter")
+    ap.add_argument("--word", default=os.environ.get("VOXIE_WAKE_WORD", "voxie").strip().lower())
+    ap.add_argument("--takes", type=int, default=4)
+    ap.add_argument("--wav", nargs="*", default=[], help="takes from files instead of the mic")
+    ap.add_argument("--out", default="", help="model file (default: VOXIE_KWS_MODEL or data/kws/<word>.json)")
+    ap.add_argument("--margin", type=float, default=1.0, help="threshold = worst take-to-take score x margin")
+    ap.add_argument("--append", action="store_true", help="add to the existing model (another speaker)")
+    ap.add_argument("--test", action="store_true", help="score live mic segments against the model")
+    args = ap.parse_args()
+
+    out = Path(args.out) if args.out else model_path(args.word)
+    ff = FrameFeatures(RATE, CHUNK_MS)
+
+    if args.test:
+        sp = Spotter.load(out)
+        if sp is None:
+            log(f"[KWS] no model at {out}")
+            return 1
+        log(f"[KWS] model={out} word='{sp.word}' threshold={sp.threshold:.2f} (Ctrl+C to stop)")
+        try:
+            for pcm in mic_segments(ff):
+                hit, score = sp.detect(pcm)
+                log(f"[KWS] {len(pcm) / 2.0 / RATE:4.2f}s score={score:.2f} {'HIT' if hit else '-'}")
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    takes: List[bytes] = []
+    if args.wav:
+        takes = [read_wav(p) for p in args.wav]
+    else:
+        log(f"[KWS] say '{args.word}' {args.takes} times, pausing in between")
+        log(f"[KWS] take 1/{args.takes}...")
+        try:
+            for pcm in mic_segments(ff):
+                takes.append(pcm)
+                log(f"[KWS] got {len(pcm) / 2.0 / RATE:.2f}s")
+                if len(takes) >= args.takes:
+                    break
+                log(f"[KWS] take {len(takes) + 1}/{args.takes}...")
+        except KeyboardInterrupt:
+            log("[KWS] interrupted")
+    if len(takes) < 2:
+        log("[KWS] need at least 2 takes")
+        return 1
+
+    mfcc = Mfcc(RATE)
+    tpls = templates(takes, mfcc)
+    if len(tpls) < 2:
+        log("[KWS] takes too short (< 100 ms of speech)")
+        return 1
+    threshold = calibrate(tpls, args.margin)
+    old = load_model(out) if args.append else None
+    if old:
+        # each voice is calibrated on its own takes; the loosest one wins
+        tpls = old["templates"] + tpls
+        threshold = max(threshold, float(old.get("threshold", 0.0)))
+    save_model(out, args.word, mfcc, tpls, threshold)
+    log(f"[KWS] {len(tpls)} templates, {', '.join(str(len(t)) for t in tpls)} frames, "
+        f"threshold={threshold:.2f} -> {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
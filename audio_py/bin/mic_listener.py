@@ -9,6 +9,9 @@ Purpose:
 - Start a microphone listener that can trigger the PHP agent
 - Optionally send STOP to audio daemon (barge-in)
 - Optionally integrate with PTT FIFO
+- One process for the trigger sources and the turns (MicListener):
+  VOXIE_LISTEN_SOURCES=fifo,evdev,wake also reads the PTT key
+  (VOXIE_PTT_EVDEV) and runs bin/wake_poll.py in here
 
 Repo-hardening:
 - No hardcoded /home/* paths
@@ -45,14 +48,15 @@ def die(msg: str, code: int = 2) -> None:
 # Imports (fail gracefully for community)
 # ------------------------------------------------------------
 try:
+    import metrics
     from mic.listener import MicListener, MicListenerConfig
 except Exception as e:
     die(f"Cannot import mic.listener from {SRC_DIR}. Missing/invalid src layout? ({e})")
 
 try:
-    from audio_client import AudioClient
+    from audio_client import AsyncAudioClient
 except Exception as e:
-    die(f"Cannot import AudioClient. Expected src/audio_client.py (or module). ({e})")
+    die(f"Cannot import AsyncAudioClient. Expected src/audio_client.py (or module). ({e})")
 
 
 def default_root() -> str:
@@ -86,13 +90,14 @@ def main() -> None:
         print(f"[MIC_LISTENER][WARN] agent not found: {agent_path}", flush=True)
         print("[MIC_LISTENER][WARN] Set VOXIE_AGENT_PHP or use --php-agent-cmd", flush=True)
 
-    # Audio client (best effort; AudioClient should handle connect errors)
-    audio = AudioClient(sock_path=args.sock)
+    # Audio client (best effort; used on the listener's event loop, calls bound their own time)
+    audio = AsyncAudioClient(sock_path=args.sock)
 
     # Build config expected by your MicListener implementation
     # Keep field names aligned to your snippet.
     try:
-        cfg = MicListenerConfig(
+        cfg = MicListenerConfig.from_env(
+            wake_script=str(SCRIPT_DIR / "wake_poll.py"),
             php_agent_cmd=args.php_agent_cmd,
             barge_in=bool(args.barge_in),
             ptt_fifo=args.ptt_fifo,
@@ -113,6 +118,8 @@ def main() -> None:
     print(f"[MIC_LISTENER] ptt_fifo={args.ptt_fifo}", flush=True)
     print(f"[MIC_LISTENER] agent={args.php_agent_cmd}", flush=True)
     print(f"[MIC_LISTENER] barge_in={bool(args.barge_in)}", flush=True)
+    print(f"[MIC_LISTENER] evdev={cfg.evdev or 'off'} wake={'on' if cfg.wake_script else 'off'}", flush=True)
+    metrics.export("mic_listener")
 
     ml = MicListener(cfg, audio=audio)
     ml.listen()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+precompile_assets.py
+Transcode hot-path audio assets to the sink's native PCM format
+
+Sources (repo-relative, see audio.cache.HOT_GLOBS):
+- assets/ack/*.wav
+- assets/intros_mp3/*.mp3, assets/intros_study_mp3/*.mp3
+- assets/vox_romana_mp3/*.mp3 (+ cues/)
+
+Output: one WAV per source in VOXIE_PCM_CACHE_DIR (default data/cache/pcm),
+S16_LE at VOXIE_SINK_RATE / VOXIE_SINK_CH. Incremental: entries newer than
+their source are skipped. The audio daemon picks them up on the next play.
+
+Usage:
+  python3 audio_py/bin/precompile_assets.py
+  python3 audio_py/bin/precompile_assets.py --force --prune
+  python3 audio_py/bin/precompile_assets.py extra/clip.mp3 ...
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from audio.cache import PcmCache, entry_name, cache_dir, compile_asset, hot_assets  # noqa: E402
+from audio.sink import SinkFormat  # noqa: E402
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Precompile audio assets to native PCM")
+    ap.add_argument("sources", nargs="*", help="extra files (default: hot assets only)")
+    ap.add_argument("--out", default=str(cache_dir()))
+    ap.add_argument("--rate", type=int, default=SinkFormat.from_env().rate)
+    ap.add_argument("--channels", type=int, default=SinkFormat.from_env().channels)
+    ap.add_argument("--force", action="store_true", help="rebuild fresh entries too")
+    ap.add_argument("--prune", action="store_true", help="delete entries with no source")
+    args = ap.parse_args()
+
+    fmt = SinkFormat(args.rate, args.channels)
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    cache = PcmCache(fmt, root=out)
+
+    sources = hot_assets() + [s for s in args.sources if os.path.isfile(s)]
+    log(f"[PRECOMPILE] {len(sources)} sources -> {out} ({fmt.rate}Hz/{fmt.channels}ch)")
+
+    built = skipped = failed = 0
+    total = 0
+    keep = set()
+    t0 = time.time()
+    for src in sources:
+        dst = out / entry_name(src, fmt)
+        keep.add(dst.name)
+        if not args.force and cache.path_for(src):
+            skipped += 1
+            total += dst.stat().st_size
+            continue
+        if compile_asset(src, str(dst), fmt):
+            built += 1
+            total += dst.stat().st_size
+            log(f"[PRECOMPILE] ok   {src}")
+        else:
+            failed += 1
+            log(f"[PRECOMPILE] FAIL {src}")
+
+    pruned = 0
+    if args.prune:
+        for p in out.glob("*.wav"):
+            if p.name not in keep:
+                p.unlink()
+                pruned += 1
+
+    log(f"[PRECOMPILE] built={built} skipped={skipped} failed={failed} pruned={pruned} "
+        f"size={total // 1024}KiB in {time.time() - t0:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,24 +2,47 @@
 """
 voxie_listen.py
 PTT -> record wav -> ASR (php) -> AGENT (php)
+wake handoff (wake_poll streams "voxie, <command>") -> wav -> ASR -> AGENT
 
 Goals:
 - portable defaults (no hardcoded /home/paolo/...)
 - robust FIFO creation
 - sane logging + minimal safety checks
 - best-effort audio STOP via unix socket (barge-in)
+- PTT recordings end on trailing silence (src/mic/endpoint.py,
+  VOXIE_REC_MODE=fixed for the old `arecord -d VOXIE_REC_SEC`)
+- agent turns go to the resident PHP worker (src/agent_client.py,
+  VOXIE_AGENT_MODE=spawn for one `php agent.php` per turn)
+- wake turns arrive with their audio on VOXIE_HANDOFF_SOCK
+  (src/mic/handoff.py): no arecord, no fixed VOXIE_REC_SEC wait; the
+  wake word is stripped from the transcript
+- turns run on the asyncio turn engine (src/mic/turn.py): a PTT press
+  or wake utterance while the previous turn records, transcribes, waits
+  for the agent or speaks cancels it (asr.php / agent worker killed)
+  and starts the new one at once
+- one process for the trigger sources too (src/mic/listener.py
+  MicListener): VOXIE_LISTEN_SOURCES=fifo,evdev,wake reads the PTT key
+  and runs wake_poll inside this listener instead of evdev_ptt.py and
+  wake_poll.py as interpreters of their own (start.sh
+  VOXIE_SINGLE_PROCESS=1)
+- PTT processes outside it (avrcp_ptt.py, evdev_ptt.py, wake_poll.py)
+  send timestamped events on VOXIE_TRIGGER_SOCK (src/trigger_bus.py),
+  read on the event loop; the FIFO is still served, without polling
+
+Metrics: $VOXIE_METRICS_DIR/voxie_listen.prom (src/metrics.py)
 """
 
 import os
 import re
-import shlex
-import json
-import time
-import socket
+import sys
+import wave
 import shutil
+import asyncio
+import threading
 import subprocess
 from pathlib import Path
 from difflib import SequenceMatcher
+from typing import Optional
 
 
 # -----------------------------
@@ -28,10 +51,23 @@ from difflib import SequenceMatcher
 SCRIPT_DIR = Path(__file__).resolve().parent
 DEFAULT_ROOT = os.environ.get("VOXIE_ROOT") or str(SCRIPT_DIR.parent)  # repo/python -> repo/
 
+SRC_DIR = SCRIPT_DIR.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import metrics  # noqa: E402
+from agent_client import AgentClient, agent_mode  # noqa: E402
+from audio_client import AsyncAudioClient  # noqa: E402
+from mic.endpoint import Recording, rec_mode, record  # noqa: E402
+from mic.handoff import Utterance, handoff_sock, strip_wake  # noqa: E402
+from mic.listener import MicListener, MicListenerConfig, stop_playback, wait_playback  # noqa: E402
+from mic.turn import Turn  # noqa: E402
+from voice_state import VoiceState  # noqa: E402
+
 ROOT = os.environ.get("VOXIE_ROOT", DEFAULT_ROOT)
 FIFO = os.environ.get("VOXIE_PTT_FIFO", "/tmp/bitvox_ptt.fifo")
 DEV  = os.environ.get("VOXIE_MIC_DEV", "default")
-DUR  = int(os.environ.get("VOXIE_REC_SEC", "4"))
+DUR  = int(os.environ.get("VOXIE_REC_SEC", "4"))  # fixed mode; baseline for the time saved otherwise
 WAV  = os.environ.get("VOXIE_WAV", "/tmp/bitvox_mic/ptt.wav")
 LANG = os.environ.get("VOXIE_LANG", "it")
 
@@ -39,6 +75,7 @@ ASR_PHP   = os.environ.get("VOXIE_ASR_PHP",   f"{ROOT}/php/bin/asr.php")
 AGENT_PHP = os.environ.get("VOXIE_AGENT_PHP", f"{ROOT}/php/bin/agent.php")
 
 AUDIO_SOCK = os.environ.get("VOXIE_AUDIO_SOCK", "/tmp/bitvox_audio.sock")
+HANDOFF_SOCK = handoff_sock()  # "" = wake turns come as FIFO PTT
 
 # Debounce + barge-in calm time
 PTT_DEBOUNCE_SEC = float(os.environ.get("VOXIE_PTT_DEBOUNCE_SEC", "0.35"))
@@ -59,6 +96,27 @@ BAD_PHRASES = (
 )
 
 
+# Metrics
+PTT_TOTAL = metrics.counter("voxie_listen_ptt_total", "PTT triggers accepted (after debounce)")
+HANDOFF_TOTAL = metrics.counter("voxie_listen_handoff_total", "Wake utterances received from wake_poll")
+HANDOFF_AUDIO = metrics.histogram(
+    "voxie_listen_handoff_audio_seconds", "Wake + command audio length", (), (1, 2, 3, 4, 5, 6, 8, 10)
+)
+REC_SECONDS = metrics.histogram("voxie_listen_record_seconds", "Recording duration", (), (1, 2, 3, 4, 5, 6, 8, 10))
+REC_SAVED = metrics.histogram(
+    "voxie_listen_record_saved_seconds", "Turn time saved against the fixed VOXIE_REC_SEC recording",
+    (), (-4, -2, -1, 0, 0.5, 1, 1.5, 2, 2.5, 3, 4),
+)
+REC_END = metrics.counter("voxie_listen_record_end_total", "How PTT recordings ended", ("reason",))
+ASR_SECONDS = metrics.histogram("voxie_asr_seconds", "ASR call duration", ("caller",))
+ASR_CALLS = metrics.counter("voxie_asr_calls_total", "ASR calls", ("caller", "result"))
+AGENT_SECONDS = metrics.histogram("voxie_agent_seconds", "Agent call duration (routing + reply playback)")
+AGENT_CALLS = metrics.counter("voxie_agent_calls_total", "Agent calls", ("result",))
+# resident agent_worker.php, started on the first turn
+AGENT = AgentClient() if agent_mode() == "worker" else None
+REJECTED = metrics.counter("voxie_listen_rejected_total", "Turns dropped before the agent", ("reason",))
+
+
 def log(s: str) -> None:
     print(s, flush=True)
 
@@ -117,69 +175,52 @@ def similarity(a: str, b: str) -> float:
 # -----------------------------
 # Audio daemon IPC (best effort)
 # -----------------------------
-def audio_send(payload: dict) -> dict:
-    """
-    Send JSON to unix socket and parse reply (if any).
-    Best-effort: returns {} on failure.
-    """
-    if not AUDIO_SOCK:
-        return {}
-
-    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    try:
-        s.settimeout(0.35)
-        s.connect(AUDIO_SOCK)
-        s.sendall((json.dumps(payload) + "\n").encode("utf-8"))
-
-        # try read reply (optional)
-        try:
-            data = s.recv(4096)
-            if not data:
-                return {}
-            return json.loads(data.decode("utf-8", errors="ignore").strip() or "{}")
-        except Exception:
-            return {}
-    except Exception:
-        return {}
-    finally:
-        try:
-            s.close()
-        except Exception:
-            pass
-
-
-def audio_stop() -> None:
-    audio_send({"cmd": "STOP"})
+# One connection for the process lifetime (reopened after errors), used on
+# the turn loop: STOP and STATUS are bounded, WAIT lasts as long as the reply
+AUDIO = AsyncAudioClient(AUDIO_SOCK) if AUDIO_SOCK else None
 
 
 # -----------------------------
 # Recording + ASR + Agent
 # -----------------------------
-def record_wav() -> bool:
+def record_wav(cancel: Optional[threading.Event] = None) -> Optional[Recording]:
     wav_path = Path(WAV)
     wav_path.parent.mkdir(parents=True, exist_ok=True)
 
     if not _which("arecord"):
         log("[ERR] arecord not found. Install alsa-utils.")
-        return False
-
-    # 16kHz mono PCM wav, fixed duration
-    cmd = [
-        "arecord",
-        "-D", DEV,
-        "-f", "S16_LE",
-        "-r", "16000",
-        "-c", "1",
-        "-d", str(DUR),
-        str(wav_path),
-    ]
-
-    log(f"[REC] {DUR}s @ {DEV}")
-    r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return r.returncode == 0 and wav_path.exists() and wav_path.stat().st_size > 1000
-
-
-def asr_transcribe() -> str:
+        return None
+
+    # 16kHz mono PCM wav, until trailing silence (or fixed duration)
+    mode = rec_mode()
+    log(f"[REC] {'until silence' if mode != 'fixed' else f'{DUR}s'} @ {DEV}")
+    with REC_SECONDS.time():
+        rec = record(DEV, str(wav_path), DUR, mode, cancel)
+    REC_END.inc(reason=rec.reason)
+    if mode != "fixed":
+        REC_SAVED.observe(rec.saved)
+        log(f"[TIMING] rec ms={int(rec.seconds * 1000)} end={rec.reason} saved_ms={int(rec.saved * 1000)} src={rec.source}")
+    if rec.reason == "error" or not wav_path.exists() or wav_path.stat().st_size <= 1000:
+        return None
+    return rec
+
+
+def save_utterance(u: Utterance) -> bool:
+    """Handed-off PCM -> WAV, in place of record_wav()."""
+    wav_path = Path(WAV)
+    wav_path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(wav_path), "wb") as wf:
+        wf.setnchannels(u.channels)
+        wf.setsampwidth(2)
+        wf.setframerate(u.rate)
+        wf.writeframes(u.pcm)
+    secs = len(u.pcm) / 2.0 / u.channels / u.rate
+    HANDOFF_AUDIO.observe(secs)
+    log(f"[WAKE] {secs:.1f}s handed off (wake word {u.wake_ms}ms)")
+    return len(u.pcm) > 1000
+
+
+async def asr_transcribe(turn: Turn) -> str:
     if not Path(ASR_PHP).exists():
         log(f"[ERR] ASR script not found: {ASR_PHP}")
         return ""
@@ -190,16 +231,18 @@ def asr_transcribe() -> str:
 
     cmd = ["php", ASR_PHP, WAV, LANG]
     log("[ASR] transcribing…")
-    p = subprocess.run(cmd, capture_output=True, text=True)
+    with ASR_SECONDS.time(caller="listen"):
+        rc, stdout, stderr = await turn.run(cmd)
 
-    out = (p.stdout or "").strip()
-    err = (p.stderr or "").strip()
+    out = stdout.strip()
+    ASR_CALLS.inc(caller="listen", result="ok" if out else ("empty" if rc == 0 else "error"))
+    err = stderr.strip()
     if err:
         log(f"[ASR][stderr] {err}")
     return out
 
 
-def call_agent(text: str) -> None:
+async def call_agent(turn: Turn, text: str) -> None:
     if not Path(AGENT_PHP).exists():
         log(f"[ERR] AGENT script not found: {AGENT_PHP}")
         return
@@ -209,8 +252,19 @@ def call_agent(text: str) -> None:
         return
 
     log("[AGENT] routing…")
-    # pass as a single argv token to avoid shell quoting issues
-    subprocess.run(["php", AGENT_PHP, text])
+    with AGENT_SECONDS.time():
+        if AGENT is not None:
+            try:
+                r = await turn.blocking(AGENT.turn, text, on_cancel=AGENT.cancel)
+                log(f"[AGENT] intent={r.get('intent', '?')} ms={r.get('ms', '?')} "
+                    f"{'ok' if r.get('ok') else r.get('err', 'error')}")
+                AGENT_CALLS.inc(result="ok" if r.get("ok") else "error")
+                return
+            except OSError as e:
+                log(f"[AGENT][WARN] worker unavailable ({e}), one-shot agent.php")
+        # pass as a single argv token to avoid shell quoting issues
+        rc, _, _ = await turn.run(["php", AGENT_PHP, text], capture=False)
+    AGENT_CALLS.inc(result="ok" if rc == 0 else "error")
 
 
 def main() -> None:
@@ -218,75 +272,108 @@ def main() -> None:
 
     log("[VOXIE] PTT → REC → ASR → AGENT  (demo listener)")
     log(f"[SYS] root={ROOT}")
-    log(f"[SYS] mic={DEV} dur={DUR}s  fifo={FIFO}")
+    log(f"[SYS] mic={DEV} dur={DUR}s  fifo={FIFO}  handoff={HANDOFF_SOCK or 'off'}")
     log("[READY] press PLAY/PAUSE (or: echo PTT > fifo)")
+    metrics.export("voxie_listen")
 
-    last_ptt_ts = 0.0
     last_spoken_norm = ""  # proxy of last line sent to agent (better than nothing)
     last_user_norm = ""    # last accepted user input
 
-    # Blocking read on FIFO: each line triggers one interaction
-    with open(FIFO, "r", encoding="utf-8", errors="ignore") as f:
-        while True:
-            line = f.readline()
-            if not line:
-                time.sleep(0.05)
-                continue
-
-            now = time.time()
-            if now - last_ptt_ts < PTT_DEBOUNCE_SEC:
-                continue
-            last_ptt_ts = now
+    async def handle(turn: Turn, utt: Optional[Utterance]) -> None:
+        """One turn: a PTT press (utt None) or a wake utterance from wake_poll."""
+        nonlocal last_spoken_norm, last_user_norm
 
+        if utt is None:
             log("[PTT] received")
+            PTT_TOTAL.inc()
 
             # Barge-in: stop audio before recording
-            audio_stop()
-            time.sleep(AUDIO_CALM_SEC)
+            await stop_playback(AUDIO)
+            await asyncio.sleep(AUDIO_CALM_SEC)
 
+            turn.state(VoiceState.LISTENING, "record")
             log("[PTT] speak now…")
-            if not record_wav():
+            rec = await turn.blocking(record_wav, turn.cancelled)
+            if rec is None:
                 log("[REC] failed/empty wav")
-                continue
-
-            text = asr_transcribe()
-            if not text:
-                log("[ASR] empty")
-                continue
-
-            log(f'[ASR][RAW] "{text}"')
-
-            # 1) ignore boilerplate / garbage
-            if is_garbage(text):
-                log("[ASR] ignored boilerplate")
-                continue
-
-            fixed = asr_repair(text)
-            if fixed != text:
-                log(f'[ASR][FIX] "{fixed}"')
-
-            clean = normalize(fixed)
-            if not clean:
-                log("[ASR] empty(after clean)")
-                continue
-
-            # 2) anti-echo: discard short repeated phrases
-            words = clean.split()
-            if len(words) <= ECHO_MAX_WORDS:
-                sim_prev_user = similarity(clean, last_user_norm)
-                sim_spoken = similarity(clean, last_spoken_norm)
-                if sim_prev_user >= ECHO_SIM_THRESH or sim_spoken >= ECHO_SIM_THRESH:
-                    log("[ASR] ignored (echo/repeat)")
-                    continue
-
-            log(f'[ASR][OK] "{fixed}"')
-
-            # update anti-echo memory
-            last_user_norm = clean
-            last_spoken_norm = clean
-
-            call_agent(fixed)
-            log("[DONE] waiting next PTT…")
+                REJECTED.inc(reason="record")
+                return
+            if not rec.speech:
+                log("[REC] no speech")
+                REJECTED.inc(reason="nospeech")
+                return
+        else:
+            # wake_poll stopped playback at speech start; the command is already here
+            HANDOFF_TOTAL.inc()
+            if not save_utterance(utt):
+                REJECTED.inc(reason="record")
+                return
+
+        turn.state(VoiceState.THINKING, "asr")
+        text = await asr_transcribe(turn)
+        if not text:
+            log("[ASR] empty")
+            REJECTED.inc(reason="empty")
+            return
+
+        log(f'[ASR][RAW] "{text}"')
+
+        # 1) ignore boilerplate / garbage
+        if is_garbage(text):
+            log("[ASR] ignored boilerplate")
+            REJECTED.inc(reason="garbage")
+            return
+
+        fixed = asr_repair(text)
+        if utt is not None:
+            fixed = strip_wake(fixed, utt.wake_word)
+            if not fixed:
+                log("[ASR] wake word only, no command")
+                REJECTED.inc(reason="wake_only")
+                return
+        if fixed != text:
+            log(f'[ASR][FIX] "{fixed}"')
+
+        clean = normalize(fixed)
+        if not clean:
+            log("[ASR] empty(after clean)")
+            REJECTED.inc(reason="empty")
+            return
+
+        # 2) anti-echo: discard short repeated phrases
+        words = clean.split()
+        if len(words) <= ECHO_MAX_WORDS:
+            sim_prev_user = similarity(clean, last_user_norm)
+            sim_spoken = similarity(clean, last_spoken_norm)
+            if sim_prev_user >= ECHO_SIM_THRESH or sim_spoken >= ECHO_SIM_THRESH:
+                log("[ASR] ignored (echo/repeat)")
+                REJECTED.inc(reason="echo")
+                return
+
+        log(f'[ASR][OK] "{fixed}"')
+
+        # update anti-echo memory
+        last_user_norm = clean
+        last_spoken_norm = clean
+
+        turn.state(VoiceState.THINKING, "agent")
+        await call_agent(turn, fixed)
+
+        turn.state(VoiceState.SPEAKING, "speak")
+        await wait_playback(AUDIO)
+        log("[DONE] waiting next PTT…")
+
+    def on_state(st: VoiceState, turn: Optional[Turn]) -> None:
+        log(f"[STATE] {st.name}" + (f" #{turn.seq}" if turn is not None else ""))
+
+    # PTT lines from the FIFO, wake utterances (and, per VOXIE_LISTEN_SOURCES,
+    # the PTT key and the wake listener itself) all trigger; a newer one
+    # cancels the turn in progress
+    cfg = MicListenerConfig.from_env(
+        wake_script=str(SCRIPT_DIR / "wake_poll.py"),
+        ptt_fifo=FIFO, handoff_sock=HANDOFF_SOCK, debounce=PTT_DEBOUNCE_SEC,
+    )
+    MicListener(cfg, audio=AUDIO, handler=handle, on_state=on_state, log=log).listen()
 
 
 if __name__ == "__main__":
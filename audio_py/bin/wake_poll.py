@@ -3,18 +3,32 @@
 
 """
 wake_poll.py
-Wake word listener (voxie-only) → writes "PTT" to FIFO
+Wake word listener (voxie-only) → hands the utterance to the listener
+(src/mic/handoff.py), or writes "PTT" to FIFO
 
 Design goals:
 - Offline-friendly, always-on, low overhead
-- Streaming arecord (no respawn per chunk)
-- Simple amplitude-based VAD + cooldown
-- No changes to main PTT pipeline: only triggers FIFO
+- Reads the capture daemon's shared ring (bin/capture_daemon.py) when
+  it runs, else a streaming arecord of its own (no respawn per chunk),
+  drained by a capture thread into a ring; VAD in the main thread; wake verification (spotter/ASR)
+  in a worker pool behind a bounded queue, so a slow ASR call never
+  stalls the mic
+- Adaptive VAD (noise floor + SNR, src/mic/vad.py) + cooldown;
+  VOXIE_VAD_MODE=fixed restores the plain amplitude gate
+- Offline keyword spotter when enrolled (bin/kws_enroll.py), cloud ASR
+  otherwise (VOXIE_WAKE_ENGINE)
+- "Voxie, che tempo fa" is one utterance: after a wake the audio from
+  the wake word to the end of the command streams from the ring to
+  voxie_listen (VOXIE_HANDOFF_SOCK) - no second arecord, no fixed-length
+  recording; a trigger bus event (or FIFO "PTT") when the listener has
+  no handoff socket
 
 Repo-hardening:
 - No hardcoded /home/paolo paths
 - Python 3.7+ compatible typing (no list[str])
 - Better logs + backoff if arecord keeps failing
+
+Metrics: $VOXIE_METRICS_DIR/wake_poll.prom (src/metrics.py)
 """
 
 from __future__ import annotations
@@ -22,14 +36,12 @@ from __future__ import annotations
 import os
 import re
 import sys
-import json
 import time
-import math
-import socket
-import struct
 import shutil
 import signal
+import threading
 import subprocess
+from collections import deque
 from pathlib import Path
 from typing import List, Optional
 
@@ -39,6 +51,20 @@ from typing import List, Optional
 SCRIPT_DIR = Path(__file__).resolve().parent
 DEFAULT_ROOT = os.environ.get("VOXIE_ROOT") or str(SCRIPT_DIR.parent)
 
+SRC_DIR = SCRIPT_DIR.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import metrics  # noqa: E402
+from audio_client import AudioClient  # noqa: E402
+from mic.features import FrameFeatures  # noqa: E402
+from mic.handoff import HandoffSender, handoff_sock  # noqa: E402
+from mic.kws import Spotter, model_path  # noqa: E402
+from mic.ringbuf import PcmRing  # noqa: E402
+from mic.shmring import SharedRing, attach_live, stale_sec  # noqa: E402
+from mic.vad import START, Segment, make_vad  # noqa: E402
+from trigger_bus import send_trigger  # noqa: E402
+
 ROOT = os.environ.get("VOXIE_ROOT", DEFAULT_ROOT)
 
 FIFO = os.environ.get("VOXIE_PTT_FIFO", "/tmp/bitvox_ptt.fifo")
@@ -55,6 +81,9 @@ AUDIO_SOCK = os.environ.get("VOXIE_AUDIO_SOCK", "/tmp/bitvox_audio.sock")
 WAKE_WORD = os.environ.get("VOXIE_WAKE_WORD", "voxie").lower().strip()
 ASR_PHP = os.environ.get("VOXIE_WAKE_ASR_PHP", f"{ROOT}/php/bin/asr.php")
 ASR_LANG = os.environ.get("VOXIE_WAKE_LANG", os.environ.get("VOXIE_LANG", "it"))
+# Wake decision: kws (offline spotter, src/mic/kws.py) | asr (cloud transcript)
+# | both (spotter first, ASR confirms) | auto (kws when enrolled, else asr)
+WAKE_ENGINE = os.environ.get("VOXIE_WAKE_ENGINE", "auto").lower().strip()
 
 # Audio capture parameters
 SR = int(os.environ.get("VOXIE_WAKE_SR", "16000"))
@@ -65,12 +94,23 @@ FMT = os.environ.get("VOXIE_WAKE_FMT", "S16_LE")
 CHUNK_MS = int(os.environ.get("VOXIE_WAKE_CHUNK_MS", "20"))
 VAD_MIN_SEC = float(os.environ.get("VOXIE_WAKE_MIN_SEC", "0.25"))
 VAD_MAX_SEC = float(os.environ.get("VOXIE_WAKE_MAX_SEC", "2.0"))
+# fixed gate only (VOXIE_VAD_MODE=fixed); the adaptive one reads VOXIE_VAD_*
 VAD_THRESH = int(os.environ.get("VOXIE_WAKE_THRESH", "800"))  # amplitude threshold
 SILENCE_TAIL_MS = int(os.environ.get("VOXIE_WAKE_SILENCE_TAIL_MS", "250"))
+# audio kept from before the VAD start decision (first phoneme of the wake word)
+PREROLL_MS = int(os.environ.get("VOXIE_WAKE_PREROLL_MS", "200"))
+
+# Wake -> listener handoff socket ("" = FIFO PTT only); the end-of-command
+# rules read VOXIE_HANDOFF_TAIL_MS / _WAIT_MS / _MAX_SEC (src/mic/handoff.py)
+HANDOFF_SOCK = handoff_sock()
 
 # Cooldown / rate limit
 COOLDOWN_SEC = float(os.environ.get("VOXIE_WAKE_COOLDOWN", "2.5"))
 
+# Verification stage: worker threads, segments waiting (oldest dropped when full)
+WORKERS = int(os.environ.get("VOXIE_WAKE_WORKERS", "1"))
+QUEUE_DEPTH_MAX = int(os.environ.get("VOXIE_WAKE_QUEUE", "4"))
+
 # If arecord keeps dying, increase sleep to avoid tight loop
 RESTART_BACKOFF_BASE = float(os.environ.get("VOXIE_WAKE_BACKOFF_BASE", "0.6"))
 RESTART_BACKOFF_MAX = float(os.environ.get("VOXIE_WAKE_BACKOFF_MAX", "6.0"))
@@ -81,6 +121,26 @@ STOP_AUDIO_ON_ARM = int(os.environ.get("VOXIE_WAKE_STOP_AUDIO_ON_ARM", "1")) ==
 # Debug logging
 DEBUG = int(os.environ.get("DEBUG", "0"))
 
+# Metrics (rate(voxie_wake_segments_total[1m]) * 60 = segments per minute)
+SEGMENTS = metrics.counter("voxie_wake_segments_total", "VAD speech segments", ("result",))
+ASR_SECONDS = metrics.histogram("voxie_asr_seconds", "ASR call duration", ("caller",))
+ASR_CALLS = metrics.counter("voxie_asr_calls_total", "ASR calls", ("caller", "result"))
+ARECORD_RESTARTS = metrics.counter("voxie_wake_arecord_restarts_total", "arecord (re)spawns after a failure")
+KWS_SECONDS = metrics.histogram("voxie_kws_seconds", "Offline wake-word spotter decision time")
+KWS_TOTAL = metrics.counter("voxie_kws_total", "Spotter decisions", ("result",))
+DROPPED_FRAMES = metrics.counter(
+    "voxie_wake_dropped_frames_total",
+    "Capture frames lost (alsa: arecord xrun, overrun: VAD a ring behind, queue: segment dropped unverified)",
+    ("stage",),
+)
+HANDOFFS = metrics.counter(
+    "voxie_wake_handoff_total",
+    "Wake utterances for the listener (end: streamed, fallback: FIFO PTT instead, error: stream cut)",
+    ("result",),
+)
+QUEUE_DEPTH = metrics.gauge("voxie_wake_queue_depth", "Segments waiting for verification")
+NOISE_FLOOR = metrics.gauge("voxie_wake_noise_floor_db", "VAD noise floor estimate (dB re 1 LSB)")
+
 
 def log(msg: str) -> None:
     print(msg, flush=True)
@@ -124,32 +184,21 @@ def fifo_trigger() -> bool:
         return False
 
 
+# One connection for the process lifetime (reopened after errors)
+AUDIO = AudioClient(AUDIO_SOCK, timeout=0.35) if AUDIO_SOCK else None
+
+
 def audio_send(payload: dict) -> dict:
     """
-    Best-effort unix socket JSON. Returns {} on failure.
+    Best-effort JSON command on the shared (persistent) daemon connection.
+    Returns {} on failure.
     """
-    if not AUDIO_SOCK:
+    if AUDIO is None:
         return {}
-
-    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     try:
-        s.settimeout(0.35)
-        s.connect(AUDIO_SOCK)
-        s.sendall((json.dumps(payload) + "\n").encode("utf-8"))
-        try:
-            data = s.recv(4096)
-            if not data:
-                return {}
-            return json.loads(data.decode("utf-8", errors="ignore").strip() or "{}")
-        except Exception:
-            return {}
+        return AUDIO.request(payload)
     except Exception:
         return {}
-    finally:
-        try:
-            s.close()
-        except Exception:
-            pass
 
 
 def audio_stop() -> None:
@@ -163,21 +212,8 @@ def normalize(s: str) -> str:
     return s
 
 
-def rms_amp(pcm16: bytes) -> float:
-    """
-    RMS amplitude on 16-bit little-endian PCM.
-    """
-    if not pcm16:
-        return 0.0
-    n = len(pcm16) // 2
-    if n <= 0:
-        return 0.0
-    # unpack as signed shorts
-    samples = struct.unpack("<" + ("h" * n), pcm16)
-    acc = 0.0
-    for x in samples:
-        acc += float(x) * float(x)
-    return math.sqrt(acc / n)
+# Whole-buffer frame features (see src/mic/features.py for backends)
+FEATURES = FrameFeatures(rate=SR, frame_ms=CHUNK_MS, channels=CH)
 
 
 def write_wav(path: str, pcm: bytes, sr: int, ch: int) -> None:
@@ -202,8 +238,10 @@ def run_asr_on_wav(wav_path: str) -> str:
         return ""
 
     cmd = ["php", ASR_PHP, wav_path, ASR_LANG]
-    p = subprocess.run(cmd, capture_output=True, text=True)
+    with ASR_SECONDS.time(caller="wake"):
+        p = subprocess.run(cmd, capture_output=True, text=True)
     out = (p.stdout or "").strip()
+    ASR_CALLS.inc(caller="wake", result="ok" if out else ("empty" if p.returncode == 0 else "error"))
     return out
 
 
@@ -220,6 +258,211 @@ def arecord_cmd() -> List[str]:
     ]
 
 
+def load_spotter() -> Optional[Spotter]:
+    """The enrolled spotter for WAKE_ENGINE, None for ASR-only."""
+    if WAKE_ENGINE == "asr":
+        return None
+    sp = Spotter.load() if CH == 1 else None
+    if sp is not None and sp.mfcc.rate != SR:
+        log(f"[WAKE][WARN] KWS model is {sp.mfcc.rate}Hz, capture is {SR}Hz - not used")
+        sp = None
+    if sp is None and WAKE_ENGINE != "auto":
+        log(f"[WAKE][WARN] no KWS model at {model_path(WAKE_WORD)} (bin/kws_enroll.py) - using ASR")
+    return sp
+
+
+def fire_ptt() -> None:
+    # trigger bus first (src/trigger_bus.py), the FIFO if no listener is bound there
+    ok = send_trigger("wake", {"word": WAKE_WORD}) or fifo_trigger()
+    if ok:
+        log("[WAKE] detected → PTT")
+    else:
+        log("[WAKE] detected but no listener (trigger bus / FIFO)")
+
+
+# Streams the wake utterance to the listener; falls back to the FIFO
+HANDOFF = HandoffSender(HANDOFF_SOCK, SR, CH, fire_ptt) if HANDOFF_SOCK else None
+
+
+def fire(gen: int, lo: int, hi: int) -> None:
+    """Wake word in stream bytes [lo, hi) of capture generation `gen`."""
+    SEGMENTS.inc(result="match")
+    if HANDOFF is None:
+        fire_ptt()
+    else:
+        # the VAD thread owns the ring: it starts the stream on its next frame
+        HANDOFF.request(gen, lo, hi, WAKE_WORD)
+
+
+def verify(pcm: bytes, spotter: Optional[Spotter], wav_path: str) -> bool:
+    """
+    Wake word in this segment? Spotter and/or ASR, per WAKE_ENGINE.
+    """
+    if spotter is not None:
+        with KWS_SECONDS.time():
+            hit, score = spotter.detect(pcm)
+        KWS_TOTAL.inc(result="hit" if hit else "miss")
+        dlog(f"[WAKE][KWS] score={score:.2f} threshold={spotter.threshold:.2f}")
+        if not hit or WAKE_ENGINE != "both":
+            return hit
+
+    write_wav(wav_path, pcm, SR, CH)
+
+    text = run_asr_on_wav(wav_path)
+    norm = normalize(text)
+    dlog(f'[WAKE][ASR] "{text}"')
+    return bool(WAKE_WORD and WAKE_WORD in norm.split())
+
+
+class Verifier:
+    """
+    Verification stage: closed segments wait in a bounded queue (the
+    oldest is dropped when full) for VOXIE_WAKE_WORKERS threads running
+    verify(). Cooldown lives here: checked when a worker picks a segment
+    up and again before firing (another worker may just have fired).
+    """
+
+    def __init__(self, spotter: Optional[Spotter], workers: int, depth: int):
+        self.spotter = spotter
+        self.depth = max(1, depth)
+        self._q: deque = deque()
+        self._cond = threading.Condition()
+        self._last_fire = 0.0
+        for i in range(max(1, workers)):
+            wav = str(Path(TMP_DIR) / ("wake_last.wav" if i == 0 else f"wake_last_{i}.wav"))
+            threading.Thread(target=self._run, args=(wav,), name=f"wake-verify-{i}", daemon=True).start()
+
+    def submit(self, pcm: bytes, gen: int, lo: int, hi: int) -> None:
+        """Segment `pcm` = stream bytes [lo, hi) of capture generation `gen`."""
+        with self._cond:
+            if len(self._q) >= self.depth:
+                old = self._q.popleft()
+                SEGMENTS.inc(result="dropped")
+                DROPPED_FRAMES.inc(len(old[0]) // FEATURES.frame_bytes, stage="queue")
+                dlog("[WAKE] verify queue full: oldest segment dropped")
+            self._q.append((pcm, gen, lo, hi))
+            QUEUE_DEPTH.set(len(self._q))
+            self._cond.notify()
+
+    def _cooling(self) -> bool:
+        return time.time() - self._last_fire < COOLDOWN_SEC
+
+    def _run(self, wav_path: str) -> None:
+        while True:
+            with self._cond:
+                while not self._q:
+                    self._cond.wait()
+                pcm, gen, lo, hi = self._q.popleft()
+                QUEUE_DEPTH.set(len(self._q))
+                cooling = self._cooling()
+            if cooling:
+                dlog("[WAKE] cooldown skip")
+                SEGMENTS.inc(result="cooldown")
+                continue
+            try:
+                hit = verify(pcm, self.spotter, wav_path)
+            except Exception as e:
+                log(f"[WAKE][ERR] verify: {e}")
+                SEGMENTS.inc(result="error")
+                continue
+            if not hit:
+                SEGMENTS.inc(result="nomatch")
+                dlog("[WAKE] no match")
+                continue
+            with self._cond:
+                cooling = self._cooling()
+                if not cooling:
+                    self._last_fire = time.time()
+            if cooling:
+                SEGMENTS.inc(result="cooldown")
+                continue
+            fire(gen, lo, hi)
+
+
+XRUN_RE = re.compile(r"overrun!!!(?: \(at least ([0-9.]+) ms long\))?")
+
+
+class Capture(threading.Thread):
+    """
+    Capture stage: drains arecord's stdout into the ring whatever the
+    other stages are doing, so the pipe never fills and ALSA never
+    overruns because of a slow ASR call. ALSA xruns that happen anyway
+    are read from arecord's stderr and counted.
+    """
+
+    def __init__(self, proc: subprocess.Popen, ring: PcmRing, chunk: int):
+        super().__init__(name="wake-capture", daemon=True)
+        self.proc = proc
+        self.ring = ring
+        self.chunk = chunk
+        self.cond = threading.Condition()
+        self.eof = False
+        if proc.stderr is not None:
+            threading.Thread(target=self._xruns, name="wake-xrun", daemon=True).start()
+
+    def run(self) -> None:
+        try:
+            assert self.proc.stdout is not None
+            while self.ring.fill(self.proc.stdout, self.chunk):
+                with self.cond:
+                    self.cond.notify()
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.cond:
+                self.eof = True
+                self.cond.notify()
+
+    def _xruns(self) -> None:
+        assert self.proc.stderr is not None
+        for raw in self.proc.stderr:
+            line = raw.decode("utf-8", "replace").strip()
+            m = XRUN_RE.search(line)
+            if m:
+                ms = float(m.group(1) or CHUNK_MS)
+                DROPPED_FRAMES.inc(max(1, int(round(ms / CHUNK_MS))), stage="alsa")
+                dlog(f"[WAKE] arecord {line}")
+
+    def wait(self, offset: int) -> bool:
+        """Block until the ring reaches stream `offset`; False once the stream ended."""
+        with self.cond:
+            while self.ring.end < offset and not self.eof:
+                self.cond.wait(1.0)
+            return self.ring.end >= offset
+
+
+class SharedCapture:
+    """
+    Capture stage when capture_daemon owns the mic: nothing to drain, the
+    daemon fills the shared ring; wait() gives up when it stops beating.
+    """
+
+    def __init__(self, ring: SharedRing):
+        self.ring = ring
+
+    def wait(self, offset: int) -> bool:
+        return self.ring.wait(offset, stale_sec())
+
+
+def attach_shared() -> Optional[SharedRing]:
+    """The capture daemon's ring, if it runs with this process' format."""
+    ring = attach_live()
+    if ring is not None and (ring.rate != SR or ring.channels != CH):
+        log(f"[WAKE][WARN] capture daemon is {ring.rate}Hz/{ring.channels}ch, need {SR}Hz/{CH}ch - own arecord")
+        ring.close()
+        ring = None
+    return ring
+
+
+def stop(proc: Optional[subprocess.Popen]) -> None:
+    if proc is None:
+        return
+    try:
+        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+    except Exception:
+        pass
+
+
 def main() -> None:
     ensure_fifo()
 
@@ -227,140 +470,145 @@ def main() -> None:
         log("[WAKE][ERR] arecord not found. Install alsa-utils.")
         sys.exit(1)
 
+    def new_vad():
+        return make_vad(CHUNK_MS, int(VAD_MIN_SEC * 1000), int(VAD_MAX_SEC * 1000), VAD_THRESH, SILENCE_TAIL_MS)
+
+    vad = new_vad()
+
     log("[WAKE] voxie-only wake listener (streaming arecord)")
     log(f"[WAKE] root={ROOT}")
-    log(f"[WAKE] mic={MIC_DEV} sr={SR} ch={CH} chunk={CHUNK_MS}ms thresh={VAD_THRESH}")
-    log(f"[WAKE] word='{WAKE_WORD}' fifo={FIFO}")
+    log(f"[WAKE] mic={MIC_DEV} sr={SR} ch={CH} chunk={CHUNK_MS}ms preroll={PREROLL_MS}ms vad={vad.name} features={FEATURES.backend}")
+    spotter = load_spotter()
+    engine = "asr" if spotter is None else ("kws+asr" if WAKE_ENGINE == "both" else "kws")
+    log(f"[WAKE] word='{WAKE_WORD}' engine={engine} workers={WORKERS} queue={QUEUE_DEPTH_MAX} fifo={FIFO} "
+        f"handoff={HANDOFF_SOCK or 'off'}")
     if STOP_AUDIO_ON_ARM:
         log("[WAKE] will stop playback when speech starts (best effort)")
+    metrics.export("wake_poll")
 
-    bytes_per_frame = 2 * CH  # S16_LE
-    chunk_frames = int(SR * (CHUNK_MS / 1000.0))
-    chunk_bytes = chunk_frames * bytes_per_frame
+    verifier = Verifier(spotter, WORKERS, QUEUE_DEPTH_MAX)
 
-    min_bytes = int(SR * VAD_MIN_SEC) * bytes_per_frame
-    max_bytes = int(SR * VAD_MAX_SEC) * bytes_per_frame
-    tail_bytes = int(SR * (SILENCE_TAIL_MS / 1000.0)) * bytes_per_frame
+    chunk_bytes = FEATURES.frame_bytes
+    preroll_bytes = (PREROLL_MS // CHUNK_MS) * chunk_bytes
+    # longest segment + pre-roll, plus 1 s for the VAD stage to lag behind capture;
+    # with the handoff the wake segment must also outlive its verification
+    # (an ASR round trip) until the stream to the listener starts
+    slack = 4.0 if HANDOFF is not None else 1.0
+    ring_bytes = int(SR * (VAD_MAX_SEC + slack)) * 2 * CH + preroll_bytes
+    gen = 0  # capture generation: offsets from an older arecord are meaningless
 
-    last_fire = 0.0
     backoff = RESTART_BACKOFF_BASE
 
+    proc: Optional[subprocess.Popen] = None
     while True:
-        dlog(f"[WAKE] spawn: {' '.join(arecord_cmd())}")
-        try:
-            proc = subprocess.Popen(
-                arecord_cmd(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.DEVNULL,
-                bufsize=0,
-                preexec_fn=os.setsid,  # kill group on restart
-            )
-        except Exception as e:
-            log(f"[WAKE][ERR] cannot start arecord: {e}")
-            time.sleep(min(backoff, RESTART_BACKOFF_MAX))
-            backoff = min(backoff * 1.6, RESTART_BACKOFF_MAX)
-            continue
+        shared = attach_shared()
+        capture: "Capture | SharedCapture"
+        if shared is not None:
+            proc = None
+            log(f"[WAKE] capture: shared ring {shared.capacity // (SR * 2 * CH)}s from capture_daemon")
+            ring: PcmRing = shared
+            capture = SharedCapture(shared)
+            done = ring.end - ring.end % (2 * CH)  # from now on, at the daemon's stream offsets
+        else:
+            dlog(f"[WAKE] spawn: {' '.join(arecord_cmd())}")
+            try:
+                proc = subprocess.Popen(
+                    arecord_cmd(),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    bufsize=0,
+                    preexec_fn=os.setsid,  # kill group on restart
+                )
+            except Exception as e:
+                log(f"[WAKE][ERR] cannot start arecord: {e}")
+                time.sleep(min(backoff, RESTART_BACKOFF_MAX))
+                backoff = min(backoff * 1.6, RESTART_BACKOFF_MAX)
+                continue
+            ring = PcmRing(ring_bytes, align=chunk_bytes)
+            capture = Capture(proc, ring, chunk_bytes)
+            capture.start()
+            done = 0  # stream offset of the next chunk to analyse
 
         backoff = RESTART_BACKOFF_BASE  # reset if spawn worked
 
-        buf = bytearray()
-        in_speech = False
-        silent_tail = bytearray()
+        vad = new_vad()  # fresh floor, no half-open segment from the last stream
+        base = done  # stream offset of the VAD's frame 0
+        gen += 1
 
         try:
-            assert proc.stdout is not None
             while True:
-                data = proc.stdout.read(chunk_bytes)
-                if not data:
-                    # arecord ended
-                    raise RuntimeError("arecord stream ended")
-
-                amp = rms_amp(data)
-
-                if not in_speech:
-                    if amp >= VAD_THRESH:
-                        in_speech = True
-                        buf.clear()
-                        silent_tail.clear()
-                        if STOP_AUDIO_ON_ARM:
-                            audio_stop()
-                        buf.extend(data)
-                        dlog(f"[WAKE] speech start amp={amp:.0f}")
-                    else:
-                        # idle
-                        continue
-                else:
-                    # in speech: collect
-                    buf.extend(data)
-
-                    if amp < VAD_THRESH:
-                        silent_tail.extend(data)
-                        # keep tail bounded
-                        if len(silent_tail) > tail_bytes:
-                            silent_tail = silent_tail[-tail_bytes:]
-                    else:
-                        silent_tail.clear()
-
-                    # if too long, cut and evaluate anyway
-                    if len(buf) >= max_bytes:
-                        dlog("[WAKE] max speech reached")
-                        # trim any tail to avoid long silences
-                        if silent_tail:
-                            buf = buf[:-len(silent_tail)]
-                        break
-
-                    # end speech if silence tail long enough AND min length reached
-                    if len(buf) >= min_bytes and len(silent_tail) >= tail_bytes:
-                        dlog("[WAKE] speech end by silence")
-                        buf = buf[:-len(silent_tail)]
-                        break
-
-            # speech segment ready
-            pcm = bytes(buf)
-            if len(pcm) < min_bytes:
-                in_speech = False
-                continue
-
-            # Cooldown
-            now = time.time()
-            if now - last_fire < COOLDOWN_SEC:
-                dlog("[WAKE] cooldown skip")
-                in_speech = False
-                continue
-
-            wav_path = str(Path(TMP_DIR) / "wake_last.wav")
-            write_wav(wav_path, pcm, SR, CH)
-
-            text = run_asr_on_wav(wav_path)
-            norm = normalize(text)
-            dlog(f'[WAKE][ASR] "{text}"')
-
-            if WAKE_WORD and WAKE_WORD in norm.split():
-                ok = fifo_trigger()
-                last_fire = time.time()
-                if ok:
-                    log("[WAKE] detected → PTT")
-                else:
-                    log("[WAKE] detected but FIFO has no reader (listener not running)")
-            else:
-                dlog("[WAKE] no match")
-
-            in_speech = False
+                if not capture.wait(done + chunk_bytes):
+                    # arecord ended (or the capture daemon stopped)
+                    raise RuntimeError("capture stream ended")
+
+                if done < ring.start:
+                    # this stage fell a whole ring behind: that audio is gone
+                    lost = -(-(ring.start - done) // chunk_bytes)
+                    DROPPED_FRAMES.inc(lost, stage="overrun")
+                    dlog(f"[WAKE] VAD overrun: {lost} frames lost")
+                    done += lost * chunk_bytes
+                    vad, base = new_vad(), done
+                    continue
+
+                f = FEATURES.frames(ring.view(done, done + chunk_bytes))
+                done += chunk_bytes
+                ev = vad.update(f.rms[0], f.zcr[0])
+                streaming = False
+                if HANDOFF is not None:
+                    hev = HANDOFF.poll(ring, gen, done, vad.in_speech or ev is not None)
+                    if hev:
+                        HANDOFFS.inc(result=hev)
+                        dlog(f"[WAKE] handoff {hev}")
+                    # the command after the wake word is the listener's, not a wake candidate
+                    streaming = HANDOFF.active or hev == "end"
+                if ev is None:
+                    continue
+
+                if ev == START:
+                    if STOP_AUDIO_ON_ARM:
+                        audio_stop()
+                    dlog(f"[WAKE] speech start amp={f.rms[0]:.0f} floor={vad.floor_db:.1f}dB")
+                    continue
+
+                # segment closed: pre-roll + speech, trailing silence dropped
+                assert isinstance(ev, Segment)
+                NOISE_FLOOR.set(vad.floor_db)
+                dlog(f"[WAKE] speech end frames={ev.frames} snr={ev.snr_db:.1f}dB mod={ev.mod_db:.1f}dB "
+                     f"{ev.reason or 'ok'}")
+                if not ev.ok:
+                    SEGMENTS.inc(result=ev.reason)
+                    continue
+                if streaming:
+                    SEGMENTS.inc(result="handoff")
+                    continue
+                lo = base + ev.start * chunk_bytes - preroll_bytes
+                hi = base + (ev.start + ev.frames - ev.tail) * chunk_bytes
+                # the one copy: the ring keeps moving while the workers verify
+                start = max(lo, ring.start)
+                try:
+                    pcm = bytes(ring.view(start, hi))
+                except ValueError:
+                    pcm = b""
+                if not pcm or start < ring.start:
+                    # lapped by the capture thread during the copy
+                    DROPPED_FRAMES.inc((hi - start) // chunk_bytes, stage="overrun")
+                    continue
+                verifier.submit(pcm, gen, lo, hi)
 
         except KeyboardInterrupt:
             log("\n[WAKE] exit")
-            try:
-                os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-            except Exception:
-                pass
+            stop(proc)
             break
 
         except Exception as e:
             dlog(f"[WAKE] restart: {e}")
-            try:
-                os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-            except Exception:
-                pass
+            ARECORD_RESTARTS.inc()
+            if HANDOFF is not None and HANDOFF.active:
+                HANDOFF.close()
+                HANDOFFS.inc(result="error")
+            stop(proc)
+            if shared is not None:
+                shared.close()
             time.sleep(min(backoff, RESTART_BACKOFF_MAX))
             backoff = min(backoff * 1.4, RESTART_BACKOFF_MAX)
             continue
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+"""
+Client for the resident PHP agent (php/bin/agent_worker.php).
+
+`php agent.php "<text>"` per turn pays PHP start-up, the .env parse and
+~20 requires before routing starts. The worker does that once and takes
+turns on VOXIE_AGENT_SOCK as JSON lines (same framing as the audio
+daemon, so the connection handling is AudioClient's):
+
+- the worker is started on demand (`php agent_worker.php`) when nobody
+  listens on the socket, and again after it retired (VOXIE_AGENT_MAX_TURNS)
+  or crashed; its stderr ([TIMING] lines) goes where ours goes
+- turn() waits up to VOXIE_AGENT_TIMEOUT (a turn includes LLM + TTS); a
+  worker that overruns it is killed and the turn reported as TIMEOUT
+- OSError from turn() means no worker could be reached and nothing ran:
+  the caller may fall back to the one-shot agent.php. A worker that dies
+  mid-turn is not retried (the turn may already have spoken).
+- cancel() (barge-in, from another thread) kills the worker we started,
+  so an abandoned turn stops its LLM/TTS calls; the request in flight
+  returns at once and the next one starts a fresh worker
+"""
+
+import os
+import time
+import socket
+import signal
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import metrics
+from audio_client import AudioClient
+
+__all__ = ["AgentClient", "DEFAULT_SOCK", "agent_mode"]
+
+DEFAULT_SOCK = os.environ.get("VOXIE_AGENT_SOCK", "/tmp/bitvox_agent.sock")
+
+_STARTS = metrics.counter("voxie_agent_worker_starts_total", "Resident PHP agent workers started")
+
+
+def agent_mode() -> str:
+    """worker (resident agent_worker.php, default) | spawn (php agent.php per turn)."""
+    return os.environ.get("VOXIE_AGENT_MODE", "worker").strip().lower() or "worker"
+
+
+def _default_worker() -> str:
+    root = os.environ.get("VOXIE_ROOT") or str(Path(__file__).resolve().parent.parent.parent)
+    return os.environ.get("VOXIE_AGENT_WORKER_PHP", f"{root}/php/bin/agent_worker.php")
+
+
+class AgentClient:
+    """JSON-lines client for agent_worker.php that starts the worker when needed."""
+
+    def __init__(
+        self,
+        sock_path: str = DEFAULT_SOCK,
+        worker_php: str = "",
+        timeout: Optional[float] = None,
+        start_timeout: float = 5.0,
+        spawn: bool = True,
+    ):
+        self.sock_path = sock_path
+        self.worker_php = worker_php or _default_worker()
+        if timeout is None:
+            timeout = float(os.environ.get("VOXIE_AGENT_TIMEOUT", "60"))
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.spawn = spawn
+        self._conn = AudioClient(sock_path, timeout=timeout)
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    # -------- worker process --------
+    def _start(self) -> None:
+        if self._proc is None or self._proc.poll() is not None:
+            env = dict(os.environ, VOXIE_AGENT_SOCK=self.sock_path)
+            self._proc = subprocess.Popen(["php", self.worker_php], stdin=subprocess.DEVNULL, env=env,
+                                          start_new_session=True)
+            _STARTS.inc()
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise OSError(f"agent worker exited rc={self._proc.returncode}")
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                s.connect(self.sock_path)
+                return
+            except OSError:
+                time.sleep(0.05)
+            finally:
+                s.close()
+        raise OSError("agent worker did not come up")
+
+    def _kill(self) -> None:
+        self._conn.close()
+        if self._proc is not None and self._proc.poll() is None:
+            try:
+                os.killpg(self._proc.pid, signal.SIGKILL)
+            except Exception:
+                pass
+            self._proc.wait()
+        self._proc = None
+
+    def close(self) -> None:
+        """Drop the connection; a worker we started keeps running for the next client."""
+        self._conn.close()
+
+    def cancel(self) -> None:
+        """Abandon the turn in flight (called from another thread than the request)."""
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except Exception:
+                pass
+        # a worker someone else started finishes the turn on its own; we just stop waiting
+        self._conn.abort()
+
+    # -------- requests --------
+    def _once(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self._conn.request(payload)
+        except (FileNotFoundError, ConnectionRefusedError):
+            raise  # connect failed: nothing was sent
+        except socket.timeout:
+            self._kill()
+            return {"ok": False, "err": "TIMEOUT"}
+        except (OSError, ValueError) as e:
+            # broken mid-request: it may have run, never replay it
+            return {"ok": False, "err": "WORKER_ERROR", "msg": str(e)}
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            try:
+                return self._once(payload)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if not self.spawn:
+                    raise
+            # nobody listening (or a stale socket file): start a worker, then once more
+            self._start()
+            return self._once(payload)
+
+    def turn(self, text: str) -> Dict[str, Any]:
+        """One voice turn: {"ok", "intent", "result", "ms"} as agent.php prints it (+ worker time)."""
+        return self.request({"cmd": "TURN", "text": text})
+
+    def route(self, text: str) -> Dict[str, Any]:
+        """Routing only, no side effects."""
+        return self.request({"cmd": "ROUTE", "text": text})
+
+    def ping(self) -> Dict[str, Any]:
+        return self.request({"cmd": "PING"})
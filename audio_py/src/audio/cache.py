@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Pre-decoded PCM asset cache.
+
+Hot-path assets (ack, intros, Vox Romana clips) are transcoded once by
+bin/precompile_assets.py into WAV files in the sink's native format
+(S16_LE, VOXIE_SINK_RATE / VOXIE_SINK_CH) under VOXIE_PCM_CACHE_DIR
+(default: <root>/data/cache/pcm). At play time:
+
+- sink mode:  the PCM payload is mmap'd and fed to the warm sink as-is
+              (no decoder process, no conversion)
+- spawn mode: aplay plays the precompiled WAV instead of mpg123 decoding
+              the MP3
+
+Mapped buffers are kept in a size-bounded LRU (VOXIE_PCM_CACHE_MB); the
+page cache does the rest. An entry is only used while it is newer than
+its source, so re-generated assets are picked up without a restart.
+"""
+
+import os
+import mmap
+import wave
+import hashlib
+import subprocess
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from . import player
+from .sink import SinkFormat, _decoder_cmd, _wav_chunks
+
+__all__ = ["PcmCache", "compile_asset", "cache_dir", "entry_name", "hot_assets", "HOT_GLOBS"]
+
+# Repo-relative sources worth precompiling (latency masking + Vox Romana).
+HOT_GLOBS = (
+    "assets/ack/*.wav",
+    "assets/intros_mp3/*.mp3",
+    "assets/intros_study_mp3/*.mp3",
+    "assets/vox_romana_mp3/*.mp3",
+    "assets/vox_romana_mp3/cues/*.mp3",
+)
+
+
+def _log(msg: str) -> None:
+    player._log("[cache] " + msg)
+
+
+def _root() -> Path:
+    # audio_py/src/audio/cache.py -> repo root
+    return Path(os.environ.get("VOXIE_ROOT") or Path(__file__).resolve().parents[3])
+
+
+def cache_dir() -> Path:
+    d = os.environ.get("VOXIE_PCM_CACHE_DIR", "").strip()
+    return Path(d) if d else _root() / "data" / "cache" / "pcm"
+
+
+def hot_assets(root: Optional[Path] = None) -> List[str]:
+    """Existing files matched by HOT_GLOBS, sorted."""
+    base = Path(root) if root else _root()
+    out: List[str] = []
+    for pattern in HOT_GLOBS:
+        out.extend(str(p) for p in sorted(base.glob(pattern)) if p.is_file())
+    return out
+
+
+def entry_name(src: str, fmt: SinkFormat) -> str:
+    real = os.path.realpath(src)
+    h = hashlib.sha1(real.encode("utf-8")).hexdigest()[:12]
+    return "%s-%s.%dx%d.wav" % (Path(real).stem[:40], h, fmt.rate, fmt.channels)
+
+
+def _fresh(src: str, dst: str) -> bool:
+    try:
+        return os.stat(dst).st_mtime_ns >= os.stat(src).st_mtime_ns
+    except OSError:
+        return False
+
+
+def _data_span(buf: mmap.mmap, fmt: SinkFormat) -> Optional[Tuple[int, int]]:
+    """(offset, length) of the PCM payload if the WAV matches `fmt`."""
+    if len(buf) < 12 or buf[0:4] != b"RIFF" or buf[8:12] != b"WAVE":
+        return None
+    pos, ok = 12, False
+    while pos + 8 <= len(buf):
+        cid = buf[pos:pos + 4]
+        size = int.from_bytes(buf[pos + 4:pos + 8], "little")
+        body = pos + 8
+        if cid == b"fmt ":
+            tag = int.from_bytes(buf[body:body + 2], "little")
+            ch = int.from_bytes(buf[body + 2:body + 4], "little")
+            rate = int.from_bytes(buf[body + 4:body + 8], "little")
+            bits = int.from_bytes(buf[body + 14:body + 16], "little")
+            ok = tag == 1 and ch == fmt.channels and rate == fmt.rate and bits == 16
+        elif cid == b"data":
+            if not ok:
+                return None
+            size = min(size, len(buf) - body)
+            return body, size - size % fmt.frame_bytes
+        pos = body + size + (size & 1)
+    return None
+
+
+def compile_asset(src: str, dst: str, fmt: SinkFormat) -> bool:
+    """Transcode a WAV/MP3 into a native-format WAV at `dst` (atomic)."""
+    part = dst + ".part"
+    proc: Optional[subprocess.Popen] = None
+    try:
+        if src.lower().endswith(".wav"):
+            chunks = _wav_chunks(src, fmt, 200)
+            if chunks is None:
+                return False
+        else:
+            proc = subprocess.Popen(
+                _decoder_cmd(src, fmt),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                close_fds=True,
+            )
+            assert proc.stdout is not None
+            out = proc.stdout
+            chunks = iter(lambda: out.read(65536), b"")
+
+        wf = wave.open(part, "wb")
+        try:
+            wf.setnchannels(fmt.channels)
+            wf.setsampwidth(2)
+            wf.setframerate(fmt.rate)
+            n = 0
+            for data in chunks:
+                wf.writeframesraw(data)
+                n += len(data)
+        finally:
+            wf.close()
+
+        if proc is not None and proc.wait() != 0:
+            _log("decode failed: %s (exit=%s)" % (src, proc.returncode))
+            return False
+        if n == 0:
+            _log("empty decode: %s" % src)
+            return False
+        os.replace(part, dst)
+        return True
+    except Exception as e:
+        _log("compile failed: %s (%s)" % (src, e))
+        return False
+    finally:
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        if proc is not None and proc.stdout is not None:
+            proc.stdout.close()
+        if os.path.exists(part):
+            try:
+                os.unlink(part)
+            except OSError:
+                pass
+
+
+class _Entry:
+    __slots__ = ("mm", "view", "sig")
+
+    def __init__(self, mm: mmap.mmap, view: memoryview, sig: Tuple[int, int]):
+        self.mm = mm
+        self.view = view
+        self.sig = sig
+
+
+class PcmCache:
+    """Size-bounded LRU of mmap'd, pre-decoded PCM buffers."""
+
+    def __init__(
+        self,
+        fmt: Optional[SinkFormat] = None,
+        root: Optional[Path] = None,
+        max_bytes: int = 0,
+    ):
+        self.fmt = fmt or SinkFormat.from_env()
+        self.root = Path(root) if root else cache_dir()
+        self.max_bytes = max_bytes or int(float(os.environ.get("VOXIE_PCM_CACHE_MB", "32")) * 1024 * 1024)
+        self._lru: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, src: str) -> Optional[str]:
+        """Precompiled WAV for `src`, if present and newer than the source."""
+        dst = str(self.root / entry_name(src, self.fmt))
+        return dst if _fresh(src, dst) else None
+
+    def get(self, src: str) -> Optional[memoryview]:
+        """
+        Mapped PCM payload for `src` (sink format), or None. Each call gets a
+        view of its own: evicting the entry never invalidates a clip playing it.
+        """
+        dst = self.path_for(src)
+        if dst is None:
+            self.misses += 1
+            return None
+        try:
+            st = os.stat(dst)
+        except OSError:
+            self.misses += 1
+            return None
+        sig = (st.st_mtime_ns, st.st_size)
+
+        ent = self._lru.get(dst)
+        if ent is not None and ent.sig == sig:
+            self._lru.move_to_end(dst)
+            self.hits += 1
+            return ent.view[:]
+        if ent is not None:
+            self._evict(dst)
+
+        ent = self._map(dst, sig)
+        if ent is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ent.view[:]
+
+    def preload(self, sources: Iterable[str]) -> int:
+        """Map (and hint readahead for) the given sources; returns how many."""
+        n = 0
+        for src in sources:
+            view = self.get(src)
+            if view is None:
+                continue
+            n += 1
+            ent = self._lru.get(self.path_for(src) or "")
+            advise = getattr(mmap, "MADV_WILLNEED", None)
+            if ent is not None and advise is not None and hasattr(ent.mm, "madvise"):
+                try:
+                    ent.mm.madvise(advise)
+                except OSError:
+                    pass
+        return n
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._lru),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        for key in list(self._lru):
+            self._evict(key)
+
+    # -------- internals --------
+    def _map(self, dst: str, sig: Tuple[int, int]) -> Optional[_Entry]:
+        if sig[1] > self.max_bytes:
+            return None
+        try:
+            with open(dst, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            _log("map failed: %s (%s)" % (dst, e))
+            return None
+
+        span = _data_span(mm, self.fmt)
+        if span is None:
+            _log("format mismatch, ignoring: %s" % dst)
+            mm.close()
+            return None
+        off, size = span
+
+        while self._lru and self._bytes + sig[1] > self.max_bytes:
+            self._evict(next(iter(self._lru)))
+
+        ent = _Entry(mm, memoryview(mm)[off:off + size], sig)
+        self._lru[dst] = ent
+        self._bytes += sig[1]
+        return ent
+
+    def _evict(self, key: str) -> None:
+        ent = self._lru.pop(key, None)
+        if ent is None:
+            return
+        self._bytes -= ent.sig[1]
+        ent.view.release()
+        try:
+            ent.mm.close()
+        except BufferError:
+            # A clip still streams from its own view: the mapping is unmapped
+            # when that last view is dropped.
+            pass
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Child-exit notifications for the asyncio engine.
+
+Player exit used to be detected by parking a thread in Popen.wait().
+ChildWatcher turns the kernel's notification into a future instead:
+
+- pidfd (Linux >= 5.3, Python >= 3.9): the pidfd becomes readable when the
+  child exits; the loop watches it like a socket
+- SIGCHLD: a loop signal handler polls the watched children
+  (main thread only)
+- thread: Popen.wait() in the default executor, as before
+
+Nothing is ever polled on a timer.
+"""
+
+import os
+import signal
+import asyncio
+import subprocess
+from typing import Dict, Tuple
+
+__all__ = ["ChildWatcher"]
+
+
+class ChildWatcher:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._sig: Dict[int, Tuple[subprocess.Popen, "asyncio.Future[int]"]] = {}
+        self._sig_installed = False
+        if hasattr(os, "pidfd_open"):
+            self.method = "pidfd"
+        elif self._install_sigchld():
+            self.method = "sigchld"
+        else:
+            self.method = "thread"
+
+    def wait(self, proc: subprocess.Popen) -> "asyncio.Future[int]":
+        """Future resolved with the exit code once `proc` exits."""
+        fut: "asyncio.Future[int]" = self._loop.create_future()
+        if proc.poll() is not None:
+            fut.set_result(proc.returncode)
+            return fut
+
+        if self.method == "pidfd":
+            try:
+                fd = os.pidfd_open(proc.pid)  # type: ignore[attr-defined]
+            except ProcessLookupError:
+                self._finish(proc, fut)
+                return fut
+            except OSError:
+                # ENOSYS: kernel without pidfd
+                self.method = "sigchld" if self._install_sigchld() else "thread"
+            else:
+                def ready() -> None:
+                    self._loop.remove_reader(fd)
+                    os.close(fd)
+                    self._finish(proc, fut)
+
+                self._loop.add_reader(fd, ready)
+                return fut
+
+        if self.method == "sigchld":
+            self._sig[proc.pid] = (proc, fut)
+            # the child may have exited before it was registered
+            self._on_sigchld()
+            return fut
+
+        wf = self._loop.run_in_executor(None, proc.wait)
+        wf.add_done_callback(lambda _f: self._finish(proc, fut))
+        return fut
+
+    def close(self) -> None:
+        if self._sig_installed:
+            try:
+                self._loop.remove_signal_handler(signal.SIGCHLD)
+            except Exception:
+                pass
+            self._sig_installed = False
+        for proc, fut in self._sig.values():
+            if not fut.done():
+                fut.cancel()
+        self._sig.clear()
+
+    # -------- internals --------
+    def _install_sigchld(self) -> bool:
+        if self._sig_installed:
+            return True
+        try:
+            self._loop.add_signal_handler(signal.SIGCHLD, self._on_sigchld)
+        except (RuntimeError, ValueError, NotImplementedError):
+            # not the main thread / not a Unix loop
+            return False
+        self._sig_installed = True
+        return True
+
+    def _on_sigchld(self) -> None:
+        for pid, (proc, fut) in list(self._sig.items()):
+            if proc.poll() is not None or fut.done():
+                del self._sig[pid]
+                self._finish(proc, fut)
+
+    @staticmethod
+    def _finish(proc: subprocess.Popen, fut: "asyncio.Future[int]") -> None:
+        if fut.done():
+            return
+        code = proc.poll()
+        if code is None:
+            # exited, but another thread (player._reap) holds the wait lock
+            code = proc.wait()
+        fut.set_result(code)
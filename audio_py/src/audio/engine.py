@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Asyncio playback engine used by the audio daemon (async mode).
+
+Responsibilities:
+- turn PLAY_* / ENQUEUE requests into jobs and answer with job ids right away
+- run spawn + alive verification on a single worker thread (player.py)
+- watch the player process and report end-of-playback on the job
+- keep STOP/STATUS on the event loop (never blocking)
+- schedule a priority queue (playqueue.py): alarm > tts > filler > radio,
+  preempt/resume, back-to-back playback of queued items
+- play precompiled assets (cache.py) instead of decoding them again
+- play audio while it is still arriving on the socket (ingest.py)
+- race a ranked list of stream URLs and switch only to a verified winner
+  (race.py); a preempted race job drops its stream and races again when
+  it resumes, so radio comes back live
+
+Engine modes (VOXIE_AUDIO_ENGINE):
+- spawn (default): one aplay/mpg123 process per playback (player.py); the
+                   next queued item is spawned as soon as the previous exits
+- sink:            one warm aplay fed raw PCM (sink.py); STOP drops the
+                   buffer instead of terminate-and-wait, and the next queued
+                   item is submitted behind the current one (gapless)
+- mixer:           sink + a background channel (mixer.py): radio plays on
+                   it and is ducked under everything else instead of being
+                   preempted; PLAY_WAV/MP3 only replace the foreground
+"""
+
+import os
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from . import player
+from .cache import PcmCache, hot_assets
+from .childwatch import ChildWatcher
+from .ingest import ByteFeed, spec_pcm
+from .jobs import Job, JobTable, STARTED, TERMINAL
+from .mixer import MixerSink
+from .playqueue import PRIO, PRIO_NAMES, RESUMABLE, PlaybackQueue, default_prio
+from .race import Winner, race
+from .sink import Clip, PcmSink, decoder_clip, fd_clip, pcm_clip, wav_clip
+
+# PLAY_STREAM_ANY: 4 KiB chunks a live stream may queue ahead of its reader (~8 s at 128 kbps)
+LIVE_CHUNKS = 32
+
+__all__ = ["AudioEngine"]
+
+
+class AudioEngine:
+    def __init__(self, mode: Optional[str] = None) -> None:
+        self.mode = (mode or os.environ.get("VOXIE_AUDIO_ENGINE", "spawn")).strip().lower()
+        self.jobs = JobTable()
+        self.queue = PlaybackQueue()
+        # Job holding the output (starting/playing).
+        self.current: Optional[Job] = None
+        # Sink mode: next job already submitted behind the current one.
+        self.lookahead: Optional[Job] = None
+        self.sink: Optional[PcmSink] = None
+        if self.mode == "mixer":
+            self.sink = MixerSink()
+        elif self.mode == "sink":
+            self.sink = PcmSink()
+        # Mixer mode: radio job on the background channel.
+        self.bg: Optional[Job] = None
+        self.cache = PcmCache(self.sink.fmt if self.sink is not None else None)
+        # WAVs the sink cannot convert: played through a one-off player.
+        self._spawn_only: Set[str] = set()
+        # PLAY_BYTES jobs: job id -> feed (player reads feed.rfd)
+        self._feeds: Dict[str, ByteFeed] = {}
+        # PLAY_STREAM_ANY jobs still connecting
+        self._racing: Set[Job] = set()
+        # PLAY_STREAM_ANY jobs: job id -> ranked urls (raced again on resume)
+        self._race_urls: Dict[str, List[str]] = {}
+        # Single worker: spawns stay serialized, like the legacy daemon.
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spawn")
+        self.children: Optional[ChildWatcher] = None
+
+    def start(self) -> None:
+        """Call from the event loop thread."""
+        self.children = ChildWatcher(asyncio.get_running_loop())
+        if self.sink is not None:
+            self.sink.start()
+            # Map the latency-masking assets up front (no-op if not precompiled).
+            n = self.cache.preload(hot_assets())
+            player._log("[cache] preloaded %d assets (%d KiB)" % (n, self.cache.stats()["bytes"] // 1024))
+
+    # ------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------
+    @property
+    def mixing(self) -> bool:
+        return isinstance(self.sink, MixerSink)
+
+    def play(self, kind: str, target: str, prio: Optional[int] = None) -> Job:
+        """PLAY_*: stop everything, then play now (non-blocking)."""
+        if prio is None:
+            prio = default_prio(kind)
+        self.stop(fg_only=prio != PRIO["radio"])
+        return self.enqueue([(kind, target, prio)])[0]
+
+    def enqueue(self, items: List[Tuple[str, str, Optional[int]]]) -> List[Job]:
+        """Queue (kind, target, prio) items in order; returns their jobs."""
+        out: List[Job] = []
+        for kind, target, prio in items:
+            job = self.jobs.new(kind, target, default_prio(kind) if prio is None else prio)
+            self.jobs.update(job, "queued")
+            out.append(job)
+            if self.mixing and job.prio == PRIO["radio"]:
+                self._start_bg(job)
+            else:
+                self.queue.push(job)
+        self._schedule()
+        return out
+
+    def play_bytes(self, feed: ByteFeed, prio: Optional[int] = None) -> Job:
+        """PLAY_BYTES: queue a job that plays `feed` while it is being filled."""
+        job = self.jobs.new("bytes", feed.spec, default_prio("bytes") if prio is None else prio)
+        self._feeds[job.id] = feed
+        self.jobs.update(job, "queued")
+        self.queue.push(job)
+        self._schedule()
+        return job
+
+    def play_any(self, urls: List[str], prio: Optional[int] = None) -> Job:
+        """
+        PLAY_STREAM_ANY: race `urls` (best first); the winner replaces the
+        stream that was playing (or paused in the queue) when the command
+        arrived, only once it delivered valid audio (make-before-break).
+        Anything queued meanwhile (tts, alarm) is left alone.
+        """
+        job = self.jobs.new("stream", urls[0], default_prio("stream") if prio is None else prio)
+        for other in self._racing:
+            other.cut = "stop"
+        self._racing.add(job)
+        self._race_urls[job.id] = urls
+        asyncio.get_running_loop().create_task(self._race(job, urls, self._streams()))
+        return job
+
+    def clear(self, prio: Optional[int] = None, current: bool = False) -> int:
+        """Drop queued items (one class or all); current=True also cuts the playing one."""
+        dropped = self.queue.clear(prio)
+        for job in dropped:
+            self.jobs.update(job, "stopped")
+            self._release(job)
+        n = len(dropped)
+
+        la = self.lookahead
+        if la is not None and (prio is None or la.prio == prio):
+            self._cut_lookahead("stop")
+            n += 1
+
+        cur = self.current
+        if current and cur is not None and (prio is None or cur.prio == prio):
+            self._cut_current("stop")
+            n += 1
+
+        bg = self.bg
+        if current and bg is not None and (prio is None or bg.prio == prio):
+            self._cut_bg()
+            n += 1
+        return n
+
+    def fail_bytes(self, job: Job, err: str) -> None:
+        """PLAY_BYTES producer went away before the end frame: cut the job, report it failed."""
+        if job.state in TERMINAL:
+            return
+        job.err = err
+        if self.queue.remove(job):
+            self.jobs.update(job, "failed")
+            self._release(job)
+        elif job is self.current:
+            self._cut_current("fail")
+        elif job is self.lookahead:
+            self._cut_lookahead("fail")
+        elif job is self.bg:
+            self._cut_bg()
+            job.cut = "fail"
+        else:
+            # still in _run_sink / _run_spawn: settles as soon as it checks job.cut
+            job.cut = "fail"
+
+    def stop(self, fg_only: bool = False) -> None:
+        """Stop everything; fg_only (mixer mode) keeps the background radio."""
+        if fg_only and self.mixing:
+            for p in PRIO.values():
+                if p != PRIO["radio"]:
+                    self.clear(p, current=True)
+            player.stop(wait=False)
+            return
+        for job in self._racing:
+            job.cut = "stop"
+        self.clear(current=True)
+        # Also cancels whatever is still in the spawn lane.
+        player.stop(wait=False)
+        if self.sink is not None:
+            self.sink.drop()
+
+    def playing(self) -> bool:
+        if self.sink is not None and self.sink.busy():
+            return True
+        return bool(player.is_playing())
+
+    def status(self) -> Dict[str, Any]:
+        res: Dict[str, Any] = {"ok": True, "playing": self.playing()}
+        cur = self.current
+        if cur is not None and cur.state not in TERMINAL:
+            res["job"] = cur.id
+            res["prio"] = PRIO_NAMES.get(cur.prio, cur.prio)
+        if self.bg is not None:
+            res["bg"] = self.bg.id
+        res["queued"] = len(self.queue) + (1 if self.lookahead is not None else 0)
+        return res
+
+    async def wait(self, job: Job, until: str = "done", timeout: float = 30.0) -> bool:
+        states = STARTED if until == "started" else TERMINAL
+        return await self.jobs.wait(job, states, timeout)
+
+    def close(self) -> None:
+        player.stop(wait=False)
+        if self.sink is not None:
+            self.sink.close()
+        self.cache.close()
+        if self.children is not None:
+            self.children.close()
+        self._pool.shutdown(wait=False)
+
+    # ------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------
+    def _schedule(self) -> None:
+        head = self.queue.peek()
+        if head is None:
+            return
+
+        cur = self.current
+        if cur is None:
+            self._start(self.queue.pop())  # type: ignore[arg-type]
+            return
+
+        if head.prio > cur.prio:
+            # Higher class waiting: cut the current item, head starts when it settles.
+            if not cur.cut:
+                self._cut_current("preempt")
+            return
+
+        if self.sink is None or cur.cut:
+            return
+
+        la = self.lookahead
+        if la is not None:
+            if head.prio > la.prio and not la.cut:
+                self._cut_lookahead("requeue")
+            return
+
+        if head.id in self._spawn_only or cur.id in self._spawn_only:
+            return
+
+        self.lookahead = self.queue.pop()
+        self._launch(self.lookahead)  # type: ignore[arg-type]
+
+    def _start(self, job: Job) -> None:
+        self.current = job
+        self._launch(job)
+
+    def _launch(self, job: Job) -> None:
+        loop = asyncio.get_running_loop()
+        if job.id in self._race_urls and job.id not in self._feeds:
+            loop.create_task(self._rerace(job))
+            return
+        if self.sink is None or job.id in self._spawn_only:
+            loop.create_task(self._run_spawn(job, player.generation()))
+        else:
+            loop.create_task(self._run_sink(job))
+
+    def _cut_current(self, why: str) -> None:
+        cur = self.current
+        if cur is None:
+            return
+        cur.cut = why
+        if self.sink is not None:
+            la = self.lookahead
+            if la is not None and not la.cut:
+                la.cut = "requeue"
+            self.sink.drop()
+        # Bumps the generation: cancels a spawn still in its grace period.
+        player.stop(wait=False)
+
+    def _cut_lookahead(self, why: str) -> None:
+        la = self.lookahead
+        if la is None:
+            return
+        la.cut = why
+        if self.sink is not None:
+            self.sink.drop(current=False)
+
+    def _settle(self, job: Job, state: str, err: str = "", exit_code: Optional[int] = None) -> None:
+        """Single exit point for a launched job; applies cut/preempt rules."""
+        cut, job.cut = job.cut, ""
+        resumable = PRIO_NAMES.get(job.prio) in RESUMABLE
+
+        if cut == "fail":
+            self.jobs.update(job, "failed", err=job.err or "ABORTED", exit_code=exit_code)
+        elif state == "done" and cut != "requeue":
+            self.jobs.update(job, "done", exit_code=exit_code)
+        elif cut == "requeue" or (cut == "preempt" and resumable):
+            if job.id in self._race_urls:
+                # a live stream resumes live: drop the socket now, race again on launch
+                self._release_feed(job)
+            self.jobs.update(job, "queued")
+            self.queue.push_front(job)
+        elif cut == "preempt":
+            self.jobs.update(job, "preempted", exit_code=exit_code)
+        elif cut == "stop":
+            self.jobs.update(job, "stopped", exit_code=exit_code)
+        else:
+            self.jobs.update(job, state, err=err, exit_code=exit_code)
+
+        if self.current is job:
+            la = self.lookahead
+            if la is not None and not la.cut:
+                # already queued in the sink right behind this one
+                self.current, self.lookahead = la, None
+            else:
+                self.current = None
+        if self.lookahead is job:
+            self.lookahead = None
+        if self.bg is job:
+            self.bg = None
+        if job.state in TERMINAL:
+            self._release(job)
+        self._schedule()
+
+    def _release(self, job: Job) -> None:
+        self._race_urls.pop(job.id, None)
+        self._release_feed(job)
+
+    def _release_feed(self, job: Job) -> None:
+        feed = self._feeds.pop(job.id, None)
+        if feed is not None:
+            feed.close_reader()
+
+    # ------------------------------------------------------------
+    # Spawn mode (and sink fallback)
+    # ------------------------------------------------------------
+    async def _run_spawn(self, job: Job, gen: int) -> None:
+        loop = asyncio.get_running_loop()
+        self.jobs.update(job, "starting")
+        try:
+            proc = await loop.run_in_executor(self._pool, self._spawn, job, gen)
+        except Exception as e:
+            self._settle(job, "failed", err="EXC: %s" % e)
+            return
+
+        if proc is None:
+            if gen != player.generation() or job.cut:
+                self._settle(job, "stopped")
+            else:
+                self._settle(job, "failed", err="SPAWN_FAILED")
+            return
+
+        self.jobs.update(job, "playing")
+        code = await self._wait_exit(proc)
+        self._spawn_only.discard(job.id)
+
+        if code == 0:
+            self._settle(job, "done", exit_code=code)
+        elif not player.is_current(proc):
+            # terminated by STOP/preempt or replaced by a newer PLAY
+            self._settle(job, "stopped", exit_code=code)
+        else:
+            self._settle(job, "failed", err="PLAYER_EXIT", exit_code=code)
+
+    def _spawn(self, job: Job, gen: int) -> Optional[subprocess.Popen]:
+        feed = self._feeds.get(job.id)
+        if feed is not None:
+            return player.spawn("bytes", feed.spec, gen, stdin=feed.rfd)
+        if job.kind == "bytes":
+            return None
+        if job.kind in ("wav", "mp3"):
+            cached = self.cache.path_for(job.target)
+            if cached is not None:
+                return player.spawn("wav", cached, gen)
+        return player.spawn(job.kind, job.target, gen)
+
+    async def _wait_exit(self, proc: subprocess.Popen) -> int:
+        if self.children is None:
+            self.children = ChildWatcher(asyncio.get_running_loop())
+        return await self.children.wait(proc)
+
+    # ------------------------------------------------------------
+    # Sink mode
+    # ------------------------------------------------------------
+    def _make_clip(self, job: Job) -> Optional[Clip]:
+        assert self.sink is not None
+        fmt = self.sink.fmt
+        feed = self._feeds.get(job.id)
+        if feed is not None:
+            pcm = spec_pcm(feed.spec)
+            if pcm is not None:
+                return fd_clip(feed.rfd, pcm[0], pcm[1], fmt)
+            return decoder_clip("-", fmt, stdin=feed.rfd)
+        if job.kind in ("wav", "mp3"):
+            buf = self.cache.get(job.target)
+            if buf is not None:
+                return pcm_clip(buf, fmt)
+        if job.kind == "wav":
+            return wav_clip(job.target, fmt)
+        if job.kind == "mp3":
+            if not os.path.isfile(job.target) or os.path.getsize(job.target) == 0:
+                return None
+            return decoder_clip(job.target, fmt)
+        if job.kind == "stream":
+            u = job.target.strip()
+            if not (u.startswith("http://") or u.startswith("https://")):
+                return None
+            return decoder_clip(u, fmt)
+        return None
+
+    async def _run_sink(self, job: Job) -> None:
+        assert self.sink is not None
+        loop = asyncio.get_running_loop()
+        self.jobs.update(job, "starting")
+
+        # Decoder spawn / file open off the loop thread.
+        clip = await loop.run_in_executor(self._pool, self._make_clip, job)
+        if clip is None:
+            if job.kind == "wav" and os.path.isfile(job.target) and not job.cut:
+                # Format the sink cannot convert: replay it through a one-off
+                # player once it reaches the head of the output.
+                self._spawn_only.add(job.id)
+                job.cut = "requeue"
+                self._settle(job, "queued")
+            else:
+                self._settle(job, "failed", err="SPAWN_FAILED")
+            return
+
+        if job.cut:
+            clip.close()
+            self._settle(job, "stopped")
+            return
+
+        def on_start() -> None:
+            loop.call_soon_threadsafe(self._clip_started, job)
+
+        def on_end(reason: str) -> None:
+            loop.call_soon_threadsafe(self._clip_ended, job, reason)
+
+        clip.on_start = on_start
+        clip.on_end = on_end
+        self.sink.submit(clip)
+
+    def _clip_started(self, job: Job) -> None:
+        self.jobs.update(job, "playing")
+
+    def _clip_ended(self, job: Job, reason: str) -> None:
+        if reason != "done" or job.cut == "fail":
+            if reason == "failed":
+                self._settle(job, "failed", err="DECODE_FAILED")
+            else:
+                self._settle(job, "stopped")
+            return
+        job.cut = ""
+        self._release(job)
+
+        # The next clip is already flowing: hand over the output right away,
+        # but report "done" once the tail has left the pipe/ALSA buffer.
+        assert self.sink is not None
+        delay = self.sink.buffer_ms / 1000.0
+        asyncio.get_running_loop().call_later(delay, self.jobs.update, job, "done", "", 0)
+        if self.current is job:
+            la = self.lookahead
+            if la is not None and not la.cut:
+                self.current, self.lookahead = la, None
+            else:
+                self.current = None
+        self._schedule()
+
+    # ------------------------------------------------------------
+    # Mixer mode: background channel
+    # ------------------------------------------------------------
+    def _start_bg(self, job: Job) -> None:
+        if self.bg is not None:
+            self._cut_bg()
+        self.bg = job
+        asyncio.get_running_loop().create_task(self._run_bg(job))
+
+    def _cut_bg(self) -> None:
+        bg = self.bg
+        if bg is None:
+            return
+        bg.cut = "stop"
+        assert isinstance(self.sink, MixerSink)
+        self.sink.drop_bg()
+
+    async def _run_bg(self, job: Job) -> None:
+        assert isinstance(self.sink, MixerSink)
+        loop = asyncio.get_running_loop()
+        self.jobs.update(job, "starting")
+
+        clip = await loop.run_in_executor(self._pool, self._make_clip, job)
+        if clip is None:
+            self._settle(job, "failed", err="SPAWN_FAILED")
+            return
+        if job.cut or self.bg is not job:
+            clip.close()
+            self._settle(job, "stopped")
+            return
+
+        def on_start() -> None:
+            loop.call_soon_threadsafe(self._clip_started, job)
+
+        def on_end(reason: str) -> None:
+            loop.call_soon_threadsafe(self._bg_ended, job, reason)
+
+        clip.on_start = on_start
+        clip.on_end = on_end
+        self.sink.set_bg(clip)
+
+    def _bg_ended(self, job: Job, reason: str) -> None:
+        if reason == "done":
+            self._settle(job, "done", exit_code=0)
+        elif reason == "failed":
+            self._settle(job, "failed", err="DECODE_FAILED")
+        else:
+            self._settle(job, "stopped")
+
+    # ------------------------------------------------------------
+    # Stream racing
+    # ------------------------------------------------------------
+    def _streams(self) -> List[Job]:
+        """Stream jobs playing or waiting to resume (what a new PLAY_STREAM_ANY replaces)."""
+        out = [j for j in (self.current, self.lookahead, self.bg) if j is not None and j.kind == "stream"]
+        out.extend(j for j in self.queue.items() if j.kind == "stream")
+        return out
+
+    def _replace(self, old: List[Job]) -> None:
+        """Stop the jobs in `old` that are still around, wherever they are now."""
+        for job in old:
+            if job.state in TERMINAL:
+                continue
+            if self.queue.remove(job):
+                self.jobs.update(job, "stopped")
+                self._release(job)
+            elif job is self.current:
+                self._cut_current("stop")
+            elif job is self.lookahead:
+                self._cut_lookahead("stop")
+            elif job is self.bg:
+                self._cut_bg()
+
+    async def _race(self, job: Job, urls: List[str], old: List[Job]) -> None:
+        loop = asyncio.get_running_loop()
+        self.jobs.update(job, "starting")
+        try:
+            win = await loop.run_in_executor(None, race, urls)
+        finally:
+            self._racing.discard(job)
+
+        if win is None:
+            self.jobs.update(job, "failed", err="NO_STREAM")
+            self._release(job)
+            return
+        if job.cut:
+            win.close()
+            self.jobs.update(job, "stopped")
+            self._release(job)
+            return
+
+        job.target = win.url
+        self._feeds[job.id] = self._pump(win)
+
+        # Break only now: the old stream played while the race ran.
+        if self.mixing and job.prio == PRIO["radio"]:
+            self._replace([j for j in old if j is not self.bg])
+            self._start_bg(job)
+            return
+        self._replace(old)
+        self.jobs.update(job, "queued")
+        self.queue.push(job)
+        self._schedule()
+
+    def _pump(self, win: Winner) -> ByteFeed:
+        # bounded: a reader that falls behind skips ahead instead of growing the buffer
+        feed = ByteFeed("mp3", max_chunks=LIVE_CHUNKS)
+        win.pump(feed)
+        return feed
+
+    async def _rerace(self, job: Job) -> None:
+        """Resumed PLAY_STREAM_ANY job (current or lookahead): race its urls again, then play."""
+        loop = asyncio.get_running_loop()
+        self.jobs.update(job, "starting")
+        win = await loop.run_in_executor(None, race, self._race_urls.get(job.id) or [job.target])
+        if win is None:
+            self._settle(job, "failed", err="NO_STREAM")
+            return
+        if job.cut or job.id not in self._race_urls:
+            win.close()
+            self._settle(job, "stopped")
+            return
+        job.target = win.url
+        self._feeds[job.id] = self._pump(win)
+        self._launch(job)
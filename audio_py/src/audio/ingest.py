@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Streaming byte ingest (PLAY_BYTES).
+
+The client sends one JSON header line, then the audio itself as framed
+chunks on the same connection:
+
+  {"cmd":"PLAY_BYTES","format":"mp3","prio":"tts","tee":"/.../tts_x.mp3"}\\n
+  <u32 big-endian length><bytes> ... <u32 0>
+
+The daemon answers the header with {"ok":true,"job":"j7"} before any audio
+arrives, and {"ok":true,"job":"j7","bytes":N} after the final zero-length
+frame. Playback starts as soon as the player has the first frames.
+
+A ByteFeed moves the chunks off the event loop:
+- tee thread:  appends to "<tee>.part", renamed to <tee> once the stream
+               ended cleanly (so the TTS cache never holds a partial file)
+- pipe thread: writes into a pipe whose read end is the player's stdin
+               (spawn mode) or the decoder's / sink reader's (sink modes)
+
+The tee never waits for playback: a queued or stopped job still leaves a
+complete cache file behind.
+"""
+
+import os
+import queue
+import struct
+import threading
+from typing import Optional, Tuple
+
+from . import player
+
+__all__ = ["ByteFeed", "FRAME", "MAX_FRAME", "parse_format", "spec_pcm"]
+
+# Chunk header: payload length, big-endian u32; 0 ends the stream.
+FRAME = struct.Struct(">I")
+MAX_FRAME = 1 << 20
+
+_END = object()
+_ABORT = object()
+
+
+def _log(msg: str) -> None:
+    player._log("[ingest] " + msg)
+
+
+def parse_format(fmt: str, rate: int = 0, channels: int = 0) -> Optional[str]:
+    """Player spec for a PLAY_BYTES header: "mp3" or "pcm:<rate>:<ch>"."""
+    fmt = (fmt or "mp3").strip().lower()
+    if fmt == "mp3":
+        return "mp3"
+    if fmt == "pcm" and 8000 <= rate <= 192000 and channels in (1, 2):
+        return "pcm:%d:%d" % (rate, channels)
+    return None
+
+
+def spec_pcm(spec: str) -> Optional[Tuple[int, int]]:
+    """(rate, channels) for a "pcm:..." spec, None for mp3."""
+    parts = spec.split(":")
+    if parts[0] != "pcm" or len(parts) != 3:
+        return None
+    return int(parts[1]), int(parts[2])
+
+
+class ByteFeed:
+    def __init__(self, spec: str, tee: Optional[str] = None, max_chunks: int = 0):
+        self.spec = spec
+        self.tee = tee
+        # live source (a radio stream): at most this many chunks wait for the
+        # reader, the oldest are dropped (0 = keep everything, the TTS case)
+        self.max_chunks = max_chunks
+        self.dropped = 0
+        self.received = 0
+        self.saved = False
+        self.rfd, self._wfd = os.pipe()
+        self._rfd_open = True
+        self._lock = threading.Lock()
+        self._tee_q: "queue.Queue[object]" = queue.Queue()
+        self._pipe_q: "queue.Queue[object]" = queue.Queue()
+        threading.Thread(target=self._tee_loop, name="ingest-tee", daemon=True).start()
+        threading.Thread(target=self._pipe_loop, name="ingest-pipe", daemon=True).start()
+
+    # -------- event loop side --------
+    def feed(self, data: bytes) -> None:
+        self.received += len(data)
+        self._tee_q.put(data)
+
+    def finish(self, ok: bool = True) -> None:
+        """End of stream (ok) or connection lost (tee discarded)."""
+        self._tee_q.put(_END if ok else _ABORT)
+
+    @property
+    def closed(self) -> bool:
+        """True once playback released the feed (producers can stop)."""
+        return not self._rfd_open
+
+    def close_reader(self) -> None:
+        """Playback is over for good: unblock the pipe thread."""
+        with self._lock:
+            if not self._rfd_open:
+                return
+            self._rfd_open = False
+        try:
+            os.close(self.rfd)
+        except OSError:
+            pass
+
+    # -------- threads --------
+    def _tee_loop(self) -> None:
+        part = self.tee + ".part" if self.tee else ""
+        f = None
+        if part:
+            try:
+                f = open(part, "wb")
+            except OSError as e:
+                _log("tee open failed: %s (%s)" % (part, e))
+        try:
+            while True:
+                item = self._tee_q.get()
+                if item is _END or item is _ABORT:
+                    break
+                if f is not None:
+                    try:
+                        f.write(item)  # type: ignore[arg-type]
+                    except OSError as e:
+                        _log("tee write failed: %s" % e)
+                        f.close()
+                        f = None
+                        os.unlink(part)
+                self._pipe_put(item)  # type: ignore[arg-type]
+        finally:
+            self._pipe_q.put(_END)
+        if f is not None:
+            f.close()
+            if item is _END and self.received > 0:
+                os.replace(part, self.tee)  # type: ignore[arg-type]
+                self.saved = True
+            else:
+                os.unlink(part)
+
+    def _pipe_put(self, data: bytes) -> None:
+        while self.max_chunks and self._pipe_q.qsize() >= self.max_chunks:
+            try:
+                self._pipe_q.get_nowait()
+            except queue.Empty:
+                break
+            self.dropped += 1
+        self._pipe_q.put(data)
+
+    def _pipe_loop(self) -> None:
+        alive = True
+        while True:
+            item = self._pipe_q.get()
+            if item is _END:
+                break
+            if not alive:
+                continue
+            mv = memoryview(item)  # type: ignore[arg-type]
+            try:
+                while mv:
+                    mv = mv[os.write(self._wfd, mv):]
+            except OSError:
+                # every reader is gone (stopped): keep draining for the tee
+                alive = False
+        os.close(self._wfd)
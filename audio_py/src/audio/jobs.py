@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Playback jobs.
+
+Every PLAY_* request handled by the asyncio daemon gets a short job id.
+The reply carries the id immediately; spawn success/failure and
+end-of-playback are reported later through JOB_STATUS / WAIT.
+
+Lifecycle:
+  pending -> queued -> starting -> playing -> done | failed | stopped | preempted
+
+A resumable job that gets preempted goes back to "queued".
+
+Subscribers (SUBSCRIBE) get one event per transition, see EVENTS; a
+resumable job going back to "queued" is reported as "preempted" with
+"resume": true.
+
+The table is owned by the event loop: update() must be called from the
+loop thread (use loop.call_soon_threadsafe from workers).
+"""
+
+import time
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+__all__ = ["Job", "JobTable", "TERMINAL", "STARTED", "EVENTS"]
+
+# States after which a job never changes again.
+TERMINAL = ("done", "failed", "stopped", "preempted")
+
+# States that mean "spawn verification is over".
+STARTED = ("playing",) + TERMINAL
+
+# Job state -> event pushed to subscribers
+EVENTS = {
+    "playing": "started",
+    "done": "finished",
+    "failed": "failed",
+    "preempted": "preempted",
+    "stopped": "stopped",
+}
+
+
+_START = metrics.histogram(
+    "voxie_audio_job_start_seconds", "Job accepted to playing (queue wait + spawn/first frames)", ("kind",))
+_ENDED = metrics.counter("voxie_audio_jobs_total", "Jobs by final state", ("kind", "state"))
+
+
+class Job:
+    __slots__ = ("id", "kind", "target", "prio", "state", "err", "exit_code",
+                 "created", "started", "ended", "cut", "_changed")
+
+    def __init__(self, job_id: str, kind: str, target: str, prio: int = 0):
+        self.id = job_id
+        self.kind = kind
+        self.target = target
+        self.prio = prio
+        self.state = "pending"
+        self.err = ""
+        self.exit_code: Optional[int] = None
+        self.created = time.time()
+        self.started = 0.0
+        self.ended = 0.0
+        # Set by the engine before cutting a job: "stop" | "preempt" | "requeue" | "fail"
+        self.cut = ""
+        self._changed: Optional[asyncio.Event] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+        }
+        if self.err:
+            d["err"] = self.err
+        if self.exit_code is not None:
+            d["exit"] = self.exit_code
+        if self.started:
+            d["start_ms"] = int((self.started - self.created) * 1000)
+        if self.ended:
+            d["dur_ms"] = int((self.ended - (self.started or self.created)) * 1000)
+        return d
+
+
+class JobTable:
+    """Bounded id -> Job map with asyncio waiters."""
+
+    def __init__(self, keep: int = 64):
+        self.keep = max(8, int(keep))
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._subs: List["asyncio.Queue[Dict[str, Any]]"] = []
+
+    def new(self, kind: str, target: str, prio: int = 0) -> Job:
+        job = Job("j%d" % next(self._ids), kind, target, prio)
+        self._jobs[job.id] = job
+        # Forget the oldest finished jobs first; never drop live ones.
+        while len(self._jobs) > self.keep:
+            for jid, j in self._jobs.items():
+                if j.state in TERMINAL:
+                    del self._jobs[jid]
+                    break
+            else:
+                break
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id or "")
+
+    def subscribe(self, maxsize: int = 256) -> "asyncio.Queue[Dict[str, Any]]":
+        q: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=maxsize)
+        self._subs.append(q)
+        return q
+
+    def unsubscribe(self, q: "asyncio.Queue[Dict[str, Any]]") -> None:
+        if q in self._subs:
+            self._subs.remove(q)
+
+    def _emit(self, job: Job, event: str, **extra: Any) -> None:
+        ev = job.to_dict()
+        ev["event"] = event
+        ev["ts"] = round(time.time(), 3)
+        ev.update(extra)
+        for q in self._subs:
+            if q.full():
+                # slow reader: lose the oldest event, never block the loop
+                q.get_nowait()
+            q.put_nowait(ev)
+
+    def update(self, job: Job, state: str, err: str = "", exit_code: Optional[int] = None) -> None:
+        if job.state in TERMINAL:
+            return
+        prev, job.state = job.state, state
+        if err:
+            job.err = err
+        if exit_code is not None:
+            job.exit_code = exit_code
+        now = time.time()
+        if state == "playing" and not job.started:
+            job.started = now
+            _START.observe(now - job.created, kind=job.kind)
+        if state in TERMINAL:
+            job.ended = now
+            _ENDED.inc(kind=job.kind, state=state)
+        if job._changed is not None:
+            job._changed.set()
+            job._changed = None
+
+        if self._subs and state != prev:
+            if state in EVENTS:
+                self._emit(job, EVENTS[state])
+            elif state == "queued" and prev == "playing":
+                self._emit(job, "preempted", resume=True)
+
+    async def wait(self, job: Job, until: tuple = TERMINAL, timeout: float = 30.0) -> bool:
+        """Wait until job.state is in `until`. Returns False on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, timeout)
+        while job.state not in until:
+            left = deadline - loop.time()
+            if left <= 0:
+                return False
+            if job._changed is None:
+                job._changed = asyncio.Event()
+            try:
+                await asyncio.wait_for(job._changed.wait(), left)
+            except asyncio.TimeoutError:
+                return False
+        return True
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Two-channel software mixer (engine mode "mixer").
+
+Same warm aplay as sink.py, but the writer thread mixes two voices:
+
+- background (bg): the radio stream
+- foreground (fg): everything else (tts, fillers, alarms), queued exactly
+  like PcmSink clips (submit / drop)
+
+Each voice is decoded ahead by its own prefetch thread, so a stalled
+network, decoder or PLAY_BYTES feed never blocks the other one: the
+stalled voice is mixed as silence for that period.
+
+While a foreground clip is playing the background is ducked
+(VOXIE_MIX_DUCK, linear gain, default 0.25 = -12 dB) with a short ramp
+(VOXIE_MIX_DUCK_MS) instead of being stopped, so the stream never has to
+reconnect and rebuffer.
+
+Mixing is whole-buffer arithmetic (VOXIE_MIX_BACKEND):
+- numpy:   int16 -> float32, per-sample gain ramp, saturating add
+- audioop: C mul/add on the whole chunk (per-chunk gain step)
+- python:  array-based fallback, only for interpreters without either
+"""
+
+import os
+import queue
+import array
+import threading
+from typing import Optional
+
+try:
+    import audioop  # C helpers, stdlib until Python 3.12
+except Exception:  # pragma: no cover - depends on interpreter
+    audioop = None  # type: ignore
+
+try:
+    import numpy as np  # optional: per-sample ramps
+except Exception:  # pragma: no cover - optional dependency
+    np = None  # type: ignore
+
+from .sink import Clip, PcmSink, SinkFormat, _log
+
+__all__ = ["Ducker", "MixerSink", "backends"]
+
+# back-to-back clips: how long the writer waits for the next clip's first bytes
+CHAIN_WAIT_SEC = 0.005
+
+# ------------------------------------------------------------
+# Mix kernels: out = fg + bg * gain (ramped g0 -> g1), saturated
+# ------------------------------------------------------------
+def _mix_numpy(fg: Optional[bytes], bg: Optional[bytes], g0: float, g1: float, ch: int = 1) -> bytes:
+    b = np.frombuffer(bg, dtype=np.int16).astype(np.float32)  # type: ignore[arg-type]
+    if g0 != 1.0 or g1 != 1.0:
+        frames = len(b) // ch
+        ramp = np.linspace(g0, g1, frames, endpoint=False, dtype=np.float32)
+        b *= np.repeat(ramp, ch) if ch > 1 else ramp
+    if fg is not None:
+        b += np.frombuffer(fg, dtype=np.int16)
+    np.clip(b, -32768, 32767, out=b)
+    return b.astype(np.int16).tobytes()
+
+
+def _mix_audioop(fg: Optional[bytes], bg: Optional[bytes], g0: float, g1: float, ch: int = 1) -> bytes:
+    g = (g0 + g1) * 0.5
+    if g != 1.0:
+        bg = audioop.mul(bg, 2, g)
+    if fg is None:
+        return bg  # type: ignore[return-value]
+    return audioop.add(fg, bg, 2)
+
+
+def _mix_python(fg: Optional[bytes], bg: Optional[bytes], g0: float, g1: float, ch: int = 1) -> bytes:
+    b = array.array("h", bg)  # type: ignore[arg-type]
+    f = array.array("h", fg) if fg is not None else None
+    g = (g0 + g1) * 0.5
+    for i in range(len(b)):
+        v = int(b[i] * g) + (f[i] if f is not None else 0)
+        b[i] = 32767 if v > 32767 else (-32768 if v < -32768 else v)
+    return b.tobytes()
+
+
+_KERNELS = {"numpy": _mix_numpy, "audioop": _mix_audioop, "python": _mix_python}
+
+
+def backends() -> list:
+    """Mix backends available in this interpreter, fastest first."""
+    out = []
+    if np is not None:
+        out.append("numpy")
+    if audioop is not None:
+        out.append("audioop")
+    out.append("python")
+    return out
+
+
+class Ducker:
+    """Mixes fg over bg, ramping the bg gain down while fg is active."""
+
+    def __init__(
+        self,
+        fmt: SinkFormat,
+        duck: float = -1.0,
+        ramp_ms: int = -1,
+        backend: str = "",
+    ):
+        self.fmt = fmt
+        self.duck = duck if duck >= 0 else float(os.environ.get("VOXIE_MIX_DUCK", "0.25"))
+        self.ramp_ms = ramp_ms if ramp_ms >= 0 else int(os.environ.get("VOXIE_MIX_DUCK_MS", "200"))
+        name = (backend or os.environ.get("VOXIE_MIX_BACKEND", "auto")).strip().lower()
+        avail = backends()
+        self.backend = name if name in avail else avail[0]
+        self._kernel = _KERNELS[self.backend]
+        self.gain = 1.0
+
+    def _step(self, fg_active: bool, nbytes: int) -> float:
+        target = self.duck if fg_active else 1.0
+        if self.ramp_ms <= 0:
+            return target
+        ms = 1000.0 * nbytes / (self.fmt.rate * self.fmt.frame_bytes)
+        delta = (1.0 - self.duck) * ms / self.ramp_ms
+        if self.gain > target:
+            return max(target, self.gain - delta)
+        return min(target, self.gain + delta)
+
+    def mix(self, fg: Optional[bytes], bg: Optional[bytes]) -> bytes:
+        """One period; fg/bg are equal-length S16 buffers or None."""
+        if bg is None:
+            self.gain = self._step(fg is not None, len(fg or b""))
+            return fg or b""
+        g0 = self.gain
+        g1 = self.gain = self._step(fg is not None, len(bg))
+        if fg is None and g0 == 1.0 and g1 == 1.0:
+            return bg
+        return self._kernel(fg, bg, g0, g1, self.fmt.channels)
+
+
+# ------------------------------------------------------------
+# Voices
+# ------------------------------------------------------------
+class _Voice:
+    """
+    One clip, decoded ahead by a prefetch thread into a bounded queue: the
+    writer never reads the clip itself, so a stalled decoder or PLAY_BYTES
+    feed costs that voice an underrun, not the whole period.
+    """
+
+    _END = b""
+
+    def __init__(self, clip: Clip, name: str, depth: int = 25):
+        self.clip = clip
+        self.buf = bytearray()
+        self.started = False
+        self.failed = False
+        self.eof = False
+        self._q: "queue.Queue[bytes]" = queue.Queue(maxsize=depth)
+        self._pumped = False
+        self._t = threading.Thread(target=self._pump, name=name, daemon=True)
+        self._t.start()
+
+    def _next(self) -> Optional[bytes]:
+        try:
+            return next(self.clip.chunks)
+        except StopIteration:
+            return None
+        except Exception as e:
+            _log("clip failed: %s" % e)
+            self.failed = True
+            return None
+
+    def _pump(self) -> None:
+        while not self.clip.dropped:
+            data = self._next()
+            if data is None:
+                break
+            while not self.clip.dropped:
+                try:
+                    self._q.put(data, timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+        self._pumped = True
+        try:
+            self._q.put_nowait(self._END)
+        except queue.Full:
+            pass
+
+    def _take(self, data: bytes) -> None:
+        if data is self._END or not data:
+            self.eof = True
+        else:
+            self.buf += data
+
+    def read(self, n: int) -> Optional[bytes]:
+        """n bytes; shorter only at end of clip, None on underrun."""
+        if self.clip.dropped:
+            self.eof = True
+            del self.buf[:]
+            return b""
+        while len(self.buf) < n and not self.eof:
+            try:
+                data = self._q.get_nowait()
+            except queue.Empty:
+                if not self._pumped:
+                    return None
+                self.eof = True
+                break
+            self._take(data)
+        if len(self.buf) < n and not self.eof:
+            return None
+        out = bytes(self.buf[:n])
+        del self.buf[:n]
+        return out
+
+    def wait(self, timeout: float) -> None:
+        """Block until the prefetch has more (or `timeout`), instead of spinning on underruns."""
+        if self.eof or self.clip.dropped:
+            return
+        try:
+            self._take(self._q.get(timeout=timeout))
+        except queue.Empty:
+            pass
+
+    @property
+    def done(self) -> bool:
+        return self.eof and not self.buf
+
+
+# ------------------------------------------------------------
+# Sink
+# ------------------------------------------------------------
+class MixerSink(PcmSink):
+    """PcmSink with a background voice mixed under the foreground clips."""
+
+    def __init__(self, *args, period_ms: int = 20, ducker: Optional[Ducker] = None, **kw):
+        super().__init__(*args, **kw)
+        self.period = self.fmt.bytes_for_ms(period_ms)
+        self.ducker = ducker or Ducker(self.fmt)
+        self._bg: Optional[_Voice] = None
+        self._fg: Optional[_Voice] = None
+
+    def set_bg(self, clip: Clip) -> None:
+        """Replace the background voice (the old one ends as "dropped")."""
+        self.drop_bg()
+        voice = _Voice(clip, "mix-bg")
+        with self._cv:
+            self._bg = voice
+            self._cv.notify()
+
+    def drop_bg(self) -> None:
+        with self._cv:
+            voice, self._bg = self._bg, None
+        if voice is not None:
+            voice.clip.dropped = True
+            voice.clip.close()
+            voice.clip.end("dropped")
+
+    def close(self) -> None:
+        self.drop_bg()
+        super().close()
+
+    def busy(self) -> bool:
+        with self._cv:
+            return self._bg is not None or self._current is not None or bool(self._pending)
+
+    def bg_busy(self) -> bool:
+        with self._cv:
+            return self._bg is not None
+
+    # -------- writer --------
+    def _end_voice(self, voice: _Voice) -> None:
+        reason = "done"
+        if voice.clip.dropped:
+            reason = "dropped"
+        elif voice.failed or not voice.started:
+            reason = "failed"
+        voice.clip.end(reason)
+
+    def _dropped(self) -> bool:
+        """Nothing left to write for: the voices playing were dropped (STOP)."""
+        fg, bg = self._fg, self._bg
+        return (fg is None or fg.clip.dropped) and (bg is None or bg.clip.dropped)
+
+    def _fail_voices(self) -> None:
+        """aplay cannot be reopened: what is playing fails (queued clips get their own tries)."""
+        failed = []
+        with self._cv:
+            fg, bg = self._fg, self._bg
+            if fg is not None and not fg.clip.dropped:
+                self._fg = self._current = None
+                failed.append(fg)
+            if bg is not None and not bg.clip.dropped:
+                self._bg = None
+                failed.append(bg)
+        for voice in failed:
+            # stops the prefetch thread
+            voice.clip.dropped = True
+            voice.clip.end("failed")
+
+    def _fg_period(self, n: int) -> Optional[bytes]:
+        """
+        Next n bytes of foreground, chaining queued clips back-to-back.
+        A clip that underruns once it has started is silence for the rest
+        of the period (the bed stays ducked); None while nothing plays yet.
+        """
+        out = b""
+        while len(out) < n:
+            voice = self._fg
+            if voice is None:
+                with self._cv:
+                    if not self._pending:
+                        break
+                    clip = self._pending.popleft()
+                    self._current = clip
+                voice = self._fg = _Voice(clip, "mix-fg")
+                if out:
+                    # chaining mid-period: its decoder is already running (lookahead)
+                    voice.wait(CHAIN_WAIT_SEC)
+            data = voice.read(n - len(out))
+            if data is None:
+                if voice.started:
+                    out += b"\0" * (n - len(out))
+                break
+            if data and not voice.started:
+                voice.started = True
+                if voice.clip.on_start is not None:
+                    voice.clip.on_start()
+            out += data
+            if voice.done:
+                self._fg = None
+                with self._cv:
+                    self._current = None
+                self._end_voice(voice)
+        if not out:
+            return None
+        if len(out) < n:
+            out += b"\0" * (n - len(out))
+        return out
+
+    def _bg_period(self, n: int) -> Optional[bytes]:
+        with self._cv:
+            voice = self._bg
+        if voice is None:
+            return None
+        data = voice.read(n)
+        if data is not None and not voice.started:
+            voice.started = True
+            if voice.clip.on_start is not None:
+                voice.clip.on_start()
+        if data is not None and len(data) < n:
+            data += b"\0" * (n - len(data))
+        if voice.done:
+            with self._cv:
+                if self._bg is voice:
+                    self._bg = None
+            self._end_voice(voice)
+        return data
+
+    def _writer(self) -> None:
+        n = self.period
+        silence = b"\0" * n
+        wait_sec = n / float(self.fmt.rate * self.fmt.frame_bytes)
+        while True:
+            with self._cv:
+                while self._running and self._bg is None and self._fg is None and not self._pending:
+                    self._cv.wait()
+                if not self._running:
+                    return
+
+            fg = self._fg_period(n)
+            bg = self._bg_period(n)
+            if fg is None and bg is None:
+                voice = self._fg
+                if self._bg is not None:
+                    # background underrun: keep the device fed
+                    if not self._write(silence, self._dropped):
+                        self._fail_voices()
+                elif voice is not None:
+                    # lone clip not started yet (decoder spinning up): wait for
+                    # its first bytes rather than queue silence ahead of them
+                    voice.wait(wait_sec)
+                continue
+            if not self._write(self.ducker.mix(fg, bg), self._dropped):
+                self._fail_voices()
@@ -9,24 +9,46 @@ This module is intentionally small and dependency-free:
 - tracks a single active playback process
 - provides stop/status helpers used by the audio daemon
 
+Thread-safety: the active process is guarded by a lock and a generation
+counter, so an event-loop daemon can call stop()/is_playing() while a
+worker thread is inside the spawn grace period. A stop() cancels any
+spawn/retry that started before it.
+
 Designed to run on constrained hardware (e.g., ARMv6 Raspberry Pi).
 """
 
 import os
 import time
+import threading
 import subprocess
 from pathlib import Path
 from typing import Optional, List
 
+import metrics
+
 __all__ = [
     "stop",
     "is_playing",
     "play_wav",
     "play_mp3",
     "play_stream",
+    "generation",
+    "spawn",
+    "is_current",
 ]
 
 _PROC: Optional[subprocess.Popen] = None
+_LOCK = threading.RLock()
+
+# Bumped by every stop(); spawns started under an older value are cancelled.
+_GEN = 0
+
+_SPAWN_ALIVE = metrics.histogram(
+    "voxie_audio_spawn_alive_seconds", "Player spawn to verified alive", ("player",))
+_SPAWN_FAILED = metrics.counter(
+    "voxie_audio_spawn_failures_total", "Players that exited during the grace period", ("player",))
+_SPAWN_RETRIES = metrics.counter(
+    "voxie_audio_spawn_retries_total", "Spawn attempts after the first one", ("player",))
 
 
 def _log(msg: str) -> None:
@@ -46,33 +68,65 @@ def _alsa_device() -> str:
     return d or "bluealsa"
 
 
-def stop() -> bool:
-    """Stop current playback process (if any)."""
-    global _PROC
-    if _PROC is None:
-        return True
+def generation() -> int:
+    """Return the current stop generation (see play_* `gen` argument)."""
+    return _GEN
+
+
+def _reap(proc: subprocess.Popen) -> None:
+    try:
+        proc.wait(timeout=1.5)
+    except Exception:
+        try:
+            proc.kill()
+            proc.wait(timeout=1.0)
+        except Exception:
+            pass
+
 
-    if _PROC.poll() is None:
+def _terminate(proc: subprocess.Popen, wait: bool = True) -> None:
+    if proc.poll() is None:
         _log("stop(): terminate proc")
         try:
-            _PROC.terminate()
-            _PROC.wait(timeout=1.5)
+            proc.terminate()
         except Exception:
-            try:
-                _PROC.kill()
-            except Exception:
-                pass
+            pass
+    if wait:
+        _reap(proc)
+    else:
+        threading.Thread(target=_reap, args=(proc,), daemon=True).start()
 
-    _PROC = None
+
+def _take_proc() -> Optional[subprocess.Popen]:
+    global _PROC
+    with _LOCK:
+        proc, _PROC = _PROC, None
+    return proc
+
+
+def stop(wait: bool = True) -> bool:
+    """
+    Stop current playback process (if any).
+
+    wait=False signals the process and reaps it in a background thread,
+    so event-loop callers never block on terminate/wait.
+    """
+    global _GEN
+    with _LOCK:
+        _GEN += 1
+    proc = _take_proc()
+    if proc is not None:
+        _terminate(proc, wait=wait)
     return True
 
 
 def is_playing() -> bool:
     """Return True if a playback process is currently alive."""
-    return _PROC is not None and _PROC.poll() is None
+    proc = _PROC
+    return proc is not None and proc.poll() is None
 
 
-def _popen(cmd: List[str]) -> subprocess.Popen:
+def _popen(cmd: List[str], stdin: Optional[int] = None) -> subprocess.Popen:
     # Optional: redirect stdout/stderr to a log file.
     # Backward-compatible env var: AUDIO_LOG
     log_path = (
@@ -84,7 +138,7 @@ def _popen(cmd: List[str]) -> subprocess.Popen:
         f = open(log_path, "ab", buffering=0)
         return subprocess.Popen(
             cmd,
-            stdin=subprocess.DEVNULL,
+            stdin=subprocess.DEVNULL if stdin is None else stdin,
             stdout=f,
             stderr=f,
             start_new_session=True,
@@ -93,7 +147,7 @@ def _popen(cmd: List[str]) -> subprocess.Popen:
 
     return subprocess.Popen(
         cmd,
-        stdin=subprocess.DEVNULL,
+        stdin=subprocess.DEVNULL if stdin is None else stdin,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
         start_new_session=True,
@@ -101,62 +155,146 @@ def _popen(cmd: List[str]) -> subprocess.Popen:
     )
 
 
-def _spawn(cmd: List[str], check_alive_ms: int = 250) -> bool:
+def _spawn(
+    cmd: List[str],
+    check_alive_ms: int = 250,
+    gen: Optional[int] = None,
+    stdin: Optional[int] = None,
+) -> Optional[subprocess.Popen]:
     """Spawn a process and verify it stays alive for a short grace period."""
     global _PROC
-    stop()
+    old = _take_proc()
+    if old is not None:
+        _terminate(old, wait=True)
+
     _log("exec: " + " ".join(cmd))
-    _PROC = _popen(cmd)
+    t0 = time.monotonic()
+    proc = _popen(cmd, stdin)
+    with _LOCK:
+        cancelled = gen is not None and gen != _GEN
+        if not cancelled:
+            _PROC = proc
+    if cancelled:
+        _log("spawn cancelled by stop()")
+        _terminate(proc, wait=False)
+        return None
 
     time.sleep(check_alive_ms / 1000.0)
-    if _PROC.poll() is not None:
-        code = _PROC.returncode
-        _log("spawn failed (exit=%s)" % code)
-        _PROC = None
-        return False
-
-    return True
-
-
-def _retry_spawn(cmd: List[str], tries: int = 3) -> bool:
+    with _LOCK:
+        if _PROC is not proc:
+            # stopped or replaced during the grace period
+            return None
+        if proc.poll() is not None:
+            _log("spawn failed (exit=%s)" % proc.returncode)
+            _PROC = None
+            _SPAWN_FAILED.inc(player=cmd[0])
+            return None
+
+    _SPAWN_ALIVE.observe(time.monotonic() - t0, player=cmd[0])
+    return proc
+
+
+def _retry_spawn(
+    cmd: List[str],
+    tries: int = 3,
+    gen: Optional[int] = None,
+    stdin: Optional[int] = None,
+) -> Optional[subprocess.Popen]:
+    if gen is None:
+        gen = _GEN
     for i in range(tries):
-        if _spawn(cmd):
-            return True
+        if i:
+            _SPAWN_RETRIES.inc(player=cmd[0])
+        proc = _spawn(cmd, gen=gen, stdin=stdin)
+        if proc is not None:
+            return proc
+        if gen != _GEN:
+            # STOP arrived: do not retry
+            return None
         time.sleep(0.15 + 0.15 * i)
-    return False
+    return None
 
 
-def play_wav(path: str) -> bool:
-    """Play a WAV file via aplay."""
+def _wav_cmd(path: str) -> Optional[List[str]]:
     p = Path(path)
     if not p.exists() or p.stat().st_size == 0:
         _log("WAV not found: %s" % p)
-        return False
+        return None
+    return ["aplay", "-q", "-D", _alsa_device(), str(p)]
 
-    dev = _alsa_device()
-    cmd = ["aplay", "-q", "-D", dev, str(p)]
-    return _retry_spawn(cmd, tries=3)
 
-
-def play_mp3(path: str) -> bool:
-    """Play an MP3 file via mpg123."""
+def _mp3_cmd(path: str) -> Optional[List[str]]:
     p = Path(path)
     if not p.exists() or p.stat().st_size == 0:
         _log("MP3 not found: %s" % p)
-        return False
+        return None
+    return ["mpg123", "--no-control", "-q", "-o", "alsa", "-a", _alsa_device(), str(p)]
 
-    dev = _alsa_device()
-    cmd = ["mpg123", "--no-control", "-q", "-o", "alsa", "-a", dev, str(p)]
-    return _retry_spawn(cmd, tries=3)
 
-
-def play_stream(url: str) -> bool:
-    """Play an HTTP/HTTPS stream via mpg123."""
+def _stream_cmd(url: str) -> Optional[List[str]]:
     u = (url or "").strip()
     if not (u.startswith("http://") or u.startswith("https://")):
         _log("STREAM bad url: %s" % u)
-        return False
+        return None
+    return ["mpg123", "--no-control", "-q", "-o", "alsa", "-a", _alsa_device(), u]
+
+
+def _bytes_cmd(spec: str) -> Optional[List[str]]:
+    # spec: "mp3" or "pcm:<rate>:<channels>" (S16_LE), audio read from stdin
+    parts = (spec or "").split(":")
+    if parts[0] == "mp3":
+        return ["mpg123", "--no-control", "-q", "-o", "alsa", "-a", _alsa_device(), "-"]
+    if parts[0] == "pcm" and len(parts) == 3:
+        return ["aplay", "-q", "-D", _alsa_device(), "-t", "raw", "-f", "S16_LE",
+                "-r", parts[1], "-c", parts[2]]
+    _log("BYTES bad format: %s" % spec)
+    return None
+
+
+_CMDS = {"wav": _wav_cmd, "mp3": _mp3_cmd, "stream": _stream_cmd, "bytes": _bytes_cmd}
+
+
+def spawn(
+    kind: str,
+    target: str,
+    gen: Optional[int] = None,
+    stdin: Optional[int] = None,
+) -> Optional[subprocess.Popen]:
+    """
+    Start playback of `target` ("wav" / "mp3" path, "stream" url, or a
+    "bytes" format spec read from the `stdin` fd).
+
+    Returns the verified player process, or None if the target is invalid,
+    every retry failed, or a stop() newer than `gen` cancelled it.
+    """
+    build = _CMDS.get(kind)
+    cmd = build(target) if build else None
+    if cmd is None:
+        return None
+    # bytes consumed from a pipe cannot be replayed: a single attempt
+    return _retry_spawn(cmd, tries=3 if stdin is None else 1, gen=gen, stdin=stdin)
+
 
-    dev = _alsa_device()
-    cmd = ["mpg123", "--no-control", "-q", "-o", "alsa", "-a", dev, u]
-    return _retry_spawn(cmd, tries=3)
+def is_current(proc: subprocess.Popen) -> bool:
+    """True if `proc` is still the tracked playback process."""
+    return _PROC is proc
+
+
+def play_wav(path: str, gen: Optional[int] = None) -> bool:
+    """
+    Play a WAV file via aplay.
+
+    `gen` is an optional generation() token taken when the request arrived:
+    a stop() issued after it cancels this playback before it starts.
+    """
+    return spawn("wav", path, gen=gen) is not None
+
+
+def play_mp3(path: str, gen: Optional[int] = None) -> bool:
+    """Play an MP3 file via mpg123."""
+    return spawn("mp3", path, gen=gen) is not None
+
+
+def play_stream(url: str, gen: Optional[int] = None) -> bool:
+    """Play an HTTP/HTTPS stream via mpg123."""
+    return spawn("stream", url, gen=gen) is not None
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Priority playback queue.
+
+Classes (highest first): alarm > tts > filler > radio.
+
+Rules applied by the engine:
+- items of the same class play back-to-back in FIFO order
+- a new item preempts the current one only if its class is higher
+- a preempted item is resumed (re-queued at the front of its class) if its
+  class is resumable (radio restarts the live stream, tts replays from the
+  start); preempted fillers are dropped since they would be stale
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .jobs import Job
+
+__all__ = ["PRIO", "PRIO_NAMES", "RESUMABLE", "PlaybackQueue", "prio_of", "default_prio"]
+
+PRIO: Dict[str, int] = {"radio": 0, "filler": 1, "tts": 2, "alarm": 3}
+PRIO_NAMES = {v: k for k, v in PRIO.items()}
+
+# Classes that come back after being preempted.
+RESUMABLE = ("radio", "tts")
+
+
+def default_prio(kind: str) -> int:
+    return PRIO["radio"] if kind == "stream" else PRIO["tts"]
+
+
+def prio_of(name: object, kind: str = "") -> Optional[int]:
+    """Map a class name (or int) to its priority; None if unknown."""
+    if name is None or name == "":
+        return default_prio(kind)
+    if isinstance(name, int):
+        return name if name in PRIO_NAMES else None
+    return PRIO.get(str(name).strip().lower())
+
+
+class PlaybackQueue:
+    def __init__(self) -> None:
+        self._q: Dict[int, Deque[Job]] = {p: deque() for p in PRIO_NAMES}
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._q.values())
+
+    def push(self, job: Job) -> None:
+        self._q[job.prio].append(job)
+
+    def push_front(self, job: Job) -> None:
+        self._q[job.prio].appendleft(job)
+
+    def peek(self) -> Optional[Job]:
+        for p in sorted(self._q, reverse=True):
+            if self._q[p]:
+                return self._q[p][0]
+        return None
+
+    def pop(self) -> Optional[Job]:
+        for p in sorted(self._q, reverse=True):
+            if self._q[p]:
+                return self._q[p].popleft()
+        return None
+
+    def items(self, prio: Optional[int] = None) -> List[Job]:
+        """Queued items (one class or all), in play order."""
+        out: List[Job] = []
+        for p in sorted(self._q, reverse=True):
+            if prio is None or p == prio:
+                out.extend(self._q[p])
+        return out
+
+    def remove(self, job: Job) -> bool:
+        try:
+            self._q[job.prio].remove(job)
+        except ValueError:
+            return False
+        return True
+
+    def clear(self, prio: Optional[int] = None) -> List[Job]:
+        """Remove queued items (one class or all) and return them."""
+        out: List[Job] = []
+        for p, q in self._q.items():
+            if prio is None or p == prio:
+                out.extend(q)
+                q.clear()
+        return out
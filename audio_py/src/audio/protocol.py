@@ -1,10 +1,58 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+"""
+Socket protocol helpers.
+
+Text (default): one JSON object per line, one JSON reply line per command.
+
+BATCH: {"cmd":"BATCH","cmds":[{...},{...}]} runs the commands back to back
+on the event loop without yielding, so no other client's command lands in
+between (e.g. STOP + ENQUEUE ack/intro). One reply:
+{"ok": <all ok>, "results": [<reply 1>, <reply 2>, ...]}. Commands that
+wait or take over the connection (UNBATCHABLE, "wait":true) are refused
+up front, before anything runs.
+
+Binary: after {"cmd":"BINARY"} (reply {"ok":true,"binary":true}) the
+connection speaks length-prefixed frames:
+
+  <u8 op><u32 BE payload length><payload>
+
+  OP_PING    ->  OP_PING|OP_REPLY, empty
+  OP_STATUS  ->  OP_STATUS|OP_REPLY, STATUS struct (pack_status)
+  OP_STOP    ->  payload b"\\x01" = voice channel only; empty reply
+  OP_JSON    ->  any text command as JSON bytes; JSON reply (no newline)
+  OP_BYTES   ->  PLAY_BYTES header as JSON, then the same u32 chunk
+                 frames as the text variant; replies are OP_JSON frames
+
+Status polls cost a 5-byte request and a 17-byte reply with no JSON on
+either side.
+"""
+
 import json
-from typing import Any, Dict
+import struct
+from typing import Any, Dict, List, Optional, Tuple
 
-__all__ = ["parse_line", "reply"]
+__all__ = [
+    "parse_line",
+    "reply",
+    "parse_batch",
+    "BATCH_MAX",
+    "UNBATCHABLE",
+    "HEADER",
+    "MAX_PAYLOAD",
+    "OP_PING",
+    "OP_STATUS",
+    "OP_STOP",
+    "OP_JSON",
+    "OP_BYTES",
+    "OP_REPLY",
+    "OP_NAMES",
+    "frame",
+    "frame_json",
+    "pack_status",
+    "unpack_status",
+]
 
 
 def parse_line(line: str) -> Dict[str, Any]:
@@ -31,3 +79,90 @@ def reply(obj: Dict[str, Any]) -> bytes:
     Encode a JSON reply as UTF-8 bytes, newline-terminated.
     """
     return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+# ------------------------------------------------------------
+# BATCH
+# ------------------------------------------------------------
+BATCH_MAX = 16
+
+# Commands that suspend or take over the connection.
+UNBATCHABLE = frozenset(("BATCH", "BINARY", "WAIT", "SUBSCRIBE", "PLAY_BYTES"))
+
+
+def parse_batch(cmd: Dict[str, Any]) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+    """BATCH command -> (sub-commands, "") or (None, error message)."""
+    raw = cmd.get("cmds")
+    if not isinstance(raw, list) or not raw or len(raw) > BATCH_MAX:
+        return None, "cmds: 1..%d commands" % BATCH_MAX
+    out: List[Dict[str, Any]] = []
+    for i, sub in enumerate(raw):
+        if not isinstance(sub, dict):
+            return None, "cmd %d: not an object" % i
+        name = str(sub.get("cmd") or "").strip().upper()
+        if not name:
+            return None, "cmd %d: missing cmd" % i
+        if name in UNBATCHABLE or str(sub.get("wait")).strip().lower() in ("1", "true", "yes", "on"):
+            return None, "cmd %d: %s cannot be batched" % (i, name)
+        out.append(sub)
+    return out, ""
+
+
+# ------------------------------------------------------------
+# Binary frames
+# ------------------------------------------------------------
+HEADER = struct.Struct(">BI")
+MAX_PAYLOAD = 1 << 20
+
+OP_PING = 0x01
+OP_STATUS = 0x02
+OP_STOP = 0x03
+OP_JSON = 0x04
+OP_BYTES = 0x05
+OP_REPLY = 0x80
+
+OP_NAMES = {OP_PING: "PING", OP_STATUS: "STATUS", OP_STOP: "STOP", OP_BYTES: "PLAY_BYTES"}
+
+# flags (bit0 playing, bit1 job, bit2 bg), prio (0xFF none), queued, job, bg
+STATUS = struct.Struct(">BBHII")
+
+_F_PLAYING, _F_JOB, _F_BG = 1, 2, 4
+
+
+def frame(op: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(op, len(payload)) + payload
+
+
+def frame_json(op: int, obj: Dict[str, Any]) -> bytes:
+    return frame(op, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+def _job_num(job_id: Any) -> int:
+    s = str(job_id or "")
+    return int(s[1:]) if s[1:].isdigit() else 0
+
+
+def pack_status(st: Dict[str, Any], prio: Optional[int] = None) -> bytes:
+    """Engine status() dict -> STATUS struct; `prio` is the numeric class."""
+    flags = _F_PLAYING if st.get("playing") else 0
+    job = _job_num(st.get("job"))
+    bg = _job_num(st.get("bg"))
+    if job:
+        flags |= _F_JOB
+    if bg:
+        flags |= _F_BG
+    return STATUS.pack(flags, 0xFF if prio is None else prio, min(int(st.get("queued") or 0), 0xFFFF), job, bg)
+
+
+def unpack_status(b: bytes) -> Dict[str, Any]:
+    """STATUS struct -> dict shaped like the JSON STATUS reply (prio numeric)."""
+    flags, prio, queued, job, bg = STATUS.unpack(b[:STATUS.size])
+    d: Dict[str, Any] = {"ok": True, "playing": bool(flags & _F_PLAYING)}
+    if flags & _F_JOB:
+        d["job"] = "j%d" % job
+        if prio != 0xFF:
+            d["prio"] = prio
+    if flags & _F_BG:
+        d["bg"] = "j%d" % bg
+    d["queued"] = queued
+    return d
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Stream racing (PLAY_STREAM_ANY).
+
+Radio fallback used to try station URLs one after another, each one a full
+spawn + alive check. race() connects to a ranked list of URLs in parallel
+and returns the first one that actually delivers MPEG audio:
+
+- one thread per URL: minimal HTTP/1.0 GET (ICY replies and redirects
+  accepted, no Icy-MetaData so the body is plain audio)
+- the body must contain `need` consecutive valid MPEG audio frames
+  (sync word + header + frame length chaining), an ID3v2 tag is skipped;
+  HTML error pages, playlists and silence-before-data don't count
+- a better-ranked URL that validates within `grace_ms` of the first one
+  still wins (ties go to rank, not to luck)
+- losers are closed; the winner keeps its socket and the bytes already
+  read, and pump() hands everything to a ByteFeed (ingest.py)
+
+The caller plays the winner only after it validated, so switching from a
+playing stream is make-before-break.
+"""
+
+import os
+import ssl
+import time
+import socket
+import threading
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import metrics
+
+from . import player
+from .ingest import ByteFeed
+
+__all__ = ["Winner", "race", "mpeg_frames"]
+
+_USER_AGENT = "voxie-audio/1"
+
+# MPEG audio header tables (kbps / Hz); index 0 = free format, 15 = bad
+_BITRATES = {
+    (3, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),   # V1 L3
+    (3, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),  # V1 L2
+    (3, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),  # V1 L1
+    (2, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),       # V2 L2/L3
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),  # V2 L1
+}
+_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+_RACE = metrics.histogram("voxie_audio_race_seconds", "PLAY_STREAM_ANY race start to winner", ("result",))
+
+
+def _log(msg: str) -> None:
+    player._log("[race] " + msg)
+
+
+def _frame_len(h: bytes) -> int:
+    """Length of the MPEG audio frame starting with header `h`, 0 if invalid."""
+    if h[0] != 0xFF or (h[1] & 0xE0) != 0xE0:
+        return 0
+    ver = (h[1] >> 3) & 3      # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5, 1 = reserved
+    layer = (h[1] >> 1) & 3    # 1 = L3, 2 = L2, 3 = L1, 0 = reserved
+    br_i = h[2] >> 4
+    sr_i = (h[2] >> 2) & 3
+    pad = (h[2] >> 1) & 1
+    if ver == 1 or layer == 0 or br_i in (0, 15) or sr_i == 3:
+        return 0
+    kbps = _BITRATES[(3 if ver == 3 else 2, layer)][br_i] * 1000
+    rate = _RATES[ver][sr_i]
+    if layer == 3:
+        return (12 * kbps // rate + pad) * 4
+    if layer == 1 and ver != 3:
+        return 72 * kbps // rate + pad
+    return 144 * kbps // rate + pad
+
+
+def _skip_id3(buf: bytes) -> int:
+    if len(buf) >= 10 and buf[:3] == b"ID3":
+        size = 0
+        for b in buf[6:10]:
+            size = (size << 7) | (b & 0x7F)
+        return 10 + size + (10 if buf[5] & 0x10 else 0)
+    return 0
+
+
+def mpeg_frames(buf: bytes, need: int = 3) -> Optional[bool]:
+    """
+    True once `buf` holds `need` chained frames, False if it never will
+    (garbage), None if more bytes are needed.
+    """
+    start = _skip_id3(buf)
+    if start and len(buf) < start + 4:
+        return None
+    # look for the first sync within a bounded window (junk before audio)
+    limit = min(len(buf) - 4, start + 8192)
+    i = start
+    while i <= limit:
+        if buf[i] == 0xFF:
+            pos, n = i, 0
+            while n < need:
+                if pos + 4 > len(buf):
+                    return None
+                ln = _frame_len(buf[pos:pos + 4])
+                if ln == 0:
+                    break
+                pos += ln
+                n += 1
+            if n >= need:
+                return True
+        i += 1
+    return None if len(buf) < start + 8192 else False
+
+
+# ------------------------------------------------------------
+# HTTP
+# ------------------------------------------------------------
+def _open(url: str, deadline: float, redirects: int = 3) -> Tuple[socket.socket, bytes]:
+    """GET `url`; returns (socket, first body bytes). Raises on failure."""
+    for _ in range(redirects + 1):
+        u = urlsplit(url)
+        if u.scheme not in ("http", "https") or not u.hostname:
+            raise ValueError("bad url")
+        port = u.port or (443 if u.scheme == "https" else 80)
+        left = max(0.05, deadline - time.monotonic())
+        sock = socket.create_connection((u.hostname, port), timeout=left)
+        try:
+            if u.scheme == "https":
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=u.hostname)
+            path = (u.path or "/") + ("?" + u.query if u.query else "")
+            req = "GET %s HTTP/1.0\r\nHost: %s\r\nUser-Agent: %s\r\nAccept: */*\r\n\r\n" % (
+                path, u.netloc, _USER_AGENT)
+            sock.sendall(req.encode("latin-1"))
+
+            head = b""
+            while b"\r\n\r\n" not in head and b"\n\n" not in head:
+                sock.settimeout(max(0.05, deadline - time.monotonic()))
+                data = sock.recv(4096)
+                if not data:
+                    raise ConnectionError("closed in headers")
+                head += data
+                if len(head) > 16384:
+                    raise ValueError("headers too long")
+            sep = b"\r\n\r\n" if b"\r\n\r\n" in head else b"\n\n"
+            raw, body = head.split(sep, 1)
+            lines = raw.decode("latin-1", "replace").splitlines()
+            parts = lines[0].split(None, 2) if lines else []
+            code = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+            if code in (301, 302, 303, 307, 308):
+                loc = ""
+                for ln in lines[1:]:
+                    k, _, v = ln.partition(":")
+                    if k.strip().lower() == "location":
+                        loc = v.strip()
+                if not loc:
+                    raise ValueError("redirect without location")
+                url = loc if "://" in loc else "%s://%s%s" % (u.scheme, u.netloc, loc)
+                sock.close()
+                continue
+            if code != 200:
+                raise ValueError("http %s" % code)
+            return sock, body
+        except Exception:
+            sock.close()
+            raise
+    raise ValueError("too many redirects")
+
+
+class Winner:
+    """Validated stream: live socket + the bytes already read."""
+
+    def __init__(self, url: str, rank: int, sock: socket.socket, head: bytes, ms: float):
+        self.url = url
+        self.rank = rank
+        self.sock = sock
+        self.head = head
+        self.ms = ms
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+    def pump(self, feed: ByteFeed, chunk: int = 4096) -> threading.Thread:
+        """Copy the stream into `feed` on a thread until EOF or the reader is gone."""
+
+        def run() -> None:
+            ok = False
+            try:
+                self.sock.settimeout(10.0)
+                feed.feed(self.head)
+                while not feed.closed:
+                    data = self.sock.recv(chunk)
+                    if not data:
+                        ok = True
+                        break
+                    feed.feed(data)
+            except Exception as e:
+                _log("stream ended: %s (%s)" % (self.url, e))
+            finally:
+                self.close()
+                feed.finish(ok)
+
+        t = threading.Thread(target=run, name="race-pump", daemon=True)
+        t.start()
+        return t
+
+
+class _Race:
+    def __init__(self, n: int, grace: float):
+        self.cv = threading.Condition()
+        self.results: List[Optional[Winner]] = [None] * n
+        self.done = [False] * n
+        self.pending = n
+        self.first_at = 0.0
+        self.grace = grace
+        self.closed = False
+
+
+def _candidate(r: _Race, rank: int, url: str, t0: float, deadline: float, need: int) -> None:
+    win: Optional[Winner] = None
+    sock = None
+    try:
+        sock, buf = _open(url, deadline)
+        while True:
+            verdict = mpeg_frames(buf, need)
+            if verdict:
+                win = Winner(url, rank, sock, buf, (time.monotonic() - t0) * 1000)
+                break
+            if verdict is False:
+                raise ValueError("no MPEG frames")
+            if r.closed:
+                raise ValueError("race over")
+            sock.settimeout(max(0.05, deadline - time.monotonic()))
+            data = sock.recv(4096)
+            if not data:
+                raise ConnectionError("closed before audio")
+            buf += data
+    except Exception as e:
+        _log("lost: %s (%s)" % (url, e))
+        if sock is not None:
+            sock.close()
+
+    with r.cv:
+        r.pending -= 1
+        r.done[rank] = True
+        if win is not None:
+            if r.closed:
+                win.close()
+                win = None
+            else:
+                r.results[rank] = win
+                if not r.first_at:
+                    r.first_at = time.monotonic()
+        r.cv.notify_all()
+
+
+def race(
+    urls: List[str],
+    timeout: float = 0.0,
+    need: int = 3,
+    grace_ms: int = -1,
+) -> Optional[Winner]:
+    """Connect to all `urls` at once; the first one with valid audio wins."""
+    urls = [u for u in (x.strip() for x in urls) if u]
+    if not urls:
+        return None
+    timeout = timeout or float(os.environ.get("VOXIE_RACE_TIMEOUT_MS", "4000")) / 1000.0
+    grace = (grace_ms if grace_ms >= 0 else int(os.environ.get("VOXIE_RACE_GRACE_MS", "150"))) / 1000.0
+
+    t0 = time.monotonic()
+    deadline = t0 + timeout
+    r = _Race(len(urls), grace)
+    for rank, url in enumerate(urls):
+        threading.Thread(
+            target=_candidate, args=(r, rank, url, t0, deadline, need),
+            name="race-%d" % rank, daemon=True,
+        ).start()
+
+    with r.cv:
+        while True:
+            found = [w for w in r.results if w is not None]
+            if found:
+                best = found[0]
+                # a better rank still connecting gets a short grace window
+                waiting_better = not all(r.done[:best.rank])
+                if not waiting_better or time.monotonic() >= r.first_at + grace:
+                    break
+                r.cv.wait(max(0.0, r.first_at + grace - time.monotonic()))
+                continue
+            if r.pending == 0 or time.monotonic() >= deadline:
+                break
+            r.cv.wait(max(0.0, deadline - time.monotonic()))
+
+        r.closed = True
+        found = [w for w in r.results if w is not None]
+
+    if not found:
+        _RACE.observe(time.monotonic() - t0, result="none")
+        return None
+    best = found[0]
+    _RACE.observe(time.monotonic() - t0, result="won")
+    for w in found[1:]:
+        w.close()
+    _log("winner: %s (rank %d, %.0f ms)" % (best.url, best.rank, best.ms))
+    return best
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Warm PCM sink (engine mode "sink").
+
+One long-lived `aplay` reads raw PCM on stdin, so the ALSA/bluealsa device
+is opened once instead of once per playback. Clips are fed by a single
+writer thread:
+
+- WAV files are streamed as-is when they match the sink format, or
+  converted in C via audioop (rate / channels / width) when available
+- MP3 files and streams are decoded by `mpg123 -s` straight to PCM stdout
+  (the decoder still spawns, the output device does not)
+- precompiled assets (cache.py) are sliced out of an mmap'd buffer
+- PLAY_BYTES (ingest.py) clips read a pipe: MP3 through the decoder's
+  stdin, raw PCM converted like WAV
+
+STOP becomes drop(): pending clips are discarded, the current clip stops at
+the next chunk boundary and decoders are killed. What is already in the
+pipe/ALSA buffer still plays out, bounded by a small pipe + buffer-time.
+"""
+
+import os
+import time
+import wave
+import fcntl
+import select
+import threading
+import subprocess
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Iterator, List, Optional
+
+try:
+    import audioop  # C helpers, stdlib until Python 3.12
+except Exception:  # pragma: no cover - depends on interpreter
+    audioop = None  # type: ignore
+
+from . import player
+
+__all__ = ["SinkFormat", "Clip", "PcmSink", "wav_clip", "decoder_clip", "pcm_clip", "fd_clip"]
+
+# Linux fcntl; not exported by the fcntl module on older Pythons
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+
+# aplay that cannot open the device (or dies at once): reopened with backoff
+# (50 ms doubling, at most 1 s), then the clip being written fails
+SINK_RETRIES = int(os.environ.get("VOXIE_SINK_RETRIES", "5"))
+
+
+def _log(msg: str) -> None:
+    player._log("[sink] " + msg)
+
+
+class SinkFormat:
+    """Native PCM format of the sink (S16_LE, interleaved)."""
+
+    __slots__ = ("rate", "channels")
+
+    def __init__(self, rate: int = 44100, channels: int = 2):
+        self.rate = int(rate)
+        self.channels = int(channels)
+
+    @classmethod
+    def from_env(cls) -> "SinkFormat":
+        return cls(
+            rate=int(os.environ.get("VOXIE_SINK_RATE", "44100")),
+            channels=int(os.environ.get("VOXIE_SINK_CH", "2")),
+        )
+
+    @property
+    def frame_bytes(self) -> int:
+        return 2 * self.channels
+
+    def bytes_for_ms(self, ms: int) -> int:
+        return int(self.rate * ms / 1000) * self.frame_bytes
+
+
+class Clip:
+    """
+    One playable item: an iterator of PCM chunks in the sink format.
+
+    on_start() fires when the first chunk reaches the sink, on_end(reason)
+    once with reason "done" | "dropped" | "failed".
+    """
+
+    def __init__(
+        self,
+        chunks: Iterator[bytes],
+        on_start: Optional[Callable[[], None]] = None,
+        on_end: Optional[Callable[[str], None]] = None,
+        close: Optional[Callable[[], None]] = None,
+    ):
+        self.chunks = chunks
+        self.on_start = on_start
+        self.on_end = on_end
+        self._close = close
+        self.dropped = False
+        self._ended = False
+
+    def close(self) -> None:
+        if self._close is not None:
+            try:
+                self._close()
+            except Exception:
+                pass
+            self._close = None
+
+    def end(self, reason: str) -> None:
+        if self._ended:
+            return
+        self._ended = True
+        self.close()
+        if self.on_end is not None:
+            try:
+                self.on_end(reason)
+            except Exception:
+                pass
+
+
+# ------------------------------------------------------------
+# Clip sources
+# ------------------------------------------------------------
+def _wav_chunks(path: str, fmt: SinkFormat, chunk_ms: int) -> Optional[Iterator[bytes]]:
+    try:
+        wf = wave.open(path, "rb")
+    except Exception as e:
+        _log("WAV open failed: %s (%s)" % (path, e))
+        return None
+
+    ch, width, rate = wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+    conv = _converter(ch, width, rate, fmt)
+    if conv is None:
+        wf.close()
+        return None
+
+    frames = max(1, int(rate * chunk_ms / 1000))
+
+    def gen() -> Iterator[bytes]:
+        try:
+            while True:
+                data = wf.readframes(frames)
+                if not data:
+                    break
+                yield conv(data)
+        finally:
+            wf.close()
+
+    return gen()
+
+
+def _converter(ch: int, width: int, rate: int, fmt: SinkFormat) -> Optional[Callable[[bytes], bytes]]:
+    """PCM -> sink format (identity when native), None if unsupported."""
+    if ch == fmt.channels and width == 2 and rate == fmt.rate:
+        return lambda data: data
+    if audioop is None or ch not in (1, 2):
+        return None
+    state = [None]
+
+    def conv(data: bytes) -> bytes:
+        if width != 2:
+            data = audioop.lin2lin(data, width, 2)
+        if ch == 2 and fmt.channels == 1:
+            data = audioop.tomono(data, 2, 0.5, 0.5)
+        elif ch == 1 and fmt.channels == 2:
+            data = audioop.tostereo(data, 2, 1.0, 1.0)
+        if rate != fmt.rate:
+            data, state[0] = audioop.ratecv(data, 2, fmt.channels, rate, fmt.rate, state[0])
+        return data
+
+    return conv
+
+
+def wav_clip(path: str, fmt: SinkFormat, chunk_ms: int = 20, **kw) -> Optional[Clip]:
+    """Clip for a WAV file, or None if it cannot be fed to the sink."""
+    p = Path(path)
+    if not p.exists() or p.stat().st_size == 0:
+        _log("WAV not found: %s" % p)
+        return None
+    chunks = _wav_chunks(str(p), fmt, chunk_ms)
+    return Clip(chunks, **kw) if chunks is not None else None
+
+
+def pcm_clip(buf: memoryview, fmt: SinkFormat, chunk_ms: int = 20, **kw) -> Clip:
+    """Clip over an in-memory PCM buffer already in the sink format."""
+    size = fmt.bytes_for_ms(chunk_ms)
+
+    def gen() -> Iterator[bytes]:
+        for off in range(0, len(buf), size):
+            yield buf[off:off + size]
+
+    return Clip(gen(), **kw)
+
+
+def _decoder_cmd(src: str, fmt: SinkFormat) -> List[str]:
+    mode = "--mono" if fmt.channels == 1 else "--stereo"
+    return ["mpg123", "--no-control", "-q", "-s", "-e", "s16", "-r", str(fmt.rate), mode, src]
+
+
+def fd_clip(fd: int, rate: int, channels: int, fmt: SinkFormat, chunk_ms: int = 20, **kw) -> Optional[Clip]:
+    """Clip reading raw S16_LE PCM from a pipe fd (not closed by the clip)."""
+    conv = _converter(channels, 2, rate, fmt)
+    if conv is None:
+        return None
+    size = max(2 * channels, int(rate * chunk_ms / 1000) * 2 * channels)
+    clip: Optional[Clip] = None
+
+    def gen() -> Iterator[bytes]:
+        rest = b""
+        while clip is None or not clip.dropped:
+            # wake up now and then so a drop() is seen while the feed stalls
+            if not select.select([fd], [], [], 0.1)[0]:
+                continue
+            data = os.read(fd, size)
+            if not data:
+                break
+            data = rest + data
+            cut = len(data) - len(data) % (2 * channels)
+            rest = data[cut:]
+            if cut:
+                yield conv(data[:cut])
+
+    clip = Clip(gen(), **kw)
+    return clip
+
+
+def decoder_clip(src: str, fmt: SinkFormat, chunk_ms: int = 20, stdin: Optional[int] = None, **kw) -> Optional[Clip]:
+    """Clip decoding an MP3 path or http(s) stream (or "-" + stdin fd) with `mpg123 -s`."""
+    try:
+        proc = subprocess.Popen(
+            _decoder_cmd(src, fmt),
+            stdin=subprocess.DEVNULL if stdin is None else stdin,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            close_fds=True,
+        )
+    except Exception as e:
+        _log("decoder spawn failed: %s" % e)
+        return None
+
+    size = fmt.bytes_for_ms(chunk_ms)
+
+    def gen() -> Iterator[bytes]:
+        assert proc.stdout is not None
+        while True:
+            data = proc.stdout.read(size)
+            if not data:
+                break
+            yield data
+        if proc.wait() != 0:
+            raise RuntimeError("decoder exit=%s" % proc.returncode)
+
+    def close() -> None:
+        if proc.poll() is None:
+            proc.kill()
+        try:
+            proc.wait(timeout=1.0)
+        except Exception:
+            pass
+        if proc.stdout is not None:
+            proc.stdout.close()
+
+    return Clip(gen(), close=close, **kw)
+
+
+# ------------------------------------------------------------
+# Sink
+# ------------------------------------------------------------
+class PcmSink:
+    """Single long-lived aplay process fed by a writer thread."""
+
+    def __init__(
+        self,
+        fmt: Optional[SinkFormat] = None,
+        device: Optional[str] = None,
+        buffer_ms: int = 0,
+        pipe_bytes: int = 4096,
+        cmd: Optional[List[str]] = None,
+    ):
+        self.fmt = fmt or SinkFormat.from_env()
+        self.device = device or player._alsa_device()
+        self.buffer_ms = buffer_ms or int(os.environ.get("VOXIE_SINK_BUFFER_MS", "120"))
+        self.pipe_bytes = pipe_bytes
+        self._cmd = cmd
+
+        self._proc: Optional[subprocess.Popen] = None
+        self._opened = 0.0
+        self._fails = 0
+        self._pending: Deque[Clip] = deque()
+        self._current: Optional[Clip] = None
+        self._cv = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    # -------- process --------
+    def command(self) -> List[str]:
+        if self._cmd:
+            return list(self._cmd)
+        return [
+            "aplay", "-q", "-D", self.device,
+            "-t", "raw", "-f", "S16_LE",
+            "-r", str(self.fmt.rate), "-c", str(self.fmt.channels),
+            "--buffer-time=%d" % (self.buffer_ms * 1000),
+        ]
+
+    def _ensure_proc(self) -> subprocess.Popen:
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            return proc
+        _log("open: " + " ".join(self.command()))
+        proc = subprocess.Popen(
+            self.command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            close_fds=True,
+            bufsize=0,
+        )
+        assert proc.stdin is not None
+        try:
+            # Small pipe: drop() must not leave seconds of audio queued.
+            fcntl.fcntl(proc.stdin.fileno(), F_SETPIPE_SZ, self.pipe_bytes)
+        except OSError:
+            pass
+        self._proc = proc
+        self._opened = time.monotonic()
+        return proc
+
+    # -------- lifecycle --------
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        try:
+            self._ensure_proc()
+        except Exception as e:
+            _log("open failed: %s" % e)
+        self._thread = threading.Thread(target=self._writer, name="pcm-sink", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        with self._cv:
+            self._running = False
+            self._cv.notify_all()
+        self.drop()
+        proc = self._proc
+        self._proc = None
+        if proc is not None:
+            try:
+                if proc.stdin is not None:
+                    proc.stdin.close()
+            except Exception:
+                pass
+            player._terminate(proc, wait=False)
+
+    # -------- clips --------
+    def submit(self, clip: Clip) -> None:
+        with self._cv:
+            self._pending.append(clip)
+            self._cv.notify()
+
+    def drop(self, current: bool = True) -> None:
+        """Discard everything queued and (unless current=False) cut the current clip."""
+        with self._cv:
+            pending = list(self._pending)
+            self._pending.clear()
+            cur = self._current if current else None
+        for clip in pending:
+            clip.dropped = True
+            clip.end("dropped")
+        if cur is not None:
+            cur.dropped = True
+            # unblocks a decoder read; the writer reports the end
+            cur.close()
+
+    def busy(self) -> bool:
+        with self._cv:
+            return self._current is not None or bool(self._pending)
+
+    def _write(self, data: bytes, dropped: Callable[[], bool] = lambda: False) -> bool:
+        """
+        All of `data` into aplay, reopening it when it died. False once
+        dropped() (STOP while aplay is down) or after SINK_RETRIES reopens
+        without one that stayed up: the caller fails its clip instead of
+        spinning. A write into a fresh aplay proves nothing (the pipe takes
+        it before a bad device makes aplay exit), one that lived 1 s does.
+        """
+        mv = memoryview(data)
+        while mv:
+            if dropped():
+                return False
+            try:
+                proc = self._ensure_proc()
+                assert proc.stdin is not None
+                n = proc.stdin.write(mv)
+            except (BrokenPipeError, OSError, ValueError) as e:
+                self._proc = None
+                self._fails += 1
+                if self._fails > SINK_RETRIES:
+                    _log("sink: %d reopens failed, giving up on the clip (%s)" % (SINK_RETRIES, e))
+                    self._fails = 0
+                    return False
+                _log("sink died, reopening")
+                time.sleep(min(1.0, 0.05 * (1 << (self._fails - 1))))
+                continue
+            if self._fails and time.monotonic() - self._opened > 1.0:
+                self._fails = 0
+            mv = mv[n or 0:]
+        return True
+
+    def _writer(self) -> None:
+        while True:
+            with self._cv:
+                while self._running and not self._pending:
+                    self._cv.wait()
+                if not self._running:
+                    return
+                clip = self._pending.popleft()
+                self._current = clip
+
+            reason = "done"
+            started = False
+            try:
+                for chunk in clip.chunks:
+                    if clip.dropped:
+                        break
+                    if not self._write(chunk, lambda: clip.dropped):
+                        if not clip.dropped:
+                            reason = "failed"
+                        break
+                    if not started:
+                        started = True
+                        if clip.on_start is not None:
+                            clip.on_start()
+            except Exception as e:
+                _log("clip failed: %s" % e)
+                reason = "failed"
+
+            if clip.dropped:
+                reason = "dropped"
+            elif not started and reason == "done":
+                reason = "failed"
+
+            with self._cv:
+                self._current = None
+            clip.end(reason)
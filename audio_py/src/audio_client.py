@@ -1,15 +1,73 @@
 from __future__ import annotations
 
+"""
+Clients for the audio daemon's UNIX socket.
+
+The async daemon keeps connections open and answers every command line
+with exactly one JSON line, in order. Both clients use that:
+
+- one persistent connection, opened on first use and reopened after any
+  error (a daemon restart, a timeout mid-reply)
+- replies are read up to the newline, however the kernel splits them
+- pipeline([...]) writes several commands in one send and reads the
+  replies back in order (STOP + PLAY costs one round trip)
+
+AudioClient is the blocking one (thread-safe: one request at a time per
+client); AsyncAudioClient is the same API for asyncio code.
+BinaryAudioClient speaks the binary frames (audio/protocol.py) for
+high-rate status polling.
+
+A command is resent on a fresh connection only when it cannot have
+reached the daemon (send failed on a reused connection) or when it is
+idempotent (SAFE_RETRY) and the daemon closed before replying.
+"""
+
 import os
 import socket
 import json
-from typing import Any, Dict
+import asyncio
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from audio.protocol import HEADER, OP_JSON, OP_PING, OP_REPLY, OP_STATUS, OP_STOP, frame, unpack_status
 
 # Default UNIX socket path used by the audio daemon.
 # Can be overridden via environment variable for portability.
 DEFAULT_SOCK = os.environ.get("VOXIE_AUDIO_SOCK", "/tmp/bitvox_audio.sock")
 
-__all__ = ["AudioClient", "DEFAULT_SOCK"]
+__all__ = ["AudioClient", "AsyncAudioClient", "BinaryAudioClient", "DEFAULT_SOCK", "SAFE_RETRY"]
+
+# Commands that can be replayed if the connection dies before the reply.
+SAFE_RETRY = frozenset(("PING", "HELLO", "STOP", "STATUS", "STATS", "JOB_STATUS", "CLEAR"))
+
+_MAX_LINE = 1 << 20
+
+
+def _encode(payloads: List[Dict[str, Any]]) -> bytes:
+    return b"".join((json.dumps(p, ensure_ascii=False) + "\n").encode("utf-8") for p in payloads)
+
+
+def _decode(line: bytes) -> Dict[str, Any]:
+    data = line.decode("utf-8", errors="replace").strip()
+    if not data:
+        return {"ok": False, "err": "EMPTY_REPLY"}
+    try:
+        r = json.loads(data)
+    except Exception:
+        return {"ok": False, "err": "BAD_JSON_REPLY", "raw": data}
+    return r if isinstance(r, dict) else {"ok": False, "err": "BAD_JSON_REPLY", "raw": data}
+
+
+def _replayable(payloads: List[Dict[str, Any]]) -> bool:
+    return all(str(p.get("cmd", "")).strip().upper() in SAFE_RETRY for p in payloads)
+
+
+class _Stale(Exception):
+    """Reused connection found closed; `sent` tells whether the bytes went out."""
+
+    def __init__(self, sent: bool):
+        super().__init__("stale connection")
+        self.sent = sent
 
 
 class AudioClient:
@@ -19,44 +77,198 @@ class AudioClient:
 
     Protocol assumptions (must not change):
     - send: JSON payload followed by newline
-    - receive: single JSON reply
+    - receive: single JSON reply (one line) per payload
+
+    Connection errors raise OSError, like the original one-shot client.
     """
 
-    def __init__(self, sock_path: str = DEFAULT_SOCK):
+    def __init__(self, sock_path: str = DEFAULT_SOCK, timeout: Optional[float] = None):
         self.sock_path = sock_path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._buf = bytearray()
+        self._lock = threading.Lock()
 
-    def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        msg = json.dumps(payload, ensure_ascii=False)
+    # -------- connection --------
+    def _connect(self) -> socket.socket:
         s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         try:
+            s.settimeout(self.timeout)
             s.connect(self.sock_path)
-            # Protocol framing: JSON + newline
-            s.sendall((msg + "\n").encode("utf-8"))
+        except Exception:
+            s.close()
+            raise
+        self._sock = s
+        self._buf.clear()
+        return s
 
-            data = s.recv(65536).decode("utf-8", errors="replace").strip()
-            if not data:
-                return {"ok": False, "err": "EMPTY_REPLY"}
+    def close(self) -> None:
+        with self._lock:
+            self._drop()
 
+    def abort(self) -> None:
+        """From another thread: break the connection under a request in flight (it fails at once)."""
+        s = self._sock
+        if s is not None:
             try:
-                return json.loads(data)
-            except Exception:
-                return {"ok": False, "err": "BAD_JSON_REPLY", "raw": data}
-        finally:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _drop(self) -> None:
+        if self._sock is not None:
             try:
-                s.close()
+                self._sock.close()
             except Exception:
                 pass
+        self._sock = None
+        self._buf.clear()
+
+    def __enter__(self) -> "AudioClient":
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
+
+    def _readline(self, s: socket.socket) -> bytes:
+        while True:
+            i = self._buf.find(b"\n")
+            if i >= 0:
+                line = bytes(self._buf[:i])
+                del self._buf[:i + 1]
+                return line
+            if len(self._buf) > _MAX_LINE:
+                raise ValueError("reply too long")
+            data = s.recv(65536)
+            if not data:
+                raise EOFError
+            self._buf += data
+
+    def _exchange(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        reused = self._sock is not None
+        s = self._sock or self._connect()
+        try:
+            s.sendall(_encode(payloads))
+        except OSError:
+            self._drop()
+            if reused:
+                raise _Stale(sent=False)
+            raise
+        out: List[Dict[str, Any]] = []
+        try:
+            for _ in payloads:
+                out.append(_decode(self._readline(s)))
+        except EOFError:
+            self._drop()
+            if reused and not out:
+                raise _Stale(sent=True)
+            out.extend({"ok": False, "err": "EMPTY_REPLY"} for _ in payloads[len(out):])
+        except Exception:
+            # timeout / garbage mid-reply: framing is lost, start over next time
+            self._drop()
+            raise
+        return out
+
+    # -------- requests --------
+    def pipeline(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send all `payloads` at once; replies come back in the same order."""
+        if not payloads:
+            return []
+        with self._lock:
+            try:
+                return self._exchange(payloads)
+            except _Stale as e:
+                if e.sent and not _replayable(payloads):
+                    return [{"ok": False, "err": "EMPTY_REPLY"} for _ in payloads]
+                return self._exchange(payloads)
+
+    def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self.pipeline([payload])[0]
+
+    request = _send
 
     def ping(self) -> bool:
         r = self._send({"cmd": "PING"})
         return bool(r.get("ok") and r.get("pong") is True)
 
-    def stop(self) -> Dict[str, Any]:
-        return self._send({"cmd": "STOP"})
+    def stop(self, fg_only: bool = False) -> Dict[str, Any]:
+        return self._send({"cmd": "STOP", "fg": True} if fg_only else {"cmd": "STOP"})
 
     def status(self) -> Dict[str, Any]:
         return self._send({"cmd": "STATUS"})
 
+    def stats(self) -> Dict[str, Any]:
+        return self._send({"cmd": "STATS"})
+
+    def play(self, kind: str, target: str, prio: Optional[str] = None, wait: bool = False) -> Dict[str, Any]:
+        """kind: "wav" | "mp3" | "stream"."""
+        return self._send(_play_cmd(kind, target, prio, wait))
+
+    def stop_and_play(self, kind: str, target: str, prio: Optional[str] = None) -> Dict[str, Any]:
+        """Barge-in: STOP + PLAY in one round trip; returns the PLAY reply."""
+        return self.pipeline([{"cmd": "STOP"}, _play_cmd(kind, target, prio, False)])[1]
+
+    def enqueue(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return self._send({"cmd": "ENQUEUE", "items": items})
+
+    def batch(self, cmds: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run `cmds` atomically on the daemon: {"ok": all ok, "results": [...]}."""
+        return self._send({"cmd": "BATCH", "cmds": cmds})
+
+    def job_status(self, job: str) -> Dict[str, Any]:
+        return self._send({"cmd": "JOB_STATUS", "job": job})
+
+    def wait(self, job: str, timeout_ms: int = 30000, until: str = "done") -> Dict[str, Any]:
+        """Block until a PLAY job reaches `until` ("done" or "started")."""
+        return self._send({"cmd": "WAIT", "job": job, "until": until, "timeout_ms": timeout_ms})
+
+    def subscribe(
+        self,
+        jobs: Optional[List[str]] = None,
+        events: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield job events pushed by the daemon (SUBSCRIBE) as they happen:
+        {"event": "started|finished|failed|preempted|stopped", "id": "j1", ...}
+
+        One connection for the whole subscription, no polling (its own,
+        not the pooled one: it becomes a push channel). Ends when the
+        daemon closes, after `timeout` seconds without events, or when the
+        generator is closed.
+        """
+        payload: Dict[str, Any] = {"cmd": "SUBSCRIBE"}
+        if jobs:
+            payload["jobs"] = list(jobs)
+        if events:
+            payload["events"] = list(events)
+
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.settimeout(timeout)
+            s.connect(self.sock_path)
+            s.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            f = s.makefile("rb")
+            ack = json.loads(f.readline() or b"{}")
+            if not ack.get("subscribed"):
+                return
+            while True:
+                try:
+                    line = f.readline()
+                except socket.timeout:
+                    return
+                if not line:
+                    return
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        finally:
+            try:
+                s.close()
+            except Exception:
+                pass
+
     def is_playing(self) -> bool:
         """
         Returns True if audio playback is currently active.
@@ -73,3 +285,222 @@ class AudioClient:
         if "is_playing" in r:
             return bool(r.get("is_playing"))
         return False
+
+
+def _play_cmd(kind: str, target: str, prio: Optional[str], wait: bool) -> Dict[str, Any]:
+    k = kind.lower()
+    cmd: Dict[str, Any] = {"cmd": "PLAY_" + k.upper()}
+    cmd["url" if k == "stream" else "path"] = target
+    if prio:
+        cmd["prio"] = prio
+    if wait:
+        cmd["wait"] = True
+    return cmd
+
+
+class AsyncAudioClient:
+    """asyncio version of AudioClient (same commands, same reconnect rules)."""
+
+    def __init__(self, sock_path: str = DEFAULT_SOCK, timeout: Optional[float] = None):
+        self.sock_path = sock_path
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_unix_connection(self.sock_path, limit=_MAX_LINE)
+
+    def _drop(self) -> None:
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        self._reader = self._writer = None
+
+    async def close(self) -> None:
+        w = self._writer
+        self._drop()
+        if w is not None and hasattr(w, "wait_closed"):
+            try:
+                await w.wait_closed()
+            except Exception:
+                pass
+
+    async def __aenter__(self) -> "AsyncAudioClient":
+        return self
+
+    async def __aexit__(self, *_exc: Any) -> None:
+        await self.close()
+
+    async def _exchange(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        reused = self._writer is not None
+        if not reused:
+            await self._connect()
+        reader, writer = self._reader, self._writer
+        assert reader is not None and writer is not None
+        try:
+            writer.write(_encode(payloads))
+            await writer.drain()
+        except OSError:
+            self._drop()
+            if reused:
+                raise _Stale(sent=False)
+            raise
+        out: List[Dict[str, Any]] = []
+        try:
+            for _ in payloads:
+                line = await reader.readline()
+                if not line.endswith(b"\n"):
+                    raise EOFError
+                out.append(_decode(line))
+        except EOFError:
+            self._drop()
+            if reused and not out:
+                raise _Stale(sent=True)
+            out.extend({"ok": False, "err": "EMPTY_REPLY"} for _ in payloads[len(out):])
+        except BaseException:
+            # cancelled / timed out mid-reply: framing is lost
+            self._drop()
+            raise
+        return out
+
+    async def _locked(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self._lock is None:
+            # created lazily: on 3.7 a Lock binds to the loop current at creation
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                return await self._exchange(payloads)
+            except _Stale as e:
+                if e.sent and not _replayable(payloads):
+                    return [{"ok": False, "err": "EMPTY_REPLY"} for _ in payloads]
+                return await self._exchange(payloads)
+
+    async def pipeline(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send all `payloads` at once; replies come back in the same order."""
+        if not payloads:
+            return []
+        if self.timeout is None:
+            return await self._locked(payloads)
+        return await asyncio.wait_for(self._locked(payloads), self.timeout)
+
+    async def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return (await self.pipeline([payload]))[0]
+
+    async def ping(self) -> bool:
+        r = await self.request({"cmd": "PING"})
+        return bool(r.get("ok") and r.get("pong") is True)
+
+    async def stop(self, fg_only: bool = False) -> Dict[str, Any]:
+        return await self.request({"cmd": "STOP", "fg": True} if fg_only else {"cmd": "STOP"})
+
+    async def status(self) -> Dict[str, Any]:
+        return await self.request({"cmd": "STATUS"})
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self.request({"cmd": "STATS"})
+
+    async def play(self, kind: str, target: str, prio: Optional[str] = None, wait: bool = False) -> Dict[str, Any]:
+        return await self.request(_play_cmd(kind, target, prio, wait))
+
+    async def stop_and_play(self, kind: str, target: str, prio: Optional[str] = None) -> Dict[str, Any]:
+        return (await self.pipeline([{"cmd": "STOP"}, _play_cmd(kind, target, prio, False)]))[1]
+
+    async def enqueue(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self.request({"cmd": "ENQUEUE", "items": items})
+
+    async def batch(self, cmds: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self.request({"cmd": "BATCH", "cmds": cmds})
+
+    async def job_status(self, job: str) -> Dict[str, Any]:
+        return await self.request({"cmd": "JOB_STATUS", "job": job})
+
+    async def wait(self, job: str, timeout_ms: int = 30000, until: str = "done") -> Dict[str, Any]:
+        return await self.request({"cmd": "WAIT", "job": job, "until": until, "timeout_ms": timeout_ms})
+
+
+class BinaryAudioClient:
+    """
+    Binary-mode connection (BINARY): PING / STATUS / STOP as 5-byte
+    frames, anything else as a JSON frame. Persistent; any error drops the
+    connection and the next call reconnects.
+    """
+
+    def __init__(self, sock_path: str = DEFAULT_SOCK, timeout: Optional[float] = None):
+        self.sock_path = sock_path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.settimeout(self.timeout)
+            s.connect(self.sock_path)
+            s.sendall(b'{"cmd":"BINARY"}\n')
+            ack = b""
+            while not ack.endswith(b"\n"):
+                data = s.recv(1)
+                if not data:
+                    raise ConnectionError("closed during BINARY handshake")
+                ack += data
+            if not _decode(ack).get("binary"):
+                raise ConnectionError("daemon without binary mode")
+        except Exception:
+            s.close()
+            raise
+        self._sock = s
+        return s
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def __enter__(self) -> "BinaryAudioClient":
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
+
+    def _recv_exact(self, s: socket.socket, n: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < n:
+            data = s.recv(n - len(buf))
+            if not data:
+                raise ConnectionError("closed mid-frame")
+            buf += data
+        return bytes(buf)
+
+    def _call(self, op: int, payload: bytes = b"") -> bytes:
+        with self._lock:
+            s = self._sock or self._connect()
+            try:
+                s.sendall(frame(op, payload))
+                rop, n = HEADER.unpack(self._recv_exact(s, HEADER.size))
+                body = self._recv_exact(s, n) if n else b""
+            except Exception:
+                s.close()
+                self._sock = None
+                raise
+        if rop == OP_JSON | OP_REPLY and op != OP_JSON:
+            raise ValueError(_decode(body).get("err") or "bad reply")
+        return body
+
+    def ping(self) -> bool:
+        self._call(OP_PING)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """Same keys as STATUS, "prio" numeric (audio.playqueue.PRIO)."""
+        return unpack_status(self._call(OP_STATUS))
+
+    def stop(self, fg_only: bool = False) -> Dict[str, Any]:
+        self._call(OP_STOP, b"\x01" if fg_only else b"")
+        return {"ok": True}
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return _decode(self._call(OP_JSON, json.dumps(payload, ensure_ascii=False).encode("utf-8")))
@@ -0,0 +1,741 @@
+from __future__ import annotations
+
+"""
+Local HTTP gateway: pooled keep-alive connections to the cloud APIs.
+
+asr_transcribe_wav(), tts_mp3_cached(), llm_call() and
+semantic_intent_guess() each opened a fresh cURL handle in a fresh PHP
+process, so a turn paid DNS + TCP + TLS up to four times. The gateway
+(bin/http_gateway.py) keeps the connections instead; PHP
+(php/core/gateway.php) and Python (GatewayClient) send their requests
+through it on VOXIE_GW_SOCK:
+
+- one Upstream per origin (scheme://host:port): idle connections are
+  reused newest first, dropped after VOXIE_GW_IDLE_SEC or when the
+  server closed them; at most VOXIE_GW_MAX_CONN requests in flight per
+  origin, more wait for a slot
+- a Policy per kind (asr | tts | llm | embed | other): timeout, retries,
+  hedge delay; VOXIE_GW_<KIND>_TIMEOUT / _RETRIES / _HEDGE_MS override
+- a reused connection that turns out closed is retried once on a new
+  one without counting as a retry; connect errors and 502/503/504 are
+  retried `retries` times; a timeout is never retried
+- hedging: no response headers after hedge_ms -> the same request goes
+  out on a second connection (only if a slot is free), the first
+  response wins and the other connection is closed
+
+Wire format (connections stay open, one exchange at a time):
+    -> {"cmd":"HTTP","kind":"tts","method":"POST","url":"https://...",
+        "headers":{"Authorization":"Bearer .."},"body_len":123}\n + 123 bytes
+    <- {"ok":true,"status":200,"headers":{..},"conn":"new|reused",
+        "tries":1,"hedged":false,"ms":84}\n
+       then the body as <u32 BE len><bytes> frames and <u32 0> (the
+       PLAY_BYTES framing); an upstream that breaks off mid-body ends
+       the stream with <u32 0xFFFFFFFF> instead
+    <- {"ok":false,"err":"TIMEOUT|CONNECT|BUSY|BAD_REQUEST",..}\n  (no frames)
+    {"cmd":"PING"} and {"cmd":"STATS"} answer one JSON line.
+"""
+
+import os
+import ssl
+import json
+import time
+import queue
+import select
+import socket
+import struct
+import threading
+import http.client
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import metrics
+
+__all__ = [
+    "DEFAULT_SOCK", "Policy", "policy", "Upstream", "Gateway", "GatewayError",
+    "GatewayServer", "GatewayClient", "Response",
+]
+
+DEFAULT_SOCK = os.environ.get("VOXIE_GW_SOCK", "/tmp/bitvox_gw.sock")
+
+FRAME = struct.Struct(">I")
+ABORT = 0xFFFFFFFF
+CHUNK = 16384
+MAX_HEADER = 64 * 1024
+MAX_BODY = 32 << 20
+
+_RETRY_STATUS = frozenset((502, 503, 504))
+
+_REQS = metrics.counter("voxie_gw_requests_total", "Requests through the HTTP gateway", ("kind", "result"))
+_CONNS = metrics.counter("voxie_gw_connections_total", "Upstream connections used, new or reused", ("origin", "conn"))
+_HEADERS = metrics.histogram("voxie_gw_headers_seconds", "Gateway request to upstream response headers", ("kind",))
+_HEDGES = metrics.counter("voxie_gw_hedges_total", "Hedged requests by the attempt that won", ("kind", "winner"))
+
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+class Policy(NamedTuple):
+    timeout: float      # seconds per socket operation (connect, headers, each body read)
+    retries: int        # extra attempts after a connect error or 502/503/504
+    hedge_ms: int       # 0 = never hedge
+
+
+_POLICIES = {
+    "asr": Policy(30.0, 1, 0),
+    "tts": Policy(30.0, 1, 0),
+    "llm": Policy(20.0, 1, 0),
+    "embed": Policy(8.0, 1, 700),   # routing waits on it, and it is cheap to send twice
+    "other": Policy(15.0, 0, 0),
+}
+
+
+def policy(kind: str) -> Policy:
+    kind = kind if kind in _POLICIES else "other"
+    base = _POLICIES[kind]
+    k = kind.upper()
+    return Policy(
+        _env_num(f"VOXIE_GW_{k}_TIMEOUT", base.timeout),
+        int(_env_num(f"VOXIE_GW_{k}_RETRIES", base.retries)),
+        int(_env_num(f"VOXIE_GW_{k}_HEDGE_MS", base.hedge_ms)),
+    )
+
+
+class GatewayError(Exception):
+    """Request failed before a response: err is TIMEOUT | CONNECT | BUSY | BAD_REQUEST."""
+
+    def __init__(self, err: str, msg: str = ""):
+        super().__init__(f"{err}: {msg}" if msg else err)
+        self.err = err
+        self.msg = msg
+
+
+class _Conn:
+    __slots__ = ("http", "uses", "idle_since")
+
+    def __init__(self, conn: http.client.HTTPConnection):
+        self.http = conn
+        self.uses = 0
+        self.idle_since = 0.0
+
+    def closed_by_peer(self) -> bool:
+        """An idle keep-alive socket that is readable has seen FIN (or stray bytes): unusable."""
+        sock = self.http.sock
+        if sock is None:
+            return True
+        try:
+            r, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(r)
+
+    def close(self) -> None:
+        try:
+            self.http.close()
+        except Exception:
+            pass
+
+
+class Upstream:
+    """Keep-alive connections to one origin, at most max_conn in use at a time."""
+
+    def __init__(self, origin: str, max_conn: int = 4, idle_sec: float = 50.0,
+                 ctx: Optional[ssl.SSLContext] = None):
+        u = urlsplit(origin)
+        self.origin = origin
+        self.tls = u.scheme == "https"
+        self.host = u.hostname or ""
+        self.port = u.port or (443 if self.tls else 80)
+        self.max_conn = max_conn
+        self.idle_sec = idle_sec
+        self._ctx = ctx
+        self._idle: List[_Conn] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_conn)
+        self.busy = 0
+        self.connects = 0
+        self.reuses = 0
+
+    def _connect(self, timeout: float) -> _Conn:
+        if self.tls:
+            if self._ctx is None:
+                self._ctx = ssl.create_default_context()
+            h: http.client.HTTPConnection = http.client.HTTPSConnection(
+                self.host, self.port, timeout=timeout, context=self._ctx)
+        else:
+            h = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        h.connect()
+        with self._lock:
+            self.connects += 1
+        _CONNS.inc(origin=self.origin, conn="new")
+        return _Conn(h)
+
+    def _pop_idle(self) -> Optional[_Conn]:
+        now = time.monotonic()
+        drop: List[_Conn] = []
+        found = None
+        with self._lock:
+            keep = []
+            for c in self._idle:
+                (keep if now - c.idle_since <= self.idle_sec else drop).append(c)
+            self._idle = keep
+            while self._idle:
+                c = self._idle.pop()
+                if not c.closed_by_peer():
+                    found = c
+                    break
+                drop.append(c)
+        for c in drop:
+            c.close()
+        return found
+
+    def checkout(self, timeout: float, wait: bool = True, fresh: bool = False) -> Tuple[_Conn, bool]:
+        """A connection and whether it is reused; holds a slot until checkin()."""
+        ok = self._slots.acquire(True, timeout) if wait else self._slots.acquire(False)
+        if not ok:
+            raise GatewayError("BUSY", self.origin)
+        with self._lock:
+            self.busy += 1
+        try:
+            c = None if fresh else self._pop_idle()
+            if c is not None:
+                with self._lock:
+                    self.reuses += 1
+                _CONNS.inc(origin=self.origin, conn="reused")
+                c.http.sock.settimeout(timeout)
+                return c, True
+            return self._connect(timeout), False
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def checkin(self, c: _Conn, reusable: bool) -> None:
+        if reusable:
+            c.uses += 1
+            c.idle_since = time.monotonic()
+            with self._lock:
+                self._idle.append(c)
+        else:
+            c.close()
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self.busy -= 1
+        self._slots.release()
+
+    def warm(self, timeout: float = 5.0) -> None:
+        """Open one connection ahead of the first request."""
+        c, _ = self.checkout(timeout)
+        self.checkin(c, True)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for c in idle:
+            c.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"connects": self.connects, "reuses": self.reuses, "idle": len(self._idle), "busy": self.busy}
+
+
+class _Attempt:
+    """One of the racing attempts of a hedged request; cancel() aborts it from another thread."""
+
+    def __init__(self) -> None:
+        self.conn: Optional[_Conn] = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def _abort(self) -> None:
+        sock = self.conn.http.sock if self.conn is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)   # wakes up a getresponse() blocked on it
+            except OSError:
+                pass
+
+    def bind(self, c: _Conn) -> None:
+        with self._lock:
+            self.conn = c
+            if self.cancelled:
+                self._abort()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            self._abort()
+
+
+class Fetch:
+    """An upstream response whose body is still on the connection."""
+
+    def __init__(self, up: Upstream, conn: _Conn, resp: http.client.HTTPResponse, meta: Dict[str, Any]):
+        self.up = up
+        self.conn = conn
+        self.resp = resp
+        self.meta = meta
+        self._done = False
+
+    def finish(self, complete: bool) -> None:
+        """Give the connection back: reusable only after the whole body was read."""
+        if self._done:
+            return
+        self._done = True
+        reusable = complete and not self.resp.will_close
+        if reusable:
+            self.resp.close()   # read1() leaves a fully read response "open": http.client won't send on it
+        self.up.checkin(self.conn, reusable)
+
+
+class Gateway:
+    """Upstream pools plus the retry / hedging policy around one request."""
+
+    def __init__(self, max_conn: Optional[int] = None, idle_sec: Optional[float] = None):
+        self.max_conn = max_conn or int(_env_num("VOXIE_GW_MAX_CONN", 4))
+        self.idle_sec = idle_sec if idle_sec is not None else _env_num("VOXIE_GW_IDLE_SEC", 50.0)
+        self._ups: Dict[str, Upstream] = {}
+        self._lock = threading.Lock()
+        self._ctx: Optional[ssl.SSLContext] = None
+
+    def upstream(self, url: str) -> Upstream:
+        u = urlsplit(url)
+        if u.scheme not in ("http", "https") or not u.hostname:
+            raise GatewayError("BAD_REQUEST", f"bad url: {url[:80]}")
+        origin = f"{u.scheme}://{u.hostname}" + (f":{u.port}" if u.port else "")
+        with self._lock:
+            up = self._ups.get(origin)
+            if up is None:
+                if u.scheme == "https" and self._ctx is None:
+                    self._ctx = ssl.create_default_context()   # loaded once, shared by all origins
+                up = self._ups[origin] = Upstream(origin, self.max_conn, self.idle_sec, self._ctx)
+            return up
+
+    def _attempt(self, up: Upstream, method: str, target: str, headers: Dict[str, str],
+                 body: bytes, timeout: float, wait: bool = True,
+                 att: Optional[_Attempt] = None) -> Tuple[_Conn, http.client.HTTPResponse, bool]:
+        fresh = False
+        while True:
+            try:
+                c, reused = up.checkout(timeout, wait=wait, fresh=fresh)
+            except socket.timeout:
+                raise GatewayError("CONNECT", f"connect timeout {timeout:.0f}s")
+            except OSError as e:
+                raise GatewayError("CONNECT", str(e) or type(e).__name__)
+            if att is not None:
+                att.bind(c)
+            try:
+                c.http.request(method, target, body=body or None, headers=headers)
+                return c, c.http.getresponse(), reused
+            except (OSError, http.client.HTTPException) as e:
+                up.checkin(c, False)
+                if att is not None and att.cancelled:
+                    raise GatewayError("CANCELLED")
+                if isinstance(e, socket.timeout):
+                    raise GatewayError("TIMEOUT", f"{timeout:.0f}s")
+                if reused and not fresh and isinstance(e, (ConnectionError, http.client.BadStatusLine)):
+                    # keep-alive connection closed under us: one free retry on a new one
+                    fresh = True
+                    continue
+                raise GatewayError("CONNECT", str(e) or type(e).__name__)
+
+    def _hedged(self, up: Upstream, kind: str, args: Tuple[Any, ...], hedge_s: float,
+                timeout: float) -> Tuple[_Conn, http.client.HTTPResponse, bool, bool]:
+        q: "queue.Queue[Tuple[str, Any, Optional[GatewayError]]]" = queue.Queue()
+
+        atts = {"first": _Attempt(), "hedge": _Attempt()}
+
+        def run(tag: str, wait: bool) -> None:
+            try:
+                q.put((tag, self._attempt(up, *args, wait=wait, att=atts[tag]), None))
+            except GatewayError as e:
+                q.put((tag, None, e))
+
+        def reap(n: int) -> None:
+            # attempts still running when we stop waiting: close what they bring back
+            # (their response is unread, the connection can't be reused)
+            for _ in range(n):
+                _, late, _ = q.get()
+                if late is not None:
+                    up.checkin(late[0], False)
+
+        threading.Thread(target=run, args=("first", True), name="gw-attempt", daemon=True).start()
+        pending = 1
+        hedged = False
+        won = ""
+        err: Optional[GatewayError] = None
+        try:
+            try:
+                item = q.get(timeout=hedge_s)
+            except queue.Empty:
+                threading.Thread(target=run, args=("hedge", False), name="gw-hedge", daemon=True).start()
+                pending += 1
+                hedged = True
+                item = q.get(timeout=timeout * 2 + 5)
+            pending -= 1
+            while True:
+                tag, got, e = item
+                if got is not None:
+                    won = tag
+                    break
+                # a hedge that found no free slot (BUSY) must not hide the first attempt's error
+                if err is None or err.err == "BUSY":
+                    err = e
+                if not pending:
+                    assert err is not None
+                    raise err
+                item = q.get(timeout=timeout * 2 + 5)
+                pending -= 1
+        except queue.Empty:
+            raise GatewayError("TIMEOUT", f"{timeout:.0f}s")
+        finally:
+            if pending:
+                for t, a in atts.items():
+                    if t != won:
+                        a.cancel()
+                threading.Thread(target=reap, args=(pending,), name="gw-reap", daemon=True).start()
+
+        if hedged:
+            _HEDGES.inc(kind=kind, winner=won)
+        c, resp, reused = got
+        return c, resp, reused, hedged
+
+    def fetch(self, kind: str, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+              body: bytes = b"", timeout: Optional[float] = None) -> Fetch:
+        """Response headers are in; read the body with .chunks(), then .finish()."""
+        pol = policy(kind)
+        timeout = timeout or pol.timeout
+        up = self.upstream(url)
+        u = urlsplit(url)
+        target = (u.path or "/") + (f"?{u.query}" if u.query else "")
+        args = (method.upper(), target, dict(headers or {}), body, timeout)
+
+        t0 = time.monotonic()
+        tries = 0
+        last: Optional[GatewayError] = None
+        for i in range(1 + max(0, pol.retries)):
+            tries += 1
+            try:
+                if pol.hedge_ms > 0:
+                    c, resp, reused, hedged = self._hedged(up, kind, args, pol.hedge_ms / 1000.0, timeout)
+                else:
+                    c, resp, reused = self._attempt(up, *args)
+                    hedged = False
+            except GatewayError as e:
+                last = e
+                if e.err != "CONNECT":
+                    break
+                time.sleep(min(0.2 * (i + 1), 1.0))
+                continue
+            if resp.status in _RETRY_STATUS and i < pol.retries:
+                up.checkin(c, False)
+                last = GatewayError("CONNECT", f"HTTP {resp.status}")
+                time.sleep(min(0.2 * (i + 1), 1.0))
+                continue
+            _HEADERS.observe(time.monotonic() - t0, kind=kind)
+            _REQS.inc(kind=kind, result=str(resp.status))
+            meta = {
+                "status": resp.status,
+                "headers": {k.lower(): v for k, v in resp.getheaders()},
+                "conn": "reused" if reused else "new",
+                "tries": tries,
+                "hedged": hedged,
+                "ms": int((time.monotonic() - t0) * 1000),
+            }
+            return Fetch(up, c, resp, meta)
+
+        assert last is not None
+        _REQS.inc(kind=kind, result=last.err.lower())
+        raise last
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ups = list(self._ups.values())
+        return {up.origin: up.stats() for up in ups}
+
+    def close(self) -> None:
+        with self._lock:
+            ups = list(self._ups.values())
+        for up in ups:
+            up.close()
+
+
+# -------- socket server --------
+
+def _line(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class _Reader:
+    """Buffered reads from a client socket: header lines and exact byte counts."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.buf = bytearray()
+
+    def line(self) -> Optional[bytes]:
+        while b"\n" not in self.buf:
+            if len(self.buf) > MAX_HEADER:
+                raise ValueError("header too long")
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                return None
+            self.buf.extend(chunk)
+        i = self.buf.index(b"\n")
+        out = bytes(self.buf[:i])
+        del self.buf[:i + 1]
+        return out
+
+    def exactly(self, n: int) -> bytes:
+        while len(self.buf) < n:
+            chunk = self.sock.recv(max(65536, n - len(self.buf)))
+            if not chunk:
+                raise ConnectionError("client closed mid-body")
+            self.buf.extend(chunk)
+        out = bytes(self.buf[:n])
+        del self.buf[:n]
+        return out
+
+
+class GatewayServer(threading.Thread):
+    """Accepts clients on a unix socket, one thread per connection."""
+
+    def __init__(self, gw: Gateway, path: str = DEFAULT_SOCK, log: Callable[[str], None] = lambda m: None):
+        super().__init__(name="gw-server", daemon=True)
+        self.gw = gw
+        self.path = path
+        self.log = log
+        self.started = time.time()
+        self._srv: Optional[socket.socket] = None
+
+    def bind(self) -> None:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        srv.bind(self.path)
+        os.chmod(self.path, 0o666)
+        srv.listen(16)
+        self._srv = srv
+
+    def run(self) -> None:
+        if self._srv is None:
+            self.bind()
+        assert self._srv is not None
+        while True:
+            try:
+                conn, _ = self._srv.accept()
+            except OSError:
+                return   # closed by close()
+            threading.Thread(target=self._serve, args=(conn,), name="gw-client", daemon=True).start()
+
+    def close(self) -> None:
+        if self._srv is not None:
+            self._srv.close()
+            self._srv = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _serve(self, conn: socket.socket) -> None:
+        rd = _Reader(conn)
+        try:
+            while True:
+                raw = rd.line()
+                if raw is None:
+                    return
+                raw = raw.strip()
+                if not raw:
+                    continue
+                try:
+                    cmd = json.loads(raw.decode("utf-8"))
+                    if not isinstance(cmd, dict):
+                        raise ValueError("not an object")
+                except ValueError:
+                    conn.sendall(_line({"ok": False, "err": "BAD_REQUEST", "msg": "Bad JSON"}))
+                    continue
+                if not self._handle(conn, rd, cmd):
+                    return
+        except (OSError, ValueError):
+            pass
+        finally:
+            conn.close()
+
+    def _handle(self, conn: socket.socket, rd: _Reader, cmd: Dict[str, Any]) -> bool:
+        """One exchange; False when the connection can't carry another one."""
+        c = str(cmd.get("cmd", "HTTP")).strip().upper()
+        if c == "PING":
+            conn.sendall(_line({"ok": True, "pong": True, "pid": os.getpid(),
+                                "uptime_s": int(time.time() - self.started)}))
+            return True
+        if c == "STATS":
+            conn.sendall(_line({"ok": True, "upstreams": self.gw.stats()}))
+            return True
+        if c != "HTTP":
+            conn.sendall(_line({"ok": False, "err": "UNKNOWN_CMD", "cmd": c}))
+            return True
+
+        try:
+            n = int(cmd.get("body_len") or 0)
+        except (TypeError, ValueError):
+            n = -1
+        if n < 0 or n > MAX_BODY:
+            conn.sendall(_line({"ok": False, "err": "BAD_REQUEST", "msg": "Bad body_len"}))
+            return False   # can't tell where the next header starts
+        body = rd.exactly(n) if n else b""
+
+        kind = str(cmd.get("kind") or "other").lower()
+        headers = cmd.get("headers") or {}
+        if not isinstance(headers, dict):
+            headers = {}
+        try:
+            timeout = float(cmd.get("timeout") or 0) or None
+        except (TypeError, ValueError):
+            timeout = None
+        try:
+            f = self.gw.fetch(kind, str(cmd.get("method") or "GET"), str(cmd.get("url") or ""),
+                              {str(k): str(v) for k, v in headers.items()}, body, timeout)
+        except GatewayError as e:
+            self.log(f"[GW] {kind} {e.err} {e.msg}")
+            conn.sendall(_line({"ok": False, "err": e.err, "msg": e.msg}))
+            return True
+
+        complete = False
+        try:
+            conn.sendall(_line(dict(f.meta, ok=True)))
+            while True:
+                try:
+                    data = f.resp.read1(CHUNK)
+                except (OSError, http.client.HTTPException) as e:
+                    self.log(f"[GW] {kind} body cut short: {e}")
+                    conn.sendall(FRAME.pack(ABORT))
+                    return True
+                if not data:
+                    break
+                conn.sendall(FRAME.pack(len(data)) + data)   # a client that went away raises here
+            complete = True
+            f.finish(True)   # pooled again before the client even sees the end
+            conn.sendall(FRAME.pack(0))
+            return True
+        finally:
+            f.finish(complete)
+
+
+# -------- client --------
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    meta: Dict[str, Any]
+
+
+class GatewayClient:
+    """
+    Blocking client. OSError from request() means the gateway could not be
+    reached and nothing was sent (call the upstream directly instead);
+    GatewayError means the gateway tried and failed.
+    """
+
+    def __init__(self, sock_path: str = DEFAULT_SOCK, timeout: float = 120.0):
+        self.sock_path = sock_path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._rd: Optional[_Reader] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> None:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(self.timeout)
+        try:
+            s.connect(self.sock_path)
+        except OSError:
+            s.close()
+            raise
+        self._sock = s
+        self._rd = _Reader(s)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except Exception:
+                pass
+        self._sock = None
+        self._rd = None
+
+    def _exchange(self, head: Dict[str, Any], body: bytes = b"") -> Dict[str, Any]:
+        reused = self._sock is not None
+        if not reused:
+            self._open()
+        assert self._sock is not None and self._rd is not None
+        try:
+            self._sock.sendall(_line(head) + body)
+            raw = self._rd.line()
+        except OSError:
+            self.close()
+            raw = None
+        if raw is None:
+            if reused:
+                # kept-alive connection closed by a gateway restart: retry once on a new one
+                self.close()
+                return self._exchange(head, body)
+            raise ConnectionError("gateway closed the connection")
+        try:
+            r = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            self.close()
+            raise GatewayError("BAD_REPLY", raw[:200].decode("utf-8", "replace"))
+        return r if isinstance(r, dict) else {"ok": False, "err": "BAD_REPLY"}
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, body: bytes = b"",
+                kind: str = "other", timeout: Optional[float] = None,
+                on_chunk: Optional[Callable[[bytes], None]] = None) -> Response:
+        """Whole response; with on_chunk a 2xx body goes there as it arrives instead."""
+        head: Dict[str, Any] = {"cmd": "HTTP", "kind": kind, "method": method, "url": url,
+                                "headers": headers or {}, "body_len": len(body)}
+        if timeout:
+            head["timeout"] = timeout
+        with self._lock:
+            r = self._exchange(head, body)
+            if not r.get("ok"):
+                raise GatewayError(str(r.get("err") or "ERROR"), str(r.get("msg") or ""))
+            status = int(r.get("status") or 0)
+            stream = on_chunk is not None and 200 <= status < 300
+            out = bytearray()
+            assert self._rd is not None
+            try:
+                while True:
+                    (n,) = FRAME.unpack(self._rd.exactly(FRAME.size))
+                    if n == 0:
+                        break
+                    if n == ABORT:
+                        raise GatewayError("TRUNCATED", url)
+                    data = self._rd.exactly(n)
+                    if stream:
+                        on_chunk(data)   # type: ignore[misc]
+                    else:
+                        out.extend(data)
+            except OSError:
+                self.close()
+                raise GatewayError("TRUNCATED", "gateway connection lost")
+            except Exception:
+                self.close()   # on_chunk failed mid-stream: the rest of the frames are still queued
+                raise
+            return Response(status, r.get("headers") or {}, bytes(out), r)
+
+    def _simple(self, cmd: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._exchange({"cmd": cmd})
+
+    def ping(self) -> Dict[str, Any]:
+        return self._simple("PING")
+
+    def stats(self) -> Dict[str, Any]:
+        return self._simple("STATS")
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+"""
+Process metrics (counters, gauges, latency histograms).
+
+Every long-running Python process registers its metrics at import time
+and calls export("<process>") once at startup:
+
+- a thread rewrites <VOXIE_METRICS_DIR>/<process>.prom every
+  VOXIE_METRICS_INTERVAL_SEC seconds (Prometheus text format, atomic
+  rename), ready for node_exporter's textfile collector or a plain cat
+- the audio daemon also answers {"cmd":"STATS"} with snapshot()
+  ({"format":"prom"} returns the text instead)
+
+Rates ("segments per minute") are left to the reader: counters only go
+up, rate(voxie_wake_segments_total[1m]) * 60 does the rest.
+
+Dependency-free and thread-safe: updates are a lock + a dict lookup, so
+they can sit on the spawn lane and the capture loop.
+"""
+
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "LATENCY",
+    "counter",
+    "gauge",
+    "histogram",
+    "render",
+    "snapshot",
+    "export",
+]
+
+# Default buckets (seconds): socket commands, spawn checks, ASR / LLM calls.
+LATENCY = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DEFAULT_DIR = "/tmp/bitvox_metrics"
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if v == int(v) and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v))
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labelstr(names: Sequence[str], key: Tuple[str, ...], extra: str = "") -> str:
+    parts = ['%s="%s"' % (n, _esc(v)) for n, v in zip(names, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._copy().items())
+
+    def _copy(self) -> Dict[Tuple[str, ...], Any]:
+        return dict(self._values)
+
+    def _lines(self) -> List[str]:
+        return ["%s%s %s" % (self.name, _labelstr(self.labelnames, k), _fmt(v)) for k, v in self._items()]
+
+    def _snap(self, v: Any) -> Any:
+        return v
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        out = []
+        for k, v in self._items():
+            d = dict(zip(self.labelnames, k))
+            if isinstance(v, dict):
+                d.update(self._snap(v))
+            else:
+                d["value"] = v
+            out.append(d)
+        return out
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, n: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + n
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, v: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(v)
+
+    def inc(self, n: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + n
+
+    def dec(self, n: float = 1.0, **labels: Any) -> None:
+        self.inc(-n, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, v: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            h = self._values.get(key)
+            if h is None:
+                h = self._values[key] = {"n": [0] * (len(self.buckets) + 1), "count": 0, "sum": 0.0}
+            i = 0
+            for b in self.buckets:
+                if v <= b:
+                    break
+                i += 1
+            h["n"][i] += 1
+            h["count"] += 1
+            h["sum"] += v
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the wall time of the `with` body (also when it raises)."""
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - t0, **labels)
+
+    def _copy(self) -> Dict[Tuple[str, ...], Any]:
+        return {k: {"n": list(h["n"]), "count": h["count"], "sum": h["sum"]} for k, h in self._values.items()}
+
+    def _lines(self) -> List[str]:
+        out = []
+        for k, h in self._items():
+            acc = 0
+            for b, n in zip(self.buckets + (float("inf"),), h["n"]):
+                acc += n
+                out.append("%s_bucket%s %d" % (self.name, _labelstr(self.labelnames, k, 'le="%s"' % _fmt(b)), acc))
+            out.append("%s_sum%s %s" % (self.name, _labelstr(self.labelnames, k), _fmt(h["sum"])))
+            out.append("%s_count%s %d" % (self.name, _labelstr(self.labelnames, k), h["count"]))
+        return out
+
+    def _quantile(self, h: Dict[str, Any], q: float) -> float:
+        # linear interpolation inside the bucket, Prometheus-style
+        rank = q * h["count"]
+        acc, lo = 0, 0.0
+        for b, n in zip(self.buckets, h["n"]):
+            if n and acc + n >= rank:
+                return lo + (b - lo) * (rank - acc) / n
+            acc += n
+            lo = b
+        return self.buckets[-1] if self.buckets else 0.0
+
+    def _snap(self, h: Dict[str, Any]) -> Dict[str, Any]:
+        d: Dict[str, Any] = {"count": h["count"], "sum": round(h["sum"], 6)}
+        if h["count"]:
+            d["avg_ms"] = round(h["sum"] / h["count"] * 1000, 2)
+            d["p50_ms"] = round(self._quantile(h, 0.5) * 1000, 2)
+            d["p95_ms"] = round(self._quantile(h, 0.95) * 1000, 2)
+        return d
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get(self, cls: type, name: str, *args: Any, **kw: Any) -> Any:
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, *args, **kw)
+            elif not isinstance(m, cls):
+                raise ValueError("metric %s already registered as %s" % (name, m.kind))
+            return m
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY
+    ) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def _all(self) -> List[_Metric]:
+        with self._lock:
+            return [self._metrics[k] for k in sorted(self._metrics)]
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        out: List[str] = []
+        for m in self._all():
+            out.append("# HELP %s %s" % (m.name, m.help))
+            out.append("# TYPE %s %s" % (m.name, m.kind))
+            out.extend(m._lines())
+        return "\n".join(out) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view: {name: [{labels..., value | count/sum/p50_ms/...}]}."""
+        return {m.name: m.snapshot() for m in self._all()}
+
+
+REGISTRY = Registry()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
+snapshot = REGISTRY.snapshot
+
+_EXPORTED: Dict[str, str] = {}
+_FILES: Dict[int, str] = {}  # id(registry) -> its file
+
+
+def _write(path: str, registry: Registry) -> None:
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(registry.render())
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def export(process: str, registry: Optional[Registry] = None, interval: Optional[float] = None) -> Optional[str]:
+    """
+    Start writing `registry` to <VOXIE_METRICS_DIR>/<process>.prom.
+    Returns the file path, or None when disabled (VOXIE_METRICS_DIR="").
+    """
+    reg = registry or REGISTRY
+    d = os.environ.get("VOXIE_METRICS_DIR", DEFAULT_DIR).strip()
+    if not d:
+        return None
+    if process in _EXPORTED:
+        return _EXPORTED[process]
+    if id(reg) in _FILES:
+        # a second component in the same process (wake_poll inside the
+        # listener): one registry, one file - two files would repeat every
+        # series for the textfile collector
+        path = _FILES[id(reg)]
+        _EXPORTED[process] = path
+        reg.gauge("voxie_process_start_time_seconds", "Process start time (unix seconds)", ("process",)).set(
+            time.time(), process=process)
+        return path
+    if interval is None:
+        try:
+            interval = float(os.environ.get("VOXIE_METRICS_INTERVAL_SEC", "15"))
+        except ValueError:
+            interval = 15.0
+    interval = max(1.0, interval)
+    try:
+        os.makedirs(d, exist_ok=True)
+    except OSError:
+        return None
+    path = os.path.join(d, process + ".prom")
+    _EXPORTED[process] = path
+    _FILES[id(reg)] = path
+
+    reg.gauge("voxie_process_start_time_seconds", "Process start time (unix seconds)", ("process",)).set(
+        time.time(), process=process)
+
+    def run() -> None:
+        while True:
+            _write(path, reg)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="metrics-export", daemon=True).start()
+    atexit.register(_write, path, reg)
+    return path
@@ -1,10 +1,11 @@
 """
 Mic package public surface.
 
-This file only re-exports the PTT entrypoint used by orchestrators.
+This file only re-exports the PTT entrypoint used by orchestrators and
+the single-process listener runtime.
 No runtime logic should live here.
 """
 
-from .listener import on_ptt
+from .listener import MicListener, MicListenerConfig, on_ptt
 
-__all__ = ["on_ptt"]
+__all__ = ["on_ptt", "MicListener", "MicListenerConfig"]
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+"""
+End-of-utterance detection for PTT recordings.
+
+`arecord -d VOXIE_REC_SEC` records a fixed 4 s: "stop" waits the whole
+4 s before ASR starts, a long question is cut. record() streams raw PCM
+from arecord instead and stops when the speaker does:
+
+- silence:  VOXIE_REC_TAIL_MS below the VAD stop level after speech
+            (on top of the VAD hangover), once VOXIE_REC_MIN_SEC is reached
+- max:      VOXIE_REC_MAX_SEC in total
+- nospeech: no speech onset within VOXIE_REC_NOSPEECH_SEC (nothing is
+            sent to ASR)
+
+Endpointer is the per-frame decision (features.py + vad.py), record()
+the capture loop around it: from the capture daemon's shared ring when it
+runs (no arecord spawn, and VOXIE_REC_PREROLL_MS of audio from before the
+button press), else from an arecord of its own. Every Recording carries the time saved
+against the fixed VOXIE_REC_SEC recording, for the [TIMING] logs.
+VOXIE_REC_MODE=fixed restores `arecord -d`. A `cancel` event set from
+another thread (barge-in, mic/turn.py) ends any of them within a frame.
+"""
+
+import os
+import time
+import wave
+import signal
+import threading
+import subprocess
+from typing import NamedTuple, Optional, Tuple, Union
+
+from .features import FrameFeatures
+from .shmring import SharedRing, attach_live, stale_sec
+from .vad import START, AdaptiveVad, FixedVad
+
+__all__ = ["Endpointer", "Recording", "rec_mode", "record"]
+
+RATE = 16000
+FRAME_MS = 20
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def rec_mode() -> str:
+    """vad (stop on trailing silence, default) | fixed (arecord -d VOXIE_REC_SEC)."""
+    return os.environ.get("VOXIE_REC_MODE", "vad").strip().lower() or "vad"
+
+
+class Recording(NamedTuple):
+    seconds: float   # audio written to the WAV
+    reason: str      # silence | max | nospeech | eof | fixed | cancelled | error
+    speech: bool     # an onset was seen (False: don't bother the ASR)
+    saved: float     # seconds saved against the fixed-length recording
+    source: str = "arecord"  # arecord | shm (capture daemon)
+
+
+class Endpointer:
+    """Frame-by-frame end of a PTT utterance; update() returns the reason once it ends."""
+
+    def __init__(
+        self,
+        frame_ms: int = FRAME_MS,
+        min_sec: Optional[float] = None,
+        max_sec: Optional[float] = None,
+        tail_ms: Optional[float] = None,
+        nospeech_sec: Optional[float] = None,
+    ):
+        def pick(v: Optional[float], env: str, default: float) -> float:
+            return float(v) if v is not None else _env_float(env, default)
+
+        def frames(sec: float) -> int:
+            return max(1, int(sec * 1000) // frame_ms)
+
+        self.min_frames = frames(pick(min_sec, "VOXIE_REC_MIN_SEC", 0.8))
+        self.max_frames = max(self.min_frames, frames(pick(max_sec, "VOXIE_REC_MAX_SEC", 10.0)))
+        self.tail_frames = frames(pick(tail_ms, "VOXIE_REC_TAIL_MS", 500) / 1000.0)
+        self.nospeech_frames = frames(pick(nospeech_sec, "VOXIE_REC_NOSPEECH_SEC", 3.0))
+        # the whole recording is one VAD "segment" budget: pauses between
+        # words close VAD segments, only the endpointer ends the turn.
+        # The floor has a second at most to settle, so a low percentile:
+        # the gaps between syllables, not the speech, set it.
+        self.vad: Union[FixedVad, AdaptiveVad]
+        if os.environ.get("VOXIE_VAD_MODE", "adaptive").strip().lower() == "fixed":
+            self.vad = FixedVad(frame_ms, _env_float("VOXIE_WAKE_THRESH", 800.0), 250, 100,
+                                self.max_frames * frame_ms)
+        else:
+            self.vad = AdaptiveVad(frame_ms, 100, self.max_frames * frame_ms, floor_q=0.2)
+        self.frames = 0
+        self.speech = False
+        self._voice = 0  # last frame inside speech
+
+    def update(self, rms: float, zcr: float = 0.0) -> Optional[str]:
+        ev = self.vad.update(rms, zcr)
+        self.frames += 1
+        if ev == START:
+            self.speech = True
+        if self.vad.in_speech or ev is not None:
+            self._voice = self.frames
+        if self.frames >= self.max_frames:
+            return "max"
+        if not self.speech:
+            return "nospeech" if self.frames >= self.nospeech_frames else None
+        if self.frames >= self.min_frames and self.frames - self._voice >= self.tail_frames:
+            return "silence"
+        return None
+
+
+def _write_wav(path: str, pcm: bytes, rate: int) -> None:
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+
+
+def _from_ring(ring: SharedRing, ep: Endpointer, ff: FrameFeatures,
+               cancel: Optional[threading.Event] = None) -> Tuple[bytes, str]:
+    """Frames from the shared ring, pre-roll first, until the endpointer says stop."""
+    cb = ff.frame_bytes
+    preroll = int(_env_float("VOXIE_REC_PREROLL_MS", 300)) // FRAME_MS * cb
+    end = ring.end
+    pos = max(ring.start, end - preroll)
+    pos -= pos % 2
+    out = bytearray()
+    while True:
+        if cancel is not None and cancel.is_set():
+            return bytes(out), "cancelled"
+        if not ring.wait(pos + cb, stale_sec()):
+            return bytes(out), "eof"
+        if pos < ring.start:  # fell a ring behind: keep what still exists
+            pos = ring.start
+            continue
+        frame = ring.view(pos, pos + cb)
+        out += frame
+        pos += cb
+        f = ff.frames(frame)
+        reason = ep.update(f.rms[0], f.zcr[0])
+        if reason:
+            return bytes(out), reason
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    try:
+        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+    except Exception:
+        pass
+    proc.wait()
+
+
+def record(dev: str, wav_path: str, fixed_sec: float, mode: str = "",
+           cancel: Optional[threading.Event] = None) -> Recording:
+    """
+    Record one PTT utterance from ALSA `dev` into `wav_path` (16 kHz mono
+    S16). `fixed_sec` is the legacy duration: used as is in fixed mode,
+    the baseline for Recording.saved otherwise. Setting `cancel` stops it
+    early with reason "cancelled".
+    """
+    mode = mode or rec_mode()
+    t0 = time.monotonic()
+    if mode == "fixed":
+        cmd = ["arecord", "-D", dev, "-f", "S16_LE", "-r", str(RATE), "-c", "1", "-d", str(int(fixed_sec)), wav_path]
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, preexec_fn=os.setsid)
+        except OSError:
+            return Recording(0.0, "error", False, 0.0)
+        if cancel is None:
+            proc.wait()
+        while proc.poll() is None:
+            if cancel is not None and cancel.wait(0.05):
+                _stop(proc)
+                return Recording(time.monotonic() - t0, "cancelled", False, 0.0)
+        ok = proc.returncode == 0
+        return Recording(time.monotonic() - t0, "fixed" if ok else "error", ok, 0.0)
+
+    ff = FrameFeatures(RATE, FRAME_MS)
+    ep = Endpointer(FRAME_MS)
+    ring = attach_live()
+    if ring is not None and (ring.rate != RATE or ring.channels != 1):
+        ring.close()
+        ring = None
+    if ring is not None:
+        try:
+            pcm, reason = _from_ring(ring, ep, ff, cancel)
+        finally:
+            ring.close()
+        _write_wav(wav_path, pcm, RATE)
+        return Recording(len(pcm) / 2.0 / RATE, reason, ep.speech, fixed_sec - (time.monotonic() - t0), "shm")
+
+    cmd = ["arecord", "-D", dev, "-f", "S16_LE", "-r", str(RATE), "-c", "1", "-t", "raw", "-q"]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0,
+                                preexec_fn=os.setsid)
+    except OSError:
+        return Recording(0.0, "error", False, 0.0)
+
+    cb = ff.frame_bytes
+    pcm = bytearray(ep.max_frames * cb)
+    mv = memoryview(pcm)
+    n = 0
+    reason = "eof"
+    try:
+        assert proc.stdout is not None
+        while n < len(pcm):
+            if cancel is not None and cancel.is_set():
+                reason = "cancelled"
+                break
+            got = proc.stdout.readinto(mv[n:n + cb])  # type: ignore[attr-defined]
+            if not got:
+                break
+            n += got
+            while ep.frames < n // cb:
+                i = ep.frames * cb
+                f = ff.frames(mv[i:i + cb])
+                end = ep.update(f.rms[0], f.zcr[0])
+                if end:
+                    reason = end
+                    break
+            if reason != "eof":
+                break
+    finally:
+        _stop(proc)
+
+    n = ep.frames * cb
+    _write_wav(wav_path, bytes(pcm[:n]), RATE)
+    seconds = n / 2.0 / RATE
+    # the turn waits for wall-clock recording time, not for the audio length
+    took = time.monotonic() - t0
+    return Recording(seconds, reason, ep.speech, fixed_sec - took)
+
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+"""
+Frame features for the capture path (VAD, wake word).
+
+FrameFeatures.frames(buf) splits an S16_LE buffer into fixed frames and
+returns RMS, peak and zero-crossing rate for every whole frame in one
+call; a trailing partial frame is left to the caller.
+
+No per-sample Python bytecode in any backend (VOXIE_FEATURES_BACKEND):
+- numpy:   one reshape, row-wise reductions
+- audioop: C rms / max / cross per frame
+- array:   no dependencies, always available (audioop is gone from the
+           stdlib in Python 3.13, numpy is optional): the samples as one
+           list, math.hypot(*frame) for the energy (sum of squares in
+           C; map(operator.mul) before Python 3.8), max()/min() for the
+           peak, the sample high bytes for the crossings (sign bytes +
+           bytes.count)
+
+"auto" picks the first available in that order.
+
+rms() is the RMS-only fast path (what the VAD gate needs per chunk).
+
+Zero crossings are sign changes (x < 0) between consecutive samples,
+divided by the frame length. Meant for mono capture; on interleaved
+stereo RMS and peak still hold, ZCR is only indicative.
+"""
+
+import os
+import sys
+import math
+import array
+import operator
+from typing import List, NamedTuple, Sequence
+
+try:
+    import audioop  # C helpers, stdlib until Python 3.12
+except Exception:  # pragma: no cover - depends on interpreter
+    audioop = None  # type: ignore
+
+try:
+    import numpy as np  # optional: fastest on multi-frame buffers
+except Exception:  # pragma: no cover - optional dependency
+    np = None  # type: ignore
+
+__all__ = ["Frames", "FrameFeatures", "backends"]
+
+# high byte of an S16_LE sample -> 1 if negative, 0 otherwise
+_SIGN = bytes(1 if b >= 0x80 else 0 for b in range(256))
+_BIG = sys.byteorder == "big"
+
+try:
+    math.hypot(3.0, 4.0, 0.0)
+    _MULTI_HYPOT = True
+except TypeError:  # Python < 3.8: two arguments only
+    _MULTI_HYPOT = False
+
+
+def _norm(vals: Sequence[int]) -> float:
+    """sqrt(sum of squares), no Python-level loop."""
+    if _MULTI_HYPOT:
+        return math.hypot(*vals)
+    return math.sqrt(sum(map(operator.mul, vals, vals)))
+
+
+def _samples(buf: bytes, nbytes: int) -> List[int]:
+    """S16_LE samples as a list: one C conversion, and builtins iterate a
+    list far faster than an array or memoryview (no boxing per sample)."""
+    a = array.array("h")
+    a.frombytes(bytes(buf[:nbytes]))
+    if _BIG:
+        a.byteswap()
+    return a.tolist()
+
+
+class Frames(NamedTuple):
+    rms: List[float]
+    peak: List[int]
+    zcr: List[float]
+
+
+def _frames_numpy(buf: bytes, n: int, spf: int) -> Frames:
+    a = np.frombuffer(buf, dtype="<i2", count=n * spf).reshape(n, spf)
+    f = a.astype(np.float32)
+    rms = np.sqrt(np.einsum("ij,ij->i", f, f) / spf)
+    peak = np.abs(a.astype(np.int32)).max(axis=1)
+    neg = a < 0
+    zcr = np.count_nonzero(neg[:, 1:] != neg[:, :-1], axis=1) / float(spf)
+    return Frames(rms.tolist(), peak.tolist(), zcr.tolist())
+
+
+def _frames_audioop(buf: bytes, n: int, spf: int) -> Frames:
+    fb = spf * 2
+    rms: List[float] = []
+    peak: List[int] = []
+    zcr: List[float] = []
+    mv = memoryview(buf)
+    for i in range(n):
+        frag = mv[i * fb:(i + 1) * fb]
+        rms.append(float(audioop.rms(frag, 2)))
+        peak.append(audioop.max(frag, 2))
+        zcr.append(audioop.cross(frag, 2) / float(spf))
+    return Frames(rms, peak, zcr)
+
+
+def _frames_array(buf: bytes, n: int, spf: int) -> Frames:
+    vals = _samples(buf, n * spf * 2)
+    signs = bytes(buf[1:n * spf * 2:2]).translate(_SIGN)
+    root = math.sqrt(spf)
+    rms: List[float] = []
+    peak: List[int] = []
+    zcr: List[float] = []
+    # one pass of C calls per frame, none per sample
+    for i in range(n):
+        lo, hi = i * spf, (i + 1) * spf
+        f = vals[lo:hi]
+        rms.append(_norm(f) / root)
+        peak.append(max(max(f), -min(f)))
+        s = signs[lo:hi]
+        zcr.append((s.count(b"\x00\x01") + s.count(b"\x01\x00")) / float(spf))
+    return Frames(rms, peak, zcr)
+
+
+def _rms_numpy(buf: bytes, spf: int) -> float:
+    f = np.frombuffer(buf, dtype="<i2", count=spf).astype(np.float32)
+    return float(np.sqrt(np.dot(f, f) / spf))
+
+
+def _rms_audioop(buf: bytes, spf: int) -> float:
+    return float(audioop.rms(buf[:spf * 2], 2))
+
+
+def _rms_array(buf: bytes, spf: int) -> float:
+    return _norm(_samples(buf, spf * 2)) / math.sqrt(spf)
+
+
+_KERNELS = {"numpy": _frames_numpy, "audioop": _frames_audioop, "array": _frames_array}
+_RMS = {"numpy": _rms_numpy, "audioop": _rms_audioop, "array": _rms_array}
+
+
+def backends() -> list:
+    """Feature backends available in this interpreter, fastest first."""
+    out = []
+    if np is not None:
+        out.append("numpy")
+    if audioop is not None:
+        out.append("audioop")
+    out.append("array")
+    return out
+
+
+class FrameFeatures:
+    """RMS / peak / ZCR over fixed frames of S16_LE audio."""
+
+    def __init__(self, rate: int = 16000, frame_ms: int = 20, channels: int = 1, backend: str = ""):
+        self.rate = rate
+        self.frame_ms = frame_ms
+        self.channels = channels
+        self.samples = max(1, rate * frame_ms // 1000) * channels
+        self.frame_bytes = self.samples * 2
+        name = (backend or os.environ.get("VOXIE_FEATURES_BACKEND", "auto")).strip().lower()
+        avail = backends()
+        self.backend = name if name in avail else avail[0]
+        self._kernel = _KERNELS[self.backend]
+        self._rms = _RMS[self.backend]
+
+    def count(self, buf: bytes) -> int:
+        """Whole frames in `buf`."""
+        return len(buf) // self.frame_bytes
+
+    def frames(self, buf: bytes) -> Frames:
+        """Features of every whole frame in `buf` (any number of frames)."""
+        n = len(buf) // self.frame_bytes
+        if n == 0:
+            return Frames([], [], [])
+        return self._kernel(buf, n, self.samples)
+
+    def rms(self, buf: bytes) -> float:
+        """RMS of the whole buffer (any length), as one frame."""
+        spf = len(buf) // 2
+        if spf == 0:
+            return 0.0
+        return self._rms(buf, spf)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+"""
+Wake -> listener handoff: the wake utterance and the command after it,
+as one PCM stream over a unix socket (VOXIE_HANDOFF_SOCK).
+
+"Voxie, che tempo fa" is one utterance: wake_poll already has it in its
+capture ring, so instead of writing PTT to the FIFO (and voxie_listen
+spawning a fresh fixed-length arecord) it streams the audio from the
+start of the wake segment until the command ends.
+
+Wire format, one connection per utterance:
+    {"rate":16000,"channels":1,"format":"S16_LE","wake_word":"voxie","wake_ms":840}\n
+    <raw PCM ... until the sender closes>
+
+- HandoffSender (wake_poll): a verifier worker request()s a stream, the
+  VAD thread's poll() connects, sends the header, then on every frame
+  what the ring gained since the last call, and decides the end:
+  VOXIE_HANDOFF_TAIL_MS of silence after speech that followed the
+  wake segment, VOXIE_HANDOFF_WAIT_MS without any (the user said only
+  the wake word), or VOXIE_HANDOFF_MAX_SEC in total
+- HandoffServer (voxie_listen): accepts, reads the whole utterance and
+  passes it on; a missing server makes the sender fall back to the FIFO
+- strip_wake() drops the wake word from the transcript
+"""
+
+import os
+import re
+import json
+import time
+import socket
+import threading
+from difflib import SequenceMatcher
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from .ringbuf import PcmRing
+
+__all__ = ["DEFAULT_SOCK", "Utterance", "HandoffSender", "HandoffServer", "handoff_sock", "strip_wake"]
+
+DEFAULT_SOCK = "/tmp/bitvox_handoff.sock"
+MAX_HEADER = 4096
+
+
+def handoff_sock() -> str:
+    """Socket path; empty disables the handoff (FIFO PTT only)."""
+    return os.environ.get("VOXIE_HANDOFF_SOCK", DEFAULT_SOCK).strip()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(float(os.environ.get(name, str(default))))
+    except ValueError:
+        return default
+
+
+class Utterance(NamedTuple):
+    pcm: bytes
+    rate: int
+    channels: int
+    wake_word: str
+    wake_ms: int          # the wake segment at the start of `pcm`
+    received: float       # time.time() when the stream ended
+
+
+class HandoffSender:
+    """wake_poll side: streams ring ranges to the listener, one utterance at a time."""
+
+    def __init__(self, path: str, rate: int, channels: int, fallback: Callable[[], object]):
+        self.path = path
+        self.rate = rate
+        self.channels = channels
+        self.fallback = fallback
+        bps = rate * channels * 2
+        self.tail_bytes = _env_int("VOXIE_HANDOFF_TAIL_MS", 500) * bps // 1000
+        self.wait_bytes = _env_int("VOXIE_HANDOFF_WAIT_MS", 2000) * bps // 1000
+        self.max_bytes = _env_int("VOXIE_HANDOFF_MAX_SEC", 8) * bps
+        self._lock = threading.Lock()
+        self._pending: Optional[Tuple[int, int, int, str]] = None
+        self._sock: Optional[socket.socket] = None
+        self._lo = self._hi = self._sent = self._voice = 0
+
+    @property
+    def active(self) -> bool:
+        return self._sock is not None
+
+    def request(self, gen: int, lo: int, hi: int, word: str) -> None:
+        """From any thread: stream from `lo` (wake segment [lo, hi)) of capture generation `gen`."""
+        with self._lock:
+            self._pending = (gen, lo, hi, word)
+
+    def _begin(self, ring: PcmRing, lo: int, hi: int, word: str) -> bool:
+        lo = max(lo, ring.start)  # a slow verification may have lost the head of the wake word
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(0.5)
+        try:
+            s.connect(self.path)
+            head = {
+                "rate": self.rate,
+                "channels": self.channels,
+                "format": "S16_LE",
+                "wake_word": word,
+                "wake_ms": max(0, hi - lo) * 1000 // (self.rate * self.channels * 2),
+            }
+            s.sendall((json.dumps(head) + "\n").encode("utf-8"))
+        except OSError:
+            s.close()
+            return False
+        self._sock = s
+        self._lo, self._hi, self._sent, self._voice = lo, hi, lo, hi
+        return True
+
+    def poll(self, ring: PcmRing, gen: int, done: int, voiced: bool) -> Optional[str]:
+        """
+        Main (VAD) thread, once per analysed frame. `done` is the analysed
+        stream offset, `voiced` whether the VAD is inside speech there.
+        Returns "end" / "fallback" / "error" when a handoff finished.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None and not self.active:
+            pgen, lo, hi, word = pending
+            if pgen != gen or not self._begin(ring, lo, hi, word):
+                self.fallback()
+                return "fallback"
+        if not self.active:
+            return None
+
+        if voiced:
+            self._voice = done
+        end = min(done, self._lo + self.max_bytes)
+        try:
+            if self._sent < ring.start:
+                raise OSError("handoff lapped by capture")
+            if end > self._sent:
+                self._sock.sendall(ring.view(self._sent, end))  # type: ignore[union-attr]
+                self._sent = end
+        except OSError:
+            self.close()
+            return "error"
+
+        spoke = self._voice > self._hi
+        if (
+            end >= self._lo + self.max_bytes
+            or (spoke and done - self._voice >= self.tail_bytes)
+            or (not spoke and done - self._hi >= self.wait_bytes)
+        ):
+            self.close()
+            return "end"
+        return None
+
+    def close(self) -> None:
+        s, self._sock = self._sock, None
+        if s is not None:
+            try:
+                s.close()
+            except OSError:
+                pass
+
+
+class HandoffServer(threading.Thread):
+    """voxie_listen side: accepts handoff streams and passes each Utterance on."""
+
+    def __init__(self, path: str, on_utterance: Callable[[Utterance], None], max_sec: int = 30):
+        super().__init__(name="handoff-server", daemon=True)
+        self.path = path
+        self.on_utterance = on_utterance
+        self.max_sec = max_sec
+        self._srv: Optional[socket.socket] = None
+
+    def bind(self) -> None:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        srv.bind(self.path)
+        os.chmod(self.path, 0o666)
+        srv.listen(2)
+        self._srv = srv
+
+    def run(self) -> None:
+        if self._srv is None:
+            self.bind()
+        assert self._srv is not None
+        while True:
+            conn, _ = self._srv.accept()
+            try:
+                u = self._read(conn)
+            except (OSError, ValueError):
+                u = None
+            finally:
+                conn.close()
+            if u is not None:
+                self.on_utterance(u)
+
+    def _read(self, conn: socket.socket) -> Optional[Utterance]:
+        conn.settimeout(self.max_sec + 5.0)
+        buf = bytearray()
+        while b"\n" not in buf:
+            chunk = conn.recv(4096)
+            if not chunk or len(buf) > MAX_HEADER:
+                return None
+            buf.extend(chunk)
+        line, _, rest = bytes(buf).partition(b"\n")
+        head = json.loads(line.decode("utf-8"))
+        rate = int(head.get("rate", 16000))
+        channels = int(head.get("channels", 1))
+        limit = self.max_sec * rate * channels * 2
+        pcm = bytearray(rest)
+        while len(pcm) < limit:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            pcm.extend(chunk)
+        del pcm[limit:]
+        return Utterance(bytes(pcm), rate, channels, str(head.get("wake_word", "")),
+                         int(head.get("wake_ms", 0)), time.time())
+
+
+def strip_wake(text: str, word: str, min_ratio: float = 0.6) -> str:
+    """
+    `text` without the wake word it starts with ("Voxie, che tempo fa?",
+    "ehi voxie che tempo fa"): exact, or close enough for the ASR's
+    spelling of it ("voxy", "boxie"). Only the first two words are looked at.
+    """
+    words = text.split()
+    word = word.lower()
+    for i, w in enumerate(words[:2]):
+        w = re.sub(r"[^\w]", "", w.lower())
+        if w and word and (w == word or SequenceMatcher(None, w, word).ratio() >= min_ratio):
+            return " ".join(words[i + 1:]).lstrip(" ,.;:!?-")
+    return text
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+"""
+Offline wake-word spotter: MFCC + DTW against a few enrolled templates.
+
+Runs inside wake_poll on the VAD segment (no PHP process, no network):
+
+- Mfcc:     pre-emphasis, 32 ms Hamming window (512 samples at 16 kHz),
+            20 ms hop (= one capture chunk), mel filterbank, log, DCT;
+            c1..c12 + deltas. c0 is left out, so the gain does not
+            matter; no mean normalisation: a segment holds more than the
+            word ("voxie radio") and its mean would not match the
+            template's
+- dtw():    subsequence DTW, the template may match anywhere in the
+            segment ("voxie, che ore sono?"), cost normalised by path
+            length
+- Spotter:  best score over the templates, detected if <= threshold
+
+Templates come from bin/kws_enroll.py (3-5 takes of the wake word) and
+live in one JSON model, <root>/data/kws/<word>.json by default
+(VOXIE_KWS_MODEL). The threshold is calibrated at enrollment from the
+template-to-template scores; VOXIE_KWS_THRESHOLD overrides it.
+
+Backends (VOXIE_KWS_BACKEND): numpy (rfft + matrix filterbank/DCT) or
+python (radix-2 real FFT on complex lists, sparse filterbank). Same
+features either way, up to float rounding.
+"""
+
+import os
+import json
+import math
+import time
+import array
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .features import FrameFeatures
+
+try:
+    import numpy as np  # optional: ~10x faster MFCC
+except Exception:  # pragma: no cover - optional dependency
+    np = None  # type: ignore
+
+__all__ = [
+    "Mfcc",
+    "Spotter",
+    "dtw",
+    "trim",
+    "templates",
+    "calibrate",
+    "backends",
+    "model_path",
+    "load_model",
+    "save_model",
+]
+
+Vec = List[float]
+
+try:
+    _dist = math.dist  # Python 3.8+
+except AttributeError:  # pragma: no cover - Python 3.7
+    def _dist(a: Sequence[float], b: Sequence[float]) -> float:
+        return math.sqrt(sum((x - y) * (x - y) for x, y in zip(a, b)))
+
+
+def _root() -> Path:
+    # audio_py/src/mic/kws.py -> repo root
+    return Path(os.environ.get("VOXIE_ROOT") or Path(__file__).resolve().parents[3])
+
+
+def model_path(word: str = "") -> Path:
+    p = os.environ.get("VOXIE_KWS_MODEL", "").strip()
+    if p:
+        return Path(p)
+    word = (word or os.environ.get("VOXIE_WAKE_WORD", "voxie")).strip().lower() or "voxie"
+    return _root() / "data" / "kws" / (word + ".json")
+
+
+def backends() -> list:
+    """MFCC backends available in this interpreter, fastest first."""
+    return (["numpy"] if np is not None else []) + ["python"]
+
+
+def _mel(hz: float) -> float:
+    return 2595.0 * math.log10(1.0 + hz / 700.0)
+
+
+def _hz(mel: float) -> float:
+    return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+
+class _Fft:
+    """Power spectrum of a real frame of n = 2^k samples via an n/2 complex FFT."""
+
+    def __init__(self, n: int):
+        m = n // 2
+        bits = m.bit_length() - 1
+        self.n = n
+        self.m = m
+        self.rev = [int(format(i, "0%db" % bits)[::-1], 2) if bits else 0 for i in range(m)]
+        self.tw: List[Tuple[int, List[complex]]] = []
+        size = 2
+        while size <= m:
+            half = size // 2
+            self.tw.append((size, [complex(math.cos(-2 * math.pi * k / size), math.sin(-2 * math.pi * k / size))
+                                   for k in range(half)]))
+            size *= 2
+        self.post = [complex(math.cos(-2 * math.pi * k / n), math.sin(-2 * math.pi * k / n)) for k in range(m + 1)]
+
+    def power(self, x: Sequence[float]) -> List[float]:
+        m = self.m
+        a = [complex(x[2 * i], x[2 * i + 1]) for i in self.rev]
+        for size, w in self.tw:
+            half = size // 2
+            for start in range(0, m, size):
+                for k in range(half):
+                    i = start + k
+                    v = a[i + half] * w[k]
+                    u = a[i]
+                    a[i] = u + v
+                    a[i + half] = u - v
+        out = []
+        post = self.post
+        for k in range(m + 1):
+            zk = a[k % m]
+            zc = a[(m - k) % m].conjugate()
+            xk = 0.5 * (zk + zc) - 0.5j * post[k] * (zk - zc)
+            out.append(xk.real * xk.real + xk.imag * xk.imag)
+        return out
+
+
+class Mfcc:
+    """MFCC frames (c1..c<n_ceps> + deltas) of S16_LE mono PCM."""
+
+    def __init__(
+        self,
+        rate: int = 16000,
+        win: int = 512,
+        hop_ms: int = 20,
+        n_mels: int = 20,
+        n_ceps: int = 12,
+        fmin: float = 100.0,
+        fmax: float = 7000.0,
+        backend: str = "",
+    ):
+        self.rate = rate
+        self.win = win
+        self.hop = max(1, rate * hop_ms // 1000)
+        self.hop_ms = hop_ms
+        self.n_mels = n_mels
+        self.n_ceps = n_ceps
+        name = (backend or os.environ.get("VOXIE_KWS_BACKEND", "auto")).strip().lower()
+        self.backend = name if name in backends() else backends()[0]
+
+        self.window = [0.54 - 0.46 * math.cos(2 * math.pi * i / (win - 1)) for i in range(win)]
+        nbins = win // 2 + 1
+        fmax = min(fmax, rate / 2.0)
+        pts = [_hz(_mel(fmin) + (_mel(fmax) - _mel(fmin)) * i / (n_mels + 1)) for i in range(n_mels + 2)]
+        bins = [p * win / rate for p in pts]
+        # sparse triangles: (first bin, weights)
+        self.filters: List[Tuple[int, List[float]]] = []
+        for j in range(n_mels):
+            lo, mid, hi = bins[j], bins[j + 1], bins[j + 2]
+            first = int(math.ceil(lo))
+            w = []
+            for b in range(first, min(nbins, int(math.floor(hi)) + 1)):
+                w.append((b - lo) / (mid - lo) if b <= mid else (hi - b) / (hi - mid))
+            self.filters.append((first, [max(0.0, v) for v in w]))
+        self.dct = [[math.cos(math.pi * k * (j + 0.5) / n_mels) for j in range(n_mels)] for k in range(1, n_ceps + 1)]
+        self._fft = _Fft(win)
+        if self.backend == "numpy":
+            fb = np.zeros((n_mels, nbins), dtype=np.float64)
+            for j, (first, w) in enumerate(self.filters):
+                fb[j, first:first + len(w)] = w
+            self._fb = fb.T
+            self._dct = np.array(self.dct).T
+            self._win = np.array(self.window)
+
+    def count(self, nsamples: int) -> int:
+        return 0 if nsamples < self.win else 1 + (nsamples - self.win) // self.hop
+
+    def _samples(self, pcm: bytes) -> List[float]:
+        a = array.array("h")
+        a.frombytes(memoryview(pcm)[:len(pcm) - len(pcm) % 2])
+        if sys.byteorder == "big":
+            a.byteswap()
+        x = a.tolist()
+        # pre-emphasis
+        return [float(x[0])] + [x[i] - 0.97 * x[i - 1] for i in range(1, len(x))] if x else []
+
+    def frames(self, pcm: bytes) -> List[Vec]:
+        x = self._samples(pcm)
+        n = self.count(len(x))
+        if n == 0:
+            return []
+        if self.backend == "numpy":
+            return self._frames_numpy(x, n)
+        out: List[Vec] = []
+        win, hop, fft = self.win, self.hop, self._fft
+        wnd = self.window
+        for f in range(n):
+            seg = x[f * hop:f * hop + win]
+            p = fft.power([s * w for s, w in zip(seg, wnd)])
+            logmel = []
+            for first, w in self.filters:
+                e = sum(pv * wv for pv, wv in zip(p[first:first + len(w)], w))
+                logmel.append(math.log(e if e > 1e-3 else 1e-3))
+            out.append([sum(c * m for c, m in zip(row, logmel)) for row in self.dct])
+        return _deltas(out)
+
+    def _frames_numpy(self, x: List[float], n: int) -> List[Vec]:
+        a = np.asarray(x, dtype=np.float64)
+        idx = np.arange(self.win)[None, :] + self.hop * np.arange(n)[:, None]
+        spec = np.fft.rfft(a[idx] * self._win, axis=1)
+        p = spec.real ** 2 + spec.imag ** 2
+        c = np.log(np.maximum(p @ self._fb, 1e-3)) @ self._dct
+        return _deltas(c.tolist())
+
+
+def _deltas(frames: List[Vec]) -> List[Vec]:
+    # (next - previous) / 2, edges repeated: weighs the consonant transitions
+    n = len(frames)
+    return [
+        f + [(a - b) * 0.5 for a, b in zip(frames[min(n - 1, t + 1)], frames[max(0, t - 1)])]
+        for t, f in enumerate(frames)
+    ]
+
+
+def dtw(tpl: Sequence[Vec], seq: Sequence[Vec]) -> float:
+    """
+    Subsequence DTW: best match of the whole template against any stretch
+    of `seq`, accumulated distance / path length (lower is closer).
+    """
+    if not tpl or not seq:
+        return float("inf")
+    t = len(seq)
+    t0 = tpl[0]
+    cost = [_dist(t0, s) for s in seq]
+    plen = [1] * t
+    for ti in tpl[1:]:
+        c = [0.0] * t
+        ln = [0] * t
+        d = _dist(ti, seq[0])
+        c[0] = cost[0] + d
+        ln[0] = plen[0] + 1
+        for j in range(1, t):
+            d = _dist(ti, seq[j])
+            # up (i-1, j), diagonal (i-1, j-1), left (i, j-1)
+            best, bl = cost[j - 1], plen[j - 1]
+            if cost[j] < best:
+                best, bl = cost[j], plen[j]
+            if c[j - 1] < best:
+                best, bl = c[j - 1], ln[j - 1]
+            c[j] = best + d
+            ln[j] = bl + 1
+        cost, plen = c, ln
+    return min(cv / lv for cv, lv in zip(cost, plen))
+
+
+def trim(pcm: bytes, rate: int = 16000, below_db: float = 30.0) -> bytes:
+    """Drop leading/trailing 20 ms frames more than `below_db` under the loudest one."""
+    ff = FrameFeatures(rate, 20)
+    rms = ff.frames(pcm).rms
+    if not rms:
+        return pcm
+    floor = max(rms) * 10.0 ** (-below_db / 20.0)
+    keep = [i for i, v in enumerate(rms) if v >= floor]
+    return pcm[keep[0] * ff.frame_bytes:(keep[-1] + 1) * ff.frame_bytes]
+
+
+def templates(takes: Sequence[bytes], mfcc: Mfcc) -> List[List[Vec]]:
+    """MFCC templates of the enrollment takes (trimmed; < 100 ms dropped)."""
+    out = [mfcc.frames(trim(t, mfcc.rate)) for t in takes]
+    return [t for t in out if len(t) >= 5]
+
+
+def calibrate(templates: List[List[Vec]], margin: float = 1.0) -> float:
+    """Threshold from the enrolled takes: worst template-to-template score x margin."""
+    worst = 0.0
+    for i, a in enumerate(templates):
+        for j, b in enumerate(templates):
+            if i != j:
+                worst = max(worst, dtw(a, b))
+    return worst * margin if worst else 0.0
+
+
+def save_model(path: Path, word: str, mfcc: Mfcc, templates: List[List[Vec]], threshold: float) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "word": word,
+        "rate": mfcc.rate,
+        "win": mfcc.win,
+        "hop_ms": mfcc.hop_ms,
+        "n_mels": mfcc.n_mels,
+        "n_ceps": mfcc.n_ceps,
+        "threshold": round(threshold, 4),
+        "created": int(time.time()),
+        "templates": [[[round(v, 4) for v in f] for f in t] for t in templates],
+    }
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, str(path))
+
+
+def load_model(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not data.get("templates"):
+        return None
+    return data
+
+
+class Spotter:
+    """Enrolled templates + threshold; score()/detect() on a PCM segment."""
+
+    def __init__(self, model: Dict[str, Any], threshold: Optional[float] = None, backend: str = ""):
+        self.word = str(model.get("word", ""))
+        self.mfcc = Mfcc(
+            rate=int(model.get("rate", 16000)),
+            win=int(model.get("win", 512)),
+            hop_ms=int(model.get("hop_ms", 20)),
+            n_mels=int(model.get("n_mels", 20)),
+            n_ceps=int(model.get("n_ceps", 12)),
+            backend=backend,
+        )
+        self.templates: List[List[Vec]] = model["templates"]
+        if threshold is None:
+            env = os.environ.get("VOXIE_KWS_THRESHOLD", "").strip()
+            threshold = float(env) if env else float(model.get("threshold", 0.0))
+        self.threshold = threshold
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> Optional["Spotter"]:
+        """Spotter from the enrolled model, None if there is none."""
+        model = load_model(path or model_path())
+        return cls(model) if model else None
+
+    def score(self, pcm: bytes) -> float:
+        seq = self.mfcc.frames(pcm)
+        return min(dtw(t, seq) for t in self.templates) if seq else float("inf")
+
+    def detect(self, pcm: bytes) -> Tuple[bool, float]:
+        s = self.score(pcm)
+        return s <= self.threshold, s
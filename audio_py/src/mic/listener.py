@@ -1,12 +1,39 @@
 from __future__ import annotations
 
+"""
+PTT pipeline and the single-process listener runtime.
+
+- on_ptt(): one blocking record -> ASR -> agent pass, for orchestrators
+- MicListener: one asyncio process for the trigger sources (FIFO,
+  evdev key, wake VAD - src/mic/sources.py), the wake handoff socket and
+  the turn pipeline (src/mic/turn.py). start.sh used to run a Python
+  interpreter per source next to the listener; VOXIE_LISTEN_SOURCES
+  picks what runs inside instead (bin/bench_listener_mem.py: RSS saved).
+  Producers still outside (avrcp_ptt.py, a separate wake_poll.py) send
+  timestamped events on the trigger bus (src/trigger_bus.py)
+"""
+
 import os
+import sys
+import time
+import wave
+import asyncio
 import subprocess
 import shlex
-from typing import Optional
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
 
 from voice_state import VoiceState
-from audio_client import AudioClient
+from audio_client import AsyncAudioClient, AudioClient
+from agent_client import AgentClient, agent_mode
+from trigger_bus import TriggerBus, TriggerEvent
+from trigger_bus import trigger_sock as default_trigger_sock
+from .endpoint import rec_mode, record
+from .handoff import HandoffServer, Utterance, strip_wake
+from .handoff import handoff_sock as default_handoff_sock
+from .sources import EvdevSource, FifoSource, WakeSource, parse_keycodes
+from .turn import Turn, TurnEngine
+
+__all__ = ["on_ptt", "MicListener", "MicListenerConfig", "listen_sources", "stop_playback", "wait_playback"]
 
 # Project root for resolving PHP script paths (optional).
 # If not set, paths are resolved relative to the current working directory (legacy behavior).
@@ -15,7 +42,9 @@ VOXIE_ROOT = os.environ.get("VOXIE_ROOT", "").strip()
 # ALSA capture device for arecord (defaults preserved).
 MIC_DEV = os.environ.get("VOXIE_MIC_DEV", "plughw:2,0").strip()
 
-# Recording duration in seconds (defaults preserved).
+# Recording duration in seconds (defaults preserved): the fixed length with
+# VOXIE_REC_MODE=fixed, else recordings end on trailing silence (endpoint.py)
+# and this is the baseline for the time saved.
 REC_SEC = os.environ.get("VOXIE_REC_SEC", "4").strip()
 
 # Output WAV path (defaults preserved).
@@ -51,29 +80,42 @@ def _run_stdout(cmd: str) -> str:
     return (p.stdout or "").strip()
 
 
-def transcribe(wav_path: str) -> str:
-    """
-    Transcribe a WAV file by calling the existing PHP ASR bridge script.
-    Expected PHP function: asr_transcribe_wav($wavPath, $lang='it') -> ['ok'=>bool, 'text'=>string] ...
-    """
+def _asr_code(wav_path: str) -> str:
+    # A small PHP snippet that requires the bridge and echoes only the text on success.
     asr_php = _resolve("php/bin/asr.php")
-
-    # Run a small PHP snippet that requires the bridge and echoes only the text on success.
-    php_code = (
+    return (
         "require " + repr(asr_php) + "; "
         "$r=asr_transcribe_wav(" + repr(wav_path) + "," + repr(ASR_LANG) + "); "
         "if(empty($r['ok'])){fwrite(STDERR, json_encode($r).\"\\n\"); exit(2);} "
         "echo $r['text'];"
     )
-    cmd = "php -r " + shlex.quote(php_code)
+
+
+def transcribe(wav_path: str) -> str:
+    """
+    Transcribe a WAV file by calling the existing PHP ASR bridge script.
+    Expected PHP function: asr_transcribe_wav($wavPath, $lang='it') -> ['ok'=>bool, 'text'=>string] ...
+    """
+    cmd = "php -r " + shlex.quote(_asr_code(wav_path))
     return _run_stdout(cmd)
 
 
+# Resident agent worker (started on first use); None = one process per turn.
+_AGENT = AgentClient() if agent_mode() == "worker" else None
+
+
 def call_agent(text: str) -> None:
     """
-    Call the PHP agent/router entrypoint.
+    Call the PHP agent/router entrypoint: the resident worker, or
+    `php agent.php` when it cannot be reached (or VOXIE_AGENT_MODE=spawn).
     This is intentionally fire-and-forget (check=False) to preserve runtime behavior.
     """
+    if _AGENT is not None:
+        try:
+            _AGENT.turn(text)
+            return
+        except OSError:
+            pass
     agent_php = _resolve("php/bin/agent.php")
     cmd = f"php {shlex.quote(agent_php)} {shlex.quote(text)}"
     subprocess.run(cmd, shell=True, check=False)
@@ -95,7 +137,15 @@ def on_ptt(state: VoiceState, audio: Optional[AudioClient] = None) -> VoiceState
     os.makedirs(os.path.dirname(WAV_PATH) or "/tmp", exist_ok=True)
 
     # Record audio
-    _run_capture(f"{ARECORD} {shlex.quote(WAV_PATH)}")
+    if rec_mode() == "fixed":
+        _run_capture(f"{ARECORD} {shlex.quote(WAV_PATH)}")
+    else:
+        rec = record(MIC_DEV, WAV_PATH, float(REC_SEC))
+        sys.stderr.write(
+            f"[TIMING] rec ms={int(rec.seconds * 1000)} end={rec.reason} saved_ms={int(rec.saved * 1000)} src={rec.source}\n"
+        )
+        if not rec.speech:
+            return VoiceState.LISTENING
 
     # ASR
     text = transcribe(WAV_PATH)
@@ -105,3 +155,262 @@ def on_ptt(state: VoiceState, audio: Optional[AudioClient] = None) -> VoiceState
     # Agent routing
     call_agent(text)
     return VoiceState.IDLE
+
+
+# ------------------------------------------------------------
+# Single-process runtime
+# ------------------------------------------------------------
+DEFAULT_FIFO = "/tmp/bitvox_ptt.fifo"
+DEFAULT_KEYCODES = "200,201,164"  # PLAYCD, PAUSECD, PLAYPAUSE
+
+# Barge-in calm time after STOP; SPEAKING lasts while the reply plays, at most SPEAK_MAX_SEC
+AUDIO_CALM_SEC = float(os.environ.get("VOXIE_AUDIO_CALM_SEC", "0.12"))
+SPEAK_MAX_SEC = float(os.environ.get("VOXIE_SPEAK_MAX_SEC", "120"))
+# STOP / STATUS on the loop: give up on a daemon that does not answer by then
+AUDIO_CMD_SEC = 0.35
+VOICE_PRIOS = ("tts", "filler")
+
+
+def _log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def listen_sources() -> List[str]:
+    """VOXIE_LISTEN_SOURCES: trigger sources run inside the listener (fifo, evdev, wake)."""
+    raw = os.environ.get("VOXIE_LISTEN_SOURCES", "fifo")
+    return [s.strip().lower() for s in raw.split(",") if s.strip()]
+
+
+class MicListenerConfig:
+    """
+    What MicListener listens to. An empty ptt_fifo / evdev / wake_script /
+    handoff_sock / trigger_sock turns that source off.
+    """
+
+    def __init__(
+        self,
+        php_agent_cmd: str = "",
+        barge_in: bool = True,
+        ptt_fifo: str = DEFAULT_FIFO,
+        evdev: str = "",
+        keycodes: Iterable[int] = (200, 201, 164),
+        wake_script: str = "",
+        handoff_sock: Optional[str] = None,
+        trigger_sock: Optional[str] = None,
+        debounce: float = 0.35,
+        debug: bool = False,
+    ):
+        self.php_agent_cmd = php_agent_cmd
+        self.barge_in = barge_in
+        self.ptt_fifo = ptt_fifo
+        self.evdev = evdev
+        self.keycodes = tuple(keycodes)
+        self.wake_script = wake_script
+        self.handoff_sock = handoff_sock if handoff_sock is not None else default_handoff_sock()
+        self.trigger_sock = trigger_sock if trigger_sock is not None else default_trigger_sock()
+        self.debounce = debounce
+        self.debug = debug
+
+    @classmethod
+    def from_env(cls, wake_script: str = "", **kw: Any) -> "MicListenerConfig":
+        """
+        VOXIE_PTT_FIFO / VOXIE_PTT_EVDEV / VOXIE_PTT_KEYCODES /
+        VOXIE_PTT_DEBOUNCE_SEC, then `kw`; sources not in
+        VOXIE_LISTEN_SOURCES are turned off. `wake_script` is
+        bin/wake_poll.py (src/ does not know where bin/ is).
+        """
+        cfg = cls(
+            ptt_fifo=os.environ.get("VOXIE_PTT_FIFO", DEFAULT_FIFO),
+            evdev=os.environ.get("VOXIE_PTT_EVDEV", "").strip(),
+            keycodes=parse_keycodes(os.environ.get("VOXIE_PTT_KEYCODES", DEFAULT_KEYCODES)),
+            wake_script=wake_script,
+            debounce=float(os.environ.get("VOXIE_PTT_DEBOUNCE_SEC", "0.35")),
+        )
+        for k, v in kw.items():
+            setattr(cfg, k, v)
+        src = listen_sources()
+        if "fifo" not in src:
+            cfg.ptt_fifo = ""
+        if "evdev" not in src:
+            cfg.evdev = ""
+        if "wake" not in src:
+            cfg.wake_script = ""
+        return cfg
+
+
+async def stop_playback(audio: Optional[AsyncAudioClient], timeout: float = AUDIO_CMD_SEC) -> None:
+    """Barge-in STOP, best effort, without holding the loop on a slow daemon."""
+    if audio is None:
+        return
+    try:
+        await asyncio.wait_for(audio.stop(), timeout)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        pass
+
+
+async def wait_playback(audio: Optional[AsyncAudioClient], max_sec: float = SPEAK_MAX_SEC) -> None:
+    """
+    Until the reply (tts, fillers) has played: WAIT on the voice job the
+    daemon is playing, then on the next while more are queued. The daemon
+    answers when the job ends (no STATUS polling); a new trigger cancels
+    the turn, and this wait with it (the connection is dropped).
+    """
+    if audio is None:
+        return
+    deadline = time.monotonic() + max_sec
+    while True:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return
+        try:
+            st = await asyncio.wait_for(audio.status(), AUDIO_CMD_SEC)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return
+        job = st.get("job")
+        if st.get("prio") not in VOICE_PRIOS:
+            if not st.get("queued"):
+                return
+            # a voice job is queued behind one being preempted: it starts next
+            await asyncio.sleep(0.05)
+            continue
+        if not job:
+            return
+        try:
+            r = await asyncio.wait_for(audio.wait(str(job), int(left * 1000)), left + AUDIO_CMD_SEC)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return
+        if not r.get("ok") or r.get("timeout"):
+            # daemon without WAIT, or still playing at the deadline
+            return
+
+
+class MicListener:
+    """
+    Trigger sources and the turn pipeline on one event loop.
+
+    handler(turn, item) runs each turn (item: None for a PTT press, an
+    Utterance for a wake handoff); the default is turn() below, the
+    cancellable form of on_ptt(). voxie_listen passes its own.
+    """
+
+    def __init__(
+        self,
+        cfg: MicListenerConfig,
+        audio: Optional[AsyncAudioClient] = None,
+        handler: Optional[Callable[[Turn, Any], Awaitable[None]]] = None,
+        on_state: Optional[Callable[[VoiceState, Optional[Turn]], None]] = None,
+        log: Callable[[str], None] = _log,
+    ):
+        self.cfg = cfg
+        # no client timeout: WAIT lasts as long as the reply, the calls bound themselves
+        self.audio = audio if audio is not None else AsyncAudioClient()
+        self.log = log
+        self.engine = TurnEngine(handler or self.turn, cfg.debounce, on_state or self._on_state, log)
+        self.sources: List[str] = []
+        self._open: List[Any] = []
+
+    def listen(self) -> None:
+        """Blocking: serve until Ctrl-C."""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            self.log("[LISTEN] exit")
+
+    async def serve(self) -> None:
+        try:
+            await self.engine.serve(self._start)
+        finally:
+            loop = asyncio.get_running_loop()
+            for src in self._open:
+                src.close(loop)
+
+    def _on_state(self, st: VoiceState, turn: Optional[Turn]) -> None:
+        if self.cfg.debug:
+            self.log(f"[STATE] {st.name}" + (f" #{turn.seq}" if turn is not None else ""))
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        cfg, trigger = self.cfg, self.engine.trigger
+        cand: List[Any] = []
+        if cfg.trigger_sock:
+            cand.append(TriggerBus(cfg.trigger_sock, self._on_event, self.log))
+        if cfg.ptt_fifo:
+            cand.append(FifoSource(cfg.ptt_fifo, trigger, self.log))
+        if cfg.evdev:
+            cand.append(EvdevSource(cfg.evdev, cfg.keycodes, trigger, self.log))
+        for src in cand:
+            if src.start(loop):
+                self._open.append(src)
+                self.sources.append(src.name)
+        if cfg.handoff_sock:
+            try:
+                server = HandoffServer(cfg.handoff_sock, trigger)
+                server.bind()
+                server.start()
+                self.sources.append("handoff")
+            except OSError as e:
+                self.log(f"[WARN] handoff socket {cfg.handoff_sock}: {e} (wake turns via FIFO)")
+        # after the handoff socket: the wake listener connects to it
+        if cfg.wake_script and WakeSource(cfg.wake_script, self.log).start(loop):
+            self.sources.append("wake")
+        self.log(f"[LISTEN] sources: {' '.join(self.sources) or 'none'} (pid {os.getpid()})")
+
+    def _on_event(self, ev: TriggerEvent) -> None:
+        # a PTT press, or a wake without the handoff: either way a recorded turn
+        self.log(f"[BUS] {ev.source} {int((ev.received - ev.ts) * 1000)}ms" + (f" {ev.data}" if ev.data else ""))
+        self.engine.trigger(None, ev.ts)
+
+    async def turn(self, turn: Turn, utt: Optional[Utterance]) -> None:
+        """Default pipeline: record (or the handed-off audio) -> ASR -> agent -> reply."""
+        os.makedirs(os.path.dirname(WAV_PATH) or "/tmp", exist_ok=True)
+        if utt is None:
+            if self.cfg.barge_in:
+                await stop_playback(self.audio)
+                await asyncio.sleep(AUDIO_CALM_SEC)
+            turn.state(VoiceState.LISTENING, "record")
+            rec = await turn.blocking(record, MIC_DEV, WAV_PATH, float(REC_SEC), "", turn.cancelled)
+            sys.stderr.write(
+                f"[TIMING] rec ms={int(rec.seconds * 1000)} end={rec.reason} saved_ms={int(rec.saved * 1000)} src={rec.source}\n"
+            )
+            if not rec.speech:
+                return
+        else:
+            with wave.open(WAV_PATH, "wb") as wf:
+                wf.setnchannels(utt.channels)
+                wf.setsampwidth(2)
+                wf.setframerate(utt.rate)
+                wf.writeframes(utt.pcm)
+
+        turn.state(VoiceState.THINKING, "asr")
+        rc, out, err = await turn.run(["php", "-r", _asr_code(WAV_PATH)])
+        text = out.strip()
+        if utt is not None:
+            text = strip_wake(text, utt.wake_word)
+        if not text:
+            if err.strip():
+                self.log(f"[ASR][stderr] {err.strip()}")
+            return
+        self.log(f'[ASR] "{text}"')
+
+        turn.state(VoiceState.THINKING, "agent")
+        await self._agent(turn, text)
+
+        turn.state(VoiceState.SPEAKING, "speak")
+        await wait_playback(self.audio)
+
+    async def _agent(self, turn: Turn, text: str) -> None:
+        """call_agent(), cancellable: the worker is killed, or the one-shot php."""
+        if _AGENT is not None:
+            try:
+                await turn.blocking(_AGENT.turn, text, on_cancel=_AGENT.cancel)
+                return
+            except OSError:
+                pass
+        agent_php = self.cfg.php_agent_cmd or _resolve("php/bin/agent.php")
+        await turn.run(["php", agent_php, text], capture=False)
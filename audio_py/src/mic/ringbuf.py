@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+"""
+Fixed-size capture ring for the wake path.
+
+PcmRing keeps the last `capacity` bytes of the capture stream in one
+preallocated buffer, addressed by absolute stream offsets (bytes written
+since start). Segments come back as memoryview slices, no copy:
+
+- fill(raw, n) reads from the arecord pipe straight into the ring
+  (readinto, no intermediate bytes object)
+- the buffer is mirrored (2 x capacity, every write lands in both halves),
+  so any range up to `capacity` bytes is contiguous and view() never has
+  to stitch two pieces together
+- a view stays valid until `capacity` more bytes are written; callers
+  that keep a segment longer copy it (bytes(view))
+
+One writer thread and one reader thread may share a ring: `end` only
+moves after the bytes are in place, and a reader that compares its
+offsets with `start` after reading knows whether it was lapped.
+
+Pre-roll is just a lower start offset: view(onset - preroll, end)
+returns the audio before the VAD decision with the segment, as long as
+it is still in the ring.
+"""
+
+from typing import BinaryIO
+
+__all__ = ["PcmRing"]
+
+
+class PcmRing:
+    """Mirrored byte ring over a PCM stream, absolute offsets, zero-copy views."""
+
+    def __init__(self, capacity: int, align: int = 2):
+        align = max(1, align)
+        self.capacity = max(align, capacity - capacity % align)
+        self._buf = bytearray(2 * self.capacity)
+        self._mv = memoryview(self._buf)
+        self.end = 0  # absolute offset of the next byte to be written
+
+    @property
+    def start(self) -> int:
+        """Oldest absolute offset still held."""
+        return max(0, self.end - self.capacity)
+
+    def _mirror(self, off: int, n: int) -> None:
+        cap = self.capacity
+        self._mv[off + cap:off + cap + n] = self._mv[off:off + n]
+
+    def write(self, data: bytes) -> int:
+        """Append `data`; returns the new end offset."""
+        mv = memoryview(data).cast("B")
+        if len(mv) > self.capacity:
+            self.end += len(mv) - self.capacity
+            mv = mv[len(mv) - self.capacity:]
+        cap = self.capacity
+        while len(mv):
+            off = self.end % cap
+            n = min(len(mv), cap - off)
+            self._mv[off:off + n] = mv[:n]
+            self._mirror(off, n)
+            self.end += n
+            mv = mv[n:]
+        return self.end
+
+    def fill(self, raw: BinaryIO, n: int) -> int:
+        """
+        One readinto() of up to `n` bytes from `raw` into the ring.
+        Returns the bytes read (0 at EOF), like a short pipe read.
+        """
+        cap = self.capacity
+        off = self.end % cap
+        n = min(n, cap - off)
+        got = raw.readinto(self._mv[off:off + n])  # type: ignore[attr-defined]
+        if not got:
+            return 0
+        self._mirror(off, got)
+        self.end += got
+        return got
+
+    def view(self, start: int, end: int) -> memoryview:
+        """Bytes [start, end) of the stream, as a view into the ring."""
+        if start < self.start or end > self.end or start > end:
+            raise ValueError("range %d..%d not in ring (%d..%d)" % (start, end, self.start, self.end))
+        off = start % self.capacity
+        return self._mv[off:off + (end - start)]
+
+    def last(self, n: int) -> memoryview:
+        """The most recent `n` bytes (fewer right after start)."""
+        return self.view(max(self.start, self.end - n), self.end)
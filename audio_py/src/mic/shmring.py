@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+"""
+Capture ring in shared memory: one writer (bin/capture_daemon.py owns
+the mic), any number of reader processes at their own offsets.
+
+A file in /dev/shm (VOXIE_CAPTURE_SHM, default /dev/shm/voxie_capture),
+mmap'ed by everyone: a 64-byte header, then the same mirrored 2 x capacity
+layout as PcmRing, so SharedRing *is* a PcmRing (view(), last(), start,
+absolute stream offsets) whose `end` lives in the header.
+
+    magic    8s   b"VOXPCM1\\0"
+    capacity u32  ring bytes (one half of the mirror)
+    rate     u32
+    channels u32
+    _        u32
+    end      u64  absolute offset of the next byte; moves after the bytes are in place
+    beat     f64  time.time() of the writer's last fill (liveness)
+    gen      u64  writer instance: a restarted daemon starts a new stream
+
+Readers copy what they keep and compare their offsets with `start`
+afterwards, exactly like PcmRing readers in another thread; `end` is
+read until two reads agree (a u64 store is two stores on 32-bit ARM).
+Plain mmap keeps this on Python 3.7 (no multiprocessing.shared_memory,
+no resource tracker unlinking the segment when a reader exits).
+"""
+
+import os
+import mmap
+import time
+import struct
+from typing import Optional
+
+from .ringbuf import PcmRing
+
+__all__ = ["DEFAULT_SHM", "SharedRing", "attach_live", "capture_shm"]
+
+DEFAULT_SHM = "/dev/shm/voxie_capture"
+MAGIC = b"VOXPCM1\0"
+_HEAD = struct.Struct("<8sIIIIQdQ")
+_END = struct.Struct("<Q")
+_BEAT = struct.Struct("<d")
+_END_AT = 24
+_BEAT_AT = 32
+_GEN_AT = 40
+HEADER = 64
+
+
+def capture_shm() -> str:
+    """Shared ring path; empty = every process captures on its own."""
+    return os.environ.get("VOXIE_CAPTURE_SHM", DEFAULT_SHM).strip()
+
+
+def stale_sec() -> float:
+    """A writer silent for longer is gone (or its arecord is stuck)."""
+    try:
+        return float(os.environ.get("VOXIE_CAPTURE_STALE_SEC", "1.5"))
+    except ValueError:
+        return 1.5
+
+
+class SharedRing(PcmRing):
+    """PcmRing over an mmap'ed file: create() for the writer, attach() for readers."""
+
+    def __init__(self, mm: mmap.mmap, capacity: int, rate: int, channels: int):
+        # no PcmRing.__init__: the buffer is the mapping, `end` the header field
+        self._mm = mm
+        self.capacity = capacity
+        self.rate = rate
+        self.channels = channels
+        self._mv = memoryview(mm)[HEADER:HEADER + 2 * capacity]
+
+    @classmethod
+    def create(cls, path: str, seconds: float, rate: int = 16000, channels: int = 1) -> "SharedRing":
+        align = 2 * channels
+        cap = int(seconds * rate) * align
+        size = HEADER + 2 * cap
+        tmp = path + ".new"
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        _HEAD.pack_into(mm, 0, MAGIC, cap, rate, channels, 0, 0, time.time(), time.time_ns())
+        # readers never see a half-initialised header
+        os.replace(tmp, path)
+        return cls(mm, cap, rate, channels)
+
+    @classmethod
+    def attach(cls, path: str) -> Optional["SharedRing"]:
+        """The writer's ring, read-only; None when there is none (or not a ring)."""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if size < HEADER:
+                return None
+            mm = mmap.mmap(fd, size, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic, cap, rate, channels, _, _, _, _ = _HEAD.unpack_from(mm, 0)
+        if magic != MAGIC or size < HEADER + 2 * cap:
+            mm.close()
+            return None
+        return cls(mm, cap, rate, channels)
+
+    @property  # type: ignore[override]
+    def end(self) -> int:
+        a = _END.unpack_from(self._mm, _END_AT)[0]
+        while True:
+            b = _END.unpack_from(self._mm, _END_AT)[0]
+            if a == b:
+                return a
+            a = b
+
+    @end.setter
+    def end(self, v: int) -> None:
+        _END.pack_into(self._mm, _END_AT, v)
+        _BEAT.pack_into(self._mm, _BEAT_AT, time.time())
+
+    @property
+    def gen(self) -> int:
+        return _END.unpack_from(self._mm, _GEN_AT)[0]
+
+    def age(self) -> float:
+        """Seconds since the writer last filled the ring."""
+        return time.time() - _BEAT.unpack_from(self._mm, _BEAT_AT)[0]
+
+    def beat(self) -> None:
+        """Writer: alive, even if the mic delivered nothing."""
+        _BEAT.pack_into(self._mm, _BEAT_AT, time.time())
+
+    def alive(self) -> bool:
+        return self.age() < stale_sec()
+
+    def wait(self, offset: int, timeout: float, poll: float = 0.01) -> bool:
+        """
+        Reader: sleep until the ring reaches stream `offset` (no cross-process
+        condition variable; `poll` is well under a frame). False on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while self.end < offset:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def close(self) -> None:
+        try:
+            self._mv.release()
+            self._mm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes with the process
+
+
+def attach_live(path: Optional[str] = None) -> Optional[SharedRing]:
+    """The capture daemon's ring if it is running, else None (capture yourself)."""
+    path = capture_shm() if path is None else path
+    if not path:
+        return None
+    ring = SharedRing.attach(path)
+    if ring is not None and not ring.alive():
+        ring.close()
+        return None
+    return ring
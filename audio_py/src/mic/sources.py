@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+"""
+Trigger sources for the single-process listener (src/mic/listener.py).
+
+Each one used to be a Python interpreter of its own writing "PTT" into
+the FIFO (bin/evdev_ptt.py, bin/wake_poll.py). Here they run inside the
+listener and call `trigger(item, ts)` directly - TurnEngine.trigger(),
+which is safe from any thread:
+
+- FifoSource: lines on VOXIE_PTT_FIFO (`echo PTT > fifo`, producers
+  when the trigger bus is off); an asyncio reader, no thread
+- EvdevSource: key presses on /dev/input/eventX (what evdev_ptt.py
+  does), an asyncio reader on the non-blocking device
+- WakeSource: bin/wake_poll.py's main() on a thread; it hands wake
+  utterances to the listener's HandoffServer as before, only the
+  socket is now within one process
+
+Sources that cannot start (no device, no permission) log why and stay
+off; the listener runs with the rest.
+"""
+
+import os
+import sys
+import struct
+import asyncio
+import threading
+import importlib.util
+from typing import Any, Callable, Iterable, List, Optional
+
+from trigger_bus import realtime_to_mono
+
+__all__ = ["FifoSource", "EvdevSource", "WakeSource", "parse_keycodes"]
+
+# struct input_event: struct timeval (2x long) + type + code + value, native layout
+EVENT_FMT = "llHHi"
+EVENT_SIZE = struct.calcsize(EVENT_FMT)
+EV_KEY = 0x01
+KEY_PRESS = 1  # 0 = release, 2 = autorepeat
+
+
+def parse_keycodes(csv: str) -> List[int]:
+    out: List[int] = []
+    for part in (csv or "").split(","):
+        try:
+            out.append(int(part.strip(), 10))
+        except ValueError:
+            pass
+    return out
+
+
+class FifoSource:
+    """Each line on the FIFO is one PTT press."""
+
+    name = "fifo"
+
+    def __init__(self, path: str, trigger: Callable[..., None], log: Callable[[str], None]):
+        self.path = path
+        self.trigger = trigger
+        self.log = log
+        self._fd: Optional[int] = None
+        self._buf = b""
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> bool:
+        if not os.path.exists(self.path):
+            try:
+                os.mkfifo(self.path, 0o666)
+            except OSError as e:
+                self.log(f"[SRC][WARN] fifo {self.path}: {e}")
+                return False
+        # O_RDWR: we hold a writer ourselves, so the FIFO never reads EOF between writers
+        self._fd = os.open(self.path, os.O_RDWR | os.O_NONBLOCK)
+        loop.add_reader(self._fd, self._ready)
+        return True
+
+    def _ready(self) -> None:
+        assert self._fd is not None
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        *lines, self._buf = (self._buf + data).split(b"\n")
+        for line in lines:
+            if line.strip():
+                self.trigger(None)
+
+    def close(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._fd is not None:
+            loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+
+class EvdevSource:
+    """Presses of `keycodes` on an input event device are PTT presses."""
+
+    name = "evdev"
+
+    def __init__(self, dev: str, keycodes: Iterable[int], trigger: Callable[..., None],
+                 log: Callable[[str], None]):
+        self.dev = dev
+        self.keycodes = frozenset(keycodes)
+        self.trigger = trigger
+        self.log = log
+        self._fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._buf = b""
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            self._fd = os.open(self.dev, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError as e:
+            self.log(f"[SRC][WARN] evdev {self.dev}: {e} (sudo, or add the user to the input group)")
+            return False
+        self._loop = loop
+        loop.add_reader(self._fd, self._ready)
+        return True
+
+    def _ready(self) -> None:
+        assert self._fd is not None
+        try:
+            data = os.read(self._fd, EVENT_SIZE * 64)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # device unplugged
+            self.log(f"[SRC][WARN] evdev {self.dev}: {e}")
+            assert self._loop is not None
+            self.close(self._loop)
+            return
+        buf = self._buf + data
+        end = len(buf) - len(buf) % EVENT_SIZE
+        for sec, usec, etype, code, value in struct.iter_unpack(EVENT_FMT, buf[:end]):
+            if etype == EV_KEY and value == KEY_PRESS and code in self.keycodes:
+                self.log(f"[EVDEV_PTT] PTT (code={code})")
+                # the kernel's press time: debounce on it, not on when we read it
+                self.trigger(None, realtime_to_mono(sec + usec / 1e6))
+        self._buf = buf[end:]
+
+    def close(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._fd is not None:
+            loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+
+class WakeSource:
+    """bin/wake_poll.py, loaded as a module and run on a daemon thread."""
+
+    name = "wake"
+
+    def __init__(self, script: str, log: Callable[[str], None]):
+        self.script = script
+        self.log = log
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            spec = importlib.util.spec_from_file_location("wake_poll", self.script)
+            if spec is None or spec.loader is None:
+                raise ImportError(f"not a python file: {self.script}")
+            mod = importlib.util.module_from_spec(spec)
+            sys.modules["wake_poll"] = mod
+            spec.loader.exec_module(mod)  # type: ignore[union-attr]
+        except Exception as e:
+            self.log(f"[SRC][WARN] wake {self.script}: {e}")
+            return False
+        self._thread = threading.Thread(target=self._run, args=(mod,), name="wake", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, mod: Any) -> None:
+        try:
+            mod.main()
+        except SystemExit as e:
+            # arecord missing and the like: the listener keeps its other sources
+            self.log(f"[SRC][WARN] wake listener exited ({e.code})")
+
+    def close(self, loop: asyncio.AbstractEventLoop) -> None:
+        # daemon thread; as with wake_poll.py run alone, its own arecord
+        # (only spawned without the capture daemon) outlives a SIGTERM
+        pass
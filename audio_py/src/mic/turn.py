@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+"""
+Turn engine: one voice turn at a time, every stage cancellable.
+
+voxie_listen ran record -> ASR -> agent strictly in sequence: a PTT
+press while ASR or the agent ran waited in the FIFO and was then eaten
+by the debounce. TurnEngine runs each turn as an asyncio task and tracks
+its VoiceState (LISTENING while recording, THINKING during ASR and the
+agent, SPEAKING while the reply plays, IDLE after). A new trigger (PTT
+line, wake handoff) in any of them is a barge-in:
+
+- the running turn's task is cancelled and cleans up before the next
+  turn starts: subprocesses (asr.php, agent.php) are killed with their
+  whole process group; a thread stage (recording, the agent worker
+  request) sees Turn.cancelled set and its on_cancel hook runs (the
+  agent worker is killed, see AgentClient.cancel), so an abandoned turn
+  keeps no CPU or network busy
+- then the new turn starts at once (its handler stops playback and
+  records)
+
+Triggers closer than `debounce` seconds are dropped, measured on when
+the event happened (the trigger bus' timestamps, else the trigger()
+call), not on when the loop got to it. What a
+turn does is the caller's `async def handler(turn, item)`, written with
+turn.state(), turn.run() and turn.blocking().
+"""
+
+import os
+import time
+import signal
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import metrics
+from voice_state import VoiceState
+
+__all__ = ["Turn", "TurnEngine"]
+
+# how long a thread stage may take to notice the cancel before the next turn starts anyway
+THREAD_GRACE_SEC = 2.0
+
+_TURNS = metrics.counter("voxie_turn_total", "Turns by outcome", ("result",))
+_CANCELLED = metrics.counter("voxie_turn_cancelled_total", "Turns abandoned for a newer trigger, by stage", ("stage",))
+_CANCEL_SECONDS = metrics.histogram(
+    "voxie_turn_cancel_seconds", "Barge-in: new trigger until the old turn has stopped", (),
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2),
+)
+_STATE = metrics.gauge("voxie_turn_state", "Turn engine VoiceState (1 = current)", ("state",))
+
+
+def _killpg(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except Exception:
+        pass
+
+
+class Turn:
+    """One running turn, as its handler sees it."""
+
+    def __init__(self, engine: "TurnEngine", seq: int, item: Any):
+        self.engine = engine
+        self.seq = seq
+        self.item = item
+        self.stage = "start"
+        self.t0 = time.monotonic()
+        # set on barge-in, before the task is cancelled: thread stages poll it
+        self.cancelled = threading.Event()
+
+    def state(self, st: VoiceState, stage: str = "") -> None:
+        self.stage = stage or st.name.lower()
+        self.engine._set_state(st, self)
+
+    async def run(self, cmd: List[str], capture: bool = True) -> Tuple[int, str, str]:
+        """Subprocess in a session of its own: on cancel the whole group is killed."""
+        pipe = asyncio.subprocess.PIPE if capture else None
+        proc = await asyncio.create_subprocess_exec(*cmd, stdout=pipe, stderr=pipe, start_new_session=True)
+        try:
+            out, err = await proc.communicate()
+        except asyncio.CancelledError:
+            _killpg(proc.pid)
+            await proc.wait()
+            raise
+        dec = (lambda b: b.decode("utf-8", errors="replace") if b else "")
+        return proc.returncode if proc.returncode is not None else -1, dec(out), dec(err)
+
+    async def blocking(self, fn: Callable[..., Any], *args: Any,
+                       on_cancel: Optional[Callable[[], None]] = None) -> Any:
+        """
+        fn(*args) on a worker thread. On cancel, Turn.cancelled is already
+        set, on_cancel() runs, and the thread gets THREAD_GRACE_SEC to return.
+        """
+        fut = asyncio.get_running_loop().run_in_executor(self.engine._pool, fn, *args)
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            if on_cancel is not None:
+                on_cancel()
+            try:
+                await asyncio.wait_for(fut, THREAD_GRACE_SEC)
+            except BaseException:
+                pass
+            raise
+
+
+class TurnEngine:
+    """Runs `handler(turn, item)` per trigger; a newer trigger cancels the turn in progress."""
+
+    def __init__(
+        self,
+        handler: Callable[[Turn, Any], Awaitable[None]],
+        debounce: float = 0.35,
+        on_state: Optional[Callable[[VoiceState, Optional[Turn]], None]] = None,
+        log: Callable[[str], None] = lambda m: None,
+    ):
+        self.handler = handler
+        self.debounce = debounce
+        self.on_state = on_state
+        self.log = log
+        self.state = VoiceState.IDLE
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._q: Optional["asyncio.Queue[Tuple[Any, float]]"] = None
+        self._turn: Optional[Turn] = None
+        self._task: Optional["asyncio.Future[None]"] = None
+        self._seq = 0
+        self._last = 0.0
+        # recording + agent request + a cancelled one still winding down
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="turn")
+
+    def trigger(self, item: Any = None, ts: Optional[float] = None) -> None:
+        """
+        Any thread: None for a PTT press, or a handed-off Utterance. `ts`:
+        when it happened (time.monotonic()); default now.
+        """
+        if self._loop is None or self._q is None:
+            raise RuntimeError("TurnEngine.serve() is not running")
+        now = time.monotonic()
+        # never in the future: a bad stamp would debounce everything after it
+        ts = now if ts is None else min(ts, now)
+        self._loop.call_soon_threadsafe(self._q.put_nowait, (item, ts))
+
+    def _set_state(self, st: VoiceState, turn: Optional[Turn]) -> None:
+        if st is self.state:
+            return
+        _STATE.set(0, state=self.state.name)
+        _STATE.set(1, state=st.name)
+        self.state = st
+        if self.on_state is not None:
+            self.on_state(st, turn)
+
+    async def serve(self, on_ready: Optional[Callable[[], None]] = None) -> None:
+        """Event loop side; on_ready() runs once trigger() works (start the input threads there)."""
+        self._loop = asyncio.get_running_loop()
+        self._q = asyncio.Queue()
+        _STATE.set(1, state=self.state.name)
+        if on_ready is not None:
+            on_ready()
+        try:
+            while True:
+                item, ts = await self._q.get()
+                if ts - self._last < self.debounce:
+                    continue
+                self._last = ts
+                await self._cancel()
+                self._seq += 1
+                turn = Turn(self, self._seq, item)
+                self._turn = turn
+                self._task = asyncio.ensure_future(self._run(turn))
+        finally:
+            await self._cancel()
+            self._pool.shutdown(wait=False)
+
+    async def _cancel(self) -> None:
+        task, turn = self._task, self._turn
+        if task is None or task.done() or turn is None:
+            return
+        t0 = time.monotonic()
+        turn.cancelled.set()
+        task.cancel()
+        await asyncio.wait({task})   # stages clean up (kill, thread grace) before the next turn starts
+        took = time.monotonic() - t0
+        _CANCELLED.inc(stage=turn.stage)
+        _CANCEL_SECONDS.observe(took)
+        self.log(f"[TURN] #{turn.seq} cancelled in {turn.stage} after "
+                 f"{int((t0 - turn.t0) * 1000)}ms (stopped in {int(took * 1000)}ms)")
+
+    async def _run(self, turn: Turn) -> None:
+        result = "done"
+        try:
+            await self.handler(turn, turn.item)
+        except asyncio.CancelledError:
+            result = "cancelled"
+            raise
+        except Exception as e:
+            result = "error"
+            self.log(f"[TURN][ERR] #{turn.seq} {turn.stage}: {e!r}")
+        finally:
+            _TURNS.inc(result=result)
+            if self._turn is turn:
+                self._set_state(VoiceState.IDLE, turn)
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+"""
+Voice activity detection for the wake path (one decision per frame).
+
+Both gates take the per-frame features from features.py and share one
+interface: update(rms, zcr) returns None, START when a segment begins,
+or a Segment when it ends (accepted or rejected, see Segment.reason).
+
+FixedVad is the historical wake_poll gate: RMS >= VOXIE_WAKE_THRESH opens
+a segment, VOXIE_WAKE_SILENCE_TAIL_MS below it closes it. In a room with a
+fan, a TV or the speaker's own radio above the threshold it never stops
+cutting 2 s segments, and every one of them is an ASR call.
+
+AdaptiveVad decides on SNR against a running noise floor instead:
+- floor:    percentile (VOXIE_VAD_FLOOR_Q, median by default) of the
+            100 ms block levels over the last VOXIE_VAD_FLOOR_SEC seconds;
+            steady noise becomes the floor within a few seconds, a 2 s
+            wake phrase never does
+- start:    VOXIE_VAD_ONSET_MS of consecutive frames >= VOXIE_VAD_START_DB
+            above the floor (and >= VOXIE_VAD_MIN_RMS absolute)
+- stop:     VOXIE_VAD_HANGOVER_MS below VOXIE_VAD_STOP_DB (hysteresis:
+            stop_db < start_db keeps word gaps inside one segment)
+- gap:      no new onset for VOXIE_VAD_MIN_GAP_MS after a segment ends
+- reject:   "hum" when the mean ZCR is below VOXIE_VAD_ZCR_MIN (mains hum,
+            motors: 50/100 Hz cross 0.006-0.0125 per sample), "steady" when
+            the frame levels vary less than VOXIE_VAD_MOD_DB (speech has
+            syllabic modulation, a fan switching on does not), "short"
+            below the minimum length
+
+make_vad() picks one from VOXIE_VAD_MODE (adaptive|fixed).
+"""
+
+import os
+import math
+from collections import deque
+from typing import List, NamedTuple, Optional, Union
+
+__all__ = ["START", "Segment", "FixedVad", "AdaptiveVad", "make_vad", "level_db"]
+
+START = "start"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def level_db(rms: float) -> float:
+    """RMS of S16 samples in dB (0 dB = 1 LSB)."""
+    return 20.0 * math.log10(rms) if rms > 1.0 else 0.0
+
+
+class Segment(NamedTuple):
+    start: int      # frame index of the first frame (onset included)
+    frames: int     # frames from start to the decision, tail included
+    tail: int       # trailing frames below the stop level (trim before ASR)
+    ok: bool
+    reason: str     # "" when ok, else "short" | "hum" | "steady"
+    snr_db: float   # loudest frame above the floor
+    mod_db: float   # std-dev of the frame levels (speech > steady noise)
+
+
+Event = Optional[Union[str, Segment]]
+
+
+class _Track:
+    """Per-segment frame levels (bounded by max_frames) shared by both gates."""
+
+    __slots__ = ("start", "tail", "peak", "db", "zcr")
+
+    def __init__(self, start: int) -> None:
+        self.start = start
+        self.tail = 0
+        self.peak = 0.0
+        self.db: List[float] = []
+        self.zcr: List[float] = []
+
+    @property
+    def frames(self) -> int:
+        return len(self.db)
+
+    def add(self, db: float, zcr: float, snr: float, active: bool) -> None:
+        self.db.append(db)
+        self.zcr.append(zcr)
+        self.tail = 0 if active else self.tail + 1
+        if snr > self.peak:
+            self.peak = snr
+
+    def mod_db(self, tail: int) -> float:
+        """Std-dev of the frame levels, trailing `tail` frames excluded."""
+        x = self.db[:len(self.db) - tail]
+        if len(x) < 2:
+            return 0.0
+        mean = sum(x) / len(x)
+        return math.sqrt(sum((v - mean) ** 2 for v in x) / len(x))
+
+    def mean_zcr(self, tail: int) -> float:
+        x = self.zcr[:len(self.zcr) - tail]
+        return sum(x) / len(x) if x else 0.0
+
+
+class FixedVad:
+    """Fixed RMS threshold + silence tail (the legacy wake_poll gate)."""
+
+    name = "fixed"
+    onset_frames = 1
+
+    def __init__(
+        self,
+        frame_ms: int = 20,
+        thresh: float = 800.0,
+        tail_ms: int = 250,
+        min_ms: int = 250,
+        max_ms: int = 2000,
+    ):
+        self.frame_ms = frame_ms
+        self.thresh = float(thresh)
+        self.tail_frames = max(1, tail_ms // frame_ms)
+        self.min_frames = max(1, min_ms // frame_ms)
+        self.max_frames = max(self.min_frames, max_ms // frame_ms)
+        self.floor_db = level_db(self.thresh)
+        self._i = 0
+        self._seg: Optional[_Track] = None
+
+    @property
+    def in_speech(self) -> bool:
+        return self._seg is not None
+
+    def update(self, rms: float, zcr: float = 0.0) -> Event:
+        i = self._i
+        self._i += 1
+        loud = rms >= self.thresh
+        seg = self._seg
+        if seg is None:
+            if not loud:
+                return None
+            seg = self._seg = _Track(i)
+            seg.add(level_db(rms), zcr, level_db(rms) - self.floor_db, True)
+            return START
+        seg.add(level_db(rms), zcr, level_db(rms) - self.floor_db, loud)
+        tail = min(seg.tail, self.tail_frames)
+        if seg.frames >= self.max_frames or (seg.frames >= self.min_frames and tail >= self.tail_frames):
+            self._seg = None
+            ok = seg.frames - tail >= self.min_frames
+            return Segment(seg.start, seg.frames, tail, ok, "" if ok else "short", seg.peak, seg.mod_db(tail))
+        return None
+
+
+class AdaptiveVad:
+    """SNR gate over a running noise floor, with hangover, gap and hum checks."""
+
+    name = "adaptive"
+
+    def __init__(
+        self,
+        frame_ms: int = 20,
+        min_ms: int = 250,
+        max_ms: int = 2000,
+        start_db: Optional[float] = None,
+        stop_db: Optional[float] = None,
+        onset_ms: Optional[int] = None,
+        hangover_ms: Optional[int] = None,
+        min_gap_ms: Optional[int] = None,
+        min_rms: Optional[float] = None,
+        zcr_min: Optional[float] = None,
+        mod_db: Optional[float] = None,
+        floor_sec: Optional[float] = None,
+        floor_q: Optional[float] = None,
+    ):
+        def pick(v: Optional[float], env: str, default: float) -> float:
+            return float(v) if v is not None else _env_float(env, default)
+
+        self.frame_ms = frame_ms
+        self.start_db = pick(start_db, "VOXIE_VAD_START_DB", 12.0)
+        self.stop_db = min(self.start_db, pick(stop_db, "VOXIE_VAD_STOP_DB", 6.0))
+        self.min_rms = pick(min_rms, "VOXIE_VAD_MIN_RMS", 250.0)
+        self.zcr_min = pick(zcr_min, "VOXIE_VAD_ZCR_MIN", 0.015)
+        self.min_mod_db = pick(mod_db, "VOXIE_VAD_MOD_DB", 3.0)
+        self.floor_q = min(1.0, max(0.0, pick(floor_q, "VOXIE_VAD_FLOOR_Q", 0.5)))
+
+        def frames(ms: float) -> int:
+            return max(1, int(ms) // frame_ms)
+
+        self.onset_frames = frames(pick(onset_ms, "VOXIE_VAD_ONSET_MS", 60))
+        self.hang_frames = frames(pick(hangover_ms, "VOXIE_VAD_HANGOVER_MS", 300))
+        self.gap_frames = int(pick(min_gap_ms, "VOXIE_VAD_MIN_GAP_MS", 300)) // frame_ms
+        self.min_frames = frames(min_ms)
+        self.max_frames = max(self.min_frames, frames(max_ms))
+
+        # floor: 100 ms blocks, percentile over the window
+        self._block = frames(100)
+        blocks = max(5, int(pick(floor_sec, "VOXIE_VAD_FLOOR_SEC", 5.0) * 1000) // (self._block * frame_ms))
+        self._levels: deque = deque(maxlen=blocks)
+        self._warm = min(5, blocks)
+        self._acc = 0.0
+        self._acc_n = 0
+        self.floor_db = 0.0
+
+        self._i = 0
+        self._run = 0
+        self._recent: deque = deque(maxlen=self.onset_frames)
+        self._last_end = -self.gap_frames
+        self._seg: Optional[_Track] = None
+
+    @property
+    def in_speech(self) -> bool:
+        return self._seg is not None
+
+    def _track_floor(self, db: float) -> None:
+        if not self._levels and self._acc_n == 0:
+            self.floor_db = db
+        self._acc += db
+        self._acc_n += 1
+        if self._acc_n < self._block:
+            return
+        self._levels.append(self._acc / self._acc_n)
+        self._acc = 0.0
+        self._acc_n = 0
+        ranked: List[float] = sorted(self._levels)
+        self.floor_db = ranked[int(self.floor_q * (len(ranked) - 1))]
+
+    def update(self, rms: float, zcr: float = 0.0) -> Event:
+        i = self._i
+        self._i += 1
+        db = level_db(rms)
+        snr = db - self.floor_db
+        self._track_floor(db)
+        seg = self._seg
+
+        if seg is None:
+            self._recent.append((db, zcr, snr))
+            if snr >= self.start_db and rms >= self.min_rms:
+                self._run += 1
+            else:
+                self._run = 0
+            if (
+                self._run < self.onset_frames
+                or len(self._levels) < self._warm
+                or i - self._last_end < self.gap_frames
+            ):
+                return None
+            # the onset frames belong to the segment (caller keeps them as pre-roll)
+            self._run = 0
+            seg = self._seg = _Track(i - self.onset_frames + 1)
+            for f in self._recent:
+                seg.add(f[0], f[1], f[2], True)
+            return START
+
+        seg.add(db, zcr, snr, snr >= self.stop_db and rms >= self.min_rms)
+        if seg.tail < self.hang_frames and seg.frames < self.max_frames:
+            return None
+
+        self._seg = None
+        self._last_end = i
+        tail = seg.tail
+        if seg.frames - tail < self.min_frames:
+            reason = "short"
+        elif seg.mean_zcr(tail) < self.zcr_min:
+            reason = "hum"
+        elif seg.mod_db(tail) < self.min_mod_db:
+            reason = "steady"
+        else:
+            reason = ""
+        return Segment(seg.start, seg.frames, tail, not reason, reason, seg.peak, seg.mod_db(tail))
+
+
+def make_vad(
+    frame_ms: int = 20,
+    min_ms: int = 250,
+    max_ms: int = 2000,
+    thresh: float = 800.0,
+    tail_ms: int = 250,
+    mode: str = "",
+) -> Union[FixedVad, AdaptiveVad]:
+    """VAD for `mode` (default VOXIE_VAD_MODE, adaptive); thresh/tail_ms are the fixed gate's."""
+    name = (mode or os.environ.get("VOXIE_VAD_MODE", "adaptive")).strip().lower()
+    if name == "fixed":
+        return FixedVad(frame_ms, thresh, tail_ms, min_ms, max_ms)
+    return AdaptiveVad(frame_ms, min_ms, max_ms)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+"""
+Trigger bus: PTT / wake events as datagrams on a unix socket
+(VOXIE_TRIGGER_SOCK, default /tmp/bitvox_trigger.sock).
+
+The FIFO carries a bare "PTT\n": no source, no time, and a producer
+that finds no reader loses the press. Here each event is one datagram
+
+    {"src":"evdev","ts":12345.678,"data":{"code":164}}
+
+- ts is CLOCK_MONOTONIC (time.monotonic(), one clock for every process
+  on the host) at the moment the event happened: for a key, the input
+  event's kernel timestamp, not the time the producer got round to it
+- the kernel queues datagrams while the listener is busy (bounded by
+  the socket buffer), so nothing is lost in a busy moment; the bus
+  drops events older than VOXIE_TRIGGER_MAX_AGE_MS when it reads them,
+  so a press from seconds ago does not start a turn now
+- the listener reads the socket from its event loop (asyncio's epoll
+  selector), no thread, no polling; TurnEngine debounces on ts
+
+send_trigger() is the producer side (evdev_ptt.py, avrcp_ptt.py,
+wake_poll.py); it returns False when no listener is bound and the
+producer falls back to the FIFO. TriggerBus is a MicListener source
+(src/mic/listener.py). Outside mic/ so the small producers import it
+without the listener.
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import metrics
+
+__all__ = ["DEFAULT_SOCK", "TriggerEvent", "TriggerBus", "trigger_sock", "send_trigger", "realtime_to_mono"]
+
+DEFAULT_SOCK = "/tmp/bitvox_trigger.sock"
+MAX_DGRAM = 4096
+
+_EVENTS = metrics.counter("voxie_trigger_events_total", "Trigger bus events", ("source", "result"))
+_DELAY = metrics.histogram(
+    "voxie_trigger_delay_seconds", "Trigger bus: event time until the listener read it", (),
+    (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+
+def trigger_sock() -> str:
+    """Socket path; empty disables the bus (FIFO only)."""
+    return os.environ.get("VOXIE_TRIGGER_SOCK", DEFAULT_SOCK).strip()
+
+
+def realtime_to_mono(ts: float) -> float:
+    """A CLOCK_REALTIME stamp (input_event's default clock) on the monotonic clock."""
+    return ts - (time.time() - time.monotonic())
+
+
+class TriggerEvent(NamedTuple):
+    source: str
+    ts: float              # monotonic, when it happened
+    data: Dict[str, Any]
+    received: float        # monotonic, when the bus read it
+
+
+def send_trigger(source: str, data: Optional[Dict[str, Any]] = None, ts: Optional[float] = None,
+                 path: Optional[str] = None) -> bool:
+    """One event to the listener; False if no listener is bound (use the FIFO then)."""
+    path = trigger_sock() if path is None else path
+    if not path:
+        return False
+    msg = {"src": source, "ts": time.monotonic() if ts is None else ts, "data": data or {}}
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        s.setblocking(False)
+        s.sendto(json.dumps(msg, separators=(",", ":")).encode("utf-8"), path)
+        return True
+    except OSError:
+        # no socket, nobody bound, or the listener's queue is full
+        return False
+    finally:
+        s.close()
+
+
+class TriggerBus:
+    """Listener side: binds the socket, reads it on the loop, passes fresh events on."""
+
+    name = "bus"
+
+    def __init__(self, path: str, on_event: Callable[[TriggerEvent], None], log: Callable[[str], None],
+                 max_age_ms: Optional[int] = None):
+        self.path = path
+        self.on_event = on_event
+        self.log = log
+        if max_age_ms is None:
+            max_age_ms = int(os.environ.get("VOXIE_TRIGGER_MAX_AGE_MS", "1500"))
+        self.max_age = max_age_ms / 1000.0
+        self._sock: Optional[socket.socket] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            s.bind(self.path)
+            os.chmod(self.path, 0o666)
+        except OSError as e:
+            s.close()
+            self.log(f"[SRC][WARN] trigger bus {self.path}: {e}")
+            return False
+        s.setblocking(False)
+        self._sock = s
+        loop.add_reader(s.fileno(), self._ready)
+        return True
+
+    def _ready(self) -> None:
+        assert self._sock is not None
+        while True:
+            try:
+                raw = self._sock.recv(MAX_DGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                self.log(f"[SRC][WARN] trigger bus: {e}")
+                return
+            now = time.monotonic()
+            try:
+                msg = json.loads(raw.decode("utf-8"))
+                ev = TriggerEvent(str(msg.get("src") or "?"), float(msg.get("ts", now)),
+                                  dict(msg.get("data") or {}), now)
+            except (ValueError, TypeError, AttributeError):
+                _EVENTS.inc(source="?", result="bad")
+                continue
+            age = now - ev.ts
+            if age > self.max_age:
+                _EVENTS.inc(source=ev.source, result="stale")
+                self.log(f"[BUS] {ev.source} event {int(age * 1000)}ms old: dropped")
+                continue
+            _EVENTS.inc(source=ev.source, result="ok")
+            _DELAY.observe(max(0.0, age))
+            self.on_event(ev)
+
+    def close(self, loop: asyncio.AbstractEventLoop) -> None:
+        s, self._sock = self._sock, None
+        if s is not None:
+            loop.remove_reader(s.fileno())
+            s.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
@@ -25,28 +25,66 @@ mkdir -p logs run
 
 # kill eventuali vecchi processi (best-effort)
 pkill -f "audio_daemon.py" 2>/dev/null || true
+pkill -f "capture_daemon.py" 2>/dev/null || true
+pkill -f "http_gateway.py" 2>/dev/null || true
 pkill -f "voxie_listen.py" 2>/dev/null || true
+pkill -f "agent_worker.php" 2>/dev/null || true
 pkill -f "evdev_ptt.py" 2>/dev/null || true
 pkill -f "avrcp_ptt.py" 2>/dev/null || true
 pkill -f "wake_poll.py" 2>/dev/null || true
 
+# precompile ack/intro/vox assets to native PCM (incremental, fast when fresh)
+if [ "${VOXIE_PCM_PRECOMPILE:-1}" = "1" ]; then
+  python3 ./audio_py/bin/precompile_assets.py > logs/precompile.log 2>&1 || true
+fi
+
 # start audio daemon
 nohup python3 ./audio_py/bin/audio_daemon.py > logs/audio_daemon.log 2>&1 & echo $! > run/audio_daemon.pid
 sleep 0.2
 
-# start PTT source: scegli UNO (evdev consigliato)
-if [ -e "${VOXIEEVENTDEV:-/dev/input/event2}" ]; then
-  nohup python3 ./audio_py/bin/evdev_ptt.py > logs/ptt.log 2>&1 & echo $! > run/ptt.pid
-else
-  nohup python3 ./audio_py/bin/avrcp_ptt.py > logs/ptt.log 2>&1 & echo $! > run/ptt.pid
+# start HTTP gateway: pooled keep-alive connections for ASR/TTS/LLM/embeddings
+if [ "${VOXIE_GW:-1}" = "1" ]; then
+  nohup python3 ./audio_py/bin/http_gateway.py > logs/gateway.log 2>&1 & echo $! > run/gateway.pid
 fi
-sleep 0.2
 
-# start listener PTT -> REC -> ASR -> AGENT
-nohup python3 ./audio_py/bin/voxie_listen.py > logs/listen.log 2>&1 & echo $! > run/listen.pid
+# start capture daemon: owns the mic, wake_poll + PTT recording read its shared ring
+if [ "${VOXIE_CAPTURE_DAEMON:-1}" = "1" ]; then
+  nohup python3 ./audio_py/bin/capture_daemon.py > logs/capture.log 2>&1 & echo $! > run/capture.pid
+  sleep 0.2
+fi
+
+# VOXIE_SINGLE_PROCESS=1: tasto evdev (e wake_poll con VOXIE_WAKE=1) dentro il listener
+# (src/mic/listener.py MicListener), un interprete Python invece di uno per sorgente
+if [ "${VOXIE_SINGLE_PROCESS:-0}" = "1" ]; then
+  sources="fifo"
+  if [ -e "${VOXIEEVENTDEV:-/dev/input/event2}" ]; then
+    export VOXIE_PTT_EVDEV="${VOXIE_PTT_EVDEV:-${VOXIEEVENTDEV:-/dev/input/event2}}"
+    sources="$sources,evdev"
+  else
+    # AVRCP resta un processo a parte (dbus-monitor) e scrive nella FIFO
+    nohup python3 ./audio_py/bin/avrcp_ptt.py > logs/ptt.log 2>&1 & echo $! > run/ptt.pid
+  fi
+  [ "${VOXIE_WAKE:-0}" = "1" ] && sources="$sources,wake"
+  export VOXIE_LISTEN_SOURCES="${VOXIE_LISTEN_SOURCES:-$sources}"
+
+  nohup python3 ./audio_py/bin/voxie_listen.py > logs/listen.log 2>&1 & echo $! > run/listen.pid
+else
+  # start PTT source: scegli UNO (evdev consigliato)
+  if [ -e "${VOXIEEVENTDEV:-/dev/input/event2}" ]; then
+    nohup python3 ./audio_py/bin/evdev_ptt.py > logs/ptt.log 2>&1 & echo $! > run/ptt.pid
+  else
+    nohup python3 ./audio_py/bin/avrcp_ptt.py > logs/ptt.log 2>&1 & echo $! > run/ptt.pid
+  fi
+  sleep 0.2
 
-# opzionale: VAD trigger (se lo usi davvero)
-# nohup python3 ./wake_poll.py > logs/wake.log 2>&1 & echo $! > run/wake.pid
+  # start listener PTT -> REC -> ASR -> AGENT
+  nohup python3 ./audio_py/bin/voxie_listen.py > logs/listen.log 2>&1 & echo $! > run/listen.pid
+
+  # opzionale: VAD trigger (se lo usi davvero)
+  if [ "${VOXIE_WAKE:-0}" = "1" ]; then
+    nohup python3 ./audio_py/bin/wake_poll.py > logs/wake.log 2>&1 & echo $! > run/wake.pid
+  fi
+fi
 
 echo "OK - started."
 echo "Logs: $(pwd)/logs/*.log"
@@ -8,7 +8,10 @@ for f in run/*.pid; do
 done
 
 pkill -f "audio_daemon.py" 2>/dev/null || true
+pkill -f "capture_daemon.py" 2>/dev/null || true
+pkill -f "http_gateway.py" 2>/dev/null || true
 pkill -f "voxie_listen.py" 2>/dev/null || true
+pkill -f "agent_worker.php" 2>/dev/null || true
 pkill -f "evdev_ptt.py" 2>/dev/null || true
 pkill -f "avrcp_ptt.py" 2>/dev/null || true
 pkill -f "wake_poll.py" 2>/dev/null || true
@@ -0,0 +1,121 @@
+<?php
+declare(strict_types=1);
+
+/**
+ * agent_worker.php
+ * Resident agent: .env, core and skills are loaded once, turns arrive on a
+ * unix socket (no php start-up, no ~20 requires, warm station/vector/state
+ * caches per turn).
+ *
+ * Socket: VOXIE_AGENT_SOCK (default /tmp/bitvox_agent.sock), JSON lines,
+ * one reply line per request, in order; connections stay open.
+ *   {"cmd":"TURN","text":"che tempo fa"} -> {"ok":true,"intent":"weather","result":{...},"ms":812}
+ *   {"cmd":"ROUTE","text":"che ore sono"} -> {"ok":true,"intent":"time","payload":[],"ms":0}
+ *   {"cmd":"PING"} -> {"ok":true,"pong":true,"pid":123,"turns":4,"uptime_s":60,"mem_kb":2048}
+ *
+ * Turns run one at a time. After VOXIE_AGENT_MAX_TURNS turns (default 500)
+ * or above VOXIE_AGENT_MAX_MEM_MB (default 64) the worker exits after its
+ * reply, so a leaking skill cannot grow forever: audio_py/src/agent_client.py
+ * starts a new one on the next turn. .env changes need a restart the same way.
+ *
+ * Usage: php php/bin/agent_worker.php
+ */
+
+require_once __DIR__ . '/../core/agent.php';
+
+agent_boot();
+
+$sockPath = (string)config_get('VOXIE_AGENT_SOCK', '/tmp/bitvox_agent.sock');
+$maxTurns = max(1, (int)config_get('VOXIE_AGENT_MAX_TURNS', '500'));
+$maxMem   = max(8, (int)config_get('VOXIE_AGENT_MAX_MEM_MB', '64')) * 1024 * 1024;
+
+if (file_exists($sockPath)) @unlink($sockPath);
+$srv = @stream_socket_server('unix://' . $sockPath, $errno, $errstr);
+if ($srv === false) {
+  fwrite(STDERR, "[AGENT_WORKER][ERR] cannot listen on $sockPath: $errstr ($errno)\n");
+  exit(1);
+}
+@chmod($sockPath, 0666);
+
+$t_boot = microtime(true);
+$turns = 0;
+fwrite(STDERR, "[AGENT_WORKER] pid=" . getmypid() . " sock=$sockPath max_turns=$maxTurns\n");
+
+/** @return array<string,mixed> */
+function agent_worker_handle(string $line, int &$turns, float $t_boot): array {
+  $req = json_decode($line, true);
+  if (!is_array($req)) return ['ok' => false, 'err' => 'BAD_JSON'];
+
+  $cmd = strtoupper((string)($req['cmd'] ?? 'TURN'));
+  $t0 = microtime(true);
+  try {
+    if ($cmd === 'PING') {
+      return [
+        'ok' => true, 'pong' => true, 'pid' => getmypid(), 'turns' => $turns,
+        'uptime_s' => (int)(microtime(true) - $t_boot), 'mem_kb' => intdiv(memory_get_usage(true), 1024),
+      ];
+    }
+    if ($cmd === 'ROUTE') {
+      $out = ['ok' => true] + agent_route((string)($req['text'] ?? ''));
+    } elseif ($cmd === 'TURN') {
+      $turns++;
+      $out = agent_turn((string)($req['text'] ?? ''));
+    } else {
+      return ['ok' => false, 'err' => 'UNKNOWN_CMD', 'cmd' => $cmd];
+    }
+  } catch (Throwable $e) {
+    fwrite(STDERR, "[AGENT_WORKER][ERR] $cmd: " . $e->getMessage() . "\n");
+    return ['ok' => false, 'err' => 'EXCEPTION', 'msg' => $e->getMessage()];
+  }
+  $out['ms'] = (int)((microtime(true) - $t0) * 1000);
+  return $out;
+}
+
+/** @var array<int,array{fp:resource,buf:string}> $clients */
+$clients = [];
+$retire = false;
+
+while (!$retire) {
+  $r = [$srv];
+  foreach ($clients as $c) $r[] = $c['fp'];
+  $w = null;
+  $e = null;
+  if (@stream_select($r, $w, $e, null) === false) continue;  // EINTR
+
+  foreach ($r as $fp) {
+    if ($fp === $srv) {
+      $c = @stream_socket_accept($srv, 0);
+      if ($c !== false) $clients[(int)$c] = ['fp' => $c, 'buf' => ''];
+      continue;
+    }
+
+    $id = (int)$fp;
+    $data = fread($fp, 65536);
+    if ($data === false || $data === '') {
+      if ($data === false || feof($fp)) {
+        fclose($fp);
+        unset($clients[$id]);
+      }
+      continue;
+    }
+    $clients[$id]['buf'] .= $data;
+
+    while (isset($clients[$id]) && ($nl = strpos($clients[$id]['buf'], "\n")) !== false) {
+      $line = trim(substr($clients[$id]['buf'], 0, $nl));
+      $clients[$id]['buf'] = (string)substr($clients[$id]['buf'], $nl + 1);
+      if ($line === '') continue;
+
+      $reply = agent_worker_handle($line, $turns, $t_boot);
+      if (@fwrite($fp, json_encode($reply, JSON_UNESCAPED_UNICODE) . "\n") === false) {
+        fclose($fp);
+        unset($clients[$id]);
+      }
+      if ($turns >= $maxTurns || memory_get_usage(true) > $maxMem) $retire = true;
+    }
+  }
+}
+
+fwrite(STDERR, "[AGENT_WORKER] retiring after $turns turns, mem_kb=" . intdiv(memory_get_usage(true), 1024) . "\n");
+foreach ($clients as $c) fclose($c['fp']);
+fclose($srv);
+@unlink($sockPath);
@@ -31,8 +31,9 @@ foreach ($st['alarms'] as &$a) {
   $due = (int)($a['due_ts'] ?? 0);
   if ($due > 0 && $due <= $now) {
     // Play a local beep (existing WAV asset) and mark as done
+    // Class "alarm" preempts everything; speech/radio resume afterwards.
     $beep = bv_base_dir() . '/assets/ack/ack_neutral_ok.wav';
-    audio_play_wav($beep);
+    audio_enqueue([$beep], 'alarm');
 
     $a['done'] = true;
     $changed = true;
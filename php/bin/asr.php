@@ -9,8 +9,13 @@ declare(strict_types=1);
  *
  * CLI:
  *   php asr.php /path/file.wav [lang]
+ *
+ * The upload goes through the local HTTP gateway (../core/gateway.php,
+ * pooled keep-alive connection) when it runs, else straight via cURL.
  */
 
+require_once __DIR__ . '/../core/gateway.php';
+
 /* ------------------------------------------------------------
  * 0) Tiny .env loader (no external libs)
  * ------------------------------------------------------------ */
@@ -93,32 +98,45 @@ function asr_transcribe_wav(string $wavPath, string $lang='it'): array {
   $url = asr_endpoint();
   $model = asr_model();
 
-  $ch = curl_init($url);
-  if ($ch === false) return ['ok' => false, 'err' => 'CURL_INIT_FAIL'];
-
-  $post = [
+  $fields = [
     'model' => $model,
-    'file'  => new CURLFile($wavPath, 'audio/wav', basename($wavPath)),
     'language' => $lang,
     // Lower temperature reduces hallucinations
     'temperature' => '0',
     'prompt' => 'Trascrivi fedelmente in italiano. Domande tipiche: meteo, orari, comandi vocali BitVox.',
   ];
 
-  curl_setopt_array($ch, [
-    CURLOPT_POST => true,
-    CURLOPT_HTTPHEADER => [
-      "Authorization: Bearer {$key}",
-    ],
-    CURLOPT_POSTFIELDS => $post,
-    CURLOPT_RETURNTRANSFER => true,
-    CURLOPT_TIMEOUT => 90,
-  ]);
-
-  $raw  = curl_exec($ch);
-  $code = (int)curl_getinfo($ch, CURLINFO_HTTP_CODE);
-  $err  = curl_error($ch);
-  curl_close($ch);
+  $gw = null;
+  $mp = gw_enabled() ? gw_multipart($fields, ['file' => [$wavPath, 'audio/wav']]) : null;
+  if ($mp !== null) {
+    $gw = gw_http('asr', 'POST', $url, ["Authorization: Bearer {$key}", $mp[1]], $mp[0], null, 90);
+  }
+
+  if ($gw !== null) {
+    $raw  = !empty($gw['ok']) ? $gw['body'] : false;
+    $code = (int)$gw['status'];
+    $err  = (string)($gw['err'] ?? '');
+  } else {
+    $ch = curl_init($url);
+    if ($ch === false) return ['ok' => false, 'err' => 'CURL_INIT_FAIL'];
+
+    $post = $fields + ['file' => new CURLFile($wavPath, 'audio/wav', basename($wavPath))];
+
+    curl_setopt_array($ch, [
+      CURLOPT_POST => true,
+      CURLOPT_HTTPHEADER => [
+        "Authorization: Bearer {$key}",
+      ],
+      CURLOPT_POSTFIELDS => $post,
+      CURLOPT_RETURNTRANSFER => true,
+      CURLOPT_TIMEOUT => 90,
+    ]);
+
+    $raw  = curl_exec($ch);
+    $code = (int)curl_getinfo($ch, CURLINFO_HTTP_CODE);
+    $err  = curl_error($ch);
+    curl_close($ch);
+  }
 
   if ($raw === false || $code < 200 || $code >= 300) {
     return [
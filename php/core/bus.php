@@ -24,7 +24,7 @@ function audio_sock(): string {
 }
 
 /** @return array<string,mixed> */
-function audio_send(array $cmd, int $tries = 3, int $retry_ms = 120): array {
+function audio_send(array $cmd, int $tries = 3, int $retry_ms = 120, int $timeout_ms = 1000): array {
   $sock = audio_sock();
   $last = null;
 
@@ -36,7 +36,7 @@ function audio_send(array $cmd, int $tries = 3, int $retry_ms = 120): array {
       continue;
     }
 
-    stream_set_timeout($fp, 1, 0);
+    stream_set_timeout($fp, intdiv($timeout_ms, 1000), ($timeout_ms % 1000) * 1000);
     $payload = json_encode($cmd, JSON_UNESCAPED_UNICODE) . "\n";
     fwrite($fp, $payload);
 
@@ -60,12 +60,153 @@ function audio_send(array $cmd, int $tries = 3, int $retry_ms = 120): array {
 }
 
 // Audio command helpers
-function audio_play_mp3(string $path): array    { return audio_send(['cmd' => 'PLAY_MP3',    'path' => $path]); }
-function audio_play_wav(string $path): array    { return audio_send(['cmd' => 'PLAY_WAV',    'path' => $path]); }
-function audio_play_stream(string $url): array  { return audio_send(['cmd' => 'PLAY_STREAM', 'url'  => $url]); }
-function audio_stop(): array                    { return audio_send(['cmd' => 'STOP']); }
+// PLAY_* return right away with a job id (['ok'=>true,'job'=>'j1']).
+// $wait=true replies only after the player is verified alive ('ok' = started).
+function audio_play_mp3(string $path, bool $wait = false): array {
+  return audio_send(['cmd' => 'PLAY_MP3', 'path' => $path, 'wait' => $wait], 3, 120, $wait ? 6000 : 1000);
+}
+function audio_play_wav(string $path, bool $wait = false): array {
+  return audio_send(['cmd' => 'PLAY_WAV', 'path' => $path, 'wait' => $wait], 3, 120, $wait ? 6000 : 1000);
+}
+function audio_play_stream(string $url, bool $wait = false): array {
+  return audio_send(['cmd' => 'PLAY_STREAM', 'url' => $url, 'wait' => $wait], 3, 120, $wait ? 6000 : 1000);
+}
+/**
+ * Race a ranked list of stream URLs (PLAY_STREAM_ANY, async daemon): all are
+ * connected at once, the first with valid audio plays; what is playing now
+ * keeps playing until then. 'url' in the reply is the winner.
+ */
+function audio_play_stream_any(array $urls, bool $wait = false): array {
+  $cmd = ['cmd' => 'PLAY_STREAM_ANY', 'urls' => array_values($urls), 'wait' => $wait];
+  return audio_send($cmd, 1, 120, $wait ? 12000 : 1000);
+}
+/** STOP; $fg_only keeps the radio under the mixer engine (plain STOP elsewhere). */
+function audio_stop(bool $fg_only = false): array {
+  return audio_send($fg_only ? ['cmd' => 'STOP', 'fg' => true] : ['cmd' => 'STOP']);
+}
 function audio_status(): array                  { return audio_send(['cmd' => 'STATUS']); }
 
+/**
+ * Queue a sequence in one round-trip (async daemon).
+ * $items: [['path'=>'/a.wav'], ['path'=>'/b.mp3', 'prio'=>'tts'], ['url'=>'http://...']]
+ * $prio:  default class for items without one: alarm|tts|filler|radio
+ * Items of the same class play back-to-back; a higher class preempts a lower one.
+ * Falls back to sequential PLAY_* on a legacy daemon (last item wins, as before).
+ */
+function audio_enqueue(array $items, ?string $prio = null): array {
+  $out = _audio_items($items, $prio);
+  if (!$out) return ['ok' => false, 'err' => 'EMPTY_QUEUE'];
+
+  $res = audio_send(['cmd' => 'ENQUEUE', 'items' => $out]);
+  if (($res['err'] ?? '') !== 'UNKNOWN_CMD') return $res;
+
+  foreach ($out as $it) {
+    $path = (string)($it['path'] ?? '');
+    if (isset($it['url']))               $res = audio_play_stream((string)$it['url']);
+    elseif (str_ends_with($path, '.wav')) $res = audio_play_wav($path);
+    else                                 $res = audio_play_mp3($path);
+  }
+  return $res;
+}
+
+/** ENQUEUE items: bare paths become ['path'=>...], $prio fills the missing classes. */
+function _audio_items(array $items, ?string $prio): array {
+  $out = [];
+  foreach ($items as $it) {
+    if (is_string($it)) $it = ['path' => $it];
+    if (!is_array($it)) continue;
+    if ($prio !== null && !isset($it['prio'])) $it['prio'] = $prio;
+    $out[] = $it;
+  }
+  return $out;
+}
+
+/**
+ * Run several commands atomically (BATCH, async daemon): nothing from another
+ * client lands in between. Reply: ['ok'=>all ok, 'results'=>[...]].
+ * WAIT / PLAY_BYTES / SUBSCRIBE / 'wait'=>true cannot be batched.
+ * On a daemon without BATCH the reply is err UNKNOWN_CMD.
+ */
+function audio_batch(array $cmds): array {
+  return audio_send(['cmd' => 'BATCH', 'cmds' => array_values($cmds)]);
+}
+
+/** Replace whatever plays with a queued sequence, atomically (see audio_enqueue). */
+function audio_replace(array $items, ?string $prio = null): array {
+  $out = _audio_items($items, $prio);
+  if (!$out) return ['ok' => false, 'err' => 'EMPTY_QUEUE'];
+  $res = audio_batch([['cmd' => 'STOP'], ['cmd' => 'ENQUEUE', 'items' => $out]]);
+  if (($res['err'] ?? '') !== 'UNKNOWN_CMD') return $res['results'][1] ?? $res;
+
+  audio_stop();
+  return audio_enqueue($out);
+}
+
+/** Drop queued items (one class or all); $current=true also cuts the playing item. */
+function audio_clear(?string $prio = null, bool $current = false): array {
+  $cmd = ['cmd' => 'CLEAR', 'current' => $current];
+  if ($prio !== null) $cmd['prio'] = $prio;
+  return audio_send($cmd);
+}
+
+/**
+ * Streaming playback (PLAY_BYTES, async daemon): playback starts while the
+ * bytes are still arriving; $tee is the file the daemon saves them to.
+ * Returns null if the daemon is unreachable or does not support it.
+ * @return array{fp:resource,job:string}|null
+ */
+function audio_bytes_open(string $format = 'mp3', ?string $prio = null, ?string $tee = null): ?array {
+  $fp = @stream_socket_client('unix://' . audio_sock(), $errno, $errstr, 0.2);
+  if ($fp === false) return null;
+  stream_set_timeout($fp, 2);
+
+  $cmd = ['cmd' => 'PLAY_BYTES', 'format' => $format];
+  if ($prio !== null) $cmd['prio'] = $prio;
+  if ($tee !== null)  $cmd['tee'] = $tee;
+  fwrite($fp, json_encode($cmd, JSON_UNESCAPED_UNICODE) . "\n");
+
+  $res = json_decode(trim((string)fgets($fp)), true);
+  if (!is_array($res) || empty($res['ok'])) {
+    fclose($fp);
+    return null;
+  }
+  return ['fp' => $fp, 'job' => (string)($res['job'] ?? '')];
+}
+
+/** Send one chunk: u32 big-endian length + bytes. */
+function audio_bytes_write(array $h, string $data): bool {
+  if ($data === '') return true;
+  $buf = pack('N', strlen($data)) . $data;
+  while ($buf !== '') {
+    $n = @fwrite($h['fp'], $buf);
+    if ($n === false || $n === 0) return false;
+    $buf = substr($buf, $n);
+  }
+  return true;
+}
+
+/** End of stream (zero-length frame); returns the daemon's final reply. */
+function audio_bytes_close(array $h): array {
+  @fwrite($h['fp'], pack('N', 0));
+  $res = json_decode(trim((string)fgets($h['fp'])), true);
+  fclose($h['fp']);
+  return is_array($res) ? $res : ['ok' => false, 'err' => 'AUDIO_CLIENT_FAIL', 'job' => $h['job']];
+}
+
+/** Give up mid-stream: close without the end frame, so the daemon fails the job and drops the tee. */
+function audio_bytes_abort(array $h): void {
+  fclose($h['fp']);
+}
+
+// Job tracking (async daemon): state = pending|starting|playing|done|failed|stopped
+function audio_job_status(string $job): array   { return audio_send(['cmd' => 'JOB_STATUS', 'job' => $job]); }
+
+/** Block until a job finishes ($until='done') or starts ($until='started'). */
+function audio_wait(string $job, int $timeout_ms = 30000, string $until = 'done'): array {
+  $cmd = ['cmd' => 'WAIT', 'job' => $job, 'until' => $until, 'timeout_ms' => $timeout_ms];
+  return audio_send($cmd, 1, 120, $timeout_ms + 1000);
+}
+
 /**
  * http_json(): JSON HTTP request wrapper using cURL
  * - $headers must be full header strings: ["Authorization: Bearer ...", ...]
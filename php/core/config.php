@@ -9,6 +9,7 @@ date_default_timezone_set(getenv('TZ') ?: 'Europe/Rome');
  * - Minimal .env loader (once)
  * - config_get() helper with defaults
  * - Standard project paths
+ * - bv_json_file(): decoded JSON files, cached per process until they change
  */
 
 function bv_base_dir(): string {
@@ -71,6 +72,29 @@ function config_get(string $key, ?string $default = null): ?string {
   return $default;
 }
 
+/**
+ * Decoded JSON file (array), or null when missing/invalid.
+ * Cached per process and re-read only when mtime/size change: a resident
+ * agent_worker keeps stations, vectors and state warm across turns, a
+ * one-shot agent.php pays the same single read as before.
+ */
+function bv_json_file(string $path): ?array {
+  static $cache = [];
+  clearstatcache(true, $path);
+  $st = @stat($path);
+  if ($st === false) {
+    unset($cache[$path]);
+    return null;
+  }
+  $key = $st['mtime'] . ':' . $st['size'] . ':' . $st['ino'];
+  if (isset($cache[$path]) && $cache[$path][0] === $key) return $cache[$path][1];
+
+  $j = json_decode((string)(@file_get_contents($path) ?: ''), true);
+  $val = is_array($j) ? $j : null;
+  $cache[$path] = [$key, $val];
+  return $val;
+}
+
 function path_data(): string   { return bv_base_dir() . '/data'; }
 function path_cache(): string  { return path_data() . '/cache'; }
 function path_assets(): string { return bv_base_dir() . '/assets'; }
@@ -0,0 +1,134 @@
+<?php
+declare(strict_types=1);
+
+/**
+ * gateway.php
+ * Client for the local HTTP gateway (audio_py/bin/http_gateway.py): the
+ * cloud calls (ASR, TTS, LLM, embeddings) go out on its pooled keep-alive
+ * connections instead of a fresh cURL handshake per call.
+ *
+ * gw_http() returns null when the gateway is off (VOXIE_GW=0) or not
+ * reachable; nothing was sent then and the caller uses cURL directly.
+ * Standalone on purpose (getenv only): asr.php loads it without config.php.
+ * Wire format: see audio_py/src/gateway.py.
+ */
+
+function gw_sock(): string {
+  return (string)(getenv('VOXIE_GW_SOCK') ?: '/tmp/bitvox_gw.sock');
+}
+
+function gw_enabled(): bool {
+  return (string)(getenv('VOXIE_GW') ?: '1') !== '0' && file_exists(gw_sock());
+}
+
+/** Read exactly $n bytes (false if the gateway went away or timed out). */
+function _gw_read(mixed $fp, int $n): string|false {
+  $buf = '';
+  while (strlen($buf) < $n) {
+    $chunk = fread($fp, $n - strlen($buf));
+    if ($chunk === false || $chunk === '') return false;
+    $buf .= $chunk;
+  }
+  return $buf;
+}
+
+/**
+ * One HTTP request through the gateway.
+ * - $kind: asr | tts | llm | embed (timeout / retry / hedge policy, src/gateway.py)
+ * - $headers: full header strings, as for CURLOPT_HTTPHEADER
+ * - $on_chunk: 2xx body chunks go there as they arrive (body stays ''); error bodies never do
+ * - returns ['ok','status','body','headers','conn','ms'] or ['ok'=>false,'err'=>..,'status'=>0]
+ *   (status 0: no response; the gateway already retried what was safe to retry)
+ *
+ * @return array<string,mixed>|null
+ */
+function gw_http(string $kind, string $method, string $url, array $headers = [], string $body = '',
+                 ?callable $on_chunk = null, int $timeout = 0): ?array {
+  if (!gw_enabled()) return null;
+  $fp = @stream_socket_client('unix://' . gw_sock(), $errno, $errstr, 0.2);
+  if ($fp === false) return null;
+
+  $hdr = [];
+  foreach ($headers as $h) {
+    $pos = strpos((string)$h, ':');
+    if ($pos === false) continue;
+    $hdr[trim(substr($h, 0, $pos))] = trim(substr($h, $pos + 1));
+  }
+  $req = [
+    'cmd' => 'HTTP', 'kind' => $kind, 'method' => $method, 'url' => $url,
+    'headers' => (object)$hdr, 'body_len' => strlen($body),
+  ];
+  if ($timeout > 0) $req['timeout'] = $timeout;
+
+  // reply timeout: the gateway gives up first (its own timeouts, one retry)
+  stream_set_timeout($fp, ($timeout > 0 ? $timeout : 60) * 2 + 5);
+  $out = json_encode($req, JSON_UNESCAPED_UNICODE | JSON_UNESCAPED_SLASHES) . "\n" . $body;
+  while ($out !== '') {
+    $n = @fwrite($fp, $out);
+    if ($n === false || $n === 0) {
+      fclose($fp);
+      return ['ok' => false, 'err' => 'GW_WRITE_FAIL', 'status' => 0];
+    }
+    $out = substr($out, $n);
+  }
+
+  $head = json_decode(trim((string)fgets($fp)), true);
+  if (!is_array($head)) {
+    fclose($fp);
+    return ['ok' => false, 'err' => 'GW_BAD_REPLY', 'status' => 0];
+  }
+  if (empty($head['ok'])) {
+    fclose($fp);
+    return ['ok' => false, 'err' => 'GW_' . (string)($head['err'] ?? 'ERROR'), 'msg' => (string)($head['msg'] ?? ''), 'status' => 0];
+  }
+
+  $status = (int)($head['status'] ?? 0);
+  $stream = $on_chunk !== null && $status >= 200 && $status < 300;
+  $data = '';
+  $err = null;
+  while (true) {
+    $len = _gw_read($fp, 4);
+    if ($len === false) { $err = 'GW_TRUNCATED'; break; }
+    $n = unpack('N', $len)[1];
+    if ($n === 0) break;
+    if ($n === 0xFFFFFFFF) { $err = 'GW_TRUNCATED'; break; }
+    $chunk = _gw_read($fp, $n);
+    if ($chunk === false) { $err = 'GW_TRUNCATED'; break; }
+    if ($stream) $on_chunk($chunk);
+    else $data .= $chunk;
+  }
+  fclose($fp);
+
+  $res = [
+    'ok' => $err === null,
+    'status' => $status,
+    'body' => $data,
+    'headers' => is_array($head['headers'] ?? null) ? $head['headers'] : [],
+    'conn' => (string)($head['conn'] ?? ''),
+    'ms' => (int)($head['ms'] ?? 0),
+  ];
+  if ($err !== null) $res['err'] = $err;
+  return $res;
+}
+
+/**
+ * multipart/form-data body (what cURL builds for CURLFile posts).
+ * $files: field => [path, mime]. Returns [body, content-type header].
+ * @return array{0:string,1:string}|null null if a file can't be read
+ */
+function gw_multipart(array $fields, array $files): ?array {
+  $b = '----voxie' . bin2hex(random_bytes(8));
+  $body = '';
+  foreach ($fields as $k => $v) {
+    $body .= "--$b\r\nContent-Disposition: form-data; name=\"$k\"\r\n\r\n$v\r\n";
+  }
+  foreach ($files as $k => [$path, $mime]) {
+    $bin = @file_get_contents($path);
+    if ($bin === false) return null;
+    $name = basename($path);
+    $body .= "--$b\r\nContent-Disposition: form-data; name=\"$k\"; filename=\"$name\"\r\n"
+           . "Content-Type: $mime\r\n\r\n$bin\r\n";
+  }
+  $body .= "--$b--\r\n";
+  return [$body, "Content-Type: multipart/form-data; boundary=$b"];
+}
@@ -6,11 +6,19 @@ declare(strict_types=1);
  * - latency_ack(): short wav ack
  * - latency_pre_llm(): ack + random intro (LLM path)
  * - latency_pre_study(): ack + random intro (STUDY path)
+ *
+ * Ack + intro are queued as one "filler" sequence in a single round-trip:
+ * they play back-to-back and the spoken answer (class "tts") preempts them.
  */
 
-function latency_ack(): void {
+function _latency_ack_path(): ?string {
   $wav = bv_base_dir() . '/assets/ack/ack_neutral_ok.wav';
-  if (is_file($wav)) audio_play_wav($wav);
+  return is_file($wav) ? $wav : null;
+}
+
+function latency_ack(): void {
+  $wav = _latency_ack_path();
+  if ($wav) audio_enqueue([$wav], 'filler');
 }
 
 function _latency_pick(string $glob): ?string {
@@ -18,14 +26,15 @@ function _latency_pick(string $glob): ?string {
   return $f ? $f[array_rand($f)] : null;
 }
 
+function _latency_pre(string $glob): void {
+  $seq = array_values(array_filter([_latency_ack_path(), _latency_pick($glob)]));
+  if ($seq) audio_enqueue($seq, 'filler');
+}
+
 function latency_pre_llm(): void {
-  latency_ack();
-  $mp3 = _latency_pick(bv_base_dir() . '/assets/intros_mp3/*.mp3');
-  if ($mp3) audio_play_mp3($mp3);
+  _latency_pre(bv_base_dir() . '/assets/intros_mp3/*.mp3');
 }
 
 function latency_pre_study(): void {
-  latency_ack();
-  $mp3 = _latency_pick(bv_base_dir() . '/assets/intros_study_mp3/*.mp3');
-  if ($mp3) audio_play_mp3($mp3);
+  _latency_pre(bv_base_dir() . '/assets/intros_study_mp3/*.mp3');
 }
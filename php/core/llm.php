@@ -1,6 +1,8 @@
 <?php
 declare(strict_types=1);
 
+require_once __DIR__ . '/gateway.php';
+
 /**
  * VOXIE - Gemini Live Agent Challenge Edition
  * Migrazione da OpenAI a Google Gemini per massimizzare il punteggio della challenge.
@@ -69,22 +71,30 @@ function llm_call(string $system, string $userText): array {
         return ['ok' => false, 'err' => 'JSON_ENCODE_FAIL', 'msg' => $e->getMessage()];
     }
 
-    $ch = curl_init(llm_endpoint());
-    curl_setopt_array($ch, [
-        CURLOPT_POST => true,
-        CURLOPT_HTTPHEADER => [
-            "Content-Type: application/json",
-        ],
-        CURLOPT_POSTFIELDS => $json,
-        CURLOPT_RETURNTRANSFER => true,
-        CURLOPT_CONNECTTIMEOUT => 5,
-        CURLOPT_TIMEOUT => llm_timeout(),
-    ]);
-
-    $raw  = curl_exec($ch);
-    $code = (int)curl_getinfo($ch, CURLINFO_HTTP_CODE);
-    $err  = curl_error($ch);
-    curl_close($ch);
+    // Pooled connection via the local gateway; direct cURL if it is not running
+    $gw = gw_http('llm', 'POST', llm_endpoint(), ["Content-Type: application/json"], $json, null, llm_timeout());
+    if ($gw !== null) {
+        $raw  = !empty($gw['ok']) ? $gw['body'] : false;
+        $code = (int)$gw['status'];
+        $err  = (string)($gw['err'] ?? '');
+    } else {
+        $ch = curl_init(llm_endpoint());
+        curl_setopt_array($ch, [
+            CURLOPT_POST => true,
+            CURLOPT_HTTPHEADER => [
+                "Content-Type: application/json",
+            ],
+            CURLOPT_POSTFIELDS => $json,
+            CURLOPT_RETURNTRANSFER => true,
+            CURLOPT_CONNECTTIMEOUT => 5,
+            CURLOPT_TIMEOUT => llm_timeout(),
+        ]);
+
+        $raw  = curl_exec($ch);
+        $code = (int)curl_getinfo($ch, CURLINFO_HTTP_CODE);
+        $err  = curl_error($ch);
+        curl_close($ch);
+    }
 
     $ms = (int)((microtime(true) - $t0) * 1000);
 
@@ -6,6 +6,8 @@
  * This code is intentionally lightweight: file-based vectors + one embeddings call.
  */
 
+require_once __DIR__ . '/gateway.php';
+
 function voxie_env_load_once(): void {
   static $done = false;
   if ($done) return;
@@ -62,7 +64,7 @@ function semantic_intent_guess(string $text): ?array {
   $vecFile = __DIR__ . '/../../data/vec/intents_vectors.json';
   if (!file_exists($vecFile)) return null;
 
-  $doc = json_decode(file_get_contents($vecFile), true);
+  $doc = function_exists('bv_json_file') ? bv_json_file($vecFile) : json_decode((string)file_get_contents($vecFile), true);
   if (!$doc || empty($doc['intents'])) return null;
 
   voxie_env_load_once();
@@ -77,20 +79,30 @@ function semantic_intent_guess(string $text): ?array {
   $url = 'https://api.openai.com/v1/embeddings';
   $payload = ['model' => $model, 'input' => $text];
 
-  $ch = curl_init($url);
-  curl_setopt_array($ch, [
-    CURLOPT_POST => true,
-    CURLOPT_RETURNTRANSFER => true,
-    CURLOPT_HTTPHEADER => [
-      'Content-Type: application/json',
-      'Authorization: Bearer ' . $apiKey,
-    ],
-    CURLOPT_POSTFIELDS => json_encode($payload, JSON_UNESCAPED_UNICODE),
-    CURLOPT_TIMEOUT => 20,
-  ]);
-  $raw = curl_exec($ch);
-  $code = curl_getinfo($ch, CURLINFO_HTTP_CODE);
-  curl_close($ch);
+  $headers = [
+    'Content-Type: application/json',
+    'Authorization: Bearer ' . $apiKey,
+  ];
+  $body = (string)json_encode($payload, JSON_UNESCAPED_UNICODE);
+
+  // Gateway: pooled connection, hedged if slow; direct cURL if it is not running
+  $gw = gw_http('embed', 'POST', $url, $headers, $body, null, 20);
+  if ($gw !== null) {
+    $raw = !empty($gw['ok']) ? $gw['body'] : '';
+    $code = (int)$gw['status'];
+  } else {
+    $ch = curl_init($url);
+    curl_setopt_array($ch, [
+      CURLOPT_POST => true,
+      CURLOPT_RETURNTRANSFER => true,
+      CURLOPT_HTTPHEADER => $headers,
+      CURLOPT_POSTFIELDS => $body,
+      CURLOPT_TIMEOUT => 20,
+    ]);
+    $raw = curl_exec($ch);
+    $code = curl_getinfo($ch, CURLINFO_HTTP_CODE);
+    curl_close($ch);
+  }
 
   $res = json_decode($raw, true);
   if ($code < 200 || $code >= 300) return null;
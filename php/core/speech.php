@@ -4,21 +4,70 @@ declare(strict_types=1);
 /**
  * speech.php
  * - speak_text($text): generate mp3 (cached) then play via audio daemon
+ *   (queued as class "tts": cuts latency fillers, pauses radio until done)
+ * - cache miss: the mp3 is streamed to the daemon (PLAY_BYTES) while it
+ *   downloads and the daemon saves it to the cache (TTS_STREAM=0 disables)
  */
 
 require_once __DIR__ . '/tts.php';
 
+function _speech_timing(): void {
+  if (isset($GLOBALS['t_start'])) {
+    fwrite(STDERR, "[TIMING] tts_play ms=" . (int)((microtime(true) - $GLOBALS['t_start']) * 1000) . "\n");
+  }
+}
+
+/** Cache miss: play while downloading. Null = daemon cannot stream (use a file). */
+function _speak_text_stream(string $text, string $path): ?array {
+  $h = null;       // open PLAY_BYTES stream, false once it broke
+  $spill = null;   // daemon refused the stream: keep the bytes for the cache
+
+  $r = tts_mp3_stream($text, function (string $data) use (&$h, &$spill, $path): void {
+    if ($h === null && $spill === null) {
+      // Opened on the first audio bytes: fillers keep playing until then.
+      $h = audio_bytes_open('mp3', 'tts', $path);
+      if ($h === null) $spill = '';
+      else _speech_timing();
+    }
+    if (is_array($h) && !audio_bytes_write($h, $data)) {
+      audio_bytes_abort($h);
+      $h = false;
+    }
+    if ($spill !== null) $spill .= $data;
+  });
+
+  if ($h === false) return ['ok' => false, 'err' => 'AUDIO_STREAM_FAIL', 'tts' => $r];
+  if (empty($r['ok'])) {
+    // Download broke off: the end frame would make the daemon cache a truncated MP3.
+    if (is_array($h)) audio_bytes_abort($h);
+    return $r;
+  }
+  $a = is_array($h) ? audio_bytes_close($h) : null;
+  if ($a !== null) {
+    return ['ok' => (bool)($a['ok'] ?? false), 'tts' => $r, 'audio' => $a];
+  }
+
+  // Legacy daemon: cache what was downloaded so the file path needs no second request.
+  if ($spill !== null && strlen($spill) > 1000) @file_put_contents($path, $spill);
+  return null;
+}
+
 function speak_text(string $text): array {
+  $p = tts_mp3_path($text);
+  $stream = strtolower((string)(getenv('TTS_STREAM') ?: '1'));
+  if (!empty($p['ok']) && empty($p['cached']) && in_array($stream, ['1', 'true', 'yes', 'on'], true)) {
+    $s = _speak_text_stream($text, (string)$p['path']);
+    if ($s !== null) return $s;
+  }
+
   $r = tts_mp3_cached($text);
   if (empty($r['ok'])) return $r;
 
   $path = (string)$r['path'];
 
-  if (isset($GLOBALS['t_start'])) {
-    fwrite(STDERR, "[TIMING] tts_play ms=" . (int)((microtime(true) - $GLOBALS['t_start']) * 1000) . "\n");
-  }
+  _speech_timing();
 
-  $a = audio_play_mp3($path);
+  $a = audio_enqueue([$path], 'tts');
 
   return [
     'ok'   => (bool)($a['ok'] ?? false),
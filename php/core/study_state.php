@@ -22,18 +22,8 @@ function study_state_path(): string {
  * Always returns a normalized array with keys: enabled, pending_confirm.
  */
 function study_state_load(): array {
-  $p = study_state_path();
-
-  if (!is_file($p)) {
-    return ['enabled' => false, 'pending_confirm' => false];
-  }
-
-  $raw = file_get_contents($p);
-  if ($raw === false || trim($raw) === '') {
-    return ['enabled' => false, 'pending_confirm' => false];
-  }
-
-  $j = json_decode($raw, true);
+  // cached until the file changes (resident agent_worker: no read per turn)
+  $j = bv_json_file(study_state_path());
   if (!is_array($j)) {
     return ['enabled' => false, 'pending_confirm' => false];
   }
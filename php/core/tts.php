@@ -4,10 +4,14 @@ declare(strict_types=1);
 /**
  * tts.php (OpenAI default)
  * - tts_mp3_cached($text) -> returns mp3 path
+ * - tts_mp3_stream($text, $on_chunk) -> same request, body handed over as it arrives
  * - cache key = sha1(model|voice|text)
  * - writes to data/cache/tts/
+ * - requests go through the local HTTP gateway (gateway.php) when it runs
  */
 
+require_once __DIR__ . '/gateway.php';
+
 function tts_openai_key(): string {
   return getenv('OPENAI_API_KEY') ?: getenv('LLM_API_KEY') ?: '';
 }
@@ -30,50 +34,84 @@ function tts_normalize_text(string $t): string {
   return mb_substr($t, 0, 900);
 }
 
-function tts_mp3_cached(string $text): array {
-  $key = tts_openai_key();
-  if ($key === '') return ['ok' => false, 'err' => 'NO_TTS_KEY'];
-
-  $model = tts_openai_model();
-  $voice = tts_openai_voice();
+/**
+ * Cache lookup without any request.
+ * @return array{ok:bool,path?:string,cached?:bool,text?:string,err?:string}
+ */
+function tts_mp3_path(string $text): array {
+  if (tts_openai_key() === '') return ['ok' => false, 'err' => 'NO_TTS_KEY'];
 
   $text = tts_normalize_text($text);
   if ($text === '') return ['ok' => false, 'err' => 'EMPTY_TEXT'];
 
   @mkdir(tts_cache_dir(), 0777, true);
 
-  $hash = sha1($model . '|' . $voice . '|' . $text);
+  $hash = sha1(tts_openai_model() . '|' . tts_openai_voice() . '|' . $text);
   $out  = tts_cache_dir() . "/tts_{$hash}.mp3";
 
-  // Cache hit
-  if (is_file($out) && filesize($out) > 1000) {
-    return ['ok' => true, 'path' => $out, 'cached' => true];
-  }
+  return ['ok' => true, 'path' => $out, 'cached' => is_file($out) && filesize($out) > 1000, 'text' => $text];
+}
 
-  // OpenAI TTS request
+/** The OpenAI speech request: [url, headers, body]. */
+function _tts_request(string $text): array {
   $payload = json_encode([
-    'model'  => $model,
-    'voice'  => $voice,
+    'model'  => tts_openai_model(),
+    'voice'  => tts_openai_voice(),
     'format' => 'mp3',
     'input'  => $text,
   ], JSON_UNESCAPED_UNICODE);
 
-  $ch = curl_init('https://api.openai.com/v1/audio/speech');
-  curl_setopt_array($ch, [
-    CURLOPT_POST => true,
-    CURLOPT_HTTPHEADER => [
-      "Authorization: Bearer {$key}",
+  return [
+    'https://api.openai.com/v1/audio/speech',
+    [
+      "Authorization: Bearer " . tts_openai_key(),
       "Content-Type: application/json",
     ],
+    (string)$payload,
+  ];
+}
+
+/** cURL handle for the OpenAI speech request (caller sets the body handling). */
+function _tts_curl(string $text) {
+  [$url, $headers, $payload] = _tts_request($text);
+
+  $ch = curl_init($url);
+  curl_setopt_array($ch, [
+    CURLOPT_POST => true,
+    CURLOPT_HTTPHEADER => $headers,
     CURLOPT_POSTFIELDS => $payload,
-    CURLOPT_RETURNTRANSFER => true,
     CURLOPT_TIMEOUT => 60,
   ]);
+  return $ch;
+}
 
-  $bin  = curl_exec($ch);
-  $code = (int)curl_getinfo($ch, CURLINFO_HTTP_CODE);
-  $err  = curl_error($ch);
-  curl_close($ch);
+function tts_mp3_cached(string $text): array {
+  $p = tts_mp3_path($text);
+  if (empty($p['ok'])) return $p;
+
+  $out = (string)$p['path'];
+
+  // Cache hit
+  if (!empty($p['cached'])) {
+    return ['ok' => true, 'path' => $out, 'cached' => true];
+  }
+
+  // OpenAI TTS request (gateway first, direct cURL if it is not running)
+  [$url, $headers, $payload] = _tts_request((string)$p['text']);
+  $gw = gw_http('tts', 'POST', $url, $headers, $payload, null, 60);
+  if ($gw !== null) {
+    $bin  = !empty($gw['ok']) ? $gw['body'] : false;
+    $code = (int)$gw['status'];
+    $err  = (string)($gw['err'] ?? '');
+  } else {
+    $ch = _tts_curl((string)$p['text']);
+    curl_setopt($ch, CURLOPT_RETURNTRANSFER, true);
+
+    $bin  = curl_exec($ch);
+    $code = (int)curl_getinfo($ch, CURLINFO_HTTP_CODE);
+    $err  = curl_error($ch);
+    curl_close($ch);
+  }
 
   if ($bin === false || $code < 200 || $code >= 300) {
     return ['ok' => false, 'err' => 'TTS_HTTP_FAIL', 'code' => $code, 'curl' => $err];
@@ -87,3 +125,47 @@ function tts_mp3_cached(string $text): array {
 
   return ['ok' => true, 'path' => $out, 'cached' => false];
 }
+
+/**
+ * Same request as tts_mp3_cached(), but every body chunk goes to
+ * $on_chunk(string $bytes) as soon as cURL receives it (no file written).
+ * Error bodies (non-2xx) are never handed to $on_chunk.
+ */
+function tts_mp3_stream(string $text, callable $on_chunk): array {
+  $p = tts_mp3_path($text);
+  if (empty($p['ok'])) return $p;
+
+  $bytes = 0;
+  [$url, $headers, $payload] = _tts_request((string)$p['text']);
+  $gw = gw_http('tts', 'POST', $url, $headers, $payload, function (string $data) use ($on_chunk, &$bytes): void {
+    $on_chunk($data);
+    $bytes += strlen($data);
+  }, 60);
+  if ($gw !== null) {
+    $code = (int)$gw['status'];
+    if (empty($gw['ok']) || $code < 200 || $code >= 300) {
+      return ['ok' => false, 'err' => 'TTS_HTTP_FAIL', 'code' => $code, 'curl' => (string)($gw['err'] ?? ''), 'bytes' => $bytes];
+    }
+    return ['ok' => true, 'path' => (string)$p['path'], 'cached' => false, 'bytes' => $bytes];
+  }
+
+  $ch = _tts_curl((string)$p['text']);
+  curl_setopt($ch, CURLOPT_WRITEFUNCTION, function ($ch, string $data) use ($on_chunk, &$bytes): int {
+    $code = (int)curl_getinfo($ch, CURLINFO_HTTP_CODE);
+    if ($code >= 200 && $code < 300) {
+      $on_chunk($data);
+      $bytes += strlen($data);
+    }
+    return strlen($data);
+  });
+
+  $ok   = curl_exec($ch);
+  $code = (int)curl_getinfo($ch, CURLINFO_HTTP_CODE);
+  $err  = curl_error($ch);
+  curl_close($ch);
+
+  if ($ok === false || $code < 200 || $code >= 300) {
+    return ['ok' => false, 'err' => 'TTS_HTTP_FAIL', 'code' => $code, 'curl' => $err, 'bytes' => $bytes];
+  }
+  return ['ok' => true, 'path' => (string)$p['path'], 'cached' => false, 'bytes' => $bytes];
+}
@@ -22,7 +22,7 @@ function skill_radio_run(string $query): array {
   $stations_file = path_data() . '/stations/stations.json';
   if (!is_file($stations_file)) return ['ok'=>false,'err'=>'STATIONS_MISSING','path'=>$stations_file];
 
-  $j = json_decode((string)(file_get_contents($stations_file) ?: ''), true);
+  $j = bv_json_file($stations_file);
   if (!is_array($j)) return ['ok'=>false,'err'=>'STATIONS_BAD_JSON'];
 
   // Normalize query early (fixes legacy $q usage before definition)
@@ -83,11 +83,19 @@ function skill_radio_run(string $query): array {
   $top = array_slice($matches, 0, min(8, count($matches)));
   shuffle($top);
 
-  // Try up to 3 URLs (dead stream fallback)
+  // Up to 3 URLs (dead stream fallback), raced in parallel by the daemon
+  // wait=true: the daemon replies once the stream is verified, so 'ok' is meaningful
   $attempts = min(3, count($top));
+  $res = audio_play_stream_any(array_column(array_slice($top, 0, $attempts), 'url'), true);
+  if (($res['err'] ?? '') !== 'UNKNOWN_CMD') {
+    if (!empty($res['ok'])) return $res;
+    return ['ok'=>false,'err'=>'STREAM_FAILED_FOR_MATCHES','q'=>$q,'tried'=>$attempts];
+  }
+
+  // Legacy daemon: one URL at a time
   for ($i=0; $i<$attempts; $i++) {
     $url = $top[$i]['url'];
-    $res = audio_play_stream($url);
+    $res = audio_play_stream($url, true);
     if (!empty($res['ok'])) return $res;
     usleep(200 * 1000);
   }
@@ -110,7 +118,7 @@ function radio_resolve_playlist(string $q): ?array {
   $pl_file = path_data() . '/stations/playlists.json';
   if (!is_file($pl_file)) return null;
 
-  $playlists = json_decode((string)(file_get_contents($pl_file) ?: ''), true);
+  $playlists = bv_json_file($pl_file);
   if (!is_array($playlists)) return null;
 
   if (!isset($playlists[$q_l]) || !is_array($playlists[$q_l])) return null;
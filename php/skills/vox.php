@@ -7,8 +7,8 @@ require_once __DIR__ . '/../core/bus.php';
 /**
  * Vox Romana (offline, deterministic-ish, local assets)
  * - Optional audio cues (rotation) before author signature
- * - STOP-before-play for responsiveness
- * - MP3 duration fallback via sox (if available)
+ * - STOP, then cue + signature + quote queued in one round-trip
+ *   (the audio daemon plays them back-to-back)
  */
 function skill_vox_run(string $q): array {
   $base = bv_base_dir();
@@ -21,19 +21,6 @@ function skill_vox_run(string $q): array {
   $data = json_decode((string)file_get_contents($jsonPath), true);
   if (!is_array($data) || !$data) return ['ok'=>false,'text'=>"Vox Romana: invalid JSON."];
 
-  // MP3 duration helper via sox (seconds). Returns 0.0 if unavailable.
-  $mp3_duration_sec = function(string $file): float {
-    if (!is_file($file)) return 0.0;
-    if (!function_exists('shell_exec')) return 0.0;
-
-    $cmd = 'sox --i -D ' . escapeshellarg($file) . ' 2>/dev/null';
-    $out = @shell_exec($cmd);
-    if (!is_string($out)) return 0.0;
-
-    $v = (float)trim($out);
-    return ($v > 0.0 && $v < 3600.0) ? $v : 0.0;
-  };
-
   // Normalize: lowercase + remove punctuation + compact spaces
   $norm = function(string $s): string {
     $s = mb_strtolower(trim($s));
@@ -42,44 +29,6 @@ function skill_vox_run(string $q): array {
     return $s;
   };
 
-  // Blocking playback helper: STOP-before-play + status check + duration fallback
-  $vox_play_blocking = function(string $file, int $timeoutSec = 30) use ($mp3_duration_sec): void {
-    if (!is_file($file)) return;
-
-    audio_stop();
-    usleep(80000);
-
-    audio_play_mp3($file);
-    usleep(120000);
-
-    $tStart = microtime(true);
-    $started = false;
-
-    while (true) {
-      $st = audio_status();
-      $playing = is_array($st) && !empty($st['playing']);
-      if ($playing) { $started = true; break; }
-      if ((microtime(true) - $tStart) > 0.35) break;
-      usleep(70000);
-    }
-
-    if (!$started) {
-      $d = $mp3_duration_sec($file);
-      if ($d <= 0.0) $d = min(2.0, (float)$timeoutSec);
-      usleep((int)(($d + 0.15) * 1000000));
-      return;
-    }
-
-    $t0 = microtime(true);
-    while (true) {
-      $st = audio_status();
-      $playing = is_array($st) && !empty($st['playing']);
-      if (!$playing) break;
-      if ((microtime(true) - $t0) > (float)$timeoutSec) break;
-      usleep(90000);
-    }
-  };
-
   // ----------------------------
   // Input normalization
   // ----------------------------
@@ -199,8 +148,11 @@ function skill_vox_run(string $q): array {
   if ($cue === $lastCue) $cue = $cueList[random_int(0, count($cueList)-1)];
   @file_put_contents($lastFile, $cue);
 
+  // Playback sequence: cue -> signature -> quote
+  $seq = [];
+
   $cueMp3 = $cueDir . '/' . $cue . '.mp3';
-  if (is_file($cueMp3)) $vox_play_blocking($cueMp3, 3);
+  if (is_file($cueMp3)) $seq[] = $cueMp3;
 
   // ----------------------------
   // Author signature
@@ -215,14 +167,16 @@ function skill_vox_run(string $q): array {
 
   if ($who) {
     $sig = $sigDir . "/$who/sig_" . random_int(1,3) . ".mp3";
-    if (is_file($sig)) $vox_play_blocking($sig, 5);
+    if (is_file($sig)) $seq[] = $sig;
   }
 
   // ----------------------------
   // Quote
   // ----------------------------
-  if (is_file($quoteMp3)) {
-    $vox_play_blocking($quoteMp3, 45);
+  if (is_file($quoteMp3)) $seq[] = $quoteMp3;
+
+  if ($seq) {
+    audio_replace($seq, 'tts');
   }
 
   return [